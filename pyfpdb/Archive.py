@@ -1,102 +1,230 @@
 # -*- coding: UTF-8 -*-
 #    Copyright 2012, Chaz Littlejohn
-#    
+#
 #    This program is free software; you can redistribute it and/or modify
 #    it under the terms of the GNU General Public License as published by
 #    the Free Software Foundation; either version 2 of the License, or
 #    (at your option) any later version.
-#    
+#
 #    This program is distributed in the hope that it will be useful,
 #    but WITHOUT ANY WARRANTY; without even the implied warranty of
 #    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
 #    GNU General Public License for more details.
-#    
+#
 #    You should have received a copy of the GNU General Public License
 #    along with this program; if not, write to the Free Software
 #    Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
 ########################################################################
 
-import os, sys
-import re
-from time import time, sleep
-import codecs
-import shutil
-import subprocess
+"""Compact on disk archive of the hands imported.
+
+The archive keeps the rows stored for each hand in HandsPlayers, HandsActions and
+HandsStove, as built by Database, in chunks of up to CHUNK_SIZE hands. A chunk is
+one file: a header with the range of hand ids and start times in it, then each
+column of each table as its own zlib compressed block, which compresses far better
+than rows do. quickImport stores the rows again at disk read speed, so these tables
+can be filled again and the caches rebuilt without the hand histories being parsed.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+import os
+import struct
+import zlib
+import cPickle
+
+import logging
+# logging has been set up in fpdb.py or HUD_main.py, use their settings:
+log = logging.getLogger("importer")
+
+import Database
+
+MAGIC = 'FPDBARC1'
+CHUNK_SIZE = 10000       # hands in a chunk at most
+SUFFIX = '.fpa'
+
+# columns of the tables archived, in the order Database stores them
+COLUMNS = {
+    'Hands'        : ['id', 'startTime'],
+    'HandsPlayers' : ['handId', 'playerId'] + list(reversed(Database.HANDS_PLAYERS_KEYS)),
+    'HandsActions' : ['handId', 'playerId', 'street', 'actionNo', 'streetActionNo', 'actionId',
+                      'amount', 'raiseTo', 'amountCalled', 'numDiscarded', 'cardsDiscarded', 'allIn'],
+    'HandsStove'   : ['handId', 'playerId', 'streetId', 'boardId', 'hiLo', 'rankId', 'value', 'cards', 'ev'],
+}
+# Database.prepare name of the insert statement of each table
+STATEMENTS = {
+    'HandsPlayers' : 'store_hands_players',
+    'HandsActions' : 'store_hands_actions',
+    'HandsStove'   : 'store_hands_stove',
+}
+
+
+class ArchiveChunk:
+    """One chunk file. The header is read when opened, the columns when asked for."""
+
+    def __init__(self, path):
+        self.path = path
+        f = open(path, 'rb')
+        try:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise IOError(_("%s is not an archive chunk") % path)
+            size = struct.unpack('>I', f.read(4))[0]
+            self.header = cPickle.loads(f.read(size))
+        finally:
+            f.close()
+        self.data = len(MAGIC) + 4 + size  # offset of the blocks
+        self.hands = self.header['hands']            # (min, max) hand id
+        self.startTimes = self.header['startTimes']  # (min, max) start time
+
+    def overlaps(self, hands=None, startTimes=None):
+        """Whether the chunk can hold hands in the hands id range and started in the
+           startTimes range, both (min, max) pairs, None for any"""
+        if hands and (self.hands[1] < hands[0] or self.hands[0] > hands[1]):
+            return False
+        if startTimes and (self.startTimes[1] < startTimes[0] or self.startTimes[0] > startTimes[1]):
+            return False
+        return True
+
+    def readColumns(self, table, columns=None):
+        """The values of columns (all if None) of table, as a list per column"""
+        info = self.header['tables'].get(table)
+        if info is None:
+            return []
+        if columns is None:
+            columns = info['columns']
+        f = open(self.path, 'rb')
+        try:
+            values = []
+            for column in columns:
+                offset, length = info['blocks'][info['columns'].index(column)]
+                f.seek(self.data + offset)
+                values.append(unzipFile(f.read(length)))
+        finally:
+            f.close()
+        return values
+
+    def readTable(self, table):
+        """The rows of table, as stored"""
+        return [list(row) for row in zip(*self.readColumns(table))]
 
-from IdentifySite import *
 
-class FPDBArchive:
-    def __init__(self, hand):
-        self.hid = hand.dbid_hands
-        self.handText = hand.handText
-        
 class Archive():
-    def __init__(self, config=None, path = None, ftype="hh"):
+    def __init__(self, config=None, path = None):
         self.config = config
-        self.archivePath = None
-        if config:
-            self.archivePath = config.imp.archivePath
-        self.path   = path
-        self.ftype  = ftype
-        self.handList = {}
-        self.sessionsArchive = {}
-        self.startCardsArchive = {}
-        self.positionsArchive = {}
-        
-    def quickImport(self, userid, filtertype, game, filter, settings, tz): pass
-    """Sets up import in 'quick' mode to import the HandsPlayers, HandsActions, and HandsStove records"""
-        
-    def getSiteSplit(self): pass
-    """Returns split string for each site so it can be added back into the handText when writing to archive"""
-    
-    def fileInfo(self, path, site, filter, filter_name, obj=None, summary=None): pass
-    """Sets file site and header info if applicable"""
-        
-    def addHand(self, hand, write=False): pass
-    """Creates a FPDBArchive object for the hand and adds it to the handList dictionary"""
-    
-    def createSession(self, sid): pass
-    """Creates a session directory for a given sessionId"""
-    
-    def mergeFiles(self, path1, path2): pass
-    """Merges two files together in cases where cash sessions need to be combined within a session"""
-    
-    def mergeSessions(self, oldsid, newsid): pass
-    """Merges two session directories together"""
-    
-    def mergeSubSessions(self, type, sid, oldId, newId, hids): pass
-    """Merges two cash session files together"""
-    
-    def addSessionHands(self, type, sid, id, hids): pass
-    """Adds the handText records for a session to the sessionsArchive dictionary and sets the path"""
-    
-    def addStartCardsHands(self, category, type, startCards, wid, siteId, hids): pass
-    """Adds the handText records for startCards to the startCardsArchive dictionary and sets the path"""
-    
-    def addPositionsHands(self, type, activeSeats, position, wid, siteId, hids): pass
-    """Adds the handText records for Positions to the positionsArchive dictionary and sets the path"""
-    
-    def getFile(self, path): pass
-    """Method for creating, appending and or unzipping a file"""
-    
-    def fileOrZip(self, path): pass
-    """Checks to see if the file exists or if the zip file exists. Unzips if necessary"""
-    
-    def writeHands(self, doinsert): pass
-    """Take the hands stored in the sessionsArchive, startCardsArchive, and positionsArchive dictionaries
-       and write or append those hands to files organized in the archive directory"""
-       
-    def zipFile(self, path): pass
-    """Zip a file for archiving"""
-    
-    def unzipFile(self, path): pass
-    """Unzip a file for import"""
-    
-    def zipAll(self): pass
-    """Recursively zip all the files in the archive directory"""
-    
-    def unzipAll(self): pass
-    """Recursively unzip all the files in the archive directory"""
-    
-     
\ No newline at end of file
+        self.archivePath = path
+        if config and path is None:
+            self.archivePath = config.get_import_parameters()['archivePath'] or None
+        self.rows = {}      # table -> rows of the hands added and not written yet
+        self.resetRows()
+
+    def resetRows(self):
+        for table in COLUMNS:
+            self.rows[table] = []
+
+    def addHand(self, db, hand, write=False):
+        """Adds the rows stored for hand, once inserted by db, to the next chunk.
+           The chunk is written when full, or now if write is set"""
+        hid = hand.dbid_hands
+        self.rows['Hands'].append([hid, hand.startTime.replace(tzinfo=None)])
+        self.rows['HandsPlayers'] += db.handsPlayersRows(hid, hand.dbid_pids, hand.handsplayers)
+        if hand.saveActions:
+            self.rows['HandsActions'] += db.handsActionsRows(hid, hand.dbid_pids, hand.handsactions)
+        self.rows['HandsStove'] += [list(hs) for hs in hand.handsstove]
+        if write or len(self.rows['Hands']) >= CHUNK_SIZE:
+            self.writeHands()
+
+    def writeHands(self):
+        """Writes the hands added since the last write as a chunk"""
+        hands = self.rows['Hands']
+        if not hands or not self.archivePath:
+            return
+        if not os.path.isdir(self.archivePath):
+            os.makedirs(self.archivePath)
+        ids = [h[0] for h in hands]
+        times = [h[1] for h in hands]
+        header = {'hands': (min(ids), max(ids)), 'startTimes': (min(times), max(times)), 'tables': {}}
+        blocks, offset = [], 0
+        for table, columns in COLUMNS.iteritems():
+            rows = self.rows[table]
+            info = {'columns': columns, 'rows': len(rows), 'blocks': []}
+            for values in zip(*rows) or [()] * len(columns):
+                block = zipFile(list(values))
+                info['blocks'].append((offset, len(block)))
+                blocks.append(block)
+                offset += len(block)
+            header['tables'][table] = info
+        path = self.getFile(header['hands'])
+        data = cPickle.dumps(header, cPickle.HIGHEST_PROTOCOL)
+        f = open(path + '.tmp', 'wb')
+        try:
+            f.write(MAGIC)
+            f.write(struct.pack('>I', len(data)))
+            f.write(data)
+            for block in blocks:
+                f.write(block)
+        finally:
+            f.close()
+        os.rename(path + '.tmp', path)
+        log.info(_("Archived %d hands in %s") % (len(hands), path))
+        self.resetRows()
+
+    def getFile(self, hands):
+        """A new chunk file name for the hand id range hands"""
+        name = '%012d-%012d' % hands
+        path, n = os.path.join(self.archivePath, name + SUFFIX), 1
+        while os.path.exists(path):
+            path, n = os.path.join(self.archivePath, '%s.%d%s' % (name, n, SUFFIX)), n + 1
+        return path
+
+    def chunks(self, hands=None, startTimes=None):
+        """The chunks of the archive that can hold hands of the hands id and startTimes
+           ranges, in hand id order"""
+        found = []
+        if not self.archivePath or not os.path.isdir(self.archivePath):
+            return found
+        for name in sorted(os.listdir(self.archivePath)):
+            if name.endswith(SUFFIX):
+                try:
+                    chunk = ArchiveChunk(os.path.join(self.archivePath, name))
+                except (IOError, EOFError, cPickle.UnpicklingError), e:
+                    log.error(_("Skipping archive chunk %s: %s") % (name, e))
+                    continue
+                if chunk.overlaps(hands, startTimes):
+                    found.append(chunk)
+        return found
+
+    def quickImport(self, db, tables=('HandsPlayers', 'HandsActions', 'HandsStove'),
+                    hands=None, startTimes=None, replace=True):
+        """Stores the archived rows of tables for the hands in the hands id and
+           startTimes ranges, (min, max) pairs or None for all. With replace, the rows
+           already stored for those hands are deleted first. Returns the number of hands"""
+        c = db.get_cursor()
+        count = 0
+        for chunk in self.chunks(hands, startTimes):
+            ids, times = chunk.readColumns('Hands')
+            keep = set([hid for hid, start in zip(ids, times)
+                        if (not hands or hands[0] <= hid <= hands[1])
+                        and (not startTimes or startTimes[0] <= start <= startTimes[1])])
+            if not keep:
+                continue
+            for table in tables:
+                if replace:
+                    q = db.sql.compiled['delete_archived_rows'].replace('<table>', table)
+                    c.execute(q, (list(keep),))
+                rows = [row for row in chunk.readTable(table) if row[0] in keep]
+                if rows:
+                    db.executemany(c, db.prepare(c, STATEMENTS[table]), rows)
+            db.commit()
+            count += len(keep)
+        return count
+
+
+def zipFile(values):
+    """Compress a column of values for archiving"""
+    return zlib.compress(cPickle.dumps(values, cPickle.HIGHEST_PROTOCOL))
+
+def unzipFile(block):
+    """The column of values of a compressed block"""
+    return cPickle.loads(zlib.decompress(block))
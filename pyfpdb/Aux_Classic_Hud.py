@@ -128,8 +128,8 @@ class Classic_stat(Aux_Hud.Simple_stat):
         try: self.hudcolor = gtk.gdk.Color(game_stat_config.hudcolor)
         except: self.hudcolor = gtk.gdk.Color(aw.params['fgcolor']) 
 
-    def update(self, player_id, stat_dict):
-        super(Classic_stat, self).update(player_id, stat_dict)
+    def update(self, player_id, stat_dict, number=None):
+        super(Classic_stat, self).update(player_id, stat_dict, number)
 
         if not self.number: #stat did not create, so exit now
             return False
@@ -92,6 +92,9 @@ class Simple_HUD(Aux_Base.Aux_Seats):
                     = self.game_params.stats[stat].popup
             self.tips[self.game_params.stats[stat].rowcol[0]][self.game_params.stats[stat].rowcol[1]] \
                     = self.game_params.stats[stat].tip
+
+        # the stat functions are looked up here once, not for every stat on every hand
+        self.stat_plan = Stats.StatPlan([stat for row in self.stats for stat in row])
                                         
     def create_contents(self, container, i):
         # this is a call to whatever is in self.aw_class_window but it isn't obvious
@@ -135,6 +138,8 @@ class Simple_Stat_Window(Aux_Base.Seat_Window):
     def __init__(self, aw = None, seat = None):
         super(Simple_Stat_Window, self).__init__(aw, seat)
         self.popup_count = 0
+        self.last_player = None # player and StatPlan state of the stats shown
+        self.last_stats = None
         
     def button_press_left(self, widget, event, *args): #move window
         self.begin_move_drag(event.button, int(event.x_root), int(event.y_root), event.time)
@@ -175,9 +180,14 @@ class Simple_Stat_Window(Aux_Base.Seat_Window):
         if i == "common": return
         player_id = self.aw.get_id_from_seat(i)
         if player_id is None: return
+        last = self.last_stats if player_id == self.last_player else None
+        self.last_stats, numbers = self.aw.stat_plan.evaluate(self.aw.hud.stat_dict, player_id,
+                                                              self.aw.hud.hand_instance, last)
+        self.last_player = player_id
+        if numbers is None: return # same stats as shown already
         for r in xrange(self.aw.nrows):
             for c in xrange(self.aw.ncols):
-                self.stat_box[r][c].update(player_id, self.aw.hud.stat_dict)
+                self.stat_box[r][c].update(player_id, self.aw.hud.stat_dict, numbers[r*self.aw.ncols + c])
 
 
 class Simple_stat(object):
@@ -194,10 +204,13 @@ class Simple_stat(object):
         self.stat_dict = None
         self.hud = aw.hud
 
-    def update(self, player_id, stat_dict):
+    def update(self, player_id, stat_dict, number=None):
+        """number: the stat as evaluated by the window's StatPlan, computed here if None"""
         self.stat_dict = stat_dict     # So the Simple_stat obj always has a fresh stat_dict
         self.eb.stat_dict = stat_dict
-        self.number = Stats.do_stat(stat_dict, player_id, self.stat, self.hud.hand_instance)
+        if number is None:
+            number = Stats.do_stat(stat_dict, player_id, self.stat, self.hud.hand_instance)
+        self.number = number
         if self.number:
             self.lab.set_text( str(self.number[1]))
 
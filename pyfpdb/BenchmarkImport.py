@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""Benchmark of the import pipeline on the regression test files.
+
+Each site's converter parses its hand histories in regression-test-files (as
+many times over as --replicate says), the stats of the parsed hands are derived
+as a parse process of the Importer does, and with --store the files are
+imported into the database of the config file, which is emptied first, so give
+it one of its own and say so with --recreate. The hands per second of each stage
+and the peak memory of the process are printed for each site and can be saved
+as JSON, to be compared with on a later run: a stage slower than the baseline, or
+a peak memory higher, by more than --tolerance is a regression, and the exit
+status is then 1.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+import sys
+import json
+from optparse import OptionParser
+from time import time
+
+try:
+    import resource
+except ImportError:
+    resource = None     # no peak memory on windows
+
+import Configuration
+import IdentifySite
+import ImportProfile
+
+STAGES = ('parse', 'derive', 'store')
+# the stages of a converter's profile that are parsing the files, 'parse' is a call per hand
+PARSE_STAGES = ('read', 'split')
+# the stages of the Importer's profile that are storing hands
+STORE_STAGES = ('prepInsert', 'archive')
+
+class SiteIds(dict):
+    """Site ids without a Sites table: the next number for each site asked for"""
+    def __missing__(self, site):
+        self[site] = len(self) + 1
+        return self[site]
+
+def peakMemory():
+    """Peak resident memory of the process so far in KB, None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024    # bytes there
+    return peak
+
+def siteFiles(config, path, sitename = None):
+    """site name -> the hh files of the site under path, sorted"""
+    idsite = IdentifySite.IdentifySite(config)
+    idsite.scan(path)
+    files = {}
+    for f, fobj in idsite.filelist.iteritems():
+        if fobj.ftype == "hh" and (sitename is None or fobj.site.name == sitename):
+            files.setdefault(fobj.site.name, []).append(fobj)
+    for fobjs in files.itervalues():
+        fobjs.sort(key = lambda fobj: fobj.path)
+    return files
+
+def parseAndDerive(config, fobjs, replicate, profile):
+    """Parse the files replicate times and derive the stats of their hands, as
+       Importer._parse_hh_worker does. The time of each is added to profile as
+       'parse' and 'derive', the stages of parsing included"""
+    for i in range(replicate):
+        for fobj in fobjs:
+            obj = getattr(__import__(fobj.site.hhc_fname), fobj.site.filter_name)
+            hhc = obj(config, in_path = fobj.path, autostart = False, sitename = fobj.site.name)
+            hhc.setProfile(profile)
+            try:
+                hhc.start()
+            except Exception, e:
+                print _("%s failed to parse: %r") % (fobj.path, e)
+                continue
+            stime = time()
+            derived = 0
+            for hand in hhc.getProcessedHands():
+                try:
+                    hand.assembleDetached()
+                    derived += 1
+                except Exception, e:
+                    print _("%s hand %s failed to derive: %r") % (fobj.path, hand.handid, e)
+            profile.add('derive', time() - stime, derived)
+
+def store(importer, fobjs, profile):
+    """Import the files with importer, adding the time of the store stages of its
+       profile to profile as 'store'"""
+    for fobj in fobjs:
+        importer.addImportFile(fobj.path, site = fobj.site.name)
+    stored = importer.runImport()[0]
+    importer.clearFileList()
+    seconds = 0.0
+    for stage, (calls, secs) in importer.profile.stages.iteritems():
+        if stage in STORE_STAGES or stage.startswith('db.'):
+            seconds += secs
+    profile.add('store', seconds, stored)
+
+def rates(profile):
+    """stage -> [hands, hands per second] of the stages in profile"""
+    result = {}
+    for stage in STAGES:
+        if stage in profile.stages:
+            hands, seconds = profile.stages[stage]
+            if stage == 'parse':
+                seconds += sum([profile.stages.get(s, [0, 0.0])[1] for s in PARSE_STAGES])
+            result[stage] = [hands, hands / seconds if seconds else 0.0]
+    return result
+
+def compareResults(results, baseline, tolerance):
+    """The lines describing each site and stage of results slower than in baseline,
+       and each site with a peak memory higher, by more than the fraction tolerance.
+       'all' is only compared if the sites are the same"""
+    regressions = []
+    for site in sorted(results):
+        if site == 'all' and sorted(results) != sorted(baseline):
+            continue
+        for stage in STAGES:
+            new = results[site].get(stage)
+            old = baseline.get(site, {}).get(stage)
+            if new is None or old is None or not old[1]:
+                continue
+            if new[1] < old[1] * (1 - tolerance):
+                regressions.append(_("%s %s: %.0f hands/s, baseline %.0f hands/s (%+.0f%%)")
+                                   % (site, stage, new[1], old[1], 100 * (new[1] / old[1] - 1)))
+        new = results[site].get('peakKB')
+        old = baseline.get(site, {}).get('peakKB')
+        if new and old and new > old * (1 + tolerance):
+            regressions.append(_("%s peak memory: %d KB, baseline %d KB (%+.0f%%)")
+                               % (site, new, old, 100 * (float(new) / old - 1)))
+    return regressions
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = OptionParser()
+    parser.add_option("-c", "--configFile", dest="config", default="HUD_config.test.xml",
+                      help=_("Configuration file, of the database --store imports into"))
+    parser.add_option("-s", "--sitename", dest="sitename", default=None,
+                      help=_("Only benchmark this site"))
+    parser.add_option("-D", "--directory", dest="directory", default="regression-test-files",
+                      help=_("Directory of the hand histories"))
+    parser.add_option("-n", "--replicate", dest="replicate", default=1, type="int",
+                      help=_("Parse and derive the files this many times"))
+    parser.add_option("--store", action="store_true", dest="store", default=False,
+                      help=_("Also import the files into the database, which is emptied first"))
+    parser.add_option("--recreate", action="store_true", dest="recreate", default=False,
+                      help=_("Allow --store to drop and recreate the tables of the database"))
+    parser.add_option("-b", "--baseline", dest="baseline", metavar="FILE", default=None,
+                      help=_("Compare with the results saved in FILE"))
+    parser.add_option("--save", dest="save", metavar="FILE", default=None,
+                      help=_("Save the results to FILE as JSON"))
+    parser.add_option("-t", "--tolerance", dest="tolerance", default=0.2, type="float",
+                      help=_("Fraction slower than the baseline a stage may be. Default is 0.2"))
+    (options, argv) = parser.parse_args(argv)
+    if options.store and not options.recreate:
+        parser.error(_("--store empties the database of the config file, add --recreate to confirm"))
+
+    Configuration.set_logfile("fpdb-log.txt")
+    config = Configuration.Config(file = options.config)
+    if options.sitename:
+        import Options
+        options.sitename = Options.site_alias(options.sitename)
+
+    importer = None
+    if not options.store:
+        # no database to read them from, they are only stored in the hands
+        config.site_ids = SiteIds()
+    else:
+        import Database
+        import Importer
+        Database.Database(config).recreate_tables()
+        settings = {}
+        settings.update(config.get_db_parameters())
+        settings.update(config.get_import_parameters())
+        settings.update(config.get_default_paths())
+        importer = Importer.Importer(False, settings, config, None)
+        importer.setDropIndexes("don't drop")
+        importer.setCallHud(False)
+
+    results = {}
+    total = ImportProfile.ImportProfile()
+    for site, fobjs in sorted(siteFiles(config, options.directory, options.sitename).iteritems()):
+        profile = ImportProfile.ImportProfile()
+        parseAndDerive(config, fobjs, options.replicate, profile)
+        if importer is not None:
+            store(importer, fobjs, profile)
+        results[site] = rates(profile)
+        results[site]['peakKB'] = peakMemory()
+        total.merge(profile)
+        print "%-20s" % site, "  ".join(["%s %6d hands %8.0f/s" % (stage, results[site][stage][0], results[site][stage][1])
+                                       for stage in STAGES if stage in results[site]]), \
+              _("peak %s KB") % results[site]['peakKB']
+    results['all'] = rates(total)
+    results['all']['peakKB'] = peakMemory()
+    print _("Profile of all the sites:")
+    print total.report()
+
+    if options.save:
+        f = open(options.save, 'w')
+        try:
+            json.dump(results, f, sort_keys = True, indent = 1)
+        finally:
+            f.close()
+    if options.baseline:
+        f = open(options.baseline)
+        try:
+            baseline = json.load(f)
+        finally:
+            f.close()
+        regressions = compareResults(results, baseline, options.tolerance)
+        for line in regressions:
+            print _("Slower than the baseline:"), line
+        if regressions:
+            return 1
+        print _("No stage slower than the baseline by more than %.0f%%") % (100 * options.tolerance)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -427,7 +427,7 @@ class Bovada(HandHistoryConverter):
                     hand.gametype['currency']="play"
         for a in self.re_Action.finditer(self.re_Hole_Third.split(hand.handText)[0]):
             if a.group('ATYPE') == ' All-in':
-                re_Ante_Plyr  = re.compile(r"^" + re.escape(a.group('PNAME')) + " (\s?\[ME\]\s)?: Ante chip %(CUR)s(?P<ANTE>[%(NUM)s]+)" % self.substitutions, re.MULTILINE)
+                re_Ante_Plyr  = self.compileRegex(r"^" + re.escape(a.group('PNAME')) + " (\s?\[ME\]\s)?: Ante chip %(CUR)s(?P<ANTE>[%(NUM)s]+)" % self.substitutions, re.MULTILINE)
                 m = self.re_Antes.search(hand.handText)
                 m1 = re_Ante_Plyr.search(hand.handText)
                 if (not m or m1):
@@ -613,6 +613,7 @@ class Import:
         self.callFpdbHud = string_to_bool(node.getAttribute("callFpdbHud"), default=False)
         self.fastStoreHudCache = string_to_bool(node.getAttribute("fastStoreHudCache"), default=False)
         self.saveStarsHH = string_to_bool(node.getAttribute("saveStarsHH"), default=False)
+        self.archivePath = node.getAttribute("archivePath")
 
     def __str__(self):
         return "    interval = %s\n    callFpdbHud = %s\n    saveActions = %s\n   cacheSessions = %s\n    publicDB = %s\n    sessionTimeout = %s\n    fastStoreHudCache = %s\n    ResultsDirectory = %s" \
@@ -769,14 +770,14 @@ class RawHands:
             if save in ("none", "error", "all"):
                 self.save = save
             else:
-                print (_("Invalid config value for %s, defaulting to %s") % (raw_hands.save, "\"error\""))
+                print (_("Invalid config value for %s, defaulting to %s") % ("raw_hands save", "\"error\""))
                 self.save = "error"
 
             compression = node.getAttribute("compression")
-            if save in ("none", "gzip", "bzip2"):
+            if compression in ("none", "gzip", "bzip2"):
                 self.compression = compression
             else:
-                print (_("Invalid config value for %s, defaulting to %s") % (raw_hands.compression, "\"none\""))
+                print (_("Invalid config value for %s, defaulting to %s") % ("raw_hands compression", "\"none\""))
                 self.compression = "none"
 
     #end def __init__
@@ -798,14 +799,14 @@ class RawTourneys:
             if save in ("none", "error", "all"):
                 self.save = save
             else:
-                print (_("Invalid config value for %s, defaulting to %s") % (raw_tourneys.save, "\"error\""))
+                print (_("Invalid config value for %s, defaulting to %s") % ("raw_tourneys save", "\"error\""))
                 self.save = "error"
 
             compression = node.getAttribute("compression")
-            if save in ("none", "gzip", "bzip2"):
+            if compression in ("none", "gzip", "bzip2"):
                 self.compression = compression
             else:
-                print (_("Invalid config value for %s, defaulting to %s") % (raw_tourneys.compression, "\"none\""))
+                print (_("Invalid config value for %s, defaulting to %s") % ("raw_tourneys compression", "\"none\""))
                 self.compression = "none"
 
     #end def __init__
@@ -1559,6 +1560,12 @@ class Config:
         except:
             imp['fastStoreHudCache'] = False
 
+        # archivePath is where Archive keeps the hands imported, not archived if unset
+        try:
+            imp['archivePath'] = self.imp.archivePath
+        except:
+            imp['archivePath'] = ""
+
         return imp
 
     def get_default_paths(self, site=None):
@@ -42,8 +42,12 @@ from decimal_wrapper import Decimal
 import string
 import re
 import Queue
+import threading
+from contextlib import contextmanager
 import codecs
+from cStringIO import StringIO
 import math 
+import bisect
 import pytz
 import logging
 
@@ -55,6 +59,7 @@ import Card
 import Charset
 from Exceptions import *
 import Configuration
+import ReportCache
 
 if __name__ == "__main__":
     Configuration.set_logfile("fpdb-log.txt")
@@ -79,6 +84,13 @@ except ImportError:
 
 DB_VERSION = 190
 
+# hand ids in each step of the chunked cache rebuilds
+REBUILD_CHUNK = 100000
+
+# Database handles kept open at most by the pool, see checkout
+POOL_SIZE = 5
+POOL_TIMEOUT = 30   # seconds to wait for a handle when all are checked out
+
 # Variance created as sqlite has a bunch of undefined aggregate functions.
 
 class VARIANCE:
@@ -351,6 +363,20 @@ CACHE_KEYS = [
     'street4Raises',
     ]
 
+# Key columns of the cache tables, in the order of their insert queries
+HUDCACHE_KEYS = ['gametypeId', 'playerId', 'activeSeats', 'position', 'tourneyTypeId', 'styleKey']
+CARDSCACHE_KEYS = ['weekId', 'monthId', 'gametypeId', 'tourneyTypeId', 'playerId', 'streetId', 'boardId', 'hiLo', 'startCards', 'rankId']
+POSITIONSCACHE_KEYS = ['weekId', 'monthId', 'gametypeId', 'tourneyTypeId', 'playerId', 'activeSeats', 'position']
+CASHCACHE_KEYS = ['sessionId', 'startTime', 'endTime', 'gametypeId', 'playerId']
+TOURCACHE_KEYS = ['sessionId', 'startTime', 'endTime', 'tourneyId', 'playerId']
+
+# table -> (key columns, the key columns that can be NULL), for the rebuilds of the caches
+CACHE_TABLES = {
+    'HudCache'       : (HUDCACHE_KEYS, ('tourneyTypeId',)),
+    'CardsCache'     : (CARDSCACHE_KEYS, ('gametypeId', 'tourneyTypeId', 'startCards')),
+    'PositionsCache' : (POSITIONSCACHE_KEYS, ('gametypeId', 'tourneyTypeId')),
+    }
+
 
 class Database:
 
@@ -599,6 +625,7 @@ class Database:
         self.day_start = 0
         self._hero = None
         self._has_lock = False
+        self.hold_commits = False
         self.printdata = False
         self.resetCache()
         self.resetBulkCache()
@@ -650,6 +677,7 @@ class Database:
             self.date_ndays_ago = 'd000000'    # date N days ago ('d' + YYMMDD)
             self.h_date_ndays_ago = 'd000000'  # date N days ago ('d' + YYMMDD) for hero
             self.date_nhands_ago = {}          # dates N hands ago per player - not used yet
+            self.hud_stat_cache = None         # HudStatCache used by get_stats_from_hand, set by the HUD
 
             self.saveActions = False if self.import_options['saveActions'] == False else True
 
@@ -659,31 +687,16 @@ class Database:
                 self.connection.rollback()  # make sure any locks taken so far are released
     #end def __init__
 
-    def dumpDatabase(self):
-        result="fpdb database dump\nDB version=" + str(DB_VERSION)+"\n\n"
-
-        tables=self.cursor.execute(self.sql.query['list_tables'])
-        tables=self.cursor.fetchall()
-        for table in (u'Actions', u'Autorates', u'Backings', u'Gametypes', u'Hands', u'Boards', u'HandsActions', u'HandsPlayers', u'HandsStove', u'Files', u'HudCache', u'SessionsCache', u'CashCache', u'TourCache',u'Players', u'RawHands', u'RawTourneys', u'Settings', u'Sites', u'TourneyTypes', u'Tourneys', u'TourneysPlayers'):
-            print "table:", table
-            result+="###################\nTable "+table+"\n###################\n"
-            rows=self.cursor.execute(self.sql.query['get'+table])
-            rows=self.cursor.fetchall()
-            columnNames=self.cursor.description
-            if not rows:
-                result+="empty table\n"
-            else:
-                for row in rows:
-                    for columnNumber in range(len(columnNames)):
-                        if columnNames[columnNumber][0]=="importTime":
-                            result+=("  "+columnNames[columnNumber][0]+"=ignore\n")
-                        elif columnNames[columnNumber][0]=="styleKey":
-                            result+=("  "+columnNames[columnNumber][0]+"=ignore\n")
-                        else:
-                            result+=("  "+columnNames[columnNumber][0]+"="+str(row[columnNumber])+"\n")
-                    result+="\n"
-            result+="\n"
-        return result
+    def dumpDatabase(self, f, format="text", progress=None):
+        """Write all the tables to the file f in format (text, csv or binary), a chunk
+           of rows at a time, see DatabaseDump. Returns a dict of the rows of each table"""
+        import DatabaseDump
+        return DatabaseDump.dump(self, f, format, progress)
+
+    def restoreDatabase(self, f, progress=None):
+        """Replace the rows of all the tables with those of a csv or binary dump in f"""
+        import DatabaseDump
+        return DatabaseDump.restore(self, f, progress)
     #end def dumpDatabase
 
     # could be used by hud to change hud style
@@ -729,6 +742,7 @@ class Database:
         self.connection = None
         self.cursor     = None
         self.hand_inc   = 1
+        self.prepared   = None # name -> EXECUTE text of the statements prepared on the connection
 
         import psycopg2
         import psycopg2.extensions
@@ -809,6 +823,9 @@ class Database:
     #end def connect
 
     def commit(self):
+        if self.hold_commits:
+            # the caller commits once several store calls are done
+            return
         if self.backend != self.SQLITE:
             self.connection.commit()
         else:
@@ -862,7 +879,23 @@ class Database:
         """Reconnects the DB"""
         #print "started reconnect"
         self.disconnect(due_to_error)
-        self.connect(self.backend, self.host, self.database, self.user, self.password)
+        self.connect(self.backend, self.host, self.port, self.database, self.user, self.password)
+
+    def is_alive(self):
+        """True if the connection still answers a query. Ends the transaction"""
+        if not self.is_connected():
+            return False
+        try:
+            self.connection.rollback()
+            c = self.connection.cursor()
+            c.execute("SELECT 1")
+            c.fetchone()
+            c.close()
+            self.connection.rollback()
+            return True
+        except Exception, e:
+            log.warning(_("Database connection lost: %s") % e)
+            return False
 
     def get_backend_name(self):
         """Returns the name of the currently used backend"""
@@ -920,14 +953,24 @@ class Database:
         # returns a gameinfo (gametype) dictionary suitable for passing
         #  to Hand.hand_factory
         c = self.connection.cursor()
-        q = self.sql.query['get_gameinfo_from_hid']
-        q = q.replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['get_gameinfo_from_hid']
         c.execute (q, (hand_id, ))
         row = c.fetchone()
         gameinfo = {'sitename':row[0],'category':row[1],'base':row[2],'type':row[3],'limitType':row[4],
                 'hilo':row[5],'sb':row[6],'bb':row[7], 'sbet':row[8],'bbet':row[9], 'currency':row[10], 'gametypeId':row[11]}
         return gameinfo
         
+    def get_gameinfo_from_hids(self, hand_ids):
+        # set based get_gameinfo_from_hid, returns a dict of gameinfo dictionaries by hand id
+        c = self.connection.cursor()
+        q = self.sql.compiled['get_gameinfo_from_hids']
+        c.execute (q, (list(hand_ids), ))
+        gameinfos = {}
+        for row in c.fetchall():
+            gameinfos[row[0]] = {'sitename':row[1],'category':row[2],'base':row[3],'type':row[4],'limitType':row[5],
+                'hilo':row[6],'sb':row[7],'bb':row[8], 'sbet':row[9],'bbet':row[10], 'currency':row[11], 'gametypeId':row[12]}
+        return gameinfos
+        
 #   Query 'get_hand_info' does not exist, so it seems
 #    def get_hand_info(self, new_hand_id):
 #        c = self.connection.cursor()
@@ -954,12 +997,10 @@ class Database:
 
     def getSiteTourneyNos(self, site):
         c = self.connection.cursor()
-        q = self.sql.query['getSiteId']
-        q = q.replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['getSiteId']
         c.execute(q, (site,))
         siteid = c.fetchone()[0]
-        q = self.sql.query['getSiteTourneyNos']
-        q = q.replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['getSiteTourneyNos']
         c.execute(q, (siteid,))
         alist = []
         for row in c.fetchall():
@@ -1121,6 +1162,12 @@ class Database:
         #elif h_stat_range == 'H':
         #    h_stylekey = date_nhands_ago  needs array by player here ...
 
+        if self.hud_stat_cache is not None:
+            self.hud_stat_cache.get_stats(hand, stat_dict, hero_id
+                                         ,stat_range, stylekey, agg_bb_mult, seats_min, seats_max
+                                         ,h_stat_range, h_stylekey, h_agg_bb_mult, h_seats_min, h_seats_max)
+            return stat_dict
+
         # lookup gametypeId from hand
         handinfo = self.get_gameinfo_from_hid(hand)
         gametypeId = handinfo["gametypeId"]
@@ -1485,6 +1532,7 @@ class Database:
         self.createAllIndexes()
         self.commit()
         self.get_sites()
+        ReportCache.invalidate(self.config)
         log.info(_("Finished recreating tables"))
     #end def recreate_tables
 
@@ -1510,6 +1558,7 @@ class Database:
         c.execute(self.sql.query['createTourneysPlayersTable'])
         c.execute(self.sql.query['createCashCacheTable'])
         c.execute(self.sql.query['createTourCacheTable'])
+        c.execute(self.sql.query['createCacheRebuildsTable'])
         c.execute(self.sql.query['createHandsTable'])
         c.execute(self.sql.query['createHandsPlayersTable'])
         c.execute(self.sql.query['createHandsActionsTable'])
@@ -1982,8 +2031,11 @@ class Database:
                 
         return query
 
-    def rebuild_cache(self, h_start=None, v_start=None, table = 'HudCache', ttid = None, wmid = None):
-        """clears hudcache and rebuilds from the individual handsplayers records"""
+    def rebuild_cache(self, h_start=None, v_start=None, table = 'HudCache', ttid = None, wmid = None, pids = None, callback = None):
+        """clears hudcache and rebuilds from the individual handsplayers records
+           pids limits the rebuild to the rows of those players, eg. after a new hero
+           was added. Full and players rebuilds run in checkpointed chunks of hands
+           on PostgreSQL, see rebuild_in_chunks."""
         stime = time()
         # derive list of program owner's player ids
         self.hero = {}                               # name of program owner indexed by site id
@@ -2007,11 +2059,20 @@ class Database:
                 h_start = self.hero_hudstart_def
             if not v_start:
                 v_start = self.villain_hudstart_def
-                
-        if not ttid and not wmid:
-            self.get_cursor().execute(self.sql.query['clear%s' % table])
-            self.commit()
         
+        chunked = self.backend == self.PGSQL and not ttid and not wmid
+        if chunked and pids:
+            pending = self.get_cache_rebuild(table)
+            if pending is not None and pending[0] != repr((h_start, v_start, sorted(pids))):
+                # the rows of the other players are from an unfinished rebuild too
+                log.warning(_("Unfinished %s rebuild found, rebuilding all players.") % table)
+                pids = None
+        if pids:
+            players = " AND hp.playerId IN (%s)" % ','.join([str(int(p)) for p in pids])
+        else:
+            players = ""
+        
+        queries = []
         if not ttid:
             if self.hero_ids is None:
                 if wmid:
@@ -2024,14 +2085,12 @@ class Database:
                         + "   or (    hp.playerId in " + str(tuple(self.hero_ids.values())) \
                         + "       and h.startTime > '" + h_start + "'))" \
                         + "   AND hp.tourneysPlayersId IS NULL)"
-            rebuild_sql_cash = self.sql.query['rebuildCache'].replace('%s', self.sql.query['placeholder'])
+            rebuild_sql_cash = self.sql.compiled['rebuildCache']
             rebuild_sql_cash = rebuild_sql_cash.replace('<tourney_join_clause>', "")
-            rebuild_sql_cash = rebuild_sql_cash.replace('<where_clause>', where)
+            rebuild_sql_cash = rebuild_sql_cash.replace('<where_clause>', where + players + '<hand_range>')
             rebuild_sql_cash = self.replace_statscache('ring', table, rebuild_sql_cash)
             #print rebuild_sql_cash 
-            self.get_cursor().execute(rebuild_sql_cash)
-            self.commit()
-            #print _("Rebuild cache(cash) took %.1f seconds") % (time() - stime,)
+            queries.append(rebuild_sql_cash)
 
         if ttid:
             where = "WHERE t.tourneyTypeId = %s<hero_where>" % ttid
@@ -2046,22 +2105,96 @@ class Database:
                     + "   or (    hp.playerId in " + str(tuple(self.hero_ids.values())) \
                     + "       and h.startTime > '" + h_start + "'))" \
                     + "   AND hp.tourneysPlayersId >= 0)"
-        rebuild_sql_tourney = self.sql.query['rebuildCache'].replace('%s', self.sql.query['placeholder'])
+        rebuild_sql_tourney = self.sql.compiled['rebuildCache']
         rebuild_sql_tourney = rebuild_sql_tourney.replace('<tourney_join_clause>', """INNER JOIN Tourneys t ON (t.id = h.tourneyId)""")
-        rebuild_sql_tourney = rebuild_sql_tourney.replace('<where_clause>', where)
+        rebuild_sql_tourney = rebuild_sql_tourney.replace('<where_clause>', where + players + '<hand_range>')
         rebuild_sql_tourney = self.replace_statscache('tour', table, rebuild_sql_tourney)
         #print rebuild_sql_tourney
-        self.get_cursor().execute(rebuild_sql_tourney)
-        self.commit()
+        queries.append(rebuild_sql_tourney)
+        
+        if pids:
+            def clear(c):
+                c.execute(self.sql.query['clearCachePlayers'].replace('<table>', table), (list(pids),))
+        else:
+            def clear(c):
+                c.execute(self.sql.query['clear%s' % table])
+        
+        if chunked:
+            self.rebuild_in_chunks(table, repr((h_start, v_start, pids and sorted(pids))), queries, clear, callback)
+        else:
+            c = self.get_cursor()
+            if not ttid and not wmid:
+                clear(c)
+                self.commit()
+            for q in queries:
+                c.execute(q.replace('<hand_range>', ''))
+                self.commit()
+        ReportCache.invalidate(self.config)
         #print _("Rebuild hudcache took %.1f seconds") % (time() - stime,)
     #end def rebuild_cache
     
+    def get_cache_rebuild(self, table):
+        """Returns (params, last hand id done, last hand id to do) of the unfinished
+           chunked rebuild of table, or None"""
+        c = self.get_cursor()
+        c.execute(self.sql.query['createCacheRebuildsTable'])
+        c.execute(self.sql.compiled['select_cache_rebuild'], (table,))
+        row = c.fetchone()
+        self.commit()
+        return row
+    
+    def start_cache_rebuild(self, table, params, clear):
+        """Returns the last hand id done and the last hand id to do of the rebuild of table
+           with params: where an interrupted one stopped, else 0 and the last hand in the
+           database, after clearing the rows to rebuild with clear(cursor)"""
+        pending = self.get_cache_rebuild(table)
+        if pending is not None and pending[0] == params:
+            log.info(_("Resuming %s rebuild at hand id %d of %d") % (table, pending[1], pending[2]))
+            return pending[1], pending[2]
+        c = self.get_cursor()
+        c.execute(self.sql.compiled['delete_cache_rebuild'], (table,))
+        c.execute(self.sql.query['get_last_hand'])
+        end = c.fetchone()[0] or 0
+        clear(c)
+        c.execute(self.sql.compiled['insert_cache_rebuild'], (table, params, 0, end))
+        self.commit()
+        return 0, end
+    
+    def rebuild_in_chunks(self, table, params, queries, clear, callback=None):
+        """Runs the rebuildCache queries of table over ranges of REBUILD_CHUNK hand ids,
+           adding the rows of each range to table. The range done is recorded in
+           CacheRebuilds in the same transaction, so a rebuild with the same params
+           interrupted part way resumes from there instead of starting again. Hands
+           imported after the rebuild started are left to the importer.
+           callback, if given, is called with the fraction done after each range."""
+        keys, nullable = CACHE_TABLES[table]
+        start, end = self.start_cache_rebuild(table, params, clear)
+        c = self.get_cursor()
+        stage = re.compile('INSERT INTO\s+%s\\b' % table)
+        while start < end:
+            stime = time()
+            last = min(start + REBUILD_CHUNK, end)
+            hand_range = ' AND h.id > %d AND h.id <= %d' % (start, last)
+            for q in queries:
+                create = self.sql.query['create_cache_stage']
+                c.execute(create.replace('<table>', table).replace('<columns>', ', '.join(keys + CACHE_KEYS)))
+                c.execute(stage.sub('INSERT INTO cache_stage', q, 1).replace('<hand_range>', hand_range))
+                self.mergeCacheStage(c, table, keys, keys, nullable)
+            c.execute(self.sql.compiled['update_cache_rebuild'], (last, table))
+            self.commit()
+            log.debug(_("%s rebuilt to hand id %d of %d in %.1f seconds") % (table, last, end, time() - stime))
+            if callback is not None:
+                callback(float(last) / end)
+            start = last
+        c.execute(self.sql.compiled['delete_cache_rebuild'], (table,))
+        self.commit()
+    
     def update_timezone(self, tz_name):
-        select_WC     = self.sql.query['select_WC'].replace('%s', self.sql.query['placeholder'])
-        select_MC     = self.sql.query['select_MC'].replace('%s', self.sql.query['placeholder'])
-        insert_WC     = self.sql.query['insert_WC'].replace('%s', self.sql.query['placeholder'])
-        insert_MC     = self.sql.query['insert_MC'].replace('%s', self.sql.query['placeholder'])
-        update_WM_SC  = self.sql.query['update_WM_SC'].replace('%s', self.sql.query['placeholder'])
+        select_WC     = self.sql.compiled['select_WC']
+        select_MC     = self.sql.compiled['select_MC']
+        insert_WC     = self.sql.compiled['insert_WC']
+        insert_MC     = self.sql.compiled['insert_MC']
+        update_WM_SC  = self.sql.compiled['update_WM_SC']
         c = self.get_cursor()
         c.execute("SELECT id, sessionStart, weekId wid, monthId mid FROM SessionsCache")
         sessions = self.fetchallDict(c)
@@ -2084,116 +2217,134 @@ class Database:
         self.commit()
         self.cleanUpWeeksMonths()
     
-    def rebuild_sessionscache(self, tz_name = None, recreate=False, heroes = []):
-        """clears sessionscache and rebuilds from the individual records"""
+    def rebuild_sessionscache(self, tz_name = None, recreate=False, heroes = [], pids = None, callback = None):
+        """clears sessionscache and rebuilds from the individual records
+           pids only adds the hands of those heroes, eg. heroes added since the last
+           rebuild, to the caches without clearing them. The hands they share with the
+           other heroes are in the caches already and are skipped. The hands are read
+           REBUILD_CHUNK ids at a time, each chunk checkpointed like rebuild_in_chunks."""
         c = self.get_cursor()
+        heroes = list(heroes)
         if not heroes:
-            c.execute("SELECT id FROM Players WHERE hero=1")
-            herorecords_cash = c.fetchall()
-            for h in herorecords_cash:
-                heroes += h                                
-        rebuildSessionsCache = self.sql.query['rebuildSessionsCache']
-        if len(heroes) == 0:
-            where         = '0'
-            where_summary = '0'
-        elif len(heroes) > 0:
-            where         = str(heroes[0])
-            where_summary = str(heroes[0])
-            if len(heroes) > 1:
-                for i in heroes:
-                    if i != heroes[0]:
-                        where = where + ' OR HandsPlayers.playerId = %s' % str(i)
-        rebuildSessionsCache     = rebuildSessionsCache.replace('<where_clause>', where)
-        rebuildSessionsCacheRing = rebuildSessionsCache.replace('<tourney_join_clause>','')
-        rebuildSessionsCacheRing = rebuildSessionsCacheRing.replace('<tourney_type_clause>','NULL,')
-        rebuildSessionsCacheTour = rebuildSessionsCache.replace('<tourney_join_clause>',"""INNER JOIN Tourneys ON (Tourneys.id = Hands.tourneyId)""")
-        rebuildSessionsCacheTour = rebuildSessionsCacheTour.replace('<tourney_type_clause>','HandsPlayers.tourneysPlayersId,')
-        rebuildSessionsCacheRing = rebuildSessionsCacheRing.replace('%s', self.sql.query['placeholder'])
-        rebuildSessionsCacheTour = rebuildSessionsCacheTour.replace('%s', self.sql.query['placeholder'])
-
-        queries, type = [rebuildSessionsCacheTour, rebuildSessionsCacheRing], ['tour', 'ring']
-        c = self.get_cursor()
-        c.execute("SELECT count(H.id) FROM Hands H")
-        max = c.fetchone()[0]
-        c.execute(self.sql.query['clear_SC_H'])
-        c.execute(self.sql.query['clear_SC_T'])
-        c.execute(self.sql.query['clear_SC_CC'])
-        c.execute(self.sql.query['clear_SC_TC'])
-        c.execute(self.sql.query['clearCashCache'])
-        c.execute(self.sql.query['clearTourCache'])
-        c.execute(self.sql.query['clearSessionsCache'])
-        if not recreate:
-            c.execute(self.sql.query['clearWeeksCache'])
-            c.execute(self.sql.query['clearMonthsCache'])
+            c.execute(self.sql.query['get_hero_ids'], (True,))
+            heroes = [h[0] for h in c.fetchall()]
+        if pids:
+            others = [h for h in heroes if h not in pids]
+            heroes = others + list(pids)
         else:
-            if self.backend == self.MYSQL_INNODB:
-                c.execute('SET FOREIGN_KEY_CHECKS=0')
-            c.execute('DROP TABLE IF EXISTS CashCache, TourCache, SessionsCache, WeeksCache, MonthsCache')
-            if self.backend == self.MYSQL_INNODB:
-                c.execute('SET FOREIGN_KEY_CHECKS=1')
-            c.execute(self.sql.query['createWeeksCacheTable'])
-            c.execute(self.sql.query['createMonthsCacheTable'])
-            c.execute(self.sql.query['createSessionsCacheTable'])
-            c.execute(self.sql.query['createCashCacheTable'])
-            c.execute(self.sql.query['createTourCacheTable'])       
-        self.commit()
+            others = []
+        if not heroes:
+            return
         
-        start, end, limit =  0, 5000, 5000
-        print max, 'total hands'
-        while start < max:
+        columns = [k for k in CACHE_KEYS if k != 'hands']
+        rebuildSessionsCache = self.sql.compiled['rebuildSessionsCache']
+        rebuildSessionsCache = rebuildSessionsCache.replace('<cache_columns>', ', '.join(['HandsPlayers.%s' % k for k in columns]))
+        if others:
+            rebuildSessionsCache = rebuildSessionsCache.replace('<exclude_clause>', self.sql.compiled['rebuildSessionsCacheExclude'])
+        else:
+            rebuildSessionsCache = rebuildSessionsCache.replace('<exclude_clause>', '')
+        
+        def clear(c):
+            if pids:
+                return
+            c.execute(self.sql.query['clear_SC_H'])
+            c.execute(self.sql.query['clear_SC_T'])
+            c.execute(self.sql.query['clear_SC_CC'])
+            c.execute(self.sql.query['clear_SC_TC'])
+            c.execute(self.sql.query['clearCashCache'])
+            c.execute(self.sql.query['clearTourCache'])
+            c.execute(self.sql.query['clearSessionsCache'])
+            if not recreate:
+                c.execute(self.sql.query['clearWeeksCache'])
+                c.execute(self.sql.query['clearMonthsCache'])
+            else:
+                if self.backend == self.MYSQL_INNODB:
+                    c.execute('SET FOREIGN_KEY_CHECKS=0')
+                c.execute('DROP TABLE IF EXISTS CashCache, TourCache, SessionsCache, WeeksCache, MonthsCache')
+                if self.backend == self.MYSQL_INNODB:
+                    c.execute('SET FOREIGN_KEY_CHECKS=1')
+                c.execute(self.sql.query['createWeeksCacheTable'])
+                c.execute(self.sql.query['createMonthsCacheTable'])
+                c.execute(self.sql.query['createSessionsCacheTable'])
+                c.execute(self.sql.query['createCashCacheTable'])
+                c.execute(self.sql.query['createTourCacheTable'])
+        
+        params = repr((tz_name, sorted(heroes), pids and sorted(pids)))
+        start, end = self.start_cache_rebuild('SessionsCache', params, clear)
+        while start < end:
             ttime = time()
-            t, r = 0, 0
-            for k in range(2):
-                hid = {}
-                self.resetBulkCache()
-                c.execute(queries[k], (type[k], start, end))
-                tmp = c.fetchone()
-                if tmp and type[k]=='ring': r += 1
-                if tmp and type[k]=='tour': t += 1
-                while tmp:
-                    pids, game, pdata = {}, {}, {}
-                    pdata['pname'] = {}
-                    id                                    = tmp[0]
-                    startTime                             = tmp[1]
-                    pids['pname']                         = tmp[2]
-                    tid                                   = tmp[3]
-                    gtid                                  = tmp[4]
-                    game['type']                          = tmp[5]
-                    pdata['pname']['tourneysPlayersIds']  = tmp[6]
-                    pdata['pname']['totalProfit']         = tmp[7]
-                    pdata['pname']['rake']                = tmp[8]
-                    pdata['pname']['allInEV']             = tmp[9]
-                    pdata['pname']['street0VPI']          = tmp[10]
-                    pdata['pname']['street1Seen']         = tmp[11]
-                    pdata['pname']['sawShowdown']         = tmp[12]
-                    tmp = c.fetchone()
-                    hid[id] = tid
-                    self.storeSessionsCache (id, pids, startTime, heroes, tz_name, tmp == None)
-                    self.storeCashCache(id, pids, startTime, gtid, game, pdata, heroes, tmp == None)
-                    self.storeTourCache(id, pids, tid, startTime, game, pdata, heroes, tmp == None)
-                    if tmp == None:
-                        for i, id in self.sc.iteritems():
-                            if i!='bk':
-                                sid =  id['id']
-                                if hid[i]: 
-                                    self.tbulk[hid[i]] = sid
-                                    gid = None
-                                else: gid = self.gc[i]['id']
-                                q = self.sql.query['update_RSC_H']
-                                q = q.replace('%s', self.sql.query['placeholder'])
-                                c.execute(q, (sid, gid, i))
-                        self.updateTourneysSessions()
-                        self.commit()
-                        break
-                    if type[k]=='ring': r += 1
-                    if type[k]=='tour': t += 1
-            print 'Hand ids', start, '-', end, '\t', 'total', (r+t), 'ring:', r, 'tour:', t, '\t', int(time() - ttime), 'sec',  int((r+t)/(time() - ttime)), 'hands/sec'
-            start += limit
-            end   += limit
+            last = min(start + REBUILD_CHUNK, end)
+            if others:
+                c.execute(rebuildSessionsCache, (start, last, heroes, others))
+            else:
+                c.execute(rebuildSessionsCache, (start, last, heroes))
+            hands = []
+            for row in c.fetchall():
+                if not hands or hands[-1][0] != row[0]:
+                    # id, startTime, tourneyId, gametypeId, game, pids, pdata
+                    hands.append((row[0], row[1], row[2], row[3], {'type': row[4]}, {}, {}))
+                pid = row[5]
+                hands[-1][5][pid] = pid
+                hands[-1][6][pid] = dict(zip(columns, [v or 0 for v in row[6:]]))
+            
+            # the caches and the checkpoint of the chunk are committed together
+            self.resetBulkCache()
+            self.hold_commits = True
+            try:
+                for i, (id, startTime, tid, gtid, game, hpids, pdata) in enumerate(hands):
+                    doinsert = i == len(hands) - 1
+                    hheroes = [p for p in hpids if p in heroes]
+                    self.storeSessionsCache(id, hpids, startTime, hheroes, tz_name, doinsert)
+                    self.storeCashCache(id, hpids, startTime, gtid, game, pdata, hheroes, None, doinsert)
+                    self.storeTourCache(id, hpids, startTime, tid, game, pdata, hheroes, None, doinsert)
+                rows = []
+                for (id, startTime, tid, gtid, game, hpids, pdata) in hands:
+                    sc = self.sc.get(id)
+                    if sc is not None:
+                        rows.append((sc['id'], id))
+                        if tid: self.tbulk[tid] = sc['id']
+                self.executemany(c, self.sql.compiled['update_RSC_H'], rows)
+                self.updateTourneysSessions()
+                c.execute(self.sql.compiled['update_cache_rebuild'], (last, 'SessionsCache'))
+            finally:
+                self.hold_commits = False
             self.commit()
+            log.info(_("SessionsCache rebuilt to hand id %d of %d, %d hands in %.1f seconds") % (last, end, len(hands), time() - ttime))
+            if callback is not None:
+                callback(float(last) / end)
+            start = last
+        c.execute(self.sql.compiled['delete_cache_rebuild'], ('SessionsCache',))
         self.commit()
+        ReportCache.invalidate(self.config)
        
 
+    def new_heroes(self, heroes):
+        """The ids of the players of heroes, (site name, screen name) pairs of the
+           site preferences, that are not heroes in the database yet"""
+        c = self.get_cursor()
+        c.execute(self.sql.query['get_hero_ids'], (True,))
+        known = set([h[0] for h in c.fetchall()])
+        pids = []
+        for site, name in heroes:
+            pid = self.get_player_id(self.config, site, name)
+            if pid is not None and pid not in known and pid not in pids:
+                pids.append(pid)
+        return pids
+
+    def add_heroes(self, pids, callback = None):
+        """Make heroes of the players pids and add the hands they played to the caches
+           kept of the heroes' hands: only their rows are rebuilt (the pids of
+           rebuild_sessionscache and rebuild_cache)"""
+        log.info(_("Adding the hands of %d new heroes to the caches") % len(pids))
+        c = self.get_cursor()
+        c.execute(self.sql.query['set_heroes'], (pids,))
+        c.execute(self.sql.query['set_hero_seats'], (pids,))
+        self.commit()
+        self.rebuild_sessionscache(pids = pids, callback = callback)
+        if self.cacheSessions:
+            for table in ('CardsCache', 'PositionsCache'):
+                self.rebuild_cache(None, None, table, pids = pids, callback = callback)
+
     def get_hero_hudcache_start(self):
         """fetches earliest stylekey from hudcache for one of hero's player ids"""
 
@@ -2316,6 +2467,8 @@ class Database:
         self.htbulk      = []         # HandsPots bulk inserts
         self.tbulk       = {}         # Tourneys bulk updates
         self.sc          = {'bk': []} # SessionsCache bulk updates
+        self.scstarts    = []         # sessionStart of each self.sc['bk'] session, to bisect on
+        self.schands     = {}         # SessionsCache id -> hands mapped to it in self.sc
         self.cc          = {}         # CashCache bulk updates
         self.tc          = {}         # TourCache bulk updates
         self.hids        = []         # hand ids in order of hand bulk inserts
@@ -2328,6 +2481,28 @@ class Database:
             batch, values = values[:batch_size], values[batch_size:] #split values into the current batch and the remaining records
             c.executemany(q, batch ) #insert current batch ''
 
+    def prepare(self, c, name, q=None):
+        """Returns the text to run query name (or q, if given) with. On PostgreSQL the
+           statements listed in sql.prepared are parsed and planned by the server the
+           first time they are used on the connection, and run with EXECUTE after that."""
+        if q is None:
+            q = self.sql.compiled[name]
+        if self.backend != self.PGSQL or name not in self.sql.prepared:
+            return q
+        if self.prepared is None:
+            # pooled connections can hold statements prepared by an earlier Database
+            c.execute(self.sql.query['get_prepared_statements'])
+            existing = dict(c.fetchall())
+            self.prepared = {}
+            for n in self.sql.prepared:
+                if 'fpdb_' + n.lower() in existing:
+                    self.prepared[n] = self.sql.execute_statement('fpdb_' + n.lower(), existing['fpdb_' + n.lower()])
+        if name not in self.prepared:
+            prepare, execute = self.sql.prepare_statement('fpdb_' + name.lower(), q)
+            c.execute(prepare)
+            self.prepared[name] = execute
+        return self.prepared[name]
+
     def storeHand(self, hdata, doinsert = False, printdata = False):
         if printdata:
             print ("######## Hands ##########")
@@ -2378,9 +2553,8 @@ class Database:
         if doinsert:
             self.appendHandsSessionIds()
             self.updateTourneysSessions()
-            q = self.sql.query['store_hand']
-            q = q.replace('%s', self.sql.query['placeholder'])
             c = self.get_cursor()
+            q = self.prepare(c, 'store_hand')
             self.executemany(c, q, self.hbulk)
             self.commit()
     
@@ -2389,14 +2563,13 @@ class Database:
             for b in boards:
                 self.bbulk += [[id] + b]
         if doinsert and self.bbulk:
-            q = self.sql.query['store_boards']
-            q = q.replace('%s', self.sql.query['placeholder'])
             c = self.get_cursor()
+            q = self.prepare(c, 'store_boards')
             self.executemany(c, q, self.bbulk) #c.executemany(q, self.bbulk)
     
     def updateTourneysSessions(self):
         if self.tbulk:
-            q_update_sessions  = self.sql.query['updateTourneysSessions'].replace('%s', self.sql.query['placeholder'])
+            q_update_sessions  = self.sql.compiled['updateTourneysSessions']
             c = self.get_cursor()
             for t, sid in self.tbulk.iteritems():
                 c.execute(q_update_sessions,  (sid, t))
@@ -2409,23 +2582,27 @@ class Database:
             pp = pprint.PrettyPrinter(indent=4)
             pp.pprint(pdata)
 
-        hpbulk = self.hpbulk
-        for p, pvalue in pdata.iteritems():
-            # Add (hid, pids[p]) + all the values in pvalue at the
-            # keys in HANDS_PLAYERS_KEYS to hpbulk.
-            bulk_data = [pvalue[key] for key in HANDS_PLAYERS_KEYS]
-            bulk_data.append(pids[p])
-            bulk_data.append(hid)
-            bulk_data.reverse()
-            hpbulk.append(bulk_data)
+        self.hpbulk += self.handsPlayersRows(hid, pids, pdata)
 
         if doinsert:
             #self.appendHandsPlayersSessionIds()
-            q = self.sql.query['store_hands_players']
-            q = q.replace('%s', self.sql.query['placeholder'])
             c = self.get_cursor(True)
+            q = self.prepare(c, 'store_hands_players')
             self.executemany(c, q, self.hpbulk) #c.executemany(q, self.hpbulk)
 
+    def handsPlayersRows(self, hid, pids, pdata):
+        """The HandsPlayers rows of a hand, in store_hands_players order"""
+        rows = []
+        for p, pvalue in pdata.iteritems():
+            # (hid, pids[p]) + all the values in pvalue at the
+            # keys in HANDS_PLAYERS_KEYS
+            bulk_data = [pvalue[key] for key in HANDS_PLAYERS_KEYS]
+            bulk_data.append(pids[p])
+            bulk_data.append(hid)
+            bulk_data.reverse()
+            rows.append(bulk_data)
+        return rows
+
     #Supporto agli aggiornamenti dei risultati di torneo dai dati
     def storeTourResults(self, tourneyResults, currency, tourneyId, startTime):
         sqlParametersTourneys = {
@@ -2465,9 +2642,8 @@ class Database:
     def storeHandsPots(self, tdata, doinsert):
         self.htbulk += tdata
         if doinsert and self.htbulk:
-            q = self.sql.query['store_hands_pots']
-            q = q.replace('%s', self.sql.query['placeholder'])
             c = self.get_cursor()
+            q = self.prepare(c, 'store_hands_pots')
             self.executemany(c, q, self.htbulk) #c.executemany(q, self.hsbulk)
 
     def storeHandsActions(self, hid, pids, adata, doinsert = False, printdata = False):
@@ -2479,46 +2655,90 @@ class Database:
         #    pp = pprint.PrettyPrinter(indent=4)
         #    pp.pprint(adata)
         
-        for a in adata:
-            self.habulk.append( (hid,
-                                 pids[adata[a]['player']],
-                                 adata[a]['street'],
-                                 adata[a]['actionNo'],
-                                 adata[a]['streetActionNo'],
-                                 adata[a]['actionId'],
-                                 adata[a]['amount'],
-                                 adata[a]['raiseTo'],
-                                 adata[a]['amountCalled'],
-                                 adata[a]['numDiscarded'],
-                                 adata[a]['cardsDiscarded'],
-                                 adata[a]['allIn']
-                               ) )
+        self.habulk += self.handsActionsRows(hid, pids, adata)
             
         if doinsert:
-            q = self.sql.query['store_hands_actions']
-            q = q.replace('%s', self.sql.query['placeholder'])
             c = self.get_cursor()
+            q = self.prepare(c, 'store_hands_actions')
             self.executemany(c, q, self.habulk) #c.executemany(q, self.habulk)
     
+    def handsActionsRows(self, hid, pids, adata):
+        """The HandsActions rows of a hand, in store_hands_actions order"""
+        rows = []
+        for a in adata:
+            rows.append( (hid,
+                          pids[adata[a]['player']],
+                          adata[a]['street'],
+                          adata[a]['actionNo'],
+                          adata[a]['streetActionNo'],
+                          adata[a]['actionId'],
+                          adata[a]['amount'],
+                          adata[a]['raiseTo'],
+                          adata[a]['amountCalled'],
+                          adata[a]['numDiscarded'],
+                          adata[a]['cardsDiscarded'],
+                          adata[a]['allIn']
+                        ) )
+        return rows
+
     def storeHandsStove(self, sdata, doinsert):
         self.hsbulk += sdata
         if doinsert and self.hsbulk:
-            q = self.sql.query['store_hands_stove']
-            q = q.replace('%s', self.sql.query['placeholder'])
             c = self.get_cursor()
+            q = self.prepare(c, 'store_hands_stove')
             self.executemany(c, q, self.hsbulk) #c.executemany(q, self.hsbulk)
             
+    def copyCacheLines(self, c, table, columns, lines):
+        """Bulk load lines (values of columns) into table with a single COPY"""
+        data = StringIO()
+        for line in lines:
+            data.write('\t'.join([v is None and '\\N' or unicode(v).encode('utf-8') for v in line]) + '\n')
+        data.seek(0)
+        q = self.sql.query['copy_cache_lines']
+        c.copy_expert(q.replace('<table>', table).replace('<columns>', ', '.join(columns)), data)
+
+    def stageCacheLines(self, c, table, columns, lines):
+        """Copy lines into the temporary table cache_stage, made of the given columns of table"""
+        q = self.sql.query['create_cache_stage']
+        c.execute(q.replace('<table>', table).replace('<columns>', ', '.join(columns)))
+        self.copyCacheLines(c, 'cache_stage', columns, lines)
+
+    def mergeCacheLines(self, c, table, columns, keys, lines, nullable=(), update='', insert=True):
+        """Set based upsert of cache lines (values of columns followed by the CACHE_KEYS stats):
+           the stats of each line are added to the row of table with the same keys, or
+           the line is inserted. Takes a handful of statements whatever the number of lines."""
+        if not lines:
+            return
+        self.stageCacheLines(c, table, columns + CACHE_KEYS, lines)
+        self.mergeCacheStage(c, table, columns, keys, nullable, update, insert)
+
+    def mergeCacheStage(self, c, table, columns, keys, nullable=(), update='', insert=True):
+        """Adds the stats of the lines in cache_stage to the rows of table with the same
+           keys, inserts the other lines if insert is set, then drops cache_stage"""
+        match = ' AND '.join([(k in nullable and 't.%s IS NOT DISTINCT FROM s.%s' or 't.%s=s.%s') % (k, k) for k in keys])
+        stats = ', '.join(['%s=t.%s+s.%s' % (k, k, k) for k in CACHE_KEYS])
+        q = self.sql.query['update_cache_from_stage']
+        c.execute(q.replace('<table>', table).replace('<update>', update + stats).replace('<match>', match))
+        if insert:
+            q = self.sql.query['insert_cache_from_stage']
+            c.execute(q.replace('<table>', table).replace('<columns>', ', '.join(columns + CACHE_KEYS)).replace('<match>', match))
+        c.execute(self.sql.query['drop_cache_stage'])
+
+    def get_hudcache_stylekey(self, starttime):
+        """HudCache styleKey ('d' + YYMMDD) of the day a hand started, days starting at day_start"""
+        tz = datetime.utcnow() - datetime.today()
+        tz_offset = tz.seconds/3600
+        tz_day_start_offset = self.day_start + tz_offset
+        
+        d = timedelta(hours=tz_day_start_offset)
+        starttime_offset = starttime - d
+        return datetime.strftime(starttime_offset, 'd%y%m%d')
+
     def storeHudCache(self, gid, gametype, pids, starttime, pdata, doinsert=False):
         """Update cached statistics. If update fails because no record exists, do an insert."""
                 
         if pdata:   
-            tz = datetime.utcnow() - datetime.today()
-            tz_offset = tz.seconds/3600
-            tz_day_start_offset = self.day_start + tz_offset
-            
-            d = timedelta(hours=tz_day_start_offset)
-            starttime_offset = starttime - d
-            styleKey = datetime.strftime(starttime_offset, 'd%y%m%d')
+            styleKey = self.get_hudcache_stylekey(starttime)
             seats = len(pids)
             
         pos = {'B':'B', 'S':'S', 0:'D', 1:'C', 2:'M', 3:'M', 4:'M', 5:'E', 6:'E', 7:'E', 8:'E', 9:'E' }
@@ -2546,16 +2766,17 @@ class Database:
                 else:
                     self.hcbulk[k] = line
                 
-        if doinsert:
-            update_hudcache = self.sql.query['update_hudcache']
-            update_hudcache = update_hudcache.replace('%s', self.sql.query['placeholder'])
-            insert_hudcache = self.sql.query['insert_hudcache']
-            insert_hudcache = insert_hudcache.replace('%s', self.sql.query['placeholder'])
+        if doinsert and self.backend == self.PGSQL:
+            c = self.get_cursor()
+            lines = [list(k) + item for k, item in self.hcbulk.iteritems()]
+            self.mergeCacheLines(c, 'HudCache', HUDCACHE_KEYS, HUDCACHE_KEYS, lines, nullable=('tourneyTypeId',))
+            self.commit()
+        elif doinsert:
+            update_hudcache = self.sql.compiled['update_hudcache']
+            insert_hudcache = self.sql.compiled['insert_hudcache']
             
-            select_hudcache_ring = self.sql.query['select_hudcache_ring']
-            select_hudcache_ring = select_hudcache_ring.replace('%s', self.sql.query['placeholder'])
-            select_hudcache_tour = self.sql.query['select_hudcache_tour']
-            select_hudcache_tour = select_hudcache_tour.replace('%s', self.sql.query['placeholder'])
+            select_hudcache_ring = self.sql.compiled['select_hudcache_ring']
+            select_hudcache_tour = self.sql.compiled['select_hudcache_tour']
             inserts = []
             c = self.get_cursor()
             for k, item in self.hcbulk.iteritems():
@@ -2623,64 +2844,68 @@ class Database:
                     hand['monthStart'] = monthStart
                 hand['ids'] = [hid]
         
-        id = []
         if hand:
+            # self.sc['bk'] is sorted and its sessions are more than THRESHOLD apart,
+            # so at most the two sessions either side of the hand are in reach
+            sessions, starts = self.sc['bk'], self.scstarts
             lower = hand['startTime']-THRESHOLD
             upper = hand['startTime']+THRESHOLD
-            for i in range(len(self.sc['bk'])):
-                if ((lower  <= self.sc['bk'][i]['sessionEnd'])
-                and (upper  >= self.sc['bk'][i]['sessionStart'])):
-                    if ((hand['startTime'] <= self.sc['bk'][i]['sessionEnd']) 
-                    and (hand['startTime'] >= self.sc['bk'][i]['sessionStart'])):
-                         id.append(i)
-                    elif hand['startTime'] < self.sc['bk'][i]['sessionStart']:
-                         self.sc['bk'][i]['sessionStart'] = hand['startTime']
-                         self.sc['bk'][i]['weekStart']    = hand['weekStart']
-                         self.sc['bk'][i]['monthStart']   = hand['monthStart']
-                         id.append(i)
-                    elif hand['startTime'] > self.sc['bk'][i]['sessionEnd']:
-                         self.sc['bk'][i]['sessionEnd'] = hand['startTime']
-                         id.append(i)
+            id = self.overlappingSessions(sessions, starts, lower, upper)
+            for i in id:
+                if hand['startTime'] < sessions[i]['sessionStart']:
+                     sessions[i]['sessionStart'] = hand['startTime']
+                     sessions[i]['weekStart']    = hand['weekStart']
+                     sessions[i]['monthStart']   = hand['monthStart']
+                     starts[i] = hand['startTime']
+                elif hand['startTime'] > sessions[i]['sessionEnd']:
+                     sessions[i]['sessionEnd'] = hand['startTime']
             if len(id) == 1:
                 j = id[0]
-                self.sc['bk'][j]['ids'] += [hid]
+                sessions[j]['ids'] += [hid]
             elif len(id) == 2:
                 j, k = id
-                if  self.sc['bk'][j]['sessionStart'] < self.sc['bk'][k]['sessionStart']:
-                    self.sc['bk'][j]['sessionEnd']   = self.sc['bk'][k]['sessionEnd']
-                else:
-                    self.sc['bk'][j]['sessionStart'] = self.sc['bk'][k]['sessionStart']
-                    self.sc['bk'][j]['weekStart']    = self.sc['bk'][k]['weekStart']
-                    self.sc['bk'][j]['monthStart']   = self.sc['bk'][k]['monthStart']
-                sh = self.sc['bk'].pop(k)
-                self.sc['bk'][j]['ids'] += [hid]
-                self.sc['bk'][j]['ids'] += sh['ids']
+                sessions[j]['sessionEnd'] = sessions[k]['sessionEnd']
+                sh = sessions.pop(k)
+                starts.pop(k)
+                sessions[j]['ids'] += [hid]
+                sessions[j]['ids'] += sh['ids']
             elif len(id) == 0:
-                j = len(self.sc['bk'])
                 hand['id'] = None
                 hand['sessionStart'] = hand['startTime']
                 hand['sessionEnd']   = hand['startTime']
-                self.sc['bk'].append(hand)
+                j = bisect.bisect_right(starts, hand['startTime'])
+                sessions.insert(j, hand)
+                starts.insert(j, hand['startTime'])
         
         if doinsert:
-            select_SC     = self.sql.query['select_SC'].replace('%s', self.sql.query['placeholder'])
-            select_WC     = self.sql.query['select_WC'].replace('%s', self.sql.query['placeholder'])
-            select_MC     = self.sql.query['select_MC'].replace('%s', self.sql.query['placeholder'])
-            update_SC     = self.sql.query['update_SC'].replace('%s', self.sql.query['placeholder'])
-            insert_WC     = self.sql.query['insert_WC'].replace('%s', self.sql.query['placeholder'])
-            insert_MC     = self.sql.query['insert_MC'].replace('%s', self.sql.query['placeholder'])
-            insert_SC     = self.sql.query['insert_SC'].replace('%s', self.sql.query['placeholder'])
-            update_SC_CC  = self.sql.query['update_SC_CC'].replace('%s', self.sql.query['placeholder'])
-            update_SC_TC  = self.sql.query['update_SC_TC'].replace('%s', self.sql.query['placeholder'])
-            update_SC_T   = self.sql.query['update_SC_T'].replace('%s', self.sql.query['placeholder'])
-            update_SC_H   = self.sql.query['update_SC_H'].replace('%s', self.sql.query['placeholder'])
-            delete_SC     = self.sql.query['delete_SC'].replace('%s', self.sql.query['placeholder'])
+            select_SC     = self.sql.compiled['select_SC']
+            select_WC     = self.sql.compiled['select_WC']
+            select_MC     = self.sql.compiled['select_MC']
+            update_SC     = self.sql.compiled['update_SC']
+            insert_WC     = self.sql.compiled['insert_WC']
+            insert_MC     = self.sql.compiled['insert_MC']
+            insert_SC     = self.sql.compiled['insert_SC']
+            update_SC_CC  = self.sql.compiled['update_SC_CC']
+            update_SC_TC  = self.sql.compiled['update_SC_TC']
+            update_SC_T   = self.sql.compiled['update_SC_T']
+            update_SC_H   = self.sql.compiled['update_SC_H']
+            delete_SC     = self.sql.compiled['delete_SC']
             c = self.get_cursor()
+            # the stored sessions in reach of any of the batch, kept up to date below
+            # and looked up like self.sc['bk']
+            stored, storedstarts = [], []
+            if self.sc['bk']:
+                lower = self.sc['bk'][0]['sessionStart'] - THRESHOLD
+                upper = self.sc['bk'][-1]['sessionEnd']  + THRESHOLD
+                c.execute(select_SC, (lower, upper))
+                stored = self.fetchallDict(c)
+                stored.sort(key=lambda n: n['sessionStart'])
+                storedstarts = [n['sessionStart'] for n in stored]
             for i in range(len(self.sc['bk'])):
                 lower = self.sc['bk'][i]['sessionStart'] - THRESHOLD
                 upper = self.sc['bk'][i]['sessionEnd']   + THRESHOLD
-                c.execute(select_SC, (lower, upper))
-                r = self.fetchallDict(c)
+                found = self.overlappingSessions(stored, storedstarts, lower, upper)
+                r = [stored[n] for n in found]
                 num = len(r)
                 if (num == 1):
                     start, end  = r[0]['sessionStart'], r[0]['sessionEnd']
@@ -2703,8 +2928,12 @@ class Database:
                         self.wmnew.add((wid, mid))
                     if update: 
                         c.execute(update_SC, [wid, mid, start, end, r[0]['id']])
+                        r[0].update({'sessionStart': start, 'sessionEnd': end, 'weekStart': week,
+                                     'monthStart': month, 'weekId': wid, 'monthId': mid})
+                        storedstarts[found[0]] = start
                     for h in  self.sc['bk'][i]['ids']:
                         self.sc[h] = {'id': r[0]['id'], 'wid': wid, 'mid': mid}
+                    self.schands.setdefault(r[0]['id'], []).extend(self.sc['bk'][i]['ids'])
                 elif (num > 1):
                     start, end, wmold, merge = None, None, set(), []
                     for n in r: merge.append(n['id'])
@@ -2736,12 +2965,19 @@ class Database:
                     row = [wid, mid, start, end]
                     c.execute(insert_SC, row)
                     sid = self.get_last_insert_id(c)
+                    del stored[found[0]:found[-1]+1], storedstarts[found[0]:found[-1]+1]
+                    stored.insert(found[0], {'id': sid, 'sessionStart': start, 'sessionEnd': end,
+                                             'weekStart': week, 'monthStart': month,
+                                             'weekId': wid, 'monthId': mid})
+                    storedstarts.insert(found[0], start)
+                    hands = self.schands.setdefault(sid, [])
+                    hands.extend(self.sc['bk'][i]['ids'])
                     for h in self.sc['bk'][i]['ids']:
                         self.sc[h] = {'id': sid, 'wid': wid, 'mid': mid}
                     for m in merge:
-                        for h, n in self.sc.iteritems():
-                            if h!='bk' and n['id'] == m:
-                                self.sc[h] = {'id': sid, 'wid': wid, 'mid': mid}
+                        for h in self.schands.pop(m, []):
+                            self.sc[h] = {'id': sid, 'wid': wid, 'mid': mid}
+                            hands.append(h)
                         c.execute(update_SC_TC,(sid, m))
                         c.execute(update_SC_CC,(sid, m))
                         c.execute(update_SC_T, (sid, m))
@@ -2757,9 +2993,25 @@ class Database:
                     row = [wid, mid, start, end]
                     c.execute(insert_SC, row)
                     sid = self.get_last_insert_id(c)
+                    n = bisect.bisect_right(storedstarts, start)
+                    stored.insert(n, {'id': sid, 'sessionStart': start, 'sessionEnd': end,
+                                      'weekStart': week, 'monthStart': month,
+                                      'weekId': wid, 'monthId': mid})
+                    storedstarts.insert(n, start)
                     for h in self.sc['bk'][i]['ids']:
                         self.sc[h] = {'id': sid, 'wid': wid, 'mid': mid}
+                    self.schands[sid] = list(self.sc['bk'][i]['ids'])
             self.commit()
+
+    def overlappingSessions(self, sessions, starts, lower, upper):
+        """Indexes of the sessions reaching into lower..upper. sessions are sorted by
+           sessionStart, which starts holds, and do not overlap, so their ends are sorted too"""
+        found = []
+        i = bisect.bisect_right(starts, upper) - 1
+        while i >= 0 and sessions[i]['sessionEnd'] >= lower:
+            found.insert(0, i)
+            i -= 1
+        return found
     
     def storeCashCache(self, hid, pids, startTime, gtid, gametype, pdata, heroes, hero, doinsert = False):
         """Update cached cash sessions. If no record exists, do an insert"""      
@@ -2817,11 +3069,14 @@ class Database:
                     if pids[p]==heroes[0]: hp['ids'].append(hid)
                     self.cc[k].append(hp)
         
-        if doinsert:
-            select_CC    = self.sql.query['select_CC'].replace('%s', self.sql.query['placeholder'])
-            update_CC    = self.sql.query['update_CC'].replace('%s', self.sql.query['placeholder'])
-            insert_CC    = self.sql.query['insert_CC'].replace('%s', self.sql.query['placeholder'])
-            delete_CC    = self.sql.query['delete_CC'].replace('%s', self.sql.query['placeholder'])
+        if doinsert and self.backend == self.PGSQL:
+            self.mergeCashCache(THRESHOLD)
+            self.commit()
+        elif doinsert:
+            select_CC    = self.sql.compiled['select_CC']
+            update_CC    = self.sql.compiled['update_CC']
+            insert_CC    = self.sql.compiled['insert_CC']
+            delete_CC    = self.sql.compiled['delete_CC']
             c = self.get_cursor()
             for k, cashplayer in self.cc.iteritems():
                 for session in cashplayer:
@@ -2886,6 +3141,86 @@ class Database:
                         id = self.get_last_insert_id(c)              
             self.commit()
             
+    def mergeCashCache(self, THRESHOLD):
+        """Set based flush of the cash sessions in self.cc: the CashCache rows they can join
+           are read with one query and the sessions merged into them in memory, the same way
+           storeCashCache does it row by row. Changes are then written with one statement each
+           for updates, inserts and deletes."""
+        windows = []
+        for k, cashplayer in self.cc.iteritems():
+            for session in cashplayer:
+                windows.append([session['startTime'] - THRESHOLD, session['endTime'] + THRESHOLD] + list(k[:2]))
+        if not windows:
+            return
+        c = self.get_cursor()
+        self.stageCacheLines(c, 'CashCache', ['startTime', 'endTime', 'gametypeId', 'playerId'], windows)
+        c.execute(self.sql.query['select_CC_from_stage'])
+        colnames = [desc[0].lower() for desc in c.description]
+        stats = [s.lower() for s in CACHE_KEYS]
+        rows = {}
+        for r in c.fetchall():
+            r = dict(zip(colnames, r))
+            rows.setdefault((r['gametypeid'], r['playerid']), []).append(
+                {'id'       : r['id'],
+                 'sessionId': r['sessionid'],
+                 'startTime': r['starttime'],
+                 'endTime'  : r['endtime'],
+                 'line'     : [int(r[s]) for s in stats],
+                 'added'    : [0]*len(CACHE_KEYS)})
+        c.execute(self.sql.query['drop_cache_stage'])
+
+        deletes = []
+        for k, cashplayer in self.cc.iteritems():
+            known = rows.setdefault(k[:2], [])
+            for session in cashplayer:
+                sc = self.sc.get(session['hid'])
+                if sc is not None:
+                    sid = sc['id']
+                else:
+                    sid = None
+                lower = session['startTime'] - THRESHOLD
+                upper = session['endTime']   + THRESHOLD
+                r = [n for n in known if n['endTime'] >= lower and n['startTime'] <= upper]
+                if len(r) == 1:
+                    n = r[0]
+                    n['startTime'] = min(n['startTime'], session['startTime'])
+                    n['endTime']   = max(n['endTime'], session['endTime'])
+                    for idx, val in enumerate(session['line']):
+                        n['line'][idx]  += val
+                        n['added'][idx] += val
+                else:
+                    merged = {'id'       : None,
+                              'sessionId': sid,
+                              'startTime': session['startTime'],
+                              'endTime'  : session['endTime'],
+                              'line'     : list(session['line']),
+                              'added'    : [0]*len(CACHE_KEYS)}
+                    for n in r:
+                        merged['startTime'] = min(merged['startTime'], n['startTime'])
+                        merged['endTime']   = max(merged['endTime'], n['endTime'])
+                        if not merged['sessionId']:
+                            merged['sessionId'] = n['sessionId']
+                        for idx, val in enumerate(n['line']):
+                            merged['line'][idx] += val
+                        known.remove(n)
+                        if n['id'] is not None:
+                            deletes.append(n['id'])
+                    known.append(merged)
+
+        updates, inserts = [], []
+        for k, known in rows.iteritems():
+            for n in known:
+                if n['id'] is None:
+                    inserts.append([n['sessionId'], n['startTime'], n['endTime']] + list(k) + n['line'])
+                elif any(n['added']):
+                    updates.append([n['id'], n['startTime'], n['endTime']] + n['added'])
+        self.mergeCacheLines(c, 'CashCache', ['id', 'startTime', 'endTime'], ['id'], updates
+                            ,update='startTime=s.startTime, endTime=s.endTime, ', insert=False)
+        if inserts:
+            self.copyCacheLines(c, 'CashCache', CASHCACHE_KEYS + CACHE_KEYS, inserts)
+        if deletes:
+            c.execute(self.sql.compiled['delete_CC_many'], (deletes,))
+            
     def storeTourCache(self, hid, pids, startTime, tid, gametype, pdata, heroes, hero, doinsert = False):
         """Update cached tour sessions. If no record exists, do an insert"""   
         if gametype['type']=='tour' and pdata:
@@ -2917,12 +3252,9 @@ class Database:
                     self.tc[k]['endTime']    = startTime
                 
         if doinsert:
-            update_TC = self.sql.query['update_TC']
-            update_TC = update_TC.replace('%s', self.sql.query['placeholder'])
-            insert_TC = self.sql.query['insert_TC']
-            insert_TC = insert_TC.replace('%s', self.sql.query['placeholder'])
-            select_TC = self.sql.query['select_TC']
-            select_TC = select_TC.replace('%s', self.sql.query['placeholder'])
+            update_TC = self.sql.compiled['update_TC']
+            insert_TC = self.sql.compiled['insert_TC']
+            select_TC = self.sql.compiled['select_TC']
             
             inserts = []
             c = self.get_cursor()
@@ -2940,6 +3272,9 @@ class Database:
                 else:
                     tc['startTime'] = tc['startTime'].replace(tzinfo=None)
                     tc['endTime']   = tc['endTime'].replace(tzinfo=None)
+                if self.backend == self.PGSQL:
+                    inserts.append([sid, tc['startTime'], tc['endTime']] + list(k[:2]) + tc['line'])
+                    continue
                 c.execute(select_TC, k)
                 result = c.fetchone()
                 id, start, end = None, None, None
@@ -2969,7 +3304,11 @@ class Database:
                     #append to the bulk inserts
                     inserts.append(row)
                 
-            if inserts:
+            if inserts and self.backend == self.PGSQL:
+                # all the lines, merged with one update and one insert
+                self.mergeCacheLines(c, 'TourCache', TOURCACHE_KEYS, ['tourneyId', 'playerId'], inserts
+                                    ,update='startTime=LEAST(t.startTime, s.startTime), endTime=GREATEST(t.endTime, s.endTime), ')
+            elif inserts:
                 c.executemany(insert_TC, inserts)
             self.commit()
     
@@ -3002,19 +3341,15 @@ class Database:
                     self.dcbulk[k] = line
 
         if doinsert:
-            update_cardscache = self.sql.query['update_cardscache']
-            update_cardscache = update_cardscache.replace('%s', self.sql.query['placeholder'])
-            insert_cardscache = self.sql.query['insert_cardscache']
-            insert_cardscache = insert_cardscache.replace('%s', self.sql.query['placeholder'])
-            select_cardscache_ring = self.sql.query['select_cardscache_ring']
-            select_cardscache_ring = select_cardscache_ring.replace('%s', self.sql.query['placeholder'])
-            select_cardscache_tour = self.sql.query['select_cardscache_tour']
-            select_cardscache_tour = select_cardscache_tour.replace('%s', self.sql.query['placeholder'])
+            update_cardscache = self.sql.compiled['update_cardscache']
+            insert_cardscache = self.sql.compiled['insert_cardscache']
+            select_cardscache_ring = self.sql.compiled['select_cardscache_ring']
+            select_cardscache_tour = self.sql.compiled['select_cardscache_tour']
             
-            select_WC     = self.sql.query['select_WC'].replace('%s', self.sql.query['placeholder'])
-            select_MC     = self.sql.query['select_MC'].replace('%s', self.sql.query['placeholder'])
-            insert_WC     = self.sql.query['insert_WC'].replace('%s', self.sql.query['placeholder'])
-            insert_MC     = self.sql.query['insert_MC'].replace('%s', self.sql.query['placeholder'])
+            select_WC     = self.sql.compiled['select_WC']
+            select_MC     = self.sql.compiled['select_MC']
+            insert_WC     = self.sql.compiled['insert_WC']
+            insert_MC     = self.sql.compiled['insert_MC']
             
             dccache, inserts = {}, []
             for k, l in self.dcbulk.iteritems():
@@ -3034,6 +3369,9 @@ class Database:
                 garbageWeekMonths = (k[0], k[1]) in self.wmnew or (k[0], k[1]) in self.wmold
                 garbageTourneyTypes = k[2] in self.ttnew or k[2] in self.ttold
                 if not garbageWeekMonths and not garbageTourneyTypes:
+                    if self.backend == self.PGSQL:
+                        inserts.append(list(k) + item)
+                        continue
                     if k[2]:
                         q = select_cardscache_ring
                         row = list(k[:3]) + list(k[-6:])
@@ -3050,7 +3388,12 @@ class Database:
                         insert = list(k) + item
                         inserts.append(insert)
                 
-            if inserts:
+            if inserts and self.backend == self.PGSQL:
+                # all the lines, merged with one update and one insert
+                self.mergeCacheLines(c, 'CardsCache', CARDSCACHE_KEYS, CARDSCACHE_KEYS, inserts
+                                    ,nullable=('gametypeId', 'tourneyTypeId', 'startCards'))
+                self.commit()
+            elif inserts:
                 c.executemany(insert_cardscache, inserts)
                 self.commit()
             
@@ -3079,20 +3422,16 @@ class Database:
             self.pcbulk[k] = line
                 
         if doinsert:
-            update_positionscache = self.sql.query['update_positionscache']
-            update_positionscache = update_positionscache.replace('%s', self.sql.query['placeholder'])
-            insert_positionscache = self.sql.query['insert_positionscache']
-            insert_positionscache = insert_positionscache.replace('%s', self.sql.query['placeholder'])
+            update_positionscache = self.sql.compiled['update_positionscache']
+            insert_positionscache = self.sql.compiled['insert_positionscache']
             
-            select_positionscache_ring = self.sql.query['select_positionscache_ring']
-            select_positionscache_ring = select_positionscache_ring.replace('%s', self.sql.query['placeholder'])
-            select_positionscache_tour = self.sql.query['select_positionscache_tour']
-            select_positionscache_tour = select_positionscache_tour.replace('%s', self.sql.query['placeholder'])
+            select_positionscache_ring = self.sql.compiled['select_positionscache_ring']
+            select_positionscache_tour = self.sql.compiled['select_positionscache_tour']
             
-            select_WC     = self.sql.query['select_WC'].replace('%s', self.sql.query['placeholder'])
-            select_MC     = self.sql.query['select_MC'].replace('%s', self.sql.query['placeholder'])
-            insert_WC     = self.sql.query['insert_WC'].replace('%s', self.sql.query['placeholder'])
-            insert_MC     = self.sql.query['insert_MC'].replace('%s', self.sql.query['placeholder'])
+            select_WC     = self.sql.compiled['select_WC']
+            select_MC     = self.sql.compiled['select_MC']
+            insert_WC     = self.sql.compiled['insert_WC']
+            insert_MC     = self.sql.compiled['insert_MC']
                 
             pccache, inserts = {}, []
             for k, l in self.pcbulk.iteritems():
@@ -3112,6 +3451,9 @@ class Database:
                 garbageWeekMonths = (k[0], k[1]) in self.wmnew or (k[0], k[1]) in self.wmold
                 garbageTourneyTypes = k[2] in self.ttnew or k[2] in self.ttold
                 if not garbageWeekMonths and not garbageTourneyTypes:
+                    if self.backend == self.PGSQL:
+                        inserts.append(list(k) + item)
+                        continue
                     if k[2]:
                         q = select_positionscache_ring
                         row = list(k[:3]) + list(k[-3:])
@@ -3129,7 +3471,12 @@ class Database:
                         insert = list(k) + item
                         inserts.append(insert)
                 
-            if inserts:
+            if inserts and self.backend == self.PGSQL:
+                # all the lines, merged with one update and one insert
+                self.mergeCacheLines(c, 'PositionsCache', POSITIONSCACHE_KEYS, POSITIONSCACHE_KEYS, inserts
+                                    ,nullable=('gametypeId', 'tourneyTypeId'))
+                self.commit()
+            elif inserts:
                 c.executemany(insert_positionscache, inserts)
                 self.commit()
     
@@ -3143,8 +3490,7 @@ class Database:
                 if tid: self.tbulk[tid] = sc['id']
                 
     def get_id(self, file):
-        q = self.sql.query['get_id']
-        q = q.replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['get_id']
         c = self.get_cursor()
         c.execute(q, (file,))
         id = c.fetchone()
@@ -3153,16 +3499,14 @@ class Database:
         return id[0]
 
     def storeFile(self, fdata):
-        q = self.sql.query['store_file']
-        q = q.replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['store_file']
         c = self.get_cursor()
         c.execute(q, fdata)
         id = self.get_last_insert_id(c)
         return id
         
     def updateFile(self, fdata):
-        q = self.sql.query['update_file']
-        q = q.replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['update_file']
         c = self.get_cursor()
         c.execute(q, fdata)
 
@@ -3207,17 +3551,19 @@ class Database:
         return id
 
     def isDuplicate(self, siteId, siteHandNo, heroSeat, publicDB):
-        q = self.sql.query['isAlreadyInDB'].replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['isAlreadyInDB']
         if publicDB:
             key = (siteHandNo, siteId, heroSeat)
-            q = q.replace('<heroSeat>', ' AND heroSeat=%s')
+            name = 'isAlreadyInDBHeroSeat'
+            q = q.replace('<heroSeat>', ' AND heroSeat=' + self.sql.query['placeholder'])
         else:
             key = (siteHandNo, siteId)
+            name = 'isAlreadyInDB'
             q = q.replace('<heroSeat>', '')
         if key in self.siteHandNos:
             return True
         c = self.get_cursor()
-        c.execute(q, key)
+        c.execute(self.prepare(c, name, q), key)
         result = c.fetchall()
         if len(result) > 0:
             return True
@@ -3317,9 +3663,7 @@ class Database:
     def insertGameTypes(self, gtinfo, gtinsert):
         result = None
         c = self.get_cursor()
-        q = self.sql.query['getGametypeNL']
-        q = q.replace('%s', self.sql.query['placeholder'])
-        c.execute(q, gtinfo)
+        c.execute(self.prepare(c, 'getGametypeNL'), gtinfo)
         tmp = c.fetchone()
         if (tmp == None):
                 
@@ -3330,7 +3674,7 @@ class Database:
                 pp.pprint(gtinsert)
                 print ("###### End Gametype ########")
                 
-            c.execute(self.sql.query['insertGameTypes'].replace('%s', self.sql.query['placeholder']), gtinsert)
+            c.execute(self.prepare(c, 'insertGameTypes'), gtinsert)
             result = self.get_last_insert_id(c)
         else:
             result = tmp[0]
@@ -3338,7 +3682,7 @@ class Database:
     
     def getTourneyInfo(self, siteName, tourneyNo):
         c = self.get_cursor()
-        q = self.sql.query['getTourneyInfo'].replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['getTourneyInfo']
         c.execute(q, (siteName, tourneyNo))
         columnNames=c.description
 
@@ -3394,7 +3738,7 @@ class Database:
     def createOrUpdateTourneyType(self, obj):
         ttid, _ttid, updateDb = None, None, False
         cursor = self.get_cursor()
-        q = self.sql.query['getTourneyTypeIdByTourneyNo'].replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['getTourneyTypeIdByTourneyNo']
         cursor.execute(q, (obj.tourNo, obj.siteId))
         result=cursor.fetchone()
         
@@ -3440,7 +3784,7 @@ class Database:
                    obj.isMultiEntry, obj.isReEntry, obj.isHomeGame, obj.isNewToGame, obj.isFifty50, obj.isTime,
                    obj.timeAmt, obj.isSatellite, obj.isDoubleOrNothing, obj.isCashOut, obj.isOnDemand, obj.isFlighted, 
                    obj.isGuarantee, obj.guaranteeAmt)
-            cursor.execute (self.sql.query['getTourneyTypeId'].replace('%s', self.sql.query['placeholder']), row)
+            cursor.execute (self.sql.compiled['getTourneyTypeId'], row)
             tmp=cursor.fetchone()
             try:
                 ttid = tmp[0]
@@ -3451,11 +3795,11 @@ class Database:
                     pp = pprint.PrettyPrinter(indent=4)
                     pp.pprint(row)
                     print ("###### End Tourneys ########")
-                cursor.execute (self.sql.query['insertTourneyType'].replace('%s', self.sql.query['placeholder']), row)
+                cursor.execute (self.sql.compiled['insertTourneyType'], row)
                 ttid = self.get_last_insert_id(cursor)
             if updateDb:
                 #print 'DEBUG createOrUpdateTourneyType:', 'old', oldttid, 'new', ttid, row
-                q = self.sql.query['updateTourneyTypeId'].replace('%s', self.sql.query['placeholder'])
+                q = self.sql.compiled['updateTourneyTypeId']
                 cursor.execute(q, (ttid, obj.siteId, obj.tourNo))
                 self.ttold.add(oldttid)
                 self.ttnew.add(ttid)
@@ -3469,13 +3813,13 @@ class Database:
                 tables = ('HudCache',)
             elif self.cacheSessions:
                 tables = ('CardsCache', 'PositionsCache')
-            select = self.sql.query['selectTourneyWithTypeId'].replace('%s', self.sql.query['placeholder'])
-            delete = self.sql.query['deleteTourneyTypeId'].replace('%s', self.sql.query['placeholder'])
+            select = self.sql.compiled['selectTourneyWithTypeId']
+            delete = self.sql.compiled['deleteTourneyTypeId']
             cursor = self.get_cursor()
             for ttid in self.ttold:
                 for t in tables:
                     statement = 'clear%sTourneyType' % t
-                    clear  = self.sql.query[statement].replace('%s', self.sql.query['placeholder'])
+                    clear  = self.sql.compiled[statement]
                     cursor.execute(clear, (ttid,))
                 self.commit()
                 cursor.execute(select, (ttid,))
@@ -3486,12 +3830,12 @@ class Database:
             for ttid in self.ttnew:
                 for t in tables:
                     statement = 'clear%sTourneyType' % t
-                    clear  = self.sql.query[statement].replace('%s', self.sql.query['placeholder'])
+                    clear  = self.sql.compiled[statement]
                     cursor.execute(clear, (ttid,))
                 self.commit()
             for t in tables:
                 statement = 'fetchNew%sTourneyTypeIds' % t
-                fetch  = self.sql.query[statement].replace('%s', self.sql.query['placeholder'])
+                fetch  = self.sql.compiled[statement]
                 cursor.execute(fetch)
                 for id in cursor.fetchall():
                     self.rebuild_cache(None, None, t, id[0])
@@ -3499,16 +3843,16 @@ class Database:
                     
     def cleanUpWeeksMonths(self):
         if self.cacheSessions and self.wmold:
-            selectWeekId = self.sql.query['selectSessionWithWeekId'].replace('%s', self.sql.query['placeholder'])
-            selectMonthId = self.sql.query['selectSessionWithMonthId'].replace('%s', self.sql.query['placeholder'])
-            deleteWeekId = self.sql.query['deleteWeekId'].replace('%s', self.sql.query['placeholder'])
-            deleteMonthId = self.sql.query['deleteMonthId'].replace('%s', self.sql.query['placeholder'])
+            selectWeekId = self.sql.compiled['selectSessionWithWeekId']
+            selectMonthId = self.sql.compiled['selectSessionWithMonthId']
+            deleteWeekId = self.sql.compiled['deleteWeekId']
+            deleteMonthId = self.sql.compiled['deleteMonthId']
             cursor = self.get_cursor()
             weeks, months, wmids = set(), set(), set()
             for (wid, mid) in self.wmold:
                 for t in ('CardsCache', 'PositionsCache'):
                     statement = 'clear%sWeeksMonths' % t
-                    clear  = self.sql.query[statement].replace('%s', self.sql.query['placeholder'])
+                    clear  = self.sql.compiled[statement]
                     cursor.execute(clear, (wid, mid))
                 self.commit()
                 weeks.add(wid)
@@ -3531,14 +3875,14 @@ class Database:
             for (wid, mid) in self.wmnew:
                 for t in ('CardsCache', 'PositionsCache'):
                     statement = 'clear%sWeeksMonths' % t
-                    clear  = self.sql.query[statement].replace('%s', self.sql.query['placeholder'])
+                    clear  = self.sql.compiled[statement]
                     cursor.execute(clear, (wid, mid))
                 self.commit()
                     
             if self.wmold:
                 for t in ('CardsCache', 'PositionsCache'):
                     statement = 'fetchNew%sWeeksMonths' % t
-                    fetch  = self.sql.query[statement].replace('%s', self.sql.query['placeholder'])
+                    fetch  = self.sql.compiled[statement]
                     cursor.execute(fetch)
                     for (wid, mid) in cursor.fetchall():
                         wmids.add((wid, mid))         
@@ -3579,14 +3923,13 @@ class Database:
     def insertTourney(self, siteId, tourNo, tourneyTypeId):
         result = None
         c = self.get_cursor()
-        q = self.sql.query['getTourneyByTourneyNo']
-        q = q.replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['getTourneyByTourneyNo']
 
         c.execute (q, (siteId, tourNo))
 
         tmp = c.fetchone()
         if (tmp == None): 
-            c.execute (self.sql.query['insertTourney'].replace('%s', self.sql.query['placeholder']),
+            c.execute (self.sql.compiled['insertTourney'],
                         (tourneyTypeId, None, tourNo, None, None,
                          None, None, None, None, None, None, None, None, None))
             result = self.get_last_insert_id(c)
@@ -3596,7 +3939,7 @@ class Database:
     
     def createOrUpdateTourney(self, summary):
         cursor = self.get_cursor()
-        q = self.sql.query['getTourneyByTourneyNo'].replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['getTourneyByTourneyNo']
         cursor.execute(q, (summary.siteId, summary.tourNo))
 
         columnNames=[desc[0] for desc in cursor.description]
@@ -3626,7 +3969,7 @@ class Database:
                 #    if (resultDict[ev] < summary.startTime):
                 #        summary.startTime=resultDict[ev]
             if updateDb:
-                q = self.sql.query['updateTourney'].replace('%s', self.sql.query['placeholder'])
+                q = self.sql.compiled['updateTourney']
                 row = (summary.entries, summary.prizepool, summary.startTime, summary.endTime, summary.tourneyName,
                        summary.totalRebuyCount, summary.totalAddOnCount, summary.comment, summary.commentTs, 
                        summary.added, summary.addedCurrency, tourneyId
@@ -3642,7 +3985,7 @@ class Database:
                 pp = pprint.PrettyPrinter(indent=4)
                 pp.pprint(row)
                 print ("###### End Tourneys ########")
-            cursor.execute (self.sql.query['insertTourney'].replace('%s', self.sql.query['placeholder']), row)
+            cursor.execute (self.sql.compiled['insertTourney'], row)
             tourneyId = self.get_last_insert_id(cursor)
         return tourneyId
     #end def createOrUpdateTourney
@@ -3674,14 +4017,13 @@ class Database:
     def insertTourneysPlayers(self, playerId, tourneyId, entryId):
         result = None
         c = self.get_cursor()
-        q = self.sql.query['getTourneysPlayersByIds']
-        q = q.replace('%s', self.sql.query['placeholder'])
+        q = self.sql.compiled['getTourneysPlayersByIds']
 
         c.execute (q, (tourneyId, playerId, entryId))
 
         tmp = c.fetchone()
         if (tmp == None): #new player
-            c.execute (self.sql.query['insertTourneysPlayer'].replace('%s',self.sql.query['placeholder'])
+            c.execute (self.sql.compiled['insertTourneysPlayer']
                       ,(tourneyId, playerId, entryId, None, None, None, None, None, None))
             #Get last id might be faster here.
             #c.execute ("SELECT id FROM Players WHERE name=%s", (name,))
@@ -3693,7 +4035,7 @@ class Database:
     def createOrUpdateTourneysPlayers(self, summary):
         tourneysPlayersIds, tplayers, inserts = {}, [], []
         cursor = self.get_cursor()
-        cursor.execute (self.sql.query['getTourneysPlayersByTourney'].replace('%s', self.sql.query['placeholder']),
+        cursor.execute (self.sql.compiled['getTourneysPlayersByTourney'],
                             (summary.tourneyId,))
         result=cursor.fetchall()
         if result: tplayers += [i for i in result]
@@ -3702,7 +4044,7 @@ class Database:
             for entryIdx in range(len(entries)):
                 entryId = entries[entryIdx]
                 if (playerId,entryId) in tplayers:
-                    cursor.execute (self.sql.query['getTourneysPlayersByIds'].replace('%s', self.sql.query['placeholder']),
+                    cursor.execute (self.sql.compiled['getTourneysPlayersByIds'],
                                     (summary.tourneyId, playerId, entryId))
                     columnNames=[desc[0] for desc in cursor.description]
                     result=cursor.fetchone()
@@ -3728,7 +4070,7 @@ class Database:
                         elif summaryDict[player][entryIdx]!=None and not resultDict[ev[1]]:#object has this value but DB doesnt, so update DB
                             updateDb=True
                     if updateDb:
-                        q = self.sql.query['updateTourneysPlayer'].replace('%s', self.sql.query['placeholder'])
+                        q = self.sql.compiled['updateTourneysPlayer']
                         inputs = (summary.ranks[player][entryIdx],
                                   summary.winnings[player][entryIdx],
                                   summary.winningsCurrency[player][entryIdx],
@@ -3753,11 +4095,158 @@ class Database:
                                         summary.rebuyCounts[player][entryIdx], summary.addOnCounts[player][entryIdx],
                                         summary.koCounts[player][entryIdx]))
         if inserts:
-            cursor.executemany(self.sql.query['insertTourneysPlayer'].replace('%s', self.sql.query['placeholder']),inserts)
+            cursor.executemany(self.sql.compiled['insertTourneysPlayer'],inserts)
             
     
 #end class Database
 
+class ConnectionPool:
+    """Database handles shared by the threads of a process, at most size of them.
+
+    A thread checks out a handle with checkout and gives it back with checkin.
+    While it has one it gets the same one back from checkout, so nested calls
+    share its transaction and a thread never holds two handles to one database.
+    A handle given back is rolled back and kept open for the next checkout, of any
+    thread, which checks that its connection is still alive and reconnects if not.
+    The SQL.Sql of each db_server is made once and shared by the handles."""
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self.lock = threading.Condition()
+        self.idle = []                  # [(key, Database)] checked in, the oldest first
+        self.count = 0                  # handles open, checked out or idle
+        self.sqls = {}                  # db_server -> SQL.Sql
+        self.local = threading.local()  # .held: key -> [Database, checkouts] of the thread
+
+    def key(self, config):
+        db = config.get_db_parameters()
+        return (db['db-backend'], db['db-host'], db['db-port'], db['db-databaseName'], db['db-user'])
+
+    def get_sql(self, config, sql=None):
+        db_server = config.get_db_parameters()['db-server']
+        with self.lock:
+            if db_server not in self.sqls:
+                self.sqls[db_server] = sql if sql is not None else SQL.Sql(db_server = db_server)
+            return self.sqls[db_server]
+
+    def held(self):
+        if not hasattr(self.local, 'held'):
+            self.local.held = {}
+        return self.local.held
+
+    def checkout(self, config, sql=None):
+        """The Database of config for this thread, connected. Raises FpdbError if
+           none can be had within timeout seconds"""
+        key = self.key(config)
+        held = self.held()
+        if key in held:
+            held[key][1] += 1
+            return held[key][0]
+        db = self.take(key)
+        if db is None:
+            try:
+                db = self.open(config, sql)
+            except:
+                self.discard(None)
+                raise
+            db.pool_key = key
+        elif not db.is_alive():
+            try:
+                db.do_connect(config)
+            except:
+                self.discard(db)
+                raise
+        held[key] = [db, 1]
+        return db
+
+    def open(self, config, sql=None):
+        return Database(config, sql = self.get_sql(config, sql))
+
+    def checkin(self, db):
+        """Give back a Database of checkout, once for each checkout"""
+        held = self.held()
+        entry = held.get(db.pool_key)
+        if entry is None or entry[0] is not db:
+            raise FpdbError("Database not checked out by this thread")
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del held[db.pool_key]
+        try:
+            db.rollback()   # don't keep locks or a half done transaction while idle
+        except Exception:
+            self.discard(db)
+            return
+        with self.lock:
+            self.idle.append((db.pool_key, db))
+            self.lock.notify()
+
+    def take(self, key):
+        """An idle Database of key, or None once there is room to open a new one"""
+        deadline = time() + self.timeout
+        with self.lock:
+            while True:
+                for i, (k, db) in enumerate(self.idle):
+                    if k == key:
+                        del self.idle[i]
+                        return db
+                if self.count < self.size:
+                    self.count += 1
+                    return None
+                if self.idle:
+                    # all open, some to another database: close the oldest of those
+                    k, db = self.idle.pop(0)
+                    self.close(db)
+                    return None
+                remaining = deadline - time()
+                if remaining <= 0:
+                    raise FpdbError(_("No database connection free after %d seconds") % self.timeout)
+                self.lock.wait(remaining)
+
+    def discard(self, db):
+        """Drop a Database that failed, or the place taken for one that couldn't be opened"""
+        if db is not None:
+            self.close(db)
+        with self.lock:
+            self.count -= 1
+            self.lock.notify()
+
+    def close(self, db):
+        try:
+            db.close_connection()
+        except Exception:
+            pass
+
+    def clear(self):
+        """Close the idle handles, e.g. when the database settings change"""
+        with self.lock:
+            for k, db in self.idle:
+                self.close(db)
+            self.count -= len(self.idle)
+            self.idle = []
+            self.lock.notify_all()
+
+
+_pool = ConnectionPool()
+
+def checkout(config, sql=None):
+    """The pooled Database of config for this thread, see ConnectionPool"""
+    return _pool.checkout(config, sql)
+
+def checkin(db):
+    _pool.checkin(db)
+
+@contextmanager
+def pooled(config, sql=None):
+    """with pooled(config) as db: a Database checked out for the block"""
+    db = _pool.checkout(config, sql)
+    try:
+        yield db
+    finally:
+        _pool.checkin(db)
+
+
 if __name__=="__main__":
     c = Configuration.Config()
     sql = SQL.Sql(db_server = 'sqlite')
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""Dump of all the tables of a database to a file, and restoring one.
+
+The tables are written one after the other, FETCH_SIZE rows at a time read
+from a server side cursor, so neither a table nor the dump is ever all in
+memory. There are three formats:
+  text    the rows as "column=value" lines, to be read or compared (importTime
+          and styleKey are left out), it cannot be restored
+  csv     for each table a "Table,<name>" line, a line of the column names,
+          the rows and an empty line; NULL is an empty field, strings are quoted
+  binary  MAGIC, then frames: the length of a zlib compressed pickle of a header,
+          of a table's name and columns, of a chunk of its rows or of its end
+A csv or binary dump is restored into a database of the same DB_VERSION: the
+rows of the tables are deleted, the dump's are loaded with COPY a chunk at a
+time and the id sequences are set past them.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+import sys
+import struct
+import zlib
+import cPickle
+import csv
+from decimal import Decimal
+from cStringIO import StringIO
+from optparse import OptionParser
+
+import logging
+# logging has been set up in fpdb.py or HUD_main.py, use their settings:
+log = logging.getLogger("db")
+
+import Database
+import ReportCache
+from Exceptions import FpdbError
+
+FORMATS = ('text', 'csv', 'binary')
+FETCH_SIZE = 10000      # rows read, written and copied at a time
+MAGIC = 'FPDBDMP1'
+TEXT_HEADER = "fpdb database dump"
+IGNORED = ('importTime', 'styleKey')    # columns left out of a text dump
+
+
+def tableCursor(db, table):
+    """A cursor over the rows of table. On PostgreSQL it is a named cursor, the
+       rows stay on the server until fetched"""
+    if db.backend == db.PGSQL:
+        c = db.connection.cursor('dump_%s' % table.lower())
+        c.itersize = FETCH_SIZE
+    else:
+        c = db.get_cursor()
+    c.execute(db.sql.query['get' + table])
+    return c
+
+def csvLine(row):
+    """row as a line of a csv dump, as COPY ... WITH CSV reads it"""
+    fields = []
+    for v in row:
+        if v is None:
+            fields.append('')
+        elif isinstance(v, (bool, int, long, float, Decimal)):
+            fields.append(str(v))
+        else:
+            if not isinstance(v, unicode):
+                v = str(v).decode('utf-8')
+            fields.append('"%s"' % v.encode('utf-8').replace('"', '""'))
+    return ','.join(fields) + '\n'
+
+def writeFrame(f, obj):
+    data = zlib.compress(cPickle.dumps(obj, cPickle.HIGHEST_PROTOCOL))
+    f.write(struct.pack('>I', len(data)))
+    f.write(data)
+
+def readFrame(f):
+    """The next object of a binary dump, None at the end of the file"""
+    size = f.read(4)
+    if len(size) < 4:
+        return None
+    return cPickle.loads(zlib.decompress(f.read(struct.unpack('>I', size)[0])))
+
+def dump(db, f, format='text', progress=None):
+    """Write all the tables of db to the file f in format. progress, if given, is
+       called with the table and the rows written of it so far after each chunk.
+       Returns a dict of the rows written of each table"""
+    if format not in FORMATS:
+        raise FpdbError(_("Unknown dump format %s") % format)
+    if format == 'text':
+        f.write("%s\nDB version=%d\n\n" % (TEXT_HEADER, Database.DB_VERSION))
+    elif format == 'csv':
+        f.write(csvLine([TEXT_HEADER, Database.DB_VERSION]))
+    else:
+        f.write(MAGIC)
+        writeFrame(f, {'version': Database.DB_VERSION})
+    counts = {}
+    for table in db.sql.dump_tables:
+        c = tableCursor(db, table)
+        rows = c.fetchmany(FETCH_SIZE)
+        columns = [d[0] for d in c.description]
+        if format == 'text':
+            f.write("###################\nTable %s\n###################\n" % table)
+            if not rows:
+                f.write("empty table\n")
+        elif format == 'csv':
+            f.write(csvLine(['Table', table]) + csvLine(columns))
+        else:
+            writeFrame(f, ('table', table, columns))
+        count = 0
+        while rows:
+            if format == 'text':
+                for row in rows:
+                    for column, value in zip(columns, row):
+                        if column in IGNORED:
+                            value = "ignore"
+                        elif isinstance(value, unicode):
+                            value = value.encode('utf-8')
+                        f.write("  %s=%s\n" % (column, value))
+                    f.write("\n")
+            elif format == 'csv':
+                f.write(''.join([csvLine(row) for row in rows]))
+            else:
+                writeFrame(f, ('rows', rows))
+            count += len(rows)
+            if progress is not None:
+                progress(table, count)
+            rows = c.fetchmany(FETCH_SIZE)
+        c.close()
+        if format == 'binary':
+            writeFrame(f, ('end', table, count))
+        else:
+            f.write("\n")
+        counts[table] = count
+        log.info(_("Dumped %d rows of %s") % (count, table))
+    db.rollback()   # ends the transaction the named cursors were in
+    return counts
+
+def copyLines(db, c, table, columns, lines):
+    """Load the rows of table in lines, csv lines of the columns, with COPY"""
+    q = db.sql.query['copy_csv_lines'].replace('<table>', table).replace('<columns>', ', '.join(columns))
+    c.copy_expert(q, StringIO(''.join(lines)))
+
+class LineReader:
+    """The lines of a file, those read since the last take() kept, for
+       csv.reader to split into rows while COPY is given the lines themselves"""
+    def __init__(self, f):
+        self.f = f
+        self.lines = []
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        line = self.f.next()
+        self.lines.append(line)
+        return line
+
+    def take(self):
+        lines, self.lines = self.lines, []
+        return lines
+
+def readCsv(f):
+    """(table, columns, chunks of its rows) of each table of a csv dump, a chunk
+       being the number of rows and their csv lines"""
+    lines = LineReader(f)
+    reader = csv.reader(lines)
+    for row in reader:
+        if not row:
+            continue
+        if row[0] != 'Table':
+            raise FpdbError(_("Not a table of a dump: %r") % row)
+        table, columns = row[1], reader.next()
+        def chunks():
+            lines.take()
+            count = 0
+            for row in reader:
+                if not row:
+                    yield (count, lines.take()[:-1])
+                    return
+                count += 1
+                if count == FETCH_SIZE:
+                    yield (count, lines.take())
+                    count = 0
+            yield (count, lines.take())
+        yield (table, columns, chunks())
+
+def readBinary(f):
+    """(table, columns, chunks of its rows) of each table of a binary dump, as readCsv"""
+    while True:
+        frame = readFrame(f)
+        if frame is None:
+            return
+        (kind, table, columns) = frame
+        def chunks():
+            while True:
+                frame = readFrame(f)
+                if frame is None or frame[0] == 'end':
+                    return
+                yield (len(frame[1]), [csvLine(row) for row in frame[1]])
+        yield (table, columns, chunks())
+
+def restore(db, f, progress=None):
+    """Replace the rows of all the tables of db with those of the csv or binary
+       dump in the file f. progress is called as for dump. Returns a dict of the
+       rows restored of each table"""
+    if f.read(len(MAGIC)) == MAGIC:
+        version = readFrame(f)['version']
+        tables = readBinary(f)
+    else:
+        f.seek(0)
+        header = csv.reader([f.readline()]).next()
+        if header[0] != TEXT_HEADER or len(header) < 2:
+            raise FpdbError(_("Only csv and binary dumps can be restored"))
+        version = int(header[1])
+        tables = readCsv(f)
+    if version != Database.DB_VERSION:
+        raise FpdbError(_("The dump is of DB version %d, the database of %d") % (version, Database.DB_VERSION))
+
+    c = db.get_cursor()
+    for table in reversed(db.sql.dump_tables):
+        c.execute(db.sql.query['clear_table'].replace('<table>', table))
+    counts = {}
+    for (table, columns, chunks) in tables:
+        count = 0
+        for (rows, lines) in chunks:
+            if rows:
+                copyLines(db, c, table, columns, lines)
+                count += rows
+                if progress is not None:
+                    progress(table, count)
+        if 'id' in columns:
+            c.execute(db.sql.query['reset_serial'].replace('<table>', table))
+        counts[table] = count
+        log.info(_("Restored %d rows of %s") % (count, table))
+    db.commit()
+    db.resetCache()
+    db.get_sites()
+    ReportCache.invalidate(db.config)
+    return counts
+
+def main(argv=None):
+    """Dump the database of a config file to a file, or restore one into it"""
+    if argv is None:
+        argv = sys.argv[1:]
+    import Configuration
+    parser = OptionParser(usage=_("%prog [options] FILE"))
+    parser.add_option("-c", "--configFile", dest="config", default=None,
+                      help=_("Configuration file, of the database"))
+    parser.add_option("-f", "--format", dest="format", default="binary", choices=FORMATS,
+                      help=_("Format of the dump: text, csv or binary. Default is binary"))
+    parser.add_option("-r", "--restore", action="store_true", dest="restore", default=False,
+                      help=_("Restore FILE into the database, whose rows are deleted first"))
+    (options, argv) = parser.parse_args(argv)
+    if len(argv) != 1:
+        parser.error(_("Give the file to dump to or restore from"))
+
+    Configuration.set_logfile("fpdb-log.txt")
+    db = Database.Database(Configuration.Config(file = options.config))
+    def progress(table, rows):
+        sys.stdout.write("\r%-20s %10d" % (table, rows))
+        sys.stdout.flush()
+    f = open(argv[0], 'rb' if options.restore else 'wb')
+    try:
+        if options.restore:
+            counts = restore(db, f, progress)
+        else:
+            counts = dump(db, f, options.format, progress)
+    finally:
+        f.close()
+    print
+    print _("%d rows of %d tables") % (sum(counts.values()), len(counts))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
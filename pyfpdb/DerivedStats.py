@@ -30,7 +30,8 @@ try:
     from pokereval import PokerEval
     pokereval = PokerEval()
 except:
-    pokereval = None
+    import HandEval
+    pokereval = HandEval.HandEval(HandEval.SAMPLES)
     
 def _buildStatsInitializer():
     init = {}
@@ -211,15 +212,13 @@ class DerivedStats():
         self.hands['street4Pot']  = totals[3]
         self.hands['showdownPot'] = totals[4]
 
-        self.vpip(hand) # Gives playersVpi (num of players vpip)
-        #print "DEBUG: vpip: %s" %(self.hands['playersVpi'])
-        self.playersAtStreetX(hand) # Gives playersAtStreet1..4 and Showdown
-        #print "DEBUG: playersAtStreet 1:'%s' 2:'%s' 3:'%s' 4:'%s'" %(self.hands['playersAtStreet1'],self.hands['playersAtStreet2'],self.hands['playersAtStreet3'],self.hands['playersAtStreet4'])
-        self.streetXRaises(hand)
+        # Gives playersVpi, playersAtStreet1..4 and Showdown, streetXRaises and all the
+        # per player stats taken from the actions
+        self.calcActionStats(hand)
 
     def assembleHandsPlayers(self, hand):
-        #street0VPI/vpip already called in Hand
-        # sawShowdown is calculated in playersAtStreetX, as that calculation gives us a convenient list of names
+        # street0VPI, sawShowdown, streetXSeen and the other stats from the actions
+        # are calculated in calcActionStats, called by assembleHands
 
         #hand.players = [[seat, name, chips],[seat, name, chips]]
         for player in hand.players:
@@ -239,22 +238,10 @@ class DerivedStats():
             if player_name in hand.shown:
                 player_stats['showed'] = True
 
-        #### seen now processed in playersAtStreetX()
-        # XXX: enumerate(list, start=x) is python 2.6 syntax; 'start'
-        #for i, street in enumerate(hand.actionStreets[2:], start=1):
-        #for i, street in enumerate(hand.actionStreets[2:]):
-        #    self.seen(self.hand, i+1)
-
-        for i, street in enumerate(hand.actionStreets[1:]):
-            self.aggr(hand, i)
-            self.calls(hand, i)
-            self.bets(hand, i)
-            if i>0:
-                self.folds(hand, i)
-
         # Winnings is a non-negative value of money collected from the pot, which already includes the
         # rake taken out. hand.collectees is Decimal, database requires cents
         num_collectees = len(hand.collectees)
+        rake = 100 * hand.rake      # the same for every player, worked out once
         for player, winnings in hand.collectees.iteritems():
             collectee_stats = self.handsplayers.get(player)
             collectee_stats['winnings'] = int(100 * winnings)
@@ -262,7 +249,7 @@ class DerivedStats():
             # You can really only pay rake when you collect money, but
             # different sites calculate rake differently.
             # Should be fine for split-pots, but won't be accurate for multi-way pots
-            collectee_stats['rake'] = int(100 * hand.rake)/num_collectees
+            collectee_stats['rake'] = int(rake)/num_collectees
             if collectee_stats['street1Seen'] == True:
                 collectee_stats['wonWhenSeenStreet1'] = True
             if collectee_stats['street2Seen'] == True:
@@ -280,21 +267,24 @@ class DerivedStats():
             paid = (100 * money_committed) + (100*hand.pot.common[player])
             committed_player_stats['totalProfit'] = int(committed_player_stats['winnings'] - paid)
             committed_player_stats['allInEV'] = committed_player_stats['totalProfit']
-            committed_player_stats['rakeDealt'] = int(100* hand.rake)/len(hand.players)
+            committed_player_stats['rakeDealt'] = int(rake)/len(hand.players)
             if paid > 0: contributed.append(player)
             if hand.totalpot>0:
-                committed_player_stats['rakeWeighted'] = int((100* hand.rake) * (paid/(100*hand.totalpot)))
+                committed_player_stats['rakeWeighted'] = int(rake * (paid/(100*hand.totalpot)))
             else:
                 committed_player_stats['rakeWeighted'] = 0
             
         for player in contributed:
-            self.handsplayers[player]['rakeContributed'] = int(100* hand.rake)/len(contributed)
+            self.handsplayers[player]['rakeContributed'] = int(rake)/len(contributed)
             
+        bigbet = 0
+        if int(Decimal(hand.gametype['bb']))>0:
+            bigbet = int(Decimal(hand.gametype['bb'])*2)
         for player in hand.players:
             player_name = player[1]
             player_stats = self.handsplayers.get(player_name)
-            if int(Decimal(hand.gametype['bb']))>0:
-                player_stats['BBwon'] = player_stats['totalProfit'] / int(Decimal(hand.gametype['bb'])*2)
+            if bigbet > 0:
+                player_stats['BBwon'] = player_stats['totalProfit'] / bigbet
             if player_stats['street0VPI'] or player_stats['street1Seen']:
                 player_stats['played'] = 1
             if player_stats['sawShowdown']:
@@ -314,8 +304,6 @@ class DerivedStats():
             else:
                 player_stats['vsHero'] = 0
 
-        self.calcCBets(hand)
-        
         # More inner-loop speed hackery.
         encodeCard = Card.encodeCard
         calcStartCards = Card.calcStartCards
@@ -330,12 +318,7 @@ class DerivedStats():
                 player_stats['card%d' % (i+1)] = encodeCard(card)
             player_stats['startCards'] = calcStartCards(hand, player_name)
 
-        self.setPositions(hand)
-        self.calcEffectiveStack(hand)
-        self.calcCheckCallRaise(hand)
-        self.calc34BetStreet0(hand)
         self.calcSteals(hand)
-        self.calcCalledRaiseStreet0(hand)
         # Additional stats
         # 3betSB, 3betBB
         # Squeeze, Ratchet?
@@ -656,169 +639,251 @@ class DerivedStats():
                         insert = [None, item['potId'], item['boardId'], item['hiLo'][0], hand.dbid_pids[p], int(item['ppot']*100), int(collected*100), int(rake*100)]   
                         self.handspots.append(insert)
 
-    def setPositions(self, hand):
-        """Sets the position for each player in HandsPlayers
-            any blinds are negative values, and the last person to act on the
-            first betting round is 0
-            NOTE: HU, both values are negative for non-stud games
-            NOTE2: I've never seen a HU stud match"""
-        actions = hand.actions[hand.holeStreets[0]]
-        # Note:  pfbao list may not include big blind if all others folded
-        players = self.pfbao(actions)
-
-        # set blinds first, then others from pfbao list, avoids problem if bb
-        # is missing from pfbao list or if there is no small blind
-        sb, bb, bi = False, False, False
-        if hand.gametype['base'] == 'stud':
-            # Stud position is determined after cards are dealt
-            bi = [x[0] for x in hand.actions[hand.actionStreets[1]] if x[1] == 'bringin']
-        else:
-            bb = [x[0] for x in hand.actions[hand.actionStreets[0]] if x[1] == 'big blind']
-            sb = [x[0] for x in hand.actions[hand.actionStreets[0]] if x[1] == 'small blind']
+    def calcActionStats(self, hand):
+        """Walks the actions of the hand once, street by street, and fills every stat
+        that comes from the order of the actions:
+            playersVpi, playersAtStreetX, playersAtShowdown, streetXRaises
+            street0VPI(Chance), street0AggrChance, streetXSeen, sawShowdown,
+            streetXAggr, streetXCalls, streetXBets, otherRaisedStreetX, foldToOtherRaisedStreetX,
+            streetXCB(Chance|Done), foldToStreetXCB(Chance|Done),
+            streetXCheckCallRaiseChance, streetXCheck(Call|Raise)Done,
+            street0_(3|4|C4)B(Chance|Done), street0_FoldTo(3|4)B(Chance|Done),
+            street0_Squeeze(Chance|Done), street0CalledRaise(Chance|Done),
+            effStack and position
+        """
+        hp = self.handsplayers
+        names = set([p[1] for p in hand.players])
+        for i in range(5): self.hands['street%dRaises' % i] = 0
+        for i in range(1, 5): self.hands['playersAtStreet%d' % i] = 0
+        self.hands['playersAtShowdown'] = 0
 
-        # if there are > 1 sb or bb only the first is used!
-        if bb:
-            self.handsplayers[bb[0]]['position'] = 'B'
-            if bb[0] in players:  players.remove(bb[0])
-        if sb:
-            self.handsplayers[sb[0]]['position'] = 'S'
-            if sb[0] in players:  players.remove(sb[0])
-        if bi:
-            self.handsplayers[bi[0]]['position'] = 'S'
-            if bi[0] in players:  players.remove(bi[0])
+        # Blinds and antes: only the first sb or bb counts
+        bb, sb, bi = None, None, None
+        p0_in = set()           # players not all in on the blinds, for the 3/4 bet chances
+        p_folds = set()
+        for action in hand.actions[hand.actionStreets[0]]:
+            pname, act = action[0], action[1]
+            if act == 'big blind' and bb is None:
+                bb = pname
+            elif act == 'small blind' and sb is None:
+                sb = pname
+            elif act == 'folds':
+                p_folds.add(pname)
+            if not action[-1]:
+                p0_in.add(pname)
+
+        # p_in holds the players with cards at the start of each street, including all-ins
+        # as they never fold. Once it is down to one player the hand is over and the
+        # streets after that were not seen. actionStreets[1] is 'DEAL', 'THIRD', 'PREFLOP',
+        # so any player dealt cards acts on it (the 'all-in blind' case aside)
+        p1_in = set([x[0] for x in hand.actions[hand.actionStreets[1]]])
+        p_in = set(p1_in)
+        if hand.pot.pots and len(hand.pot.pots[0][1]) > 1:
+            p_in = p_in.union(hand.pot.pots[0][1])
+        p_in -= p_folds
+        over = len(p_in) == 1
 
-        #print "DEBUG: bb: '%s' sb: '%s' bi: '%s' plyrs: '%s'" %(bb, sb, bi, players)
-        for i,player in enumerate(reversed(players)):
-            self.handsplayers[player]['position'] = i
+        # First street state: vpip, 3/4 bets, called raises, effective stacks, positions
+        vpipers = set()
+        fast_forward = True     # skipping to the next raise for street0CalledRaise
+        bet_level = 1           # 3 after a 3-bet, 0 when done with the 3/4 bet stats
+        squeeze_chance, raise_chance = False, True
+        p34_in = p1_in.union(p0_in)
+        action_cnt = dict([(p, 0) for p in p34_in])
+        first_agressor = None
+        order = []              # players by first action, for positions
+        pstacks = {}
+        if int(Decimal(hand.gametype['bb'])) > 0:
+            for p in hand.players:
+                if p[1] not in hand.sitout:
+                    pstacks[p[1]] = int(100 * Decimal(p[2])) / int(Decimal(hand.gametype['bb']))
 
-    def assembleHudCache(self, hand):
-        # No real work to be done - HandsPlayers data already contains the correct info
-        pass
+        lastaggr = None         # last to bet or raise on the previous street
+        for i, street in enumerate(hand.actionStreets[1:]):
+            if not over and i in (1, 2, 3, 4):
+                self.hands['playersAtStreet%d' % i] = len(p_in)
+                for pname in p_in:
+                    hp[pname]['street%dSeen' % i] = True
+            aggrers, others, folders = set(), set(), set()
+            streetaggr, raises = None, 0
+            checkers, initial_raiser = set(), None
+            # continuation bet by lastaggr: no bet before their first action, bet as it
+            # and the answers of the others until the raise or lastaggr's second action
+            cb_chance, cb_done, cb_acts, cb_open, cb_folds = None, None, 0, True, {}
+            for action in hand.actions[street]:
+                pname, act = action[0], action[1]
+                bet = act in ('bets', 'raises')
+                if aggrers:
+                    others.add(pname)
+                if bet or act == 'completes':
+                    aggrers.add(pname)
+                if bet:
+                    raises += 1
+                    streetaggr = pname
+                if act == 'calls':
+                    hp[pname]['street%dCalls' % i] += 1
+                elif act == 'bets':
+                    hp[pname]['street%dBets' % i] += 1
+                elif act == 'folds':
+                    folders.add(pname)
+
+                if i == 0:
+                    player_stats = hp.get(pname)
+                    if act in ('calls', 'bets', 'raises', 'completes'):
+                        vpipers.add(pname)
+                    if act == 'bringin' and bi is None:
+                        bi = pname
+
+                    if fast_forward:
+                        if act == 'raises':
+                            fast_forward = False
+                    else:
+                        player_stats['street0CalledRaiseChance'] += 1
+                        if act == 'calls':
+                            player_stats['street0CalledRaiseDone'] += 1
+                            fast_forward = True
+
+                    if bet_level:
+                        allin = False
+                        action_cnt[pname] += 1
+                        if len(action) > 3 and act != 'discards':
+                            allin = action[-1]
+                        if len(p34_in)==1 and action_cnt[pname]==1:
+                            raise_chance = False
+                            player_stats['street0AggrChance'] = raise_chance
+                        sitout = pname in hand.sitout
+                        if act == 'folds' or allin or sitout:
+                            p34_in.discard(pname)
+                        if sitout:
+                            pass
+                        elif bet_level == 1:
+                            if bet:
+                                first_agressor = pname
+                                bet_level += 1
+                        elif bet_level == 2:
+                            player_stats['street0_3BChance'] = raise_chance
+                            player_stats['street0_SqueezeChance'] = squeeze_chance
+                            if not squeeze_chance and act == 'calls':
+                                squeeze_chance = True
+                            elif bet:
+                                player_stats['street0_3BDone'] = True
+                                player_stats['street0_SqueezeDone'] = squeeze_chance
+                                bet_level += 1
+                        elif bet_level == 3:
+                            if pname == first_agressor:
+                                player_stats['street0_4BChance'] = raise_chance
+                                player_stats['street0_FoldTo3BChance'] = True
+                                if bet:
+                                    player_stats['street0_4BDone'] = raise_chance
+                                    bet_level += 1
+                                elif act == 'folds':
+                                    player_stats['street0_FoldTo3BDone'] = True
+                                    bet_level = 0
+                            else:
+                                player_stats['street0_C4BChance'] = raise_chance
+                                if bet:
+                                    player_stats['street0_C4BDone'] = raise_chance
+                                    bet_level += 1
+                        elif bet_level == 4:
+                            if pname != first_agressor:
+                                player_stats['street0_FoldTo4BChance'] = True
+                                if act == 'folds':
+                                    player_stats['street0_FoldTo4BDone'] = True
+
+                    if pname not in order:
+                        order.append(pname)
+                        if pname in pstacks:
+                            oppstacks = [v for (k,v) in pstacks.iteritems() if k != pname]
+                            if oppstacks:
+                                player_stats['effStack'] = min(pstacks[pname], max(oppstacks))
+                                if act == 'folds':
+                                    pstacks[pname] = 0
+                    continue
 
-    def vpip(self, hand):
-        vpipers = set()
-        bb = [x[0] for x in hand.actions[hand.actionStreets[0]] if x[1] == 'big blind']
-        for act in hand.actions[hand.actionStreets[1]]:
-            if act[1] in ('calls','bets', 'raises', 'completes'):
-                vpipers.add(act[0])
+                if bet and initial_raiser is None:
+                    initial_raiser = pname
+                elif act == 'checks' and initial_raiser is None:
+                    checkers.add(pname)
+                elif initial_raiser is not None and pname in checkers:
+                    player_stats = hp.get(pname)
+                    player_stats['street%dCheckCallRaiseChance' % i] = True
+                    player_stats['street%dCheckCallDone' % i] = act=='calls'
+                    player_stats['street%dCheckRaiseDone' % i] = act=='raises'
+
+                if lastaggr:
+                    if cb_chance is None:
+                        if pname == lastaggr:
+                            cb_chance = True
+                        elif bet:
+                            cb_chance = False
+                    if cb_done is None and pname == lastaggr and act not in ('discards', 'stands pat'):
+                        cb_done = bet
+                    if cb_open:
+                        if cb_acts > 1:
+                            cb_open = False
+                        elif pname != lastaggr:
+                            cb_folds[pname] = act == 'folds'
+                            if act == 'raises': cb_open = False
+                        elif act != 'discards':
+                            cb_acts += 1
+
+            self.hands['street%dRaises' % i] = raises
+            for pname in aggrers:
+                if pname in names:
+                    hp[pname]['street%dAggr' % i] = True
+            if i > 0 and aggrers:
+                for pname in others:
+                    hp[pname]['otherRaisedStreet%d' % i] = True
+                for pname in folders:
+                    if pname in others:
+                        hp[pname]['foldToOtherRaisedStreet%d' % i] = True
+            if cb_chance:
+                player_stats = hp.get(lastaggr)
+                player_stats['street%dCBChance' % i] = True
+                player_stats['street%dCBDone' % i] = bool(cb_done)
+                if cb_done:
+                    for pname, folds in cb_folds.iteritems():
+                        hp[pname]['foldToStreet%dCBChance' % i] = True
+                        hp[pname]['foldToStreet%dCBDone' % i] = folds
+            lastaggr = streetaggr
+            if not over:
+                p_in -= folders
+                over = len(p_in) == 1
+
+        if not over:
+            self.hands['playersAtShowdown'] = len(p_in)
+            for pname in p_in:
+                hp[pname]['sawShowdown'] = True
 
         self.hands['playersVpi'] = len(vpipers)
-
         for player in hand.players:
             pname = player[1]
-            player_stats = self.handsplayers.get(pname)
+            player_stats = hp.get(pname)
             if pname in vpipers:
                 player_stats['street0VPI'] = True
             elif pname in hand.sitout:
                 player_stats['street0VPIChance'] = False
                 player_stats['street0AggrChance'] = False
-                
         if len(vpipers)==0 and bb:
-            self.handsplayers[bb[0]]['street0VPIChance'] = False
-            self.handsplayers[bb[0]]['street0AggrChance'] = False
-
-    def playersAtStreetX(self, hand):
-        """ playersAtStreet1 SMALLINT NOT NULL,   /* num of players seeing flop/street4/draw1 */"""
-        # self.actions[street] is a list of all actions in a tuple, contining the player name first
-        # [ (player, action, ....), (player2, action, ...) ]
-        # The number of unique players in the list per street gives the value for playersAtStreetXXX
-
-        # FIXME?? - This isn't couting people that are all in - at least showdown needs to reflect this
-        #     ... new code below hopefully fixes this
-        # partly fixed, allins are now set as seeing streets because they never do a fold action
-
-        self.hands['playersAtStreet1']  = 0
-        self.hands['playersAtStreet2']  = 0
-        self.hands['playersAtStreet3']  = 0
-        self.hands['playersAtStreet4']  = 0
-        self.hands['playersAtShowdown'] = 0
-
-#        alliners = set()
-#        for (i, street) in enumerate(hand.actionStreets[2:]):
-#            actors = set()
-#            for action in hand.actions[street]:
-#                if len(action) > 2 and action[-1]: # allin
-#                    alliners.add(action[0])
-#                actors.add(action[0])
-#            if len(actors)==0 and len(alliners)<2:
-#                alliners = set()
-#            self.hands['playersAtStreet%d' % (i+1)] = len(set.union(alliners, actors))
-#
-#        actions = hand.actions[hand.actionStreets[-1]]
-#        print "p_actions:", self.pfba(actions), "p_folds:", self.pfba(actions, l=('folds',)), "alliners:", alliners
-#        pas = set.union(self.pfba(actions) - self.pfba(actions, l=('folds',)),  alliners)
-        
-        # hand.players includes people that are sitting out on some sites for cash games
-        # actionStreets[1] is 'DEAL', 'THIRD', 'PREFLOP', so any player dealt cards
-        # must act on this street if dealt cards. Almost certainly broken for the 'all-in blind' case
-        # and right now i don't care - CG
-
-        p_in = set([x[0] for x in hand.actions[hand.actionStreets[1]]])
-        #Add in players who were allin blind
-        if hand.pot.pots:
-            if len(hand.pot.pots[0][1])>1: p_in = p_in.union(hand.pot.pots[0][1])
-
-        #
-        # discover who folded on each street and remove them from p_in
-        #
-        # i values as follows 0=BLINDSANTES 1=PREFLOP 2=FLOP 3=TURN 4=RIVER
-        #   (for flop games)
-        #
-        # At the beginning of the loop p_in contains the players with cards
-        # at the start of that street.
-        # p_in is reduced each street to become a list of players still-in
-        # e.g. when i=1 (preflop) all players who folded during preflop
-        # are found by pfba() and eliminated from p_in.
-        # Therefore at the end of the loop, p_in contains players remaining
-        # at the end of the action on that street, and can therefore be set
-        # as the value for the number of players who saw the next street
-        #
-        # note that i is 1 in advance of the actual street numbers in the db
-        #
-        # if p_in reduces to 1 player, we must bomb-out immediately
-        # because the hand is over, this will ensure playersAtStreetx
-        # is accurate.
-        #
-                    
-        for (i, street) in enumerate(hand.actionStreets):
-            if (i-1) in (1,2,3,4):
-                # p_in stores players with cards at start of this street,
-                # so can set streetxSeen & playersAtStreetx with this information
-                # This hard-coded for i-1 =1,2,3,4 because those are the only columns
-                # in the db! this code section also replaces seen() - more info log 66
-                # nb i=2=flop=street1Seen, hence i-1 term needed
-                self.hands['playersAtStreet%d' % (i-1)] = len(p_in)
-                for player_with_cards in p_in:
-                    self.handsplayers[player_with_cards]['street%sSeen' % (i-1)] = True
-            #
-            # find out who folded, and eliminate them from p_in
-            #
-            actions = hand.actions[street]
-            p_in = p_in - self.pfba(actions, l=('folds',))
-            #
-            # if everyone folded, we are done, so exit this method immediately
-            #
-            if len(p_in) == 1: return None
+            hp[bb]['street0VPIChance'] = False
+            hp[bb]['street0AggrChance'] = False
 
-        #
-        # The remaining players in p_in reached showdown (including all-ins
-        # because they never did a "fold" action in pfba() above)
-        #
-        self.hands['playersAtShowdown'] = len(p_in)
-        for showdown_player in p_in:
-            self.handsplayers[showdown_player]['sawShowdown'] = True
-
-    def streetXRaises(self, hand):
-        # self.actions[street] is a list of all actions in a tuple, contining the action as the second element
-        # [ (player, action, ....), (player2, action, ...) ]
-        # No idea what this value is actually supposed to be
-        # In theory its "num small bets paid to see flop/street4, including blind" which makes sense for limit. Not so useful for nl
-        # Leaving empty for the moment,
-
-        for i in range(5): self.hands['street%dRaises' % i] = 0
+        # Positions: the blinds (bring in for stud) first, then from the last to act on
+        # the first street, who is 0. Heads up both are blinds for non-stud games
+        if hand.gametype['base'] == 'stud':
+            bb, sb = None, None
+        else:
+            bi = None
+        for pname, posn in ((bb, 'B'), (sb, 'S'), (bi, 'S')):
+            if pname:
+                hp[pname]['position'] = posn
+                if pname in order: order.remove(pname)
+        for i, pname in enumerate(reversed(order)):
+            hp[pname]['position'] = i
 
-        for (i, street) in enumerate(hand.actionStreets[1:]):
-            self.hands['street%dRaises' % i] = len(filter( lambda action: action[1] in ('raises','bets'), hand.actions[street]))
+    def assembleHudCache(self, hand):
+        # No real work to be done - HandsPlayers data already contains the correct info
+        pass
 
     def calcSteals(self, hand):
         """Fills raiseFirstInChance|raisedFirstIn, fold(Bb|Sb)ToSteal(Chance|)
@@ -870,317 +935,5 @@ class DerivedStats():
             if posn not in steal_positions and act not in ('folds', 'bringin'):
                 break
 
-    def calc34BetStreet0(self, hand):
-        """Fills street0_(3|4)B(Chance|Done), other(3|4)BStreet0"""
-        bet_level = 1 # bet_level after 3-bet is equal to 3
-        squeeze_chance, raise_chance, action_cnt = False, True, {}
-        p0_in = set([x[0] for x in hand.actions[hand.actionStreets[0]] if not x[-1]])
-        p1_in = set([x[0] for x in hand.actions[hand.actionStreets[1]]])
-        p_in = p1_in.union(p0_in)
-        for p in p_in: action_cnt[p] = 0
-        for action in hand.actions[hand.actionStreets[1]]:
-            pname, act, aggr, allin = action[0], action[1], action[1] in ('raises', 'bets'), False
-            player_stats = self.handsplayers.get(pname)
-            action_cnt[pname] += 1
-            if len(action) > 3 and act != 'discards':
-                allin = action[-1]
-            if len(p_in)==1 and action_cnt[pname]==1:
-                raise_chance = False
-                player_stats['street0AggrChance'] = raise_chance
-            if act == 'folds' or allin or player_stats['sitout']:
-                p_in.discard(pname)
-                if player_stats['sitout']: continue
-            if bet_level == 1:
-                if aggr:
-                    first_agressor = pname
-                    bet_level += 1
-                continue
-            elif bet_level == 2:
-                player_stats['street0_3BChance'] = raise_chance
-                player_stats['street0_SqueezeChance'] = squeeze_chance
-                if not squeeze_chance and act == 'calls':
-                    squeeze_chance = True
-                    continue
-                if aggr:
-                    player_stats['street0_3BDone'] = True
-                    player_stats['street0_SqueezeDone'] = squeeze_chance
-                    second_agressor = pname
-                    bet_level += 1
-                continue
-            elif bet_level == 3:
-                if pname == first_agressor:
-                    player_stats['street0_4BChance'] = raise_chance
-                    player_stats['street0_FoldTo3BChance'] = True
-                    if aggr:
-                        player_stats['street0_4BDone'] = raise_chance
-                        bet_level += 1
-                    elif act == 'folds':
-                        player_stats['street0_FoldTo3BDone'] = True
-                        break
-                else:
-                    player_stats['street0_C4BChance'] = raise_chance
-                    if aggr:
-                        player_stats['street0_C4BDone'] = raise_chance
-                        bet_level += 1
-                continue
-            elif bet_level == 4:
-                if pname != first_agressor: 
-                    player_stats['street0_FoldTo4BChance'] = True
-                    if act == 'folds':
-                        player_stats['street0_FoldTo4BDone'] = True
-
-    def calcCBets(self, hand):
-        """Fill streetXCBChance, streetXCBDone, foldToStreetXCBDone, foldToStreetXCBChance
-
-        Continuation Bet chance, action:
-        Had the last bet (initiative) on previous street, got called, close street action
-        Then no bets before the player with initiatives first action on current street
-        ie. if player on street-1 had initiative and no donkbets occurred
-        """
-        # XXX: enumerate(list, start=x) is python 2.6 syntax; 'start'
-        # came there
-        #for i, street in enumerate(hand.actionStreets[2:], start=1):
-        for i, street in enumerate(hand.actionStreets[2:]):
-            name = self.lastBetOrRaiser(hand.actions, hand.actionStreets[i+1]) # previous street
-            if name:
-                chance = self.noBetsBefore(hand.actions, hand.actionStreets[i+2], name) # this street
-                if chance == True:
-                    player_stats = self.handsplayers.get(name)
-                    player_stats['street%dCBChance' % (i+1)] = True
-                    player_stats['street%dCBDone' % (i+1)] = self.betStreet(hand.actions, hand.actionStreets[i+2], name)
-                    if player_stats['street%dCBDone' % (i+1)]:
-                        for pname, folds in self.foldTofirstsBetOrRaiser(hand.actions, street, name).iteritems():
-                            #print "DEBUG:", hand.handid, pname.encode('utf8'), street, folds, '--', name, 'lastbet on ', hand.actionStreets[i+1]
-                            self.handsplayers[pname]['foldToStreet%sCBChance' % (i+1)] = True
-                            self.handsplayers[pname]['foldToStreet%sCBDone' % (i+1)] = folds
-
-    def calcCalledRaiseStreet0(self, hand):
-        """
-        Fill street0CalledRaiseChance, street0CalledRaiseDone
-        For flop games, go through the preflop actions:
-            skip through first raise
-            For each subsequent action:
-                if the next action is fold :
-                    player chance + 1
-                if the next action is raise :
-                    player chance + 1
-                if the next non-fold action is call :
-                    player chance + 1
-                    player done + 1
-                    skip through list to the next raise action
-        """
-        
-        fast_forward = True
-        for tupleread in hand.actions[hand.actionStreets[1]]:
-            action = tupleread[1]
-            if fast_forward:
-                if action == 'raises':
-                    fast_forward = False # raisefound, end fast-forward
-            else:
-                player = tupleread[0]
-                player_stats = self.handsplayers.get(player)
-                player_stats['street0CalledRaiseChance'] += 1
-                if action == 'calls':
-                    player_stats['street0CalledRaiseDone'] += 1
-                    fast_forward = True
-
-    def calcCheckCallRaise(self, hand):
-        """Fill streetXCheckCallRaiseChance, streetXCheckCallRaiseDone
-
-        streetXCheckCallRaiseChance = got raise/bet after check
-        streetXCheckCallRaiseDone = checked. got raise/bet. didn't fold
-
-        CG: CheckCall would be a much better name for this.
-        """
-        # XXX: enumerate(list, start=x) is python 2.6 syntax; 'start'
-        #for i, street in enumerate(hand.actionStreets[2:], start=1):
-        for i, street in enumerate(hand.actionStreets[2:]):
-            actions = hand.actions[street]
-            checkers = set()
-            initial_raiser = None
-            for action in actions:
-                pname, act = action[0], action[1]
-                if act in ('bets', 'raises') and initial_raiser is None:
-                    initial_raiser = pname
-                elif act == 'checks' and initial_raiser is None:
-                    checkers.add(pname)
-                elif initial_raiser is not None and pname in checkers:
-                    player_stats = self.handsplayers.get(pname)
-                    player_stats['street%dCheckCallRaiseChance' % (i+1)] = True
-                    player_stats['street%dCheckCallDone' % (i+1)] = act=='calls'
-                    player_stats['street%dCheckRaiseDone' % (i+1)] = act=='raises'
-
-    def aggr(self, hand, i):
-        aggrers = set()
-        others = set()
-        # Growl - actionStreets contains 'BLINDSANTES', which isn't actually an action street
-
-        firstAggrMade=False
-        for act in hand.actions[hand.actionStreets[i+1]]:
-            if firstAggrMade:
-                others.add(act[0])
-            if act[1] in ('completes', 'bets', 'raises'):
-                aggrers.add(act[0])
-                firstAggrMade=True
-
-        for player in hand.players:
-            if player[1] in aggrers:
-                self.handsplayers[player[1]]['street%sAggr' % i] = True
-                
-        if len(aggrers)>0 and i>0:
-            for playername in others:
-                self.handsplayers[playername]['otherRaisedStreet%s' % i] = True
-                #print "otherRaised detected on handid "+str(hand.handid)+" for "+playername+" on street "+str(i)
-
-        if i > 0 and len(aggrers) > 0:
-            for playername in others:
-                self.handsplayers[playername]['otherRaisedStreet%s' % i] = True
-                #print "DEBUG: otherRaised detected on handid %s for %s on actionStreet[%s]: %s" 
-                #                           %(hand.handid, playername, hand.actionStreets[i+1], i)
-
-    def calls(self, hand, i):
-        callers = []
-        for act in hand.actions[hand.actionStreets[i+1]]:
-            if act[1] in ('calls'):
-                player_stats = self.handsplayers.get(act[0])
-                player_stats['street%sCalls' % i] = 1 + player_stats['street%sCalls' % i]
-
-    # CG - I'm sure this stat is wrong
-    # Best guess is that raise = 2 bets
-    def bets(self, hand, i):
-        for act in hand.actions[hand.actionStreets[i+1]]:
-            if act[1] in ('bets'):
-                player_stats = self.handsplayers.get(act[0])
-                player_stats['street%sBets' % i] = 1 + player_stats['street%sBets' % i]
-        
-    def folds(self, hand, i):
-        for act in hand.actions[hand.actionStreets[i+1]]:
-            if act[1] in ('folds'):
-                player_stats = self.handsplayers.get(act[0])
-                if player_stats['otherRaisedStreet%s' % i] == True:
-                    player_stats['foldToOtherRaisedStreet%s' % i] = True
-                    #print "DEBUG: fold detected on handid %s for %s on actionStreet[%s]: %s"
-                    #                       %(hand.handid, act[0],hand.actionStreets[i+1], i)
-
     def countPlayers(self, hand):
         pass
-
-    def pfba(self, actions, f=None, l=None):
-        """Helper method. Returns set of PlayersFilteredByActions
-
-        f - forbidden actions
-        l - limited to actions
-        """
-        players = set()
-        for action in actions:
-            if l is not None and action[1] not in l: continue
-            if f is not None and action[1] in f: continue
-            players.add(action[0])
-        return players
-
-    def pfbao(self, actions, f=None, l=None, unique=True):
-        """Helper method. Returns set of PlayersFilteredByActionsOrdered
-
-        f - forbidden actions
-        l - limited to actions
-        """
-        # Note, this is an adaptation of function 5 from:
-        # http://www.peterbe.com/plog/uniqifiers-benchmark
-        seen = {}
-        players = []
-        for action in actions:
-            if l is not None and action[1] not in l: continue
-            if f is not None and action[1] in f: continue
-            if action[0] in seen and unique: continue
-            seen[action[0]] = 1
-            players.append(action[0])
-        return players
-    
-    def calcEffectiveStack(self,hand):
-        """Calculates the effective stack for each player on street 1
-        """
-        seen = {}
-        pstacks = {}
-        actions = hand.actions[hand.holeStreets[0]]
-        for p in hand.players: 
-            if p[1] not in hand.sitout:
-                if int(Decimal(hand.gametype['bb']))>0:
-                    pstacks[p[1]] = int(100 * Decimal(p[2])) / int(Decimal(hand.gametype['bb']))
-        for action in actions:
-            if action[0] in seen: continue
-            if action[0] not in pstacks: continue
-            seen[action[0]] = 1
-            oppstacks = [v for (k,v) in pstacks.iteritems() if k != action[0]]
-            if oppstacks:
-                if pstacks[action[0]] > max(oppstacks):
-                    self.handsplayers[action[0]]['effStack'] = max(oppstacks)
-                else:
-                    self.handsplayers[action[0]]['effStack'] = pstacks[action[0]]
-                if action[1] == 'folds':
-                    pstacks[action[0]] = 0
-
-    def firstsBetOrRaiser(self, actions):
-        """Returns player name that placed the first bet or raise.
-
-        None if there were no bets or raises on that street
-        """
-        for act in actions:
-            if act[1] in ('bets', 'raises'):
-                return act[0]
-        return None
-    
-    def foldTofirstsBetOrRaiser(self, actions, street, aggressor):
-        """Returns player name that placed the first bet or raise.
-
-        None if there were no bets or raises on that street
-        """
-        i, players = 0, {}
-        for act in actions[street]:
-            if i>1: break
-            if act[0] != aggressor:
-                if act[1] == 'folds':
-                    players[act[0]] = True
-                else:
-                    players[act[0]] = False
-                if act[1] == 'raises': break
-            elif act[1]!='discards':
-                i+=1
-        return players
-
-    def lastBetOrRaiser(self, actions, street):
-        """Returns player name that placed the last bet or raise for that street.
-            None if there were no bets or raises on that street"""
-        lastbet = None
-        for act in actions[street]:
-            if act[1] in ('bets', 'raises'):
-                lastbet = act[0]
-        return lastbet
-
-
-    def noBetsBefore(self, actions, street, player):
-        """Returns true if there were no bets before the specified players turn, false otherwise"""
-        noBetsBefore = False
-        for act in actions[street]:
-            #Must test for player first in case UTG
-            if act[0] == player:
-                noBetsBefore = True
-                break
-            if act[1] in ('bets', 'raises'):
-                break
-        return noBetsBefore
-
-
-    def betStreet(self, actions, street, player):
-        """Returns true if player bet/raised the street as their first action"""
-        betOrRaise = False
-        for act in actions[street]:
-            if act[0] == player and act[1] not in ('discards', 'stands pat'):
-                if act[1] in ('bets', 'raises'):
-                    betOrRaise = True
-                else:
-                    # player found but did not bet or raise as their first action
-                    pass
-                break
-            #else:
-                # haven't found player's first action yet
-        return betOrRaise
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""Watches the auto import directories for hand history files being written to.
+
+With pyinotify the kernel reports which files changed, so Importer.runUpdated
+only looks at those and GuiAutoImport can import a hand as soon as it is
+written. Without it changes() returns None and the importer checks every file
+on each timer tick, as before.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+import logging
+# logging has been set up in fpdb.py or HUD_main.py, use their settings:
+log = logging.getLogger("importer")
+
+try:
+    import pyinotify
+    use_inotify = True
+except ImportError:
+    log.info(_("Not using pyinotify to watch the import directories."))
+    use_inotify = False
+
+
+class FileWatcher:
+
+    def __init__(self):
+        self.changed = set()
+        self.watched = set()
+        self.wm = None
+        if use_inotify:
+            self.wm = pyinotify.WatchManager()
+            self.notifier = pyinotify.Notifier(self.wm, self.event, timeout=0)
+
+    def watch(self, dir):
+        """Report changes to the files in dir and its subdirectories, new ones included"""
+        if self.wm is not None and dir not in self.watched:
+            mask = (pyinotify.IN_MODIFY | pyinotify.IN_CLOSE_WRITE
+                   |pyinotify.IN_CREATE | pyinotify.IN_MOVED_TO)
+            self.wm.add_watch(dir, mask, rec=True, auto_add=True)
+            self.watched.add(dir)
+
+    def get_fd(self):
+        """File descriptor that becomes readable when there are changes, None when not watching"""
+        if self.wm is None:
+            return None
+        return self.wm.get_fd()
+
+    def event(self, event):
+        if not event.dir:
+            self.changed.add(event.pathname)
+
+    def changes(self):
+        """The files changed since the last call, or None when not watching and all files
+        should be checked"""
+        if self.wm is None:
+            return None
+        while self.notifier.check_events(timeout=0):
+            self.notifier.read_events()
+            self.notifier.process_events()
+        changed, self.changed = self.changed, set()
+        return changed
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""Graph data for GuiGraphViewer and GuiTourneyGraphViewer.
+
+The graph queries are read in chunks of FETCH_SIZE rows straight into float
+arrays, the profit lines are computed on whole arrays, and a line is cut down
+to the lowest and highest point of each pixel column before it is plotted, so
+matplotlib draws a few thousand points whatever the number of hands.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+import numpy
+
+FETCH_SIZE = 10000      # rows fetched from the cursor at a time
+
+
+def fetchArray(cursor, columns, size=FETCH_SIZE):
+    """The rows of the query executed on cursor as a float array with a column for
+       each index of columns, NULLs as 0, booleans as 0/1"""
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        chunk = numpy.array(rows, dtype=float)[:, columns]    # NULL is read as nan
+        chunk[numpy.isnan(chunk)] = 0
+        chunks.append(chunk)
+    if not chunks:
+        return numpy.zeros((0, len(columns)))
+    return numpy.concatenate(chunks)
+
+def ringProfitLines(profit, showdown, ev):
+    """The cumulative all, showdown, non-showdown and all-in EV lines of the profit,
+       sawShowdown flag and all-in EV arrays of the hands"""
+    showdown = showdown != 0
+    return (numpy.cumsum(profit),
+            numpy.cumsum(numpy.where(showdown, profit, 0)),
+            numpy.cumsum(numpy.where(showdown, 0, profit)),
+            numpy.cumsum(ev))
+
+def downsample(line, width):
+    """The (x, y) points to plot of line on width pixels: the first and last points,
+       and the lowest and highest of each pixel's worth of points, in order"""
+    line = numpy.asarray(line)
+    n = len(line)
+    if n <= 2 * width or width < 1:
+        return numpy.arange(n), line
+    size = -(-n // width)                   # points per bucket, rounded up
+    buckets = -(-n // size)
+    padded = numpy.concatenate((line, numpy.repeat(line[-1], buckets * size - n)))
+    padded = padded.reshape(buckets, size)
+    first = numpy.arange(buckets) * size
+    # the padding repeats the last point, so an index into it is the last point
+    lows = numpy.minimum(first + padded.argmin(axis=1), n - 1)
+    highs = numpy.minimum(first + padded.argmax(axis=1), n - 1)
+    x = numpy.unique(numpy.concatenate(([0, n - 1], lows, highs)))
+    return x, line[x]
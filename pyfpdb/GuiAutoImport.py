@@ -20,6 +20,10 @@ _ = L10n.get_translation()
 
 import subprocess
 import traceback
+import threading
+import Queue
+import select
+from time import time
 
 import pygtk
 pygtk.require('2.0')
@@ -45,10 +49,85 @@ log = logging.getLogger("importer")
 if os.name == "nt":
     import win32console
 
+POLL_INTERVAL = 0.5     # seconds the worker waits at most before checking whether it should stop
+
+
+class ImportWorker:
+    """Runs the auto import in a thread of its own, so the gtk main loop never waits
+    on parsing, storing or committing hands. It is the caller of the Importer: the
+    text the Importer writes goes on the messages queue for the gui, and the hand
+    ids go to the HUD pipe from this thread as soon as each file is committed.
+    Files are imported every interval seconds, and as soon as they are written to
+    when the import directories are watched."""
+
+    def __init__(self):
+        self.importer = None
+        self.pipe_to_hud = None
+        self.messages = Queue.Queue()   # text for the gui, None once the worker has stopped
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self, importer, interval, dirs, pipe_to_hud):
+        """Start importing the dirs, [(path, (site, type))], with importer"""
+        self.importer = importer
+        self.pipe_to_hud = pipe_to_hud
+        self.stopping.clear()
+        self.thread = threading.Thread(target = self.run, args = (interval, dirs), name = "AutoImport")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Ask the worker to stop once the current import is done. It then grabs the
+           summaries and puts None on messages"""
+        self.stopping.set()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def addText(self, text):
+        self.messages.put(text)
+
+    def progressNotify(self):
+        pass    # the gui doesn't wait on the import, nothing to do
+
+    def run(self, interval, dirs):
+        try:
+            for (path, site) in dirs:
+                self.importer.addImportDirectory(path, monitor = True, site = site)
+                self.addText("\n * " + _("Add %s import directory %s") % (site[0], str(path)))
+            fd = self.importer.watcher.get_fd()
+            next_import = 0
+            while not self.stopping.is_set():
+                wait = min(POLL_INTERVAL, next_import - time())
+                if wait <= 0:
+                    next_import = time() + interval
+                elif fd is None:
+                    self.stopping.wait(wait)
+                    continue
+                elif not select.select([fd], [], [], wait)[0]:
+                    continue
+                # the interval is up or a file was written to
+                try:
+                    self.importer.autoSummaryGrab()
+                    self.importer.runUpdated()
+                    self.addText(".")
+                except:
+                    # carry on with the next tick, a moment later should the error repeat at once
+                    log.error(_("Auto Import failed: %s") % traceback.format_exc())
+                    self.addText("\n" + _("*** Auto Import Error:") + " " + traceback.format_exc())
+                    self.importer.database.rollback()
+                    self.stopping.wait(POLL_INTERVAL)
+            self.importer.autoSummaryGrab(True)
+        except:
+            log.error(_("Auto Import failed: %s") % traceback.format_exc())
+            self.addText("\n" + _("*** Auto Import Error:") + " " + traceback.format_exc())
+        finally:
+            self.messages.put(None)
+
 
 class GuiAutoImport:
     def __init__(self, settings, config, sql = None, parent = None, cli = False):
-        self.importtimer = 0
+        self.messagetimer = 0
         self.settings = settings
         self.config = config
         self.sql = sql
@@ -57,7 +136,8 @@ class GuiAutoImport:
         self.input_settings = {}
         self.pipe_to_hud = None
 
-        self.importer = Importer.Importer(self, self.settings, self.config, self.sql)
+        self.worker = ImportWorker()
+        self.importer = Importer.Importer(self.worker, self.settings, self.config, self.sql)
         self.importer.setCallHud(True)
         self.importer.setQuiet(False)
         self.importer.setHandCount(0)
@@ -118,7 +198,6 @@ class GuiAutoImport:
         lbl1 = gtk.Label()
         hbox.pack_start(lbl1, expand=True, fill=False)
 
-        self.doAutoImportBool = False
         self.startButton = gtk.ToggleButton(_("Start _Auto Import"))
         self.startButton.connect("clicked", self.startClicked, "start clicked")
         hbox.pack_start(self.startButton, expand=False, fill=False)
@@ -180,18 +259,37 @@ class GuiAutoImport:
         dia_chooser.destroy()
     #end def GuiAutoImport.browseClicked
 
-    def do_import(self):
-        """Callback for timer to do an import iteration."""
-        if self.doAutoImportBool:
-            self.importer.autoSummaryGrab()
-            self.startButton.set_label(_(u'_Auto Import Running'))
-            self.importer.runUpdated()
-            self.addText(".")
-            #sys.stdout.write(".")
-            #sys.stdout.flush()
-            gobject.timeout_add(1000, self.reset_startbutton)
+    def show_messages(self):
+        """Callback for timer to show what the import worker did, until it stopped."""
+        try:
+            while True:
+                text = self.worker.messages.get(False)
+                if text is None:
+                    self.worker_stopped()
+                    return False
+                if text == ".":
+                    self.startButton.set_label(_(u'_Auto Import Running'))
+                    gobject.timeout_add(1000, self.reset_startbutton)
+                self.addText(text)
+        except Queue.Empty:
             return True
-        return False
+
+    def worker_stopped(self):
+        """The import worker has finished, tidy up after it."""
+        self.messagetimer = 0
+        self.settings['global_lock'].release()
+        self.addText("\n" + _("Stopping Auto Import.") + _("Global lock released."))
+        if self.pipe_to_hud is not None:
+            if self.pipe_to_hud.poll() is not None:
+                self.addText("\n * " + _("Stop Auto Import") + ": " + _("HUD already terminated."))
+            else:
+                self.pipe_to_hud.terminate()
+                #print >>self.pipe_to_hud.stdin, "\n"
+                # self.pipe_to_hud.communicate('\n') # waits for process to terminate
+        self.pipe_to_hud = None
+        self.intervalEntry.set_sensitive(True)
+        self.startButton.set_sensitive(True)
+        self.startButton.set_label(_(u'Start _Auto Import'))
 
     def reset_startbutton(self):
         if self.pipe_to_hud is not None:
@@ -241,6 +339,8 @@ class GuiAutoImport:
         # to watch.
         
         if data == "autostart" or (widget == self.startButton and self.startButton.get_active()):
+            if self.worker.is_running():
+                return      # still stopping
             self.startButton.set_active(True)
             # - Does the lock acquisition need to be more sophisticated for multiple dirs?
             # (see comment above about what to do if pipe already open)
@@ -248,7 +348,6 @@ class GuiAutoImport:
             # kind of exception - is this possible?
             if self.settings['global_lock'].acquire(wait=False, source="AutoImport"):   # returns false immediately if lock not acquired
                 self.addText("\n" + _("Global lock taken ... Auto Import Started.")+"\n")
-                self.doAutoImportBool = True
                 self.startButton.set_label(_(u'Stop _Auto Import'))
                 self.intervalEntry.set_sensitive(False)
                 while gtk.events_pending(): # change the label NOW don't wait for the pipe to open
@@ -285,33 +384,24 @@ class GuiAutoImport:
                             self.pipe_to_hud = subprocess.Popen(command, bufsize=bs, stdin=subprocess.PIPE, universal_newlines=True)
                     except:
                         self.addText("\n" + _("*** GuiAutoImport Error opening pipe:") + " " + traceback.format_exc() )
-                    else:
-                        for (site,type) in self.input_settings:
-                            self.importer.addImportDirectory(self.input_settings[(site,type)][0], monitor = True, site=(site,type))
-                            self.addText("\n * " + _("Add %s import directory %s") % (site, str(self.input_settings[(site,type)][0])))
-                            self.do_import()
-                    interval = int(self.intervalEntry.get_text())
-                    if self.importtimer != 0:
-                        gobject.source_remove(self.importtimer)
-                    self.importtimer = gobject.timeout_add(interval * 1000, self.do_import)
+                if self.pipe_to_hud is None:
+                    self.startButton.set_active(False)
+                    self.worker_stopped()
+                    return
+                dirs = [(self.input_settings[(site,type)][0], (site,type)) for (site,type) in self.input_settings]
+                interval = int(self.intervalEntry.get_text())
+                self.worker.start(self.importer, interval, dirs, self.pipe_to_hud)
+                self.messagetimer = gobject.timeout_add(200, self.show_messages)
 
             else:
                 self.addText("\n" + _("Auto Import aborted.") + _("Global lock not available."))
         else: # toggled off
-            self.doAutoImportBool = False # do_import will return this and stop the gobject callback timer
-            self.importer.autoSummaryGrab(True)
-            gobject.source_remove(self.importtimer)
-            self.settings['global_lock'].release()
-            self.addText("\n" + _("Stopping Auto Import.") + _("Global lock released."))
-            if self.pipe_to_hud.poll() is not None:
-                self.addText("\n * " + _("Stop Auto Import") + ": " + _("HUD already terminated."))
-            else:
-                self.pipe_to_hud.terminate()
-                #print >>self.pipe_to_hud.stdin, "\n"
-                # self.pipe_to_hud.communicate('\n') # waits for process to terminate
-            self.pipe_to_hud = None
-            self.intervalEntry.set_sensitive(True)
-            self.startButton.set_label(_(u'Start _Auto Import'))
+            if self.worker.is_running():
+                # the worker grabs the summaries once the current import is done, then
+                # show_messages calls worker_stopped to release the lock and stop the HUD
+                self.worker.stop()
+                self.startButton.set_sensitive(False)
+                self.startButton.set_label(_(u'Stopping _Auto Import'))
 
     #end def GuiAutoImport.startClicked
 
@@ -408,6 +498,7 @@ if __name__== "__main__":
     settings['cl_options'] = string.join(sys.argv[1:])
 
     if(options.gui == True):
+        gobject.threads_init()  # the import runs in a thread of its own
         i = GuiAutoImport(settings, config, None, None)
         main_window = gtk.Window()
         main_window.connect('destroy', destroy)
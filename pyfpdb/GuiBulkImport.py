@@ -98,6 +98,7 @@ class GuiBulkImport():
                     % (stored, dups, partial, errs, ttime, (stored+0.0) / ttime)
                 print completionMessage
                 log.info(completionMessage)
+                log.info(self.importer.profile.report())
 
                 self.importer.clearFileList()
                 
@@ -202,6 +203,17 @@ def main(argv=None):
 
     #Do something useful
     importer = Importer.Importer(False,settings, config, None)
+    hands = None
+    if options.handIds:
+        hands = tuple([int(id) for id in options.handIds.split(':')])
+    if options.fromArchive:
+        count = importer.runArchiveImport(hands = hands)
+        print(_('Stored again from the archive: %d hands') % count)
+        return
+    if options.fromRawHands:
+        count = importer.runRawImport(hands = hands)
+        print(_('Parsed again from RawHands: %d hands') % count)
+        return
     importer.addBulkImportImportFileOrDir(os.path.expanduser(options.filename))
     importer.setCallHud(False)
     if options.archive:
@@ -213,6 +225,9 @@ def main(argv=None):
     importer.clearFileList()
     print(_('Bulk import done: Stored: %d, Duplicates: %d, Partial: %d, Errors: %d, Time: %s seconds, Stored/second: %.0f')\
                      % (stored, dups, partial, errs, ttime, (stored+0.0) / ttime))
+    print importer.profile.report()
+    if options.profile:
+        importer.profile.writeJSON(os.path.expanduser(options.profile))
 
 
 if __name__ == '__main__':
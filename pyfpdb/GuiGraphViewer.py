@@ -27,6 +27,7 @@ from time import time
 import Database
 import Filters
 import Charset
+import ReportCache
 
 try:
     calluse = not 'matplotlib' in sys.modules
@@ -37,7 +38,7 @@ try:
     from matplotlib.backends.backend_gtk import FigureCanvasGTK as FigureCanvas
     from matplotlib.backends.backend_gtkagg import NavigationToolbar2GTKAgg as NavigationToolbar
     from matplotlib.font_manager import FontProperties
-    from numpy import cumsum
+    import GraphData
 except ImportError, inst:
     print _("""Failed to load libs for graphing, graphing will not function. Please install numpy and matplotlib if you want to use graphs.""")
     print _("""This is of no consequence for other parts of the program, e.g. import and HUD are NOT affected by this problem.""")
@@ -53,7 +54,7 @@ class GuiGraphViewer:
         self.debug = debug
         self.parent = parent
         #print "start of GraphViewer constructor"
-        self.db = Database.Database(self.conf, sql=self.sql)
+        self.db = Database.checkout(self.conf, sql=self.sql)
 
 
         filters_display = { "Heroes"    : True,
@@ -180,7 +181,7 @@ class GuiGraphViewer:
         # SET LABEL FOR X AXIS
         self.ax.set_ylabel(graphops['dspin'])
         self.ax.grid(color='g', linestyle=':', linewidth=0.2)
-        if green == None or green == []:
+        if green is None:
             self.ax.set_title(_("No Data for Player(s) Found"))
             green = ([    0.,     0.,     0.,     0.,   500.,  1000.,   900.,   800.,
                         700.,   600.,   500.,   400.,   300.,   200.,   100.,     0.,
@@ -213,14 +214,15 @@ class GuiGraphViewer:
         else:
             self.ax.set_title((_("Profit graph for ring games")+names))
 
-            #Draw plot
+            #Draw plot, at most a couple of points per pixel
+            width = int(self.fig.get_figwidth() * self.fig.dpi)
             if graphops['showdown'] == 'ON':
-                self.ax.plot(blue, color='blue', label=_('Showdown') + ' (%s): %.2f' %(graphops['dspin'], blue[-1]))
+                self.ax.plot(*GraphData.downsample(blue, width), color='blue', label=_('Showdown') + ' (%s): %.2f' %(graphops['dspin'], blue[-1]))
             if graphops['nonshowdown'] == 'ON':
-                self.ax.plot(red, color='red', label=_('Non-showdown') + ' (%s): %.2f' %(graphops['dspin'], red[-1]))
+                self.ax.plot(*GraphData.downsample(red, width), color='red', label=_('Non-showdown') + ' (%s): %.2f' %(graphops['dspin'], red[-1]))
             if graphops['ev'] == 'ON':
-                self.ax.plot(orange, color='orange', label=_('All-in EV') + ' (%s): %.2f' %(graphops['dspin'], orange[-1]))
-            self.ax.plot(green, color='green', label=_('Hands') + ': %d\n' % len(green) + _('Profit') + ': (%s): %.2f' % (graphops['dspin'], green[-1]))
+                self.ax.plot(*GraphData.downsample(orange, width), color='orange', label=_('All-in EV') + ' (%s): %.2f' %(graphops['dspin'], orange[-1]))
+            self.ax.plot(*GraphData.downsample(green, width), color='green', label=_('Hands') + ': %d\n' % len(green) + _('Profit') + ': (%s): %.2f' % (graphops['dspin'], green[-1]))
 
             # order legend, greenline on top
             handles, labels = self.ax.get_legend_handles_labels()
@@ -301,23 +303,18 @@ class GuiGraphViewer:
 
         #print "DEBUG: sql query:"
         #print tmp
-        self.db.cursor.execute(tmp)
-        #returns (HandId,Winnings,Costs,Profit)
-        winnings = self.db.cursor.fetchall()
+        def fetch():
+            self.db.cursor.execute(tmp)
+            #returns (HandId,Profit,SawShowdown,AllInEV)
+            return GraphData.fetchArray(self.db.cursor, [1, 2, 3])
+        winnings = ReportCache.forConfig(self.conf).cached(self.db, 'ringProfit', tmp, fetch)
         self.db.rollback()
 
         if len(winnings) == 0:
-            return (None, None, None)
-
-        green = map(lambda x:float(x[1]), winnings)
-        blue  = map(lambda x: float(x[1]) if x[2] == True  else 0.0, winnings)
-        red   = map(lambda x: float(x[1]) if x[2] == False else 0.0, winnings)
-        orange = map(lambda x:float(x[3]), winnings)
-        greenline = cumsum(green)
-        blueline  = cumsum(blue)
-        redline   = cumsum(red)
-        orangeline = cumsum(orange)
-        return (greenline/100, blueline/100, redline/100,orangeline/100)
+            return (None, None, None, None)
+
+        lines = GraphData.ringProfitLines(winnings[:, 0], winnings[:, 1], winnings[:, 2])
+        return tuple([line/100 for line in lines])
         #end of def getRingProfitGraph
 
     def exportGraph (self, widget, data):
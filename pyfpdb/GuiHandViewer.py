@@ -115,7 +115,7 @@ class GuiHandViewer:
         # to select() a Hand object from the database
         self.site="PokerStars"
 
-        self.db = Database.Database(self.config, sql=self.sql)
+        self.db = Database.checkout(self.config, sql=self.sql)
 
         
         filters_display = { "Heroes"    : True,
@@ -295,9 +295,11 @@ class GuiHandViewer:
             return int(pos)
     
     def reload_hands(self, handids):
-        self.hands = {}
-        for handid in handids:
-            self.hands[handid] = self.importhand(handid)
+        self.hands = Hand.hand_factory_many(handids, self.config, self.db)
+        heroes = self.filters.getHeroes()
+        for h in self.hands.itervalues():
+            # Set the hero for this hand using the filter for the sitename of this hand
+            h.hero = heroes[h.sitename]
         self.refreshHands()
     
     def copyHandToClipboard(self, view, event, hand):
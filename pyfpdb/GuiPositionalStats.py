@@ -27,6 +27,7 @@ from time import time, strftime
 import Database
 import Filters
 import Charset
+import ReportCache
 
 class GuiPositionalStats:
     def __init__(self, config, querylist, debug=True):
@@ -38,7 +39,7 @@ class GuiPositionalStats:
         self.SQLITE         = 4
         
         # create new db connection to avoid conflicts with other threads
-        self.db = Database.Database(self.conf, sql=self.sql)
+        self.db = Database.checkout(self.conf, sql=self.sql)
         self.cursor = self.db.cursor
 
         settings = {}
@@ -189,9 +190,8 @@ class GuiPositionalStats:
         tmp = self.sql.query['playerStatsByPosition']
         tmp = self.refineQuery(tmp, playerids, sitenos, limits, seats, dates)
         #print "DEBUG:\n%s" % tmp
-        self.cursor.execute(tmp)
-        result = self.cursor.fetchall()
-        colnames = [desc[0].lower() for desc in self.cursor.description]
+        colnames, result = ReportCache.forConfig(self.conf).query(self.db, self.cursor, tmp)
+        colnames = [name.lower() for name in colnames]
 
         liststore = gtk.ListStore(*([str] * len(colnames)))
         view = gtk.TreeView(model=liststore)
@@ -289,10 +289,9 @@ class GuiPositionalStats:
         tmp = self.sql.query['playerStats']
         tmp = self.refineQuery(tmp, playerids, sitenos, limits, seats, dates)
         #print "DEBUG:\n%s" % tmp
-        self.cursor.execute(tmp)
-        result = self.cursor.fetchall()
+        colnames, result = ReportCache.forConfig(self.conf).query(self.db, self.cursor, tmp)
         rows = len(result)
-        colnames = [desc[0].lower() for desc in self.cursor.description]
+        colnames = [name.lower() for name in colnames]
 
         # blank row between main stats and totals:
         col = 0
@@ -56,7 +56,7 @@ class GuiReplayer:
         self.main_window = mainwin
         self.sql = querylist
 
-        self.db = Database.Database(self.conf, sql=self.sql)
+        self.db = Database.checkout(self.conf, sql=self.sql)
         self.states = [] # List with all table states.
 
         self.window = gtk.Window()
@@ -30,6 +30,7 @@ import Card
 import Database
 import Filters
 import Charset
+import ReportCache
 
 from TreeViewTooltips import TreeViewTooltips
 
@@ -112,7 +113,7 @@ class GuiRingPlayerStats:
         self.SQLITE         = 4
 
         # create new db connection to avoid conflicts with other threads
-        self.db = Database.Database(self.conf, sql=self.sql)
+        self.db = Database.checkout(self.conf, sql=self.sql)
         self.cursor = self.db.cursor
 
         settings = {}
@@ -430,9 +431,8 @@ class GuiRingPlayerStats:
         tmp = self.sql.query[query]
         tmp = self.refineQuery(tmp, flags, playerids, sitenos, limits, type, seats, groups, dates, games, currencies)
         #print "DEBUG: query: %s" % tmp
-        self.cursor.execute(tmp)
-        result = self.cursor.fetchall()
-        colnames = [desc[0].lower() for desc in self.cursor.description]
+        colnames, result = ReportCache.forConfig(self.conf).query(self.db, self.cursor, tmp)
+        colnames = [name.lower() for name in colnames]
 
         # pre-fetch some constant values:
         colshow = colshowsumm
@@ -35,7 +35,7 @@ try:
     from matplotlib.backends.backend_gtkagg import NavigationToolbar2GTKAgg as NavigationToolbar
     from matplotlib.finance import candlestick
 
-    from numpy import diff, nonzero, sum, cumsum, max, min, append
+    import SessionData
 
 except ImportError, inst:
     print _("""Failed to load numpy and/or matplotlib in Session Viewer""")
@@ -70,7 +70,7 @@ class GuiSessionViewer:
         self.graphBox = None
         
         # create new db connection to avoid conflicts with other threads
-        self.db = Database.Database(self.conf, sql=self.sql)
+        self.db = Database.checkout(self.conf, sql=self.sql)
         self.cursor = self.db.cursor
 
         settings = {}
@@ -102,6 +102,17 @@ class GuiSessionViewer:
         self.filters.registerButton1Name("_Refresh")
         self.filters.registerButton1Callback(self.refreshStats)
 
+        # minutes between two hands that start a new session. The sessions of the
+        # SessionsCache are read as they are, another value splits the hands again
+        self.sessionTimeout = float(self.conf.get_import_parameters()['sessionTimeout'])
+        hbox = gtk.HBox(False, 0)
+        hbox.pack_start(gtk.Label(_("Session break (minutes)")), expand=False, padding=3)
+        adj = gtk.Adjustment(value=self.sessionTimeout, lower=1, upper=1440, step_incr=5, page_incr=30, page_size=0)
+        self.sbSessionBreak = gtk.SpinButton(adjustment=adj, climb_rate=0.0, digits=0)
+        hbox.pack_start(self.sbSessionBreak, False, False, 0)
+        hbox.show_all()
+        self.filters.mainVBox.pack_start(hbox, expand=False)
+
         # ToDo: store in config
         # ToDo: create popup to adjust column config
         # columns to display, keys match column name returned by sql, values in tuple are:
@@ -251,12 +262,53 @@ class GuiSessionViewer:
 
     def generateDatasets(self, playerids, sitenos, games, currencies, limits, seats):
         if (DEBUG): print "DEBUG: Starting generateDatasets"
-        THRESHOLD = 1800     # Min # of secs between consecutive hands before being considered a new session
-        PADDING   = 5        # Additional time in minutes to add to a session, session startup, shutdown etc
+        threshold = self.sbSessionBreak.get_value_as_int() * 60  # Min # of secs between consecutive hands before being considered a new session
+
+        sessions = None
+        allseats = not seats or (seats['from'] <= 2 and seats['to'] >= 10)
+        if (not DEBUG and self.db.cacheSessions and allseats
+            and threshold == int(self.sessionTimeout * 60)):
+            # the import has kept these sessions in SessionsCache and CashCache
+            q = self.filterQuery('sessionStatsCached', playerids, games, currencies, limits, seats)
+            self.db.cursor.execute(q)
+            sessions = SessionData.fetchSessions(self.db.cursor)
+            if not len(sessions[0]):
+                sessions = None     # not cached, e.g. imported with cacheSessions off
+
+        if sessions is None:
+            # Get a list of timestamps and profits
+            q = self.filterQuery('sessionStats', playerids, games, currencies, limits, seats)
+            if DEBUG:
+                hands = [ 
+                    ( u'10000',  10), ( u'10000',  20), ( u'10000',  30),
+                    ( u'20000', -10), ( u'20000', -20), ( u'20000', -30),
+                    ( u'30000',  40),
+                    ( u'40000',   0),
+                    ( u'50000', -40),
+                    ( u'60000',  10), ( u'60000',  30), ( u'60000', -20),
+                    ( u'70000', -20), ( u'70000',  10), ( u'70000',  30),
+                    ( u'80000', -10), ( u'80000', -30), ( u'80000',  20),
+                    ( u'90000',  20), ( u'90000', -10), ( u'90000', -30),
+                    (u'100000',  30), (u'100000', -50), (u'100000',  30),
+                    (u'110000', -20), (u'110000',  50), (u'110000', -20),
+                    (u'120000', -30), (u'120000',  50), (u'120000', -30),
+                    (u'130000',  20), (u'130000', -50), (u'130000',  20),
+                    (u'140000',  40), (u'140000', -40),
+                    (u'150000', -40), (u'150000',  40),
+                    (u'160000', -40), (u'160000',  80), (u'160000', -40),
+                    ]
+            else:
+                self.db.cursor.execute(q)
+                hands = self.db.cursor.fetchall()
 
-        # Get a list of timestamps and profits
+            sessions = SessionData.handSessions([long(x[0]) for x in hands], [float(x[1]) for x in hands], threshold)
 
-        q = self.sql.query['sessionStats']
+        (results, quotes, self.times) = SessionData.sessionTable(*sessions)
+        return (results, quotes)
+
+    def filterQuery(self, name, playerids, games, currencies, limits, seats):
+        """The query name with the tests of the filters substituted"""
+        q = self.sql.query[name]
         start_date, end_date = self.filters.getDates()
         q = q.replace("<datestest>", " BETWEEN '" + start_date + "' AND '" + end_date + "'")
 
@@ -302,134 +354,7 @@ class GuiSessionViewer:
         nametest = nametest.replace(",)",")")
         q = q.replace("<player_test>", nametest)
         q = q.replace("<ampersand_s>", "%s")
-
-        if DEBUG:
-            hands = [ 
-                ( u'10000',  10), ( u'10000',  20), ( u'10000',  30),
-                ( u'20000', -10), ( u'20000', -20), ( u'20000', -30),
-                ( u'30000',  40),
-                ( u'40000',   0),
-                ( u'50000', -40),
-                ( u'60000',  10), ( u'60000',  30), ( u'60000', -20),
-                ( u'70000', -20), ( u'70000',  10), ( u'70000',  30),
-                ( u'80000', -10), ( u'80000', -30), ( u'80000',  20),
-                ( u'90000',  20), ( u'90000', -10), ( u'90000', -30),
-                (u'100000',  30), (u'100000', -50), (u'100000',  30),
-                (u'110000', -20), (u'110000',  50), (u'110000', -20),
-                (u'120000', -30), (u'120000',  50), (u'120000', -30),
-                (u'130000',  20), (u'130000', -50), (u'130000',  20),
-                (u'140000',  40), (u'140000', -40),
-                (u'150000', -40), (u'150000',  40),
-                (u'160000', -40), (u'160000',  80), (u'160000', -40),
-                ]
-        else:
-            self.db.cursor.execute(q)
-            hands = self.db.cursor.fetchall()
-
-        #fixme - nasty hack to ensure that the hands.insert() works 
-        # for mysql data.  mysql returns tuples which can't be inserted
-        # into so convert explicity to list.
-        hands = list(hands)
-
-        if (not hands):
-            return ([], [])
-
-        hands.insert(0, (hands[0][0], 0))
-
-        # Take that list and create an array of the time between hands
-        times = map(lambda x:long(x[0]), hands)
-        profits = map(lambda x:float(x[1]), hands)
-        #print "DEBUG: times   : %s" % times
-        #print "DEBUG: profits: %s" % profits
-        #print "DEBUG: len(times) %s" %(len(times))
-        diffs = diff(times)                      # This array is the difference in starttime between consecutive hands
-        diffs2 = append(diffs,THRESHOLD + 1)     # Append an additional session to the end of the diffs, so the next line
-                                                 # includes an index into the last 'session'
-        index = nonzero(diffs2 > THRESHOLD)      # This array represents the indexes into 'times' for start/end times of sessions
-                                                 # times[index[0][0]] is the end of the first session,
-        #print "DEBUG: len(index[0]) %s" %(len(index[0]))
-        if len(index[0]) > 0:
-            #print "DEBUG: index[0][0] %s" %(index[0][0])
-            #print "DEBUG: index %s" %(index)
-            pass
-        else:
-            index = [[0]]
-            #print "DEBUG: index %s" %(index)
-            #print "DEBUG: index[0][0] %s" %(index[0][0])
-            pass
-
-        first_idx = 1
-        quotes = []
-        results = []
-        cum_sum = cumsum(profits) / 100
-        sid = 1
-
-        total_hands = 0
-        total_time = 0
-        global_open = None
-        global_lwm = None
-        global_hwm = None
-
-        self.times = []
-        # Take all results and format them into a list for feeding into gui model.
-        #print "DEBUG: range(len(index[0]): %s" % range(len(index[0]))
-        for i in range(len(index[0])):
-            last_idx = index[0][i]
-            hds = last_idx - first_idx + 1                                           # Number of hands in session
-            if hds > 0:
-                stime = strftime("%d/%m/%Y %H:%M", localtime(times[first_idx]))      # Formatted start time
-                etime = strftime("%d/%m/%Y %H:%M", localtime(times[last_idx]))       # Formatted end time
-                self.times.append((times[first_idx], times[last_idx]))
-                minutesplayed = (times[last_idx] - times[first_idx])/60
-                minutesplayed = minutesplayed + PADDING
-                if minutesplayed == 0:
-                    minutesplayed = 1
-                hph = hds*60/minutesplayed # Hands per hour
-                end_idx = last_idx+1
-                won = sum(profits[first_idx:end_idx])/100.0
-                #print "DEBUG: profits[%s:%s]: %s" % (first_idx, end_idx, profits[first_idx:end_idx])
-                hwm = max(cum_sum[first_idx-1:end_idx]) # include the opening balance,
-                lwm = min(cum_sum[first_idx-1:end_idx]) # before we win/lose first hand
-                open = (sum(profits[:first_idx]))/100
-                close = (sum(profits[:end_idx]))/100
-                #print "DEBUG: range: (%s, %s) - (min, max): (%s, %s) - (open,close): (%s, %s)" %(first_idx, end_idx, lwm, hwm, open, close)
-            
-                total_hands = total_hands + hds
-                total_time = total_time + minutesplayed
-                if (global_lwm == None or global_lwm > lwm):
-                    global_lwm = lwm
-                if (global_hwm == None or global_hwm < hwm):
-                    global_hwm = hwm
-                if (global_open == None):
-                    global_open = open
-                    global_stime = stime
-
-                results.append([sid, hds, stime, etime, hph,
-                                "%.2f" % open,
-                                "%.2f" % close,
-                                "%.2f" % lwm,
-                                "%.2f" % hwm,
-                                "%.2f" % (hwm - lwm),
-                                "%.2f" % won])
-                quotes.append((sid, open, close, hwm, lwm))
-                #print "DEBUG: Hands in session %4s: %4s  Start: %s End: %s HPH: %s Profit: %s" %(sid, hds, stime, etime, hph, won)
-                first_idx = end_idx
-                sid = sid+1
-            else:
-                print "hds <= 0"
-        global_close = close
-        global_etime = etime
-        results.append([''] * 11)
-        results.append([_("all"), total_hands, global_stime, global_etime,
-                        total_hands * 60 / total_time,
-                        "%.2f" % global_open,
-                        "%.2f" % global_close,
-                        "%.2f" % global_lwm,
-                        "%.2f" % global_hwm,
-                        "%.2f" % (global_hwm - global_lwm),
-                        "%.2f" % (global_close - global_open)])
-
-        return (results, quotes)
+        return q
 
     def clearGraphData(self):
 
@@ -42,6 +42,7 @@ try:
     from matplotlib.backends.backend_gtkagg import NavigationToolbar2GTKAgg as NavigationToolbar
     from matplotlib.font_manager import FontProperties
     from numpy import arange, cumsum
+    import GraphData
     from pylab import *
 except ImportError, inst:
     print _("""Failed to load libs for graphing, graphing will not function. Please install numpy and matplotlib if you want to use graphs.""")
@@ -57,7 +58,7 @@ class GuiTourneyGraphViewer:
         self.debug = debug
         self.parent = parent
         #print "start of GraphViewer constructor"
-        self.db = Database.Database(self.conf, sql=self.sql)
+        self.db = Database.checkout(self.conf, sql=self.sql)
 
 
         filters_display = {
@@ -172,7 +173,7 @@ class GuiTourneyGraphViewer:
         self.ax.set_xlabel(_("Tournaments"), fontsize = 12)
         self.ax.set_ylabel("$", fontsize = 12)
         self.ax.grid(color='g', linestyle=':', linewidth=0.2)
-        if green == None or green == []:
+        if green is None:
             self.ax.set_title(_("No Data for Player(s) Found"))
             green = ([    0.,     0.,     0.,     0.,   500.,  1000.,   900.,   800.,
                         700.,   600.,   500.,   400.,   300.,   200.,   100.,     0.,
@@ -205,21 +206,22 @@ class GuiTourneyGraphViewer:
         else:
             self.ax.set_title(_("Tournament Results")+" (USD)")
 
-            #Draw plot
+            #Draw plot, at most a couple of points per pixel
+            width = int(self.fig.get_figwidth() * self.fig.dpi)
             self.ax.plot(
-                green,
+                *GraphData.downsample(green, width),
                 color='green',
                 label=_('Tournaments') + ': %d\n' % len(green) + _('Profit') + ': $%.2f' % green[-1])
             self.ax.plot(
-                blue,
+                *GraphData.downsample(blue, width),
                 color='blue',
                 label="Vincite" + ': $%.2f' % (10*blue[-1]))
             self.ax.plot(
-                red,
+                *GraphData.downsample(red, width),
                 color='red',
                 label="BuyIn" + ': $%.2f' % (10*red[-1]))
             self.ax.plot(
-                orange,
+                *GraphData.downsample(orange, width),
                 color='orange',
                 label="Rake" + ': $%.2f' % (10*orange[-1]))
 
@@ -244,22 +246,15 @@ class GuiTourneyGraphViewer:
             'games': games
         }
         self.db.cursor.execute(self.sql.query['tourneyGraph'], namedSqlParameters)
-        #returns (HandId,Winnings,Costs,Profit)
-        winnings = self.db.cursor.fetchall()
+        #returns (TourneyId,Profit,Winnings,BuyIn,Rake)
+        winnings = GraphData.fetchArray(self.db.cursor, [1, 2, 3, 4])
         self.db.rollback()
 
         if len(winnings) == 0:
-            return None
-
-        green = map(lambda x: float(x[1]), winnings)
-        blue = map(lambda x: float(x[2]), winnings)
-        red = map(lambda x: float(x[3]), winnings)
-        orange = map(lambda x: float(x[4]), winnings)
-        greenline = cumsum(green)
-        blueline = cumsum(blue)
-        redline = cumsum(red)
-        orangeline = cumsum(orange)
-        return (greenline/100, blueline/1000, redline/1000, orangeline/1000)
+            return (None, None, None, None)
+
+        lines = cumsum(winnings, axis=0)
+        return (lines[:, 0]/100, lines[:, 1]/1000, lines[:, 2]/1000, lines[:, 3]/1000)
 
     def exportGraph (self, widget, data):
         if self.fig is None:
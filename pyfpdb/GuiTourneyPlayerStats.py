@@ -25,6 +25,7 @@ from time import time, strftime
 
 import Charset
 import TourneyFilters
+import ReportCache
 
 colalias,colshow,colheading,coltooltip,colxalign,colformat,coltype = 0,1,2,3,4,5,6
 
@@ -129,10 +130,8 @@ class GuiTourneyPlayerStats:
             'startdate': start_date, 
             'enddate': end_date }
 
-        self.cursor.execute(query, namedSqlParameters)
-        result = self.cursor.fetchall()
+        colnames, result = ReportCache.forConfig(self.conf).query(self.db, self.cursor, query, namedSqlParameters)
         #print "result of the big query in addGrid:",result
-        colnames = [desc[0] for desc in self.cursor.description]
 
         # pre-fetch some constant values:
         #self.cols_to_show = [x for x in self.columns if x[colshow]]
@@ -33,6 +33,8 @@ _ = L10n.init_translation()
 import sys
 import os
 import thread
+import threading
+import Queue
 import time
 import string
 import logging
@@ -46,6 +48,7 @@ import gobject
 #    FreePokerTools modules
 import Configuration
 import Database
+import HudStatCache
 import Hud
 import Options
 import Deck
@@ -67,7 +70,7 @@ elif c.os_family in ('XP', 'Win7'):
 
 
 class HUD_main(object):
-    """A main() object to own both the read_stdin thread and the gui."""
+    """A main() object to own the read_stdin and process_hands threads and the gui."""
 #    This class mainly provides state for controlling the multiple HUDs.
 
     def __init__(self, db_name='fpdb'):
@@ -90,9 +93,14 @@ class HUD_main(object):
             deck_type=self.hud_params["deck_type"], card_back=self.hud_params["card_back"],
             width=self.hud_params['card_wd'], height=self.hud_params['card_ht'])
 
-        # a thread to read stdin
+        self.hand_queue = Queue.Queue()     # hand ids from read_stdin, None means quit
+        self.gui_pending = set()            # temp_keys with an idle_create/idle_update not run yet
+        self.gui_cond = threading.Condition()
+
+        # a thread to read stdin and one to process the hands it reads
         gobject.threads_init()                        # this is required
         thread.start_new_thread(self.read_stdin, ())  # starts the thread
+        thread.start_new_thread(self.process_hands, ())
 
         # a main window
         self.main_window = gtk.Window()
@@ -182,20 +190,60 @@ class HUD_main(object):
         #fixme - passing self.db_connection into another thread
         # is probably pointless.
         [aw.update_data(new_hand_id, self.db_connection) for aw in self.hud_dict[temp_key].aux_windows]
+        self.gui_busy(temp_key)
         gobject.idle_add(idle_create, self, new_hand_id, table, temp_key, max, poker_game, type, stat_dict, cards)
 
     def update_HUD(self, new_hand_id, table_name, config):
-        """Update a HUD gui from inside the non-gui read_stdin thread."""
+        """Update a HUD gui from inside the non-gui process_hands thread."""
+        self.gui_busy(table_name)
         gobject.idle_add(idle_update, self, new_hand_id, table_name, config)
 
+    def gui_busy(self, temp_key):
+        """temp_key has an idle_update/idle_create queued, its stat_dict belongs to the gui until gui_done."""
+        self.gui_cond.acquire()
+        try:
+            self.gui_pending.add(temp_key)
+        finally:
+            self.gui_cond.release()
+
+    def gui_done(self, temp_key):
+        """Called from the idle functions when the gui has caught up with temp_key."""
+        self.gui_cond.acquire()
+        try:
+            self.gui_pending.discard(temp_key)
+            self.gui_cond.notify()
+        finally:
+            self.gui_cond.release()
+
+    def wait_for_gui(self, timeout):
+        """Block the non-gui thread until an idle function completes, or timeout seconds."""
+        self.gui_cond.acquire()
+        try:
+            self.gui_cond.wait(timeout)
+        finally:
+            self.gui_cond.release()
+
     def read_stdin(self):            # This is the thread function
+        """Queue the hand numbers arriving on stdin for process_hands."""
+        while 1:    # wait for a new hand number on stdin
+            new_hand_id = sys.stdin.readline()
+            new_hand_id = string.rstrip(new_hand_id)
+            log.debug(_("Received hand no %s") % new_hand_id)
+            if new_hand_id == "":           # blank line means quit
+                self.hand_queue.put(None)
+                break
+            self.hand_queue.put(new_hand_id)
+
+    def process_hands(self):         # This is the thread function
         """Do all the non-gui heavy lifting for the HUD program."""
 
-#    This db connection is for the read_stdin thread only. It should not
+#    This db connection is for the process_hands thread only. It should not
 #    be passed to HUDs for use in the gui thread. HUD objects should not
 #    need their own access to the database, but should open their own
 #    if it is required.
-        self.db_connection = Database.Database(self.config)
+        self.db_connection = Database.checkout(self.config)
+        # keep players' HudCache totals in memory instead of summing them for every hand
+        self.db_connection.hud_stat_cache = HudStatCache.HudStatCache(self.db_connection)
 
 #       get hero's screen names and player ids
         self.hero, self.hero_ids = {}, {}
@@ -214,24 +262,27 @@ class HUD_main(object):
                 log.info(_("Aux disabled for site %s") % i)
                 aux_disabled_sites.append(i)
 
-        while 1:    # wait for a new hand number on stdin
-            time.sleep(0.45) # pause an arbitrary amount of time
-                            # This throttles thru-put to about 2 or 3
-                            # hands per second.  Otherwise, the downstream
-                            # code can become flooded and errors start to
-                            # occur due to stat_dict being overwritten before
-                            # the previous hand completed processing.
-                            # Flooding normally occurs when the hud "fast forwards"
-                            # at tables where a bunch of hands have already been played
-                            # with the HUD switched off.
-            self.db_connection.connection.rollback() # release lock from previous iteration
-            new_hand_id = sys.stdin.readline()
-            new_hand_id = string.rstrip(new_hand_id)
-            log.debug(_("Received hand no %s") % new_hand_id)
-            if new_hand_id == "":           # blank line means quit
+#    Hands are taken off the queue in batches: everything that arrived since the last
+#    pass.  Only the latest hand of each table needs stats, so when the HUD "fast
+#    forwards" at tables where a bunch of hands have already been played with the HUD
+#    switched off, the older hands are dropped instead of being shown one by one.
+#    A table stays in pending while the gui still works on its previous update, that
+#    way stat_dict is never overwritten before the previous hand completed processing.
+        pending = {}    # temp_key -> (hand id, table info) of the latest hand for that table
+        while 1:
+            new_hand_ids = []
+            if not pending:
+                new_hand_ids.append(self.hand_queue.get())  # wait for a new hand number
+            while 1:
+                try:
+                    new_hand_ids.append(self.hand_queue.get_nowait())
+                except Queue.Empty:
+                    break
+            if None in new_hand_ids:        # stdin closed, quit
                 self.db_connection.connection.rollback()
                 self.destroy()
                 break # this thread is not always killed immediately with gtk.main_quit()
+            self.db_connection.connection.rollback() # release lock from previous iteration
 
 #    The following block cannot be hoisted outside the while loop, because it would
 #    cause a problem when auto importing into an empty db.
@@ -239,7 +290,7 @@ class HUD_main(object):
 #    if our hero plays at another site for the __first_time__ during that session,
 #     the hud won't display correctly, because the heroname isn't known yet.
 
-            if not found:
+            if not found and new_hand_ids:
                 for site in enabled_sites:
                     result = self.db_connection.get_site_id(site)
                     if result:
@@ -251,148 +302,163 @@ class HUD_main(object):
                         else:
                             self.hero_ids[site_id] = -1
 
-#        get basic info about the new hand from the db
+#        get basic info about the new hands from the db
 #        if there is a db error, complain, skip hand, and proceed
-            #log.info("HUD_main.read_stdin: " + _("Hand processing starting."))
-            try:
-                (table_name, max, poker_game, type, fast, site_id, site_name, num_seats, tour_number, tab_number) = \
-                                self.db_connection.get_table_info(new_hand_id)
-            except Exception:
-                log.error(_("database error: skipping %s") % new_hand_id)
-                continue
-                
-            if fast:
-                #we are rush/zoom
-                continue
-                
-            # Do nothing if this site is on the ignore list
-            if site_name in aux_disabled_sites:
-                continue
-            # Do nothing if this site is not enabled
-            if site_name not in enabled_sites:
-                continue
+            for new_hand_id in new_hand_ids:
+                try:
+                    table_info = self.db_connection.get_table_info(new_hand_id)
+                except Exception:
+                    log.error(_("database error: skipping %s") % new_hand_id)
+                    continue
+                (table_name, max, poker_game, type, fast, site_id, site_name, num_seats, tour_number, tab_number) = table_info
 
-            # regenerate temp_key for this hand- this is the tablename (+ tablenumber (if mtt))
-            if type == "tour":   # hand is from a tournament
-                temp_key = "%s Table %s" % (tour_number, tab_number)
-            else:
-                temp_key = table_name
-                                
-            if type == "tour":
-                #
-                # Has there been a table-change?  if yes, clean-up the current hud
-                # Two checks are needed,
-                #  if a hand is received for an existing table-number, but the table-title has changed,  kill the old hud
-                #  if a hand is received for a "new" table number, clean-up the old one and create a new hud
-                #
-                if temp_key in self.hud_dict:
-                    # check if our attached window's titlebar has changed, if it has
-                    # this method will emit a "table_changed" signal which will trigger
-                    # a kill
-                    if self.hud_dict[temp_key].table.has_table_title_changed(self.hud_dict[temp_key]):
-                        #table has been renamed; the idle_kill method will housekeep hud_dict
-                        # We will skip this hand, to give time for the idle function
-                        # to complete its' work.  Normal service will be resumed on the next hand
-                        continue # abort processing this hand
+                if fast:
+                    #we are rush/zoom
+                    continue
+
+                # Do nothing if this site is on the ignore list
+                if site_name in aux_disabled_sites:
+                    continue
+                # Do nothing if this site is not enabled
+                if site_name not in enabled_sites:
+                    continue
+
+                # regenerate temp_key for this hand- this is the tablename (+ tablenumber (if mtt))
+                if type == "tour":   # hand is from a tournament
+                    temp_key = "%s Table %s" % (tour_number, tab_number)
                 else:
-                    #check if the tournament number is in the hud_dict under a different table
-                    #if it is, trigger a hud_kill - we can safely drop through the rest of the code
-                    # because this is a brand-new hud being created
-                    for k in self.hud_dict:
-                        if k.startswith(tour_number):
-                            self.table_is_stale(self.hud_dict[k])
-                            continue # this cancels the "for k in...." loop, NOT the outer while: loop
+                    temp_key = table_name
+                if temp_key in pending:
+                    log.debug(_("Skipping hand %s, superseded by hand %s") % (pending[temp_key][0], new_hand_id))
+                pending[temp_key] = (new_hand_id, table_info)
+
+            ready = [temp_key for temp_key in pending if temp_key not in self.gui_pending]
+            if not ready:
+                self.wait_for_gui(0.5)
+                continue
+            for temp_key in ready:
+                (new_hand_id, table_info) = pending.pop(temp_key)
+                self.process_hand(new_hand_id, temp_key, table_info)
+
+    def process_hand(self, new_hand_id, temp_key, table_info):
+        """Create or update the HUD of one table with the stats for new_hand_id."""
+        (table_name, max, poker_game, type, fast, site_id, site_name, num_seats, tour_number, tab_number) = table_info
+
+        if type == "tour":
+            #
+            # Has there been a table-change?  if yes, clean-up the current hud
+            # Two checks are needed,
+            #  if a hand is received for an existing table-number, but the table-title has changed,  kill the old hud
+            #  if a hand is received for a "new" table number, clean-up the old one and create a new hud
+            #
+            if temp_key in self.hud_dict:
+                # check if our attached window's titlebar has changed, if it has
+                # this method will emit a "table_changed" signal which will trigger
+                # a kill
+                if self.hud_dict[temp_key].table.has_table_title_changed(self.hud_dict[temp_key]):
+                    #table has been renamed; the idle_kill method will housekeep hud_dict
+                    # We will skip this hand, to give time for the idle function
+                    # to complete its' work.  Normal service will be resumed on the next hand
+                    return # abort processing this hand
+            else:
+                #check if the tournament number is in the hud_dict under a different table
+                #if it is, trigger a hud_kill - we can safely drop through the rest of the code
+                # because this is a brand-new hud being created
+                for k in self.hud_dict:
+                    if k.startswith(tour_number):
+                        self.table_is_stale(self.hud_dict[k])
+                        continue # this cancels the "for k in...." loop, NOT the outer while: loop
 
 
 #       detect maxseats changed in hud
 #       if so, kill and create new hud with specified "max"
-            if temp_key in self.hud_dict:
-                try:
-                    newmax = self.hud_dict[temp_key].hud_params['new_max_seats']  # trigger
-                    if newmax and self.hud_dict[temp_key].max != newmax:  # max has changed
-                        self.kill_hud("activate", temp_key)   # kill everything
-                        while temp_key in self.hud_dict: time.sleep(0.5)   # wait for idle_kill to complete
-                        max = newmax   # "max" localvar used in create_HUD call below
-                    self.hud_dict[temp_key].hud_params['new_max_seats'] = None   # reset trigger
-                except:
-                    pass
-                    
+        if temp_key in self.hud_dict:
+            try:
+                newmax = self.hud_dict[temp_key].hud_params['new_max_seats']  # trigger
+                if newmax and self.hud_dict[temp_key].max != newmax:  # max has changed
+                    self.kill_hud("activate", temp_key)   # kill everything
+                    while temp_key in self.hud_dict: time.sleep(0.5)   # wait for idle_kill to complete
+                    max = newmax   # "max" localvar used in create_HUD call below
+                self.hud_dict[temp_key].hud_params['new_max_seats'] = None   # reset trigger
+            except:
+                pass
+                
 #       detect poker_game changed in latest hand (i.e. mixed game)
 #       if so, kill and create new hud with specified poker_game
 #       Note that this will reset the aggretation params for that table
-            if temp_key in self.hud_dict:
-                if self.hud_dict[temp_key].poker_game != poker_game:
-                    print "game changed!:", poker_game
-                    try:
-                        self.kill_hud("activate", temp_key)   # kill everything
-                        while temp_key in self.hud_dict: time.sleep(0.5)   # wait for idle_kill to complete
-                    except:
-                        pass
+        if temp_key in self.hud_dict:
+            if self.hud_dict[temp_key].poker_game != poker_game:
+                print "game changed!:", poker_game
+                try:
+                    self.kill_hud("activate", temp_key)   # kill everything
+                    while temp_key in self.hud_dict: time.sleep(0.5)   # wait for idle_kill to complete
+                except:
+                    pass
 
 #        Update an existing HUD
-            if temp_key in self.hud_dict:
-                # get stats using hud's specific params and get cards
-                self.db_connection.init_hud_stat_vars( self.hud_dict[temp_key].hud_params['hud_days']
-                                                     , self.hud_dict[temp_key].hud_params['h_hud_days'])
-                #print "update an existing hud ", temp_key, self.hud_dict[temp_key].hud_params
-                stat_dict = self.db_connection.get_stats_from_hand(new_hand_id, type, self.hud_dict[temp_key].hud_params,
-                                                                   self.hero_ids[site_id], num_seats)
+        if temp_key in self.hud_dict:
+            # get stats using hud's specific params and get cards
+            self.db_connection.init_hud_stat_vars( self.hud_dict[temp_key].hud_params['hud_days']
+                                                 , self.hud_dict[temp_key].hud_params['h_hud_days'])
+            #print "update an existing hud ", temp_key, self.hud_dict[temp_key].hud_params
+            stat_dict = self.db_connection.get_stats_from_hand(new_hand_id, type, self.hud_dict[temp_key].hud_params,
+                                                               self.hero_ids[site_id], num_seats)
 
-                try:
-                    self.hud_dict[temp_key].stat_dict = stat_dict
-                except KeyError:    # HUD instance has been killed off, key is stale
-                    log.error(_('%s was not found') % ("hud_dict[%s]" % temp_key))
-                    log.error(_('will not send hand'))
-                    continue
-                    
-                self.hud_dict[temp_key].cards = self.get_cards(new_hand_id, poker_game)
-                #fixme - passing self.db_connection into another thread
-                # is probably pointless
-                [aw.update_data(new_hand_id, self.db_connection) for aw in self.hud_dict[temp_key].aux_windows]
-                self.update_HUD(new_hand_id, temp_key, self.config)
+            try:
+                self.hud_dict[temp_key].stat_dict = stat_dict
+            except KeyError:    # HUD instance has been killed off, key is stale
+                log.error(_('%s was not found') % ("hud_dict[%s]" % temp_key))
+                log.error(_('will not send hand'))
+                return
+                
+            self.hud_dict[temp_key].cards = self.get_cards(new_hand_id, poker_game)
+            #fixme - passing self.db_connection into another thread
+            # is probably pointless
+            [aw.update_data(new_hand_id, self.db_connection) for aw in self.hud_dict[temp_key].aux_windows]
+            self.update_HUD(new_hand_id, temp_key, self.config)
 
 #        Or create a new HUD
-            else:
-                # get stats using default params--also get cards
+        else:
+            # get stats using default params--also get cards
 
-                self.db_connection.init_hud_stat_vars( self.hud_params['hud_days'], self.hud_params['h_hud_days'] )
-                stat_dict = self.db_connection.get_stats_from_hand(new_hand_id, type, self.hud_params,
-                                                                   self.hero_ids[site_id], num_seats)
+            self.db_connection.init_hud_stat_vars( self.hud_params['hud_days'], self.hud_params['h_hud_days'] )
+            stat_dict = self.db_connection.get_stats_from_hand(new_hand_id, type, self.hud_params,
+                                                               self.hero_ids[site_id], num_seats)
+            
+            #Confirm our hero is seated for this hand, otherwise we must __not__ create a hud
+            # because it is impossible to work out who is sitting where, and that working-out
+            # of seat positions __only__ happens during creation.  (see Aux_Base.Aux_Seats.adj_seats())
+            #Fixes issue with 888/pacific which includes cash hands before the hero is dealt-in
+            hero_found = False
+            for key in stat_dict:
+                if stat_dict[key]['screen_name'] == self.hero[site_id]:
+                    hero_found = True
+                    break
+            if not hero_found:
+                log.info(_('hud not created yet, because hero is not seated for this hand'))
+                return
                 
-                #Confirm our hero is seated for this hand, otherwise we must __not__ create a hud
-                # because it is impossible to work out who is sitting where, and that working-out
-                # of seat positions __only__ happens during creation.  (see Aux_Base.Aux_Seats.adj_seats())
-                #Fixes issue with 888/pacific which includes cash hands before the hero is dealt-in
-                hero_found = False
-                for key in stat_dict:
-                    if stat_dict[key]['screen_name'] == self.hero[site_id]:
-                        hero_found = True
-                        break
-                if not hero_found:
-                    log.info(_('hud not created yet, because hero is not seated for this hand'))
-                    continue
-                    
-                cards = self.get_cards(new_hand_id, poker_game)
-                table_kwargs = dict(table_name=table_name, tournament=tour_number, table_number=tab_number)
-                tablewindow = Tables.Table(self.config, site_name, **table_kwargs)
-                if tablewindow.number is None:
+            cards = self.get_cards(new_hand_id, poker_game)
+            table_kwargs = dict(table_name=table_name, tournament=tour_number, table_number=tab_number)
+            tablewindow = Tables.Table(self.config, site_name, **table_kwargs)
+            if tablewindow.number is None:
 #        If no client window is found on the screen, complain and continue
-                    if type == "tour":
-                        table_name = "%s %s" % (tour_number, tab_number)
-                    log.error(_("HUD create: table name %s not found, skipping.") % table_name)
-                    continue
-                elif tablewindow.number in self.blacklist:
-                    continue    #no hud please, we are blacklisted
+                if type == "tour":
+                    table_name = "%s %s" % (tour_number, tab_number)
+                log.error(_("HUD create: table name %s not found, skipping.") % table_name)
+                return
+            elif tablewindow.number in self.blacklist:
+                return    #no hud please, we are blacklisted
+            else:
+                tablewindow.key = temp_key
+                tablewindow.max = max
+                tablewindow.site = site_name
+                # Test that the table window still exists
+                if hasattr(tablewindow, 'number'):
+                    self.create_HUD(new_hand_id, tablewindow, temp_key, max, poker_game, type, stat_dict, cards)
                 else:
-                    tablewindow.key = temp_key
-                    tablewindow.max = max
-                    tablewindow.site = site_name
-                    # Test that the table window still exists
-                    if hasattr(tablewindow, 'number'):
-                        self.create_HUD(new_hand_id, tablewindow, temp_key, max, poker_game, type, stat_dict, cards)
-                    else:
-                        log.error(_('Table "%s" no longer exists') % table_name)
-                        continue
+                    log.error(_('Table "%s" no longer exists') % table_name)
+                    return
 
     def get_cards(self, new_hand_id, poker_game):
         cards = self.db_connection.get_cards(new_hand_id)
@@ -470,6 +536,7 @@ def idle_create(hud_main, new_hand_id, table, temp_key, max, poker_game, type, s
         log.exception(_("Error creating HUD for hand %s.") % new_hand_id)
     finally:
         gtk.gdk.threads_leave()
+        hud_main.gui_done(temp_key)
     return False
 
 def idle_update(hud_main, new_hand_id, table_name, config):
@@ -482,6 +549,7 @@ def idle_update(hud_main, new_hand_id, table_name, config):
         log.exception(_("Error updating HUD for hand %s.") % new_hand_id)
     finally:
         gtk.gdk.threads_leave()
+        hud_main.gui_done(table_name)
         return False
 
 def idle_check_tables(hud_main):
@@ -304,7 +304,28 @@ class Hand(object):
         self.handsactions = self.stats.getHandsActions()
         self.handsstove = self.stats.getHandsStove()
         self.handspots = self.stats.getHandsPots()
-        
+
+    def assembleDetached(self):
+        """ assembleHand without the db ids prepInsert sets, in an import parse process
+            (see Importer._parse_hh_worker): player names stand in for them until remapIds"""
+        self.dbid_pids = dict([(p[1], p[1]) for p in self.players])
+        if self.gametype['type']=='tour':
+            self.tourneysPlayersIds = dict(self.dbid_pids)
+        self.assembleHand()
+
+    def remapIds(self):
+        """ Hands assembled in an import parse process carry player names where the
+            db ids go (see Importer._parse_hh_worker). Swap in the ids set by prepInsert"""
+        for hs in self.handsstove:
+            hs[1] = self.dbid_pids[hs[1]]
+        for ht in self.handspots:
+            ht[4] = self.dbid_pids[ht[4]]
+        if self.gametype['type']=='tour':
+            self.hands['tourneyId'] = self.tourneyId
+            for pname, hp in self.handsplayers.iteritems():
+                hp['tourneyTypeId'] = self.tourneyTypeId
+                hp['tourneysPlayersIds'] = self.tourneysPlayersIds[pname]
+
     def getHandId(self, db, id):
         if db.isDuplicate(self.siteId, self.hands['siteHandNo'], self.hands['heroSeat'], self.publicDB):
             #log.debug(_("Hand.insert(): hid #: %s is a duplicate") % hh['siteHandNo'])
@@ -392,8 +413,38 @@ class Hand(object):
         # See NOTE: below on what this does.
 
         # Discripter must be set to lowercase as postgres returns all descriptors lower case and SQLight returns them as they are
+        players = [dict(line) for line in [zip([ column[0].lower() for column in c.description], row) for row in c.fetchall()]]
+
+        # HandInfo
+        q = db.sql.query['singleHand']
+        q = q.replace('%s', db.sql.query['placeholder'])
+        c.execute(q, (handId,))
+
+        # NOTE: This relies on row_factory = sqlite3.Row (set in connect() params)
+        #       Need to find MySQL and Postgres equivalents
+        #       MySQL maybe: cursorclass=MySQLdb.cursors.DictCursor
+        #res = c.fetchone()
+
+        # Using row_factory is global, and affects the rest of fpdb. The following 2 line achieves
+        # a similar result
+
+        # Discripter must be set to lowercase as supported dbs differ on what is returned.
         res = [dict(line) for line in [zip([ column[0].lower() for column in c.description], row) for row in c.fetchall()]]
-        for row in res:
+        handrow = res[0]
+
+        # Actions
+        q = db.sql.query['handActions']
+        q = q.replace('%s', db.sql.query['placeholder'])
+        c.execute(q, (handId,))
+        
+        # Discripter must be set to lowercase as supported dbs differ on what is returned.
+        actions = [dict(line) for line in [zip([ column[0].lower() for column in c.description], row) for row in c.fetchall()]]
+        self.selectFromRows(players, handrow, actions)
+
+    def selectFromRows(self, players, handrow, actions):
+        """ Fill in the Hand from its playerHand, singleHand and handActions rows, column names
+            in lower case. Shared by select and hand_factory_many """
+        for row in players:
             #print "DEBUG: addPlayer(%s, %s, %s, %s)" %(row['seatno'],row['name'],row['chips'],row['position'])
             self.addPlayer(row['seatno'],row['name'],str(row['chips']), str(row['position']))
             cardlist = []
@@ -451,23 +502,7 @@ class Hand(object):
                     self.buttonpos = row['seatno']
 
 
-        # HandInfo
-        q = db.sql.query['singleHand']
-        q = q.replace('%s', db.sql.query['placeholder'])
-        c.execute(q, (handId,))
-
-        # NOTE: This relies on row_factory = sqlite3.Row (set in connect() params)
-        #       Need to find MySQL and Postgres equivalents
-        #       MySQL maybe: cursorclass=MySQLdb.cursors.DictCursor
-        #res = c.fetchone()
-
-        # Using row_factory is global, and affects the rest of fpdb. The following 2 line achieves
-        # a similar result
-
-        # Discripter must be set to lowercase as supported dbs differ on what is returned.
-        res = [dict(line) for line in [zip([ column[0].lower() for column in c.description], row) for row in c.fetchall()]]
-        res = res[0]
-
+        res = handrow
         #res['tourneyId'] #res['seats'] #res['rush']
         self.tablename = res['tablename']
         self.handid    = res['sitehandno']
@@ -499,13 +534,7 @@ class Hand(object):
         # street3Pot | street4Pot | showdownPot | comment | commentTs | texture
 
         # Actions
-        q = db.sql.query['handActions']
-        q = q.replace('%s', db.sql.query['placeholder'])
-        c.execute(q, (handId,))
-        
-        # Discripter must be set to lowercase as supported dbs differ on what is returned.
-        res = [dict(line) for line in [zip([ column[0].lower() for column in c.description], row) for row in c.fetchall()]]
-        for row in res:
+        for row in actions:
             name = row['name']
             street = row['street']
             act = row['actionid']
@@ -2079,4 +2108,52 @@ def hand_factory(hand_id, config, db_connection):
     
     return hand_instance
 
+def hand_factory_many(hand_ids, config, db_connection, chunk = 5000):
+    # hand_factory for a whole set of hands: the gameinfo, players, hand and action
+    # rows come from one query each per chunk of hand ids instead of four per hand.
+    # Returns a dict of populated hand instances by hand id, ids not found are left out
+    
+    hand_ids = list(hand_ids)
+    hands = {}
+    c = db_connection.get_cursor()
+    for i in xrange(0, len(hand_ids), chunk):
+        ids = hand_ids[i:i+chunk]
+        gameinfos = db_connection.get_gameinfo_from_hids(ids)
+
+        rows = {}
+        for query in ('playerHands', 'multiHands', 'handsActions'):
+            q = db_connection.sql.query[query]
+            q = q.replace('%s', db_connection.sql.query['placeholder'])
+            c.execute(q, (ids,))
+            # Discripter must be set to lowercase as supported dbs differ on what is returned.
+            res = [dict(line) for line in [zip([ column[0].lower() for column in c.description], row) for row in c.fetchall()]]
+            byhand = {}
+            for row in res:
+                if query == 'multiHands':
+                    byhand[row['id']] = row
+                else:
+                    byhand.setdefault(row['handid'], []).append(row)
+            rows[query] = byhand
+
+        for hand_id in ids:
+            gameinfo = gameinfos.get(hand_id)
+            if gameinfo is None or hand_id not in rows['multiHands']:
+                continue
+            if gameinfo['base'] == 'hold':
+                hand_instance = HoldemOmahaHand(config=config, hhc=None, sitename=gameinfo['sitename'],
+                 gametype = gameinfo, handText=None, builtFrom = "DB", handid=hand_id)
+            elif gameinfo['base'] == 'stud':
+                hand_instance = StudHand(config=config, hhc=None, sitename=gameinfo['sitename'],
+                 gametype = gameinfo, handText=None, builtFrom = "DB", handid=hand_id)
+            elif gameinfo['base'] == 'draw':
+                hand_instance = DrawHand(config=config, hhc=None, sitename=gameinfo['sitename'],
+                 gametype = gameinfo, handText=None, builtFrom = "DB", handid=hand_id)
+
+            hand_instance.selectFromRows(rows['playerHands'].get(hand_id, []), rows['multiHands'][hand_id],
+                                         rows['handsActions'].get(hand_id, []))
+            hand_instance.handid_selected = hand_id #hand_instance does not supply this, create it here
+            hands[hand_id] = hand_instance
+    
+    return hands
+
 
@@ -0,0 +1,579 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""Lookup table hand evaluator, used when the pokereval C extension is missing.
+
+HandEval.HandEval has the same interface as pokereval.PokerEval for the calls
+fpdb makes (best, winners, poker_eval, card2string, string2card) and returns
+the same hand values, which follow the poker-eval StdRules encoding.
+
+Hands are evaluated from 13-bit rank masks per suit with precomputed tables.
+When numpy is available, enumerations and Monte Carlo runs are evaluated a
+whole batch of boards at a time. The unknown cards are enumerated whenever
+there are no more deals than samples asked for. A HandEval made with samples
+evaluates at most that many deals, enumerating them or not (a fifth of it for
+omaha, whose pockets make 60 hands each): the C library's 50000 preflop
+samples take too long in Python for an import, SAMPLES is within about 1%
+equity.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+import random
+import logging
+from itertools import combinations
+# logging has been set up in fpdb.py or HUD_main.py, use their settings:
+log = logging.getLogger("parser")
+
+try:
+    import numpy
+    use_numpy = True
+except ImportError:
+    log.info(_("Not using numpy for hand evaluation."))
+    use_numpy = False
+
+RANKS = '23456789TJQKA'
+SUITS = 'hdcs'
+NOCARD = 255
+
+# HandVal layout: hand type in the top byte, then up to five 4-bit ranks
+HANDTYPE_SHIFT = 24
+TOP_SHIFT, SECOND_SHIFT, THIRD_SHIFT, FOURTH_SHIFT = 16, 12, 8, 4
+NOPAIR, ONEPAIR, TWOPAIR, TRIPS, STRAIGHT, FLUSH, FLHOUSE, QUADS, STFLUSH = range(9)
+HANDTYPE_NAMES = ('NoPair', 'OnePair', 'TwoPair', 'Trips', 'Straight', 'Flush', 'FlHouse', 'Quads', 'StFlush')
+LOW_NOTHING = (STFLUSH + 1) << HANDTYPE_SHIFT
+
+# evalgame: (hi evaluator, low evaluator, omaha rules)
+GAMES = { 'holdem'   : ('hi', None,    False),
+          'omaha'    : ('hi', None,    True),
+          'omaha8'   : ('hi', 'low8',  True),
+          '7stud'    : ('hi', None,    False),
+          '7stud8'   : ('hi', 'low8',  False),
+          'razz'     : (None, 'a5',    False),
+          'lowball'  : (None, 'a5',    False),
+          'lowball27': (None, '27',    False)
+        }
+
+BATCH = 20000  # boards evaluated per numpy batch
+SAMPLES = 2000 # Monte Carlo runs of the HandEval DerivedStats falls back to
+OMAHA_COST = 5 # omaha runs cost about that many holdem runs
+OMAHA_ROWS = 60000 # omaha hands evaluated per numpy batch
+
+
+def _build_tables():
+    n_bits, top_card, top_five, straight = [0]*8192, [0]*8192, [0]*8192, [0]*8192
+    for mask in xrange(8192):
+        ranks = [r for r in range(12, -1, -1) if mask & (1 << r)]
+        n_bits[mask] = len(ranks)
+        if ranks:
+            top_card[mask] = ranks[0]
+        value = 0
+        for shift, r in zip((TOP_SHIFT, SECOND_SHIFT, THIRD_SHIFT, FOURTH_SHIFT, 0), ranks):
+            value += r << shift
+        top_five[mask] = value
+        for top in range(12, 3, -1):
+            run = 0x1F << (top - 4)
+            if mask & run == run:
+                straight[mask] = top
+                break
+        else:
+            if mask & 0x100F == 0x100F:
+                straight[mask] = 3
+    # Ace-to-eight low: bit 0 is the ace, bit 7 the eight; lowest five ranks win
+    low_eight = [LOW_NOTHING]*256
+    for mask in xrange(256):
+        ranks = [r for r in range(8) if mask & (1 << r)][:5]
+        if len(ranks) == 5:
+            ranks.reverse()
+            low_eight[mask] = sum([r << s for r, s in zip(ranks, (TOP_SHIFT, SECOND_SHIFT, THIRD_SHIFT, FOURTH_SHIFT, 0))])
+    return n_bits, top_card, top_five, straight, low_eight
+
+N_BITS, TOP_CARD, TOP_FIVE, STRAIGHT_TOP, LOW_EIGHT = _build_tables()
+
+if use_numpy:
+    NP_N_BITS, NP_TOP_CARD, NP_TOP_FIVE, NP_STRAIGHT_TOP, NP_LOW_EIGHT = [
+        numpy.array(t, dtype=numpy.int64) for t in (N_BITS, TOP_CARD, TOP_FIVE, STRAIGHT_TOP, LOW_EIGHT)]
+
+
+def _ace_low(mask):
+    """Rotate a rank mask so that the ace is the lowest bit."""
+    return ((mask << 1) & 0x1FFE) | ((mask >> 12) & 1)
+
+
+def eval_n(sh, sd, sc, ss, n, flushes=True):
+    """HandVal of the best hi hand from n cards given as per suit rank masks.
+       With flushes=False straights and flushes are not counted, which is how
+       ace-to-five low hands are ranked."""
+    ranks = sh | sd | sc | ss
+    n_ranks = N_BITS[ranks]
+    n_dups = n - n_ranks
+    made = 0
+    if flushes and n_ranks >= 5:
+        for suit in (ss, sc, sd, sh):
+            if N_BITS[suit] >= 5:
+                if STRAIGHT_TOP[suit]:
+                    return (STFLUSH << HANDTYPE_SHIFT) + (STRAIGHT_TOP[suit] << TOP_SHIFT)
+                made = (FLUSH << HANDTYPE_SHIFT) + TOP_FIVE[suit]
+                break
+        if not made and STRAIGHT_TOP[ranks]:
+            made = (STRAIGHT << HANDTYPE_SHIFT) + (STRAIGHT_TOP[ranks] << TOP_SHIFT)
+        if made and n_dups < 3:
+            return made
+
+    if n_dups == 0:
+        return TOP_FIVE[ranks]
+    two = ranks ^ (sh ^ sd ^ sc ^ ss)
+    if n_dups == 1:
+        top = TOP_CARD[two]
+        return ((ONEPAIR << HANDTYPE_SHIFT) + (top << TOP_SHIFT)
+                + ((TOP_FIVE[ranks ^ two] >> 4) & ~0xF))
+    three = ((sc & sd) | (sh & ss)) & ((sc & sh) | (sd & ss))
+    if n_dups == 2:
+        if two:
+            return ((TWOPAIR << HANDTYPE_SHIFT) + (TOP_FIVE[two] & 0xFF000)
+                    + (TOP_CARD[ranks ^ two] << THIRD_SHIFT))
+        top = TOP_CARD[three]
+        rest = ranks ^ three
+        second = TOP_CARD[rest]
+        return ((TRIPS << HANDTYPE_SHIFT) + (top << TOP_SHIFT) + (second << SECOND_SHIFT)
+                + (TOP_CARD[rest ^ (1 << second)] << THIRD_SHIFT))
+    four = sh & sd & sc & ss
+    if four:
+        top = TOP_CARD[four]
+        return ((QUADS << HANDTYPE_SHIFT) + (top << TOP_SHIFT)
+                + (TOP_CARD[ranks ^ (1 << top)] << SECOND_SHIFT))
+    if N_BITS[two] != n_dups:
+        top = TOP_CARD[three]
+        return ((FLHOUSE << HANDTYPE_SHIFT) + (top << TOP_SHIFT)
+                + (TOP_CARD[(two | three) ^ (1 << top)] << SECOND_SHIFT))
+    if made:
+        return made
+    top = TOP_CARD[two]
+    second = TOP_CARD[two ^ (1 << top)]
+    return ((TWOPAIR << HANDTYPE_SHIFT) + (top << TOP_SHIFT) + (second << SECOND_SHIFT)
+            + (TOP_CARD[ranks ^ (1 << top) ^ (1 << second)] << THIRD_SHIFT))
+
+
+def eval_n_array(sh, sd, sc, ss, n, flushes=True):
+    """Vectorized eval_n over numpy arrays of suit masks."""
+    where = numpy.where
+    ranks = sh | sd | sc | ss
+    n_dups = n - NP_N_BITS[ranks]
+    two = ranks ^ (sh ^ sd ^ sc ^ ss)
+    three = ((sc & sd) | (sh & ss)) & ((sc & sh) | (sd & ss))
+    four = sh & sd & sc & ss
+
+    result = NP_TOP_FIVE[ranks]
+    top = NP_TOP_CARD[two]
+    onepair = ((ONEPAIR << HANDTYPE_SHIFT) + (top << TOP_SHIFT)
+               + ((NP_TOP_FIVE[ranks ^ two] >> 4) & ~0xF))
+    result = where(n_dups == 1, onepair, result)
+
+    twopair = ((TWOPAIR << HANDTYPE_SHIFT) + (NP_TOP_FIVE[two] & 0xFF000)
+               + (NP_TOP_CARD[ranks ^ two] << THIRD_SHIFT))
+    tripcard = NP_TOP_CARD[three]
+    rest = ranks ^ three
+    second = NP_TOP_CARD[rest]
+    trips = ((TRIPS << HANDTYPE_SHIFT) + (tripcard << TOP_SHIFT) + (second << SECOND_SHIFT)
+             + (NP_TOP_CARD[rest ^ (1 << second)] << THIRD_SHIFT))
+    result = where(n_dups == 2, where(two != 0, twopair, trips), result)
+
+    quadcard = NP_TOP_CARD[four]
+    quads = ((QUADS << HANDTYPE_SHIFT) + (quadcard << TOP_SHIFT)
+             + (NP_TOP_CARD[ranks ^ (1 << quadcard)] << SECOND_SHIFT))
+    fullhouse = ((FLHOUSE << HANDTYPE_SHIFT) + (tripcard << TOP_SHIFT)
+                 + (NP_TOP_CARD[(two | three) ^ (1 << tripcard)] << SECOND_SHIFT))
+    second = NP_TOP_CARD[two ^ (1 << top)]
+    twopairs = ((TWOPAIR << HANDTYPE_SHIFT) + (top << TOP_SHIFT) + (second << SECOND_SHIFT)
+                + (NP_TOP_CARD[ranks ^ (1 << top) ^ (1 << second)] << THIRD_SHIFT))
+    onlypairs = (four == 0) & (NP_N_BITS[two] == n_dups)
+    big = where(four != 0, quads, where(onlypairs, twopairs, fullhouse))
+
+    if not flushes:
+        return where(n_dups >= 3, big, result)
+
+    suit = where(NP_N_BITS[ss] >= 5, ss, where(NP_N_BITS[sc] >= 5, sc, where(NP_N_BITS[sd] >= 5, sd, sh)))
+    flush = NP_N_BITS[suit] >= 5
+    straight = NP_STRAIGHT_TOP[ranks]
+    made = where(flush, (FLUSH << HANDTYPE_SHIFT) + NP_TOP_FIVE[suit],
+                 where(straight != 0, (STRAIGHT << HANDTYPE_SHIFT) + (straight << TOP_SHIFT), 0))
+    big = where(onlypairs & (made != 0), made, big)
+    result = where(n_dups >= 3, big, where(made != 0, made, result))
+    stflush = NP_STRAIGHT_TOP[suit]
+    return where(flush & (stflush != 0), (STFLUSH << HANDTYPE_SHIFT) + (stflush << TOP_SHIFT), result)
+
+
+def _masks(cards):
+    masks = [0, 0, 0, 0]
+    for c in cards:
+        masks[c // 13] |= 1 << (c % 13)
+    return masks
+
+
+def _masks_array(cards):
+    """Per suit rank masks of a 2-D array of cards, one hand per row."""
+    bits = numpy.left_shift(1, cards % 13)
+    suits = cards // 13
+    return [numpy.where(suits == s, bits, 0).sum(axis=1) for s in range(4)]
+
+
+def _omaha_values_array(hi, lo, pocket, board):
+    """(hi, low) values of omaha pockets on boards, 2-D arrays of cards with a
+       deal per row. The hands of two pocket and three board cards are evaluated
+       for OMAHA_ROWS hands at a time"""
+    pairs = list(combinations(range(pocket.shape[1]), 2))
+    triples = list(combinations(range(board.shape[1]), 3))
+    columns = len(pairs) * len(triples)
+    pairs, triples = [p for p in pairs for t in triples], [t for p in pairs for t in triples]
+    step = max(OMAHA_ROWS // columns, 1)
+    hival, loval = [], []
+    for i in xrange(0, pocket.shape[0], step):
+        fives = numpy.concatenate((pocket[i:i + step, pairs], board[i:i + step, triples]), axis=2)
+        m = _masks_array(fives.reshape(-1, 5))
+        if hi:
+            hival.append(eval_n_array(*(m + [5])).reshape(-1, columns).max(axis=1))
+        if lo:
+            ranks = m[0] | m[1] | m[2] | m[3]
+            low = numpy.where(NP_N_BITS[ranks] == 5, NP_LOW_EIGHT[_ace_low(ranks) & 0xFF], LOW_NOTHING)
+            loval.append(low.reshape(-1, columns).min(axis=1))
+    return (numpy.concatenate(hival) if hi else None,
+            numpy.concatenate(loval) if lo else None)
+
+
+def _split(cards, omaha):
+    """Five card hands a player can make: all of them, or two from the pocket
+       and three from the board under omaha rules."""
+    pocket, board = cards
+    if omaha:
+        return [p + b for p in combinations(pocket, 2) for b in combinations(board, 3)]
+    allcards = pocket + board
+    if len(allcards) <= 5:
+        return [tuple(allcards)]
+    return list(combinations(allcards, 5))
+
+
+def _hi_value(cards, omaha):
+    pocket, board = cards
+    if omaha:
+        return max([eval_n(*(_masks(h) + [5])) for h in _split(cards, omaha)] or [0])
+    allcards = pocket + board
+    return eval_n(*(_masks(allcards) + [len(allcards)]))
+
+
+def _low_value(kind, cards, omaha):
+    """Low HandVal, lower is better; LOW_NOTHING if the hand does not qualify."""
+    if kind == 'low8':
+        if omaha:
+            return min([LOW_EIGHT[_ace_low(reduce(int.__or__, _masks(h))) & 0xFF]
+                        for h in _split(cards, omaha) if N_BITS[reduce(int.__or__, _masks(h))] == 5]
+                       or [LOW_NOTHING])
+        return LOW_EIGHT[_ace_low(reduce(int.__or__, _masks(cards[0] + cards[1]))) & 0xFF]
+    values = []
+    for h in _split(cards, omaha):
+        masks = _masks(h)
+        if kind == 'a5':
+            values.append(eval_n(*([_ace_low(m) for m in masks] + [len(h), False])))
+        else:
+            values.append(eval_n(*(masks + [len(h)])))
+    return min(values)
+
+
+class HandEval:
+    """Drop-in replacement for pokereval.PokerEval."""
+
+    def __init__(self, samples=0):
+        self.samples = samples  # most Monte Carlo runs of poker_eval, 0 for as many as asked
+
+    def card2string(self, cards):
+        if isinstance(cards, (list, tuple)):
+            return [self.card2string(c) for c in cards]
+        if cards == NOCARD:
+            return '__'
+        return RANKS[cards % 13] + SUITS[cards // 13]
+
+    def string2card(self, cards):
+        if isinstance(cards, (list, tuple)):
+            return [self.string2card(c) for c in cards]
+        if isinstance(cards, (int, long)):
+            return cards
+        if cards == '__':
+            return NOCARD
+        return SUITS.index(cards[1].lower())*13 + RANKS.index(cards[0].upper())
+
+    def best(self, side, hand, board=[]):
+        """Best five card hand: (HandVal, [hand type name] + cards), with the
+           cards ordered by significance.  With a board, omaha rules apply."""
+        pocket = [c for c in self.string2card(hand) if c != NOCARD]
+        board = [c for c in self.string2card(board) if c != NOCARD]
+        omaha = len(board) > 0
+        hands = _split((pocket, board), omaha)
+        if not hands or len(hands[0]) < 5:
+            return (0, ['Nothing'])
+        if side == 'hi':
+            value, cards = max([(eval_n(*(_masks(h) + [5])), h) for h in hands])
+            return (value, [HANDTYPE_NAMES[value >> HANDTYPE_SHIFT]] + self._order(cards, value))
+        value, cards = LOW_NOTHING, None
+        for h in hands:
+            v = LOW_EIGHT[_ace_low(reduce(int.__or__, _masks(h))) & 0xFF]
+            if v < value and N_BITS[reduce(int.__or__, _masks(h))] == 5:
+                value, cards = v, h
+        if cards is None:
+            return (LOW_NOTHING, ['Nothing'])
+        lowrank = lambda c: (c % 13 + 1) % 13
+        return (value, ['NoPair'] + sorted(cards, key=lowrank, reverse=True))
+
+    def _order(self, cards, value):
+        counts = {}
+        for c in cards:
+            counts[c % 13] = counts.get(c % 13, 0) + 1
+        if value >> HANDTYPE_SHIFT in (STRAIGHT, STFLUSH) and (value >> TOP_SHIFT) & 0xF == 3:
+            return sorted(cards, key=lambda c: (c % 13 + 1) % 13, reverse=True)
+        return sorted(cards, key=lambda c: (counts[c % 13], c % 13), reverse=True)
+
+    def winners(self, game, pockets, board=[], dead=[]):
+        """Indexes of the winning pockets for each side of the pot."""
+        hi, lo, omaha = GAMES[game]
+        board = [c for c in self.string2card(board) if c != NOCARD]
+        hands = [([c for c in self.string2card(p) if c != NOCARD], board) for p in pockets]
+        win = {}
+        if hi:
+            values = [_hi_value(h, omaha) for h in hands]
+            win['hi'] = [i for i, v in enumerate(values) if v == max(values)]
+        if lo:
+            values = [_low_value(lo, h, omaha) for h in hands]
+            low = [i for i, v in enumerate(values) if v == min(values) and v != LOW_NOTHING]
+            if low:
+                win['low'] = low
+        return win
+
+    def poker_eval(self, game, pockets, board=[], dead=[], iterations=0):
+        """Equity of each pocket.  '__' marks an unknown card; unknown cards are
+           enumerated exhaustively, or sampled when iterations is non zero."""
+        hi, lo, omaha = GAMES[game]
+        pockets = [self.string2card(p) for p in pockets]
+        board = self.string2card(board)
+        known = [c for c in sum(pockets, []) + board + self.string2card(dead) if c != NOCARD]
+        if len(set(known)) != len(known):
+            raise ValueError(_("Duplicate cards in %s") % self.card2string(known))
+        deck = [c for c in range(52) if c not in known]
+        groups = [len([c for c in board if c == NOCARD])] + [len([c for c in p if c == NOCARD]) for p in pockets]
+        slots = sum(groups)
+        if slots > len(deck):
+            raise ValueError(_("Not enough cards left in the deck"))
+
+        if self.samples:
+            samples = self.samples / (OMAHA_COST if omaha else 1)
+            iterations = min(iterations or samples, samples)
+        if slots == 0:
+            fills = [()]
+        elif iterations and _deals(len(deck), groups) > iterations:
+            fills = self._sample(deck, slots, iterations)
+        else:
+            fills = self._enumerate(deck, groups)
+
+        totals = _Totals(len(pockets), hi, lo)
+        if use_numpy:
+            for batch in _batches(fills, slots):
+                hands = _deal_array(pockets, board, batch)
+                totals.add_array([self._values_array(hi, lo, omaha, h) for h in hands])
+        else:
+            for fill in fills:
+                hands = _deal(pockets, board, fill)
+                totals.add([(hi and _hi_value(h, omaha), lo and _low_value(lo, h, omaha)) for h in hands])
+        return totals.result()
+
+    def _values_array(self, hi, lo, omaha, cards):
+        pocket, board = cards
+        if omaha:
+            return _omaha_values_array(hi, lo, pocket, board)
+        allcards = numpy.hstack((pocket, board))
+        hival = loval = None
+        if hi:
+            hival = eval_n_array(*(_masks_array(allcards) + [allcards.shape[1]]))
+        if lo == 'low8':
+            m = _masks_array(allcards)
+            loval = NP_LOW_EIGHT[_ace_low(m[0] | m[1] | m[2] | m[3]) & 0xFF]
+        elif lo:
+            lows = []
+            n = allcards.shape[1]
+            for h in (combinations(range(n), 5) if n > 5 else [range(n)]):
+                m = _masks_array(allcards[:, list(h)])
+                if lo == 'a5':
+                    lows.append(eval_n_array(*([_ace_low(s) for s in m] + [len(h), False])))
+                else:
+                    lows.append(eval_n_array(*(m + [len(h)])))
+            loval = reduce(numpy.minimum, lows)
+        return hival, loval
+
+    def _sample(self, deck, slots, iterations):
+        if use_numpy:
+            deck = numpy.array(deck)
+            done = 0
+            while done < iterations:
+                size = min(BATCH, iterations - done)
+                keys = numpy.random.random_sample((size, len(deck)))
+                picks = keys.argpartition(slots - 1, axis=1)[:, :slots] if slots < len(deck) else keys.argsort(axis=1)
+                done += size
+                yield deck[picks]
+        else:
+            for i in xrange(iterations):
+                yield random.sample(deck, slots)
+
+    def _enumerate(self, deck, groups, used=()):
+        while groups and not groups[-1]:
+            groups = groups[:-1]
+        if len(groups) == 1:
+            # the board only, most often
+            fills = combinations([c for c in deck if c not in used], groups[0])
+            if not use_numpy:
+                for fill in fills:
+                    yield fill
+                return
+            fills = list(fills)
+            for i in xrange(0, len(fills), BATCH):
+                yield numpy.array(fills[i:i + BATCH], dtype=numpy.int64)
+            return
+        if not groups:
+            yield ()
+            return
+        for first in combinations([c for c in deck if c not in used], groups[0]):
+            for rest in self._enumerate(deck, groups[1:], used + first):
+                yield first + rest
+
+
+def _deals(cards, groups):
+    """Number of ways to deal groups of cards from a deck of cards"""
+    deals = 1
+    for n in groups:
+        for i in range(n):
+            deals = deals * (cards - i) / (i + 1)
+        cards -= n
+    return deals
+
+
+def _batches(fills, slots):
+    """Group fills into 2-D arrays of at most BATCH rows."""
+    rows = []
+    for fill in fills:
+        if hasattr(fill, 'shape'):
+            yield fill
+            continue
+        rows.append(fill)
+        if len(rows) == BATCH:
+            yield numpy.array(rows, dtype=numpy.int64).reshape(len(rows), slots)
+            rows = []
+    if rows:
+        yield numpy.array(rows, dtype=numpy.int64).reshape(len(rows), slots)
+
+
+def _deal(pockets, board, fill):
+    fill = list(fill)
+    board = [c if c != NOCARD else fill.pop(0) for c in board]
+    return [([c if c != NOCARD else fill.pop(0) for c in p], board) for p in pockets]
+
+
+def _deal_array(pockets, board, batch):
+    """Replace unknown cards by the columns of batch, in the same order as _deal."""
+    size, column = batch.shape[0], [0]
+
+    def fill(cards):
+        out = numpy.empty((size, len(cards)), dtype=numpy.int64)
+        for i, c in enumerate(cards):
+            if c == NOCARD:
+                out[:, i] = batch[:, column[0]]
+                column[0] += 1
+            else:
+                out[:, i] = c
+        return out
+    board = fill(board)
+    return [(fill(p), board) for p in pockets]
+
+
+class _Totals:
+    """Accumulates the wins, ties and pot shares of each pocket."""
+
+    def __init__(self, players, hi, lo):
+        self.hashipot, self.haslopot = bool(hi), bool(lo)
+        self.samples = 0
+        self.counts = [dict([(k, 0) for k in ('scoop', 'winhi', 'losehi', 'tiehi', 'winlo', 'loselo', 'tielo')])
+                       for p in range(players)]
+        self.ev = [0.0] * players
+
+    def add(self, values):
+        self.samples += 1
+        players = range(len(values))
+        hiwin = lowin = []
+        if self.hashipot:
+            best = max([v[0] for v in values])
+            hiwin = [p for p in players if values[p][0] == best]
+        if self.haslopot:
+            best = min([v[1] for v in values])
+            if best != LOW_NOTHING:
+                lowin = [p for p in players if values[p][1] == best]
+        hishare = (0.5 if lowin and self.hashipot else 1.0) / (len(hiwin) or 1)
+        loshare = (0.5 if self.hashipot else 1.0) / (len(lowin) or 1)
+        for p in players:
+            counts, share = self.counts[p], 0.0
+            if self.hashipot:
+                key = 'losehi' if p not in hiwin else 'winhi' if len(hiwin) == 1 else 'tiehi'
+                counts[key] += 1
+                share += hishare * (p in hiwin)
+            if self.haslopot:
+                key = 'loselo' if p not in lowin else 'winlo' if len(lowin) == 1 else 'tielo'
+                counts[key] += 1
+                share += loshare * (p in lowin)
+            counts['scoop'] += share == 1.0
+            self.ev[p] += share
+
+    def add_array(self, values):
+        """values: one (hi, low) pair of arrays per pocket, one entry per board."""
+        size = len(values[0][0] if self.hashipot else values[0][1])
+        self.samples += size
+        zero = numpy.zeros(size)
+        if self.hashipot:
+            hi = numpy.vstack([v[0] for v in values])
+            hiwin = hi == hi.max(axis=0)
+            nhi = hiwin.sum(axis=0)
+        if self.haslopot:
+            lo = numpy.vstack([v[1] for v in values])
+            best = lo.min(axis=0)
+            lowin = (lo == best) & (best != LOW_NOTHING)
+            nlo = numpy.maximum(lowin.sum(axis=0), 1)
+            haslow = best != LOW_NOTHING
+        for p in range(len(values)):
+            counts, share = self.counts[p], zero
+            if self.hashipot:
+                counts['winhi'] += int((hiwin[p] & (nhi == 1)).sum())
+                counts['tiehi'] += int((hiwin[p] & (nhi > 1)).sum())
+                counts['losehi'] += int((~hiwin[p]).sum())
+                factor = numpy.where(haslow, 0.5, 1.0) if self.haslopot else 1.0
+                share = share + hiwin[p] * factor / nhi
+            if self.haslopot:
+                counts['winlo'] += int((lowin[p] & (nlo == 1)).sum())
+                counts['tielo'] += int((lowin[p] & (nlo > 1)).sum())
+                counts['loselo'] += int((~lowin[p]).sum())
+                share = share + lowin[p] * (0.5 if self.hashipot else 1.0) / nlo
+            counts['scoop'] += int((share == 1.0).sum())
+            self.ev[p] += float(share.sum())
+
+    def result(self):
+        evals = []
+        for p, counts in enumerate(self.counts):
+            e = dict(counts)
+            e['ev'] = int(self.ev[p] * 1000 / self.samples) if self.samples else 0
+            evals.append(e)
+        return {'info': (self.samples, int(self.haslopot), int(self.hashipot)), 'eval': evals}
@@ -28,6 +28,8 @@ import xml.dom.minidom
 import codecs
 from decimal_wrapper import Decimal
 import operator
+import itertools
+import bisect
 from xml.dom.minidom import Node
 
 import time
@@ -44,10 +46,12 @@ log = logging.getLogger("parser")
 import Hand
 from Exceptions import *
 import Configuration
+import RegexCache
+import ImportProfile
 
 class HandHistoryConverter():
 
-    READ_CHUNK_SIZE = 10000 # bytes to read at a time from file in tail mode
+    READ_CHUNK_SIZE = 10000 # bytes to read at a time from file in tail mode and by allHandsAsIter
 
     # filetype can be "text" or "xml"
     # so far always "text"
@@ -60,6 +64,9 @@ class HandHistoryConverter():
     codepage = "cp1252"
 
     re_tzOffset = re.compile('^\w+[+-]\d{4}$')
+    re_StarsArchive = re.compile('^Hand #\d+', re.MULTILINE)
+    # Remove  ******************** # 1 *************************
+    re_FtpArchive = re.compile('\*{20}\s#\s\d+\s\*{20,25}\s+', re.MULTILINE)
     copyGameHeader = False
     summaryInFile  = False
 
@@ -84,11 +91,14 @@ out_path  (default '-' = sys.stdout)
         self.in_path = in_path
         self.out_path = out_path
         self.kodec = None
+        self.offset = None   # byte offset to read in_path from in tail mode, see setTailOffset
+        self.tail = None     # the TailReader of the last read in tail mode
 
         self.processedHands = []
         self.numHands = 0
         self.numErrors = 0
         self.numPartial = 0
+        self.failedHands = []   # texts of the hands that failed to parse, kept in RawHands if configured
         self.isCarraige = False
         self.autoPop = False
 
@@ -101,6 +111,7 @@ out_path  (default '-' = sys.stdout)
 
         self.compiledPlayers   = set()
         self.maxseats  = 0
+        self.profile = ImportProfile.ImportProfile() # time spent reading, splitting and parsing, see setProfile
 
         self.status = True
 
@@ -128,15 +139,26 @@ HandHistoryConverter: '%(sitename)s'
         self.numHands = 0
         self.numPartial = 0
         self.numErrors = 0
+        self.failedHands = []
         lastParsed = None
-        handsList = self.allHandsAsList()
-        log.debug( _("Hands list is:") + str(handsList))
-        log.info(_("Parsing %d hands") % len(handsList))
+        # Plain text files are split while being read, one hand in memory at a time.
+        # Converters that need the whole file (copyGameHeader) or split it their own way still get the list
+        if (self.filetype == "text" and not self.copyGameHeader
+            and self.allHandsAsList.im_func is HandHistoryConverter.allHandsAsList.im_func):
+            handsIter = self.allHandsAsIter()
+        else:
+            handsIter = iter(self.allHandsAsList())
         # Determine if we're dealing with a HH file or a Summary file
         # quick fix : empty files make the handsList[0] fail ==> If empty file, go on with HH parsing
-        if len(handsList) == 0 or self.isSummary(handsList[0]) == False:
+        firstHand = next(handsIter, None)
+        if firstHand is None or self.isSummary(firstHand) == False:
             self.parsedObjectType = "HH"
-            for handText in handsList:
+            handText = None
+            if firstHand is not None:
+                handsIter = itertools.chain([firstHand], handsIter)
+            for handText in handsIter:
+                self.numHands += 1
+                stime = time.time()
                 try:
                     self.processedHands.append(self.processHand(handText))
                     lastParsed = 'stored'
@@ -146,24 +168,26 @@ HandHistoryConverter: '%(sitename)s'
                     log.debug("%s" % e)
                 except FpdbParseError:
                     self.numErrors += 1
+                    self.failedHands.append(handText)
                     lastParsed = 'error'
                     log.error(_("FpdbParseError for file '%s'") % self.in_path)
+                self.profile.add('parse', time.time() - stime)
             if lastParsed in ('partial', 'error') and self.autoPop:
-                self.index -= len(handsList[-1])
+                self.index -= len(handText)
                 if self.isCarraige:
-                     self.index -= handsList[-1].count('\n')
-                handsList.pop()
+                     self.index -= handText.count('\n')
+                self.numHands -= 1
                 if lastParsed=='partial':
                     self.numPartial -= 1
                 else:
                     self.numErrors -= 1
+                    self.failedHands.pop()
                 log.info(_("Removing partially written hand & resetting index"))
-            self.numHands = len(handsList)
             endtime = time.time()
             log.info(_("Read %d hands (%d failed) in %.3f seconds") % (self.numHands, (self.numErrors + self.numPartial), endtime - starttime))
         else:
             self.parsedObjectType = "Summary"
-            summaryParsingStatus = self.readSummaryInfo(handsList)
+            summaryParsingStatus = self.readSummaryInfo([firstHand] + list(handsIter))
             endtime = time.time()
             if summaryParsingStatus :
                 log.info(_("Summary file '%s' correctly parsed (took %.3f seconds)") % (self.in_path, endtime - starttime))
@@ -172,6 +196,12 @@ HandHistoryConverter: '%(sitename)s'
     
     def setAutoPop(self, value):
         self.autoPop = value
+
+    def setProfile(self, profile):
+        """Add the time spent reading, splitting and parsing to the ImportProfile profile,
+        that of each of the parse methods apart. Call once, before start"""
+        self.profile = profile
+        profile.instrument(self, ImportProfile.PARSE_METHODS, 'parse.')
                 
     def progressNotify(self):
         "A callback to the interface while events are pending"
@@ -182,7 +212,10 @@ HandHistoryConverter: '%(sitename)s'
     def allHandsAsList(self):
         """Return a list of handtexts in the file at self.in_path"""
         #TODO : any need for this to be generator? e.g. stars support can email one huge file of all hands in a year. Better to read bit by bit than all at once.
+        stime = time.time()
         self.readFile()
+        self.profile.add('read', time.time() - stime)
+        stime = time.time()
         lenobs = len(self.obs)
         self.obs = self.obs.rstrip()
         self.index -= (lenobs - len(self.obs))
@@ -195,18 +228,16 @@ HandHistoryConverter: '%(sitename)s'
         # if self.archive:
         #     self.obs = self.convert_archive(self.obs)
         if self.starsArchive == True:
-            m = re.compile('^Hand #\d+', re.MULTILINE)
-            self.obs = m.sub('', self.obs)
+            self.obs = self.re_StarsArchive.sub('', self.obs)
 
         if self.ftpArchive == True:
-            # Remove  ******************** # 1 *************************
-            m = re.compile('\*{20}\s#\s\d+\s\*{20,25}\s+', re.MULTILINE)
-            self.obs = m.sub('', self.obs)
+            self.obs = self.re_FtpArchive.sub('', self.obs)
     
         if self.obs is None or self.obs == "":
             log.info(_("Read no hands from file: '%s'") % self.in_path)
             return []
         handlist = re.split(self.re_SplitHands,  self.obs)
+        self.profile.add('split', time.time() - stime)
         # Some HH formats leave dangling text after the split
         # ie. </game> (split) </session>EOL
         # Remove this dangler if less than 50 characters and warn in the log
@@ -218,6 +249,141 @@ HandHistoryConverter: '%(sitename)s'
             log.info(_("Removing text < 50 characters & resetting index"))
         return handlist
 
+    def allHandsAsIter(self):
+        """Generator version of allHandsAsList: yields the handtexts in the file at self.in_path
+        one at a time, reading READ_CHUNK_SIZE bytes at a go, so memory use is bounded by the
+        largest hand instead of the file. Strips, converts and splits exactly like allHandsAsList.
+        self.index is only up to date once the generator is exhausted"""
+        if self.offset is not None or self.kodec is None:
+            # in tail mode the bytes appended since the last read are checked too: a file that
+            # was plain ASCII so far may turn out not to be in the codec guessed from it
+            stime = time.time()
+            self.kodec = self.detectCodec(self.offset, self.kodec)
+            self.profile.add('read', time.time() - stime)
+        if self.kodec is None:
+            print _("unable to read file with any codec in list!"), self.in_path
+            return
+        if self.offset is not None:
+            # tail mode: only the text after offset is decoded, self.index counts from there
+            in_fh = self.tail = TailReader(self.in_path, self.offset, self.kodec, self.READ_CHUNK_SIZE)
+            self.index = 0
+        else:
+            in_fh = codecs.getreader(self.kodec)(open(self.in_path, 'rb'))
+        try:
+            # codecs readers can't seek to a character offset, read up to self.index and drop it
+            total, skip = 0, self.index
+            while skip > 0:
+                chunk = in_fh.read(self.READ_CHUNK_SIZE, skip)
+                if not chunk:
+                    break
+                total += len(chunk)
+                skip -= len(chunk)
+
+            # raw:  read but not converted yet. Converting stops short of the last line holding
+            #       anything but whitespace, so no \r\n pair, archive marker or the whitespace
+            #       following it is cut in two, and the end of file can still be rstripped
+            # obs:  converted text not split off yet. A separator is only taken when text follows
+            #       it, as the next chunk could still extend it
+            raw, obs = u"", u""
+            wstail = 0          # length of the whitespace at the end of everything read
+            started = False     # leading whitespace is stripped until the first conversion
+            content = False     # False until anything is left to split (allHandsAsList's obs == "")
+            last = None         # the previous handtext, held back in case it is the trailing dangler
+            eof = False
+            while not eof:
+                stime = time.time()
+                chunk = in_fh.read(self.READ_CHUNK_SIZE)
+                self.profile.add('read', time.time() - stime)
+                stime = time.time()
+                eof = not chunk
+                total += len(chunk)
+                stripped = chunk.rstrip()
+                if stripped:
+                    wstail = len(chunk) - len(stripped)
+                else:
+                    wstail += len(chunk)
+
+                raw += chunk
+                if not started:
+                    raw = raw.lstrip()
+                if eof:
+                    raw = raw.rstrip()
+                    cut = len(raw)
+                else:
+                    cut = raw[:raw.rfind('\n')+1].rstrip().rfind('\n')+1
+                if cut:
+                    started = True
+                    text = raw[:cut]
+                    raw = raw[cut:]
+                    lentext = len(text)
+                    text = text.replace('\r\n', '\n')
+                    if lentext != len(text):
+                        self.isCarraige = True
+                    if self.starsArchive == True:
+                        text = self.re_StarsArchive.sub('', text)
+                    if self.ftpArchive == True:
+                        text = self.re_FtpArchive.sub('', text)
+                    obs += text
+                    content = content or text != ""
+                if eof:
+                    self.index = total - wstail
+                if not content:
+                    continue
+
+                start, texts = 0, []
+                for m in self.re_SplitHands.finditer(obs):
+                    if m.end() == m.start():
+                        continue # re.split ignores empty matches
+                    if not eof and m.end() >= len(obs):
+                        break
+                    if last is not None:
+                        texts.append(last)
+                    last = obs[start:m.start()]
+                    start = m.end()
+                obs = obs[start:]
+                # split before yielding, so the time parsing them isn't counted as splitting
+                self.profile.add('split', time.time() - stime)
+                for text in texts:
+                    yield text
+        finally:
+            in_fh.close()
+
+        if not content:
+            log.info(_("Read no hands from file: '%s'") % self.in_path)
+            return
+        if last is not None:
+            yield last
+        # Some HH formats leave dangling text after the split
+        # ie. </game> (split) </session>EOL
+        # Remove this dangler if less than 50 characters and warn in the log
+        if len(obs) <= 50:
+            self.index -= len(obs)
+            if self.isCarraige:
+                self.index -= obs.count('\n')
+            log.info(_("Removing text < 50 characters & resetting index"))
+        else:
+            yield obs
+
+    def detectCodec(self, offset=None, first=None):
+        """Return the first codec of first and self.codepage that decodes the whole of self.in_path,
+        or what follows byte offset in it, or None. Decodes in chunks, so finding out costs a pass
+        over the file (or the bytes after offset) but no memory"""
+        for kodec in ([first] if first else []) + list(self.__listof(self.codepage)):
+            try:
+                if offset:
+                    in_fh = TailReader(self.in_path, offset, kodec, self.READ_CHUNK_SIZE)
+                else:
+                    in_fh = codecs.open(self.in_path, 'r', kodec)
+                try:
+                    while in_fh.read(self.READ_CHUNK_SIZE):
+                        pass
+                finally:
+                    in_fh.close()
+                return kodec
+            except:
+                pass
+        return None
+
     def processHand(self, handText):
         if self.isPartial(handText):
             raise FpdbHandPartial(_("Could not identify as a %s hand") % self.sitename)
@@ -358,6 +524,11 @@ or None if we fail to get the info """
     Which without care in your regexes most people would match 'YesI' and not 'YesI antes $4000'
     """
 
+    def compileRegex(self, pattern, flags=0):
+        """Compile a regex built at run time, like those of compilePlayerRegexs, through the
+        cache shared by all the converters, so each pattern is compiled once per process"""
+        return RegexCache.compile(pattern, flags, self.sitename)
+
     # Needs to return a MatchObject with group names identifying the streets into the Hand object
     # so groups are called by street names 'PREFLOP', 'FLOP', 'STREET2' etc
     # blinds are done seperately
@@ -514,6 +685,20 @@ or None if we fail to get the info """
     def getLastCharacterRead(self):
         return self.index
 
+    def setTailOffset(self, offset, kodec=None):
+        """Tail mode: read in_path from byte offset on, decoded with kodec (detected when None),
+        instead of decoding it from the start to skip self.index characters. Used to follow files
+        being written to, where only the bytes appended since the last read are decoded.
+        Only applies to the converters read by allHandsAsIter"""
+        self.offset = offset
+        self.kodec = kodec
+
+    def getLastByteRead(self):
+        """In tail mode, the byte offset to carry on reading from next time, else None"""
+        if self.tail is None:
+            return None
+        return self.tail.byteOffset(self.index)
+
     def isSummary(self, topline):
         return " Tournament Summary " in topline
 
@@ -673,6 +858,63 @@ or None if we fail to get the info """
 
         return money.replace(',', '')
 
+class TailReader:
+    """Reads the text of a file from a byte offset on, like a codecs reader, and remembers
+    where in the file the characters read came from, to tell the byte offset of any of them"""
+
+    def __init__(self, path, offset, kodec, chunk_size):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.fh = open(path, 'rb')
+        self.kodec = codecs.lookup(kodec).name
+        if self.kodec == 'utf-16':
+            # only the start of the file has a BOM, take the byte order from it
+            bom = self.fh.read(2)
+            if bom == codecs.BOM_UTF16_BE:
+                self.kodec = 'utf-16-be'
+            else:
+                self.kodec = 'utf-16-le'
+            if offset == 0 and bom in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+                offset = 2
+        self.fh.seek(offset)
+        self.decoder = codecs.getincrementaldecoder(self.kodec)()
+        # characters read and their byte offset in the file, after each read
+        self.chars, self.offsets = [0], [offset]
+
+    def read(self, size=-1):
+        data = self.fh.read(size)
+        text = self.decoder.decode(data)
+        self.chars.append(self.chars[-1] + len(text))
+        # bytes ending in the middle of a character, maybe still being written, are held by
+        # the decoder and left for the next read
+        self.offsets.append(self.fh.tell() - len(self.decoder.getstate()[0]))
+        return text
+
+    def close(self):
+        self.fh.close()
+
+    def byteOffset(self, chars):
+        """Byte offset in the file of the character chars characters after the start offset"""
+        i = bisect.bisect_right(self.chars, chars) - 1
+        offset, need = self.offsets[i], chars - self.chars[i]
+        if need == 0:
+            return offset
+        # decode again from the last read before it, at most chunk_size bytes or so
+        fh = open(self.path, 'rb')
+        try:
+            fh.seek(offset)
+            decoder = codecs.getincrementaldecoder(self.kodec)()
+            text = u""
+            while len(text) < need:
+                data = fh.read(self.chunk_size)
+                if not data:
+                    break
+                text += decoder.decode(data)
+        finally:
+            fh.close()
+        return offset + len(text[:need].encode(self.kodec))
+
+
 def getTableTitleRe(config, sitename, *args, **kwargs):
     "Returns string to search in windows titles for current site"
     return getSiteHhc(config, sitename).getTableTitleRe(*args, **kwargs)
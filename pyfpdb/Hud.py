@@ -67,6 +67,7 @@ class Hud:
         self.poker_game    = poker_game
         self.game_type     = game_type # (ring|tour)
         self.max           = max
+        self.db_hud_connection = None
 
                       
         self.site          = table.site
@@ -138,6 +139,9 @@ class Hud:
         for aux in self.aux_windows:
             aux.destroy()
         self.aux_windows = []
+        if self.db_hud_connection is not None:
+            Database.checkin(self.db_hud_connection)
+            self.db_hud_connection = None
 
     def resize_windows(self):
         # resize self.layout object; this will then be picked-up
@@ -183,10 +187,11 @@ class Hud:
 
         self.stat_dict = stat_dict # stat_dict from HUD_main.read_stdin is mapped here
         # the db_connection created in HUD_Main is NOT available to the
-        #  hud.py and aux handlers, so create a fresh connection in this class
+        #  hud.py and aux handlers, so check out one of the gui thread from the pool
         # if the db connection is made in __init__, then the sqlite db threading will fail
         #  so the db connection is made here instead.
-        self.db_hud_connection = Database.Database(self.config)
+        if self.db_hud_connection is None:
+            self.db_hud_connection = Database.checkout(self.config)
         # Load a hand instance (factory will load correct type for this hand)
         self.hand_instance = Hand.hand_factory(hand, config, self.db_hud_connection)
         self.db_hud_connection.connection.rollback()
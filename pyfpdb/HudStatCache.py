@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""In memory HudCache totals for the HUD.
+
+Database.get_stats_from_hand sums HudCache over every player at the table for
+each hand the HUD receives. When a HudStatCache is set as the database's
+hud_stat_cache, the HudCache rows of a player are read once, the first time the
+player is seen, and the HandsPlayers rows of the hands imported after that are
+added to them as they come. Totals for each set of HUD parameters are kept too,
+so getting the stats of a player already seen is a dictionary lookup.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+import logging
+# logging has been set up in fpdb.py or HUD_main.py, use their settings:
+log = logging.getLogger("db")
+
+# columns before the stats in get_hudcache_for_players and get_handsplayers_for_hudcache
+KEY_COLUMNS = 6
+
+
+class HudStatCache:
+
+    def __init__(self, db):
+        self.db = db
+        self.columns = None  # stat names, as in get_stats_from_hand_aggregated
+        self.rows = {}       # playerId -> {(gametypeId, activeSeats, styleKey): stat totals}
+        self.last_hand = {}  # playerId -> id of the last hand included in rows
+        self.totals = {}     # playerId -> {filter: [rows, rows of the filter's gametype, stat totals]}
+        self.gametypes = {}  # gametypeId -> (siteId, type, category, limitType, bigBlind)
+        self.similar = {}    # (gametypeId, agg_bb_mult) -> gametypeIds aggregated with it
+
+    def get_stats(self, hand, stat_dict, hero_id
+                 ,stat_range, stylekey, agg_bb_mult, seats_min, seats_max
+                 ,h_stat_range, h_stylekey, h_agg_bb_mult, h_seats_min, h_seats_max):
+        """Fill stat_dict like the get_stats_from_hand_aggregated query does."""
+        c = self.db.get_cursor()
+        q = self.db.sql.query['get_players_from_hand'].replace('%s', self.db.sql.query['placeholder'])
+        c.execute(q, (hand,))
+        players = c.fetchall()
+        if not players:
+            return
+        gametypeId = self.db.get_gameinfo_from_hid(hand)['gametypeId']
+        self.update([p[0] for p in players])
+
+        for playerid, seat, name in players:
+            if playerid == hero_id:
+                if h_stat_range == 'S':
+                    continue
+                key = (gametypeId, h_stylekey, h_agg_bb_mult, h_seats_min, h_seats_max)
+            else:
+                if stat_range == 'S':
+                    continue
+                key = (gametypeId, stylekey, agg_bb_mult, seats_min, seats_max)
+            nrows, ngametype, totals = self.get_totals(playerid, key)
+            if nrows:
+                t_dict = dict(zip(self.columns, totals))
+                t_dict['player_id'] = playerid
+                t_dict['seat'] = seat if ngametype else -1
+                t_dict['screen_name'] = name
+                stat_dict[playerid] = t_dict
+
+    def update(self, playerids):
+        """Load players not seen yet and add the hands imported since to all of them."""
+        new = [p for p in playerids if p not in self.rows]
+        if new:
+            self.load(new)
+        c = self.db.get_cursor()
+        q = self.db.sql.query['get_handsplayers_for_hudcache'].replace('%s', self.db.sql.query['placeholder'])
+        c.execute(q, (list(playerids), min([self.last_hand[p] for p in playerids])))
+        for row in c.fetchall():
+            playerid, handid = row[0], row[1]
+            if handid > self.last_hand[playerid]:
+                if row[2] not in self.gametypes:
+                    self.load_gametypes()
+                self.add(playerid, (row[2], row[3], self.db.get_hudcache_stylekey(row[4])), row[KEY_COLUMNS:])
+                self.last_hand[playerid] = handid
+
+    def load(self, playerids):
+        c = self.db.get_cursor()
+        q = self.db.sql.query['get_hudcache_for_players'].replace('%s', self.db.sql.query['placeholder'])
+        c.execute(q, (list(playerids),))
+        if self.columns is None:
+            self.columns = [desc[0].lower() for desc in c.description][KEY_COLUMNS:]
+        last_hand = None
+        for playerid in playerids:
+            self.rows[playerid] = {}
+            self.totals[playerid] = {}
+        for row in c.fetchall():
+            self.rows[row[0]][(row[1], row[2], row[3])] = list(row[KEY_COLUMNS:])
+            last_hand = row[5]
+        if last_hand is None:
+            c.execute(self.db.sql.query['get_last_hand'])
+            last_hand = c.fetchone()[0]
+        for playerid in playerids:
+            self.last_hand[playerid] = last_hand or 0
+        log.debug("HudStatCache: loaded %d players" % len(playerids))
+
+    def load_gametypes(self):
+        c = self.db.get_cursor()
+        c.execute(self.db.sql.query['get_gametypes_for_hudcache'])
+        self.gametypes = dict([(row[0], tuple(row[1:])) for row in c.fetchall()])
+        # new gametypes can belong to existing groups, so work them out again
+        self.similar = {}
+        for playerid in self.totals:
+            self.totals[playerid] = {}
+
+    def similar_gametypes(self, gametypeId, agg_bb_mult):
+        """The gametypes get_stats_from_hand_aggregated sums with gametypeId:
+           same site, type, category and limit, big blind within agg_bb_mult."""
+        key = (gametypeId, agg_bb_mult)
+        if key not in self.similar:
+            if gametypeId not in self.gametypes:
+                self.load_gametypes()
+            ids = set()
+            gt2 = self.gametypes.get(gametypeId)
+            if gt2 and gt2[4] is not None:
+                for id, gt1 in self.gametypes.iteritems():
+                    if (gt1[:4] == gt2[:4] and gt1[4] is not None
+                        and gt1[4] <= gt2[4] * agg_bb_mult and gt1[4] >= gt2[4] / agg_bb_mult):
+                        ids.add(id)
+            self.similar[key] = ids
+        return self.similar[key]
+
+    def matches(self, rowkey, key):
+        gametypeId, seats, styleKey = rowkey
+        return (styleKey > key[1] and key[3] <= seats <= key[4]
+                and gametypeId in self.similar_gametypes(key[0], key[2]))
+
+    def get_totals(self, playerid, key):
+        totals = self.totals[playerid].get(key)
+        if totals is None:
+            totals = [0, 0, [0] * len(self.columns)]
+            for rowkey, line in self.rows[playerid].iteritems():
+                if self.matches(rowkey, key):
+                    self.add_line(totals, rowkey, key, line)
+            self.totals[playerid][key] = totals
+        return totals
+
+    def add(self, playerid, rowkey, line):
+        rows = self.rows[playerid]
+        if rowkey in rows:
+            rows[rowkey] = [(a or 0) + (b or 0) for a, b in zip(rows[rowkey], line)]
+        else:
+            rows[rowkey] = list(line)
+        for key, totals in self.totals[playerid].iteritems():
+            if self.matches(rowkey, key):
+                self.add_line(totals, rowkey, key, line)
+
+    def add_line(self, totals, rowkey, key, line):
+        totals[0] += 1
+        totals[1] += rowkey[0] == key[0]
+        totals[2] = [(a or 0) + (b or 0) for a, b in zip(totals[2], line)]
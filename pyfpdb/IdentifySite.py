@@ -24,6 +24,7 @@ import os
 from time import time
 from optparse import OptionParser
 import codecs
+import cPickle
 import Database
 import Configuration
 import logging
@@ -40,6 +41,9 @@ re_SplitArchive['Fulltilt'] = re.compile(r'(?P<SPLIT>(\*{20}\s#\s\d+\s\*{20,25}\
 re_XLS['PokerStars'] = re.compile(r'Tournaments\splayed\sby\s\'.+?\'')
 re_XLS['Fulltilt'] = re.compile(r'Player\sTournament\sReport\sfor\s.+?\s\(.*\)')
 
+HEAD_CHARS = 5000            # text of a file the site is identified from
+HEAD_BYTES = 4 * HEAD_CHARS  # bytes read to decode HEAD_CHARS in any of the codepages
+
 class FPDBFile:
     path = ""
     ftype = None # Valid: hh, summary, both
@@ -57,6 +61,7 @@ class Site:
     
     def __init__(self, name, hhc_fname, filter_name, summary, obj):
         self.name = name
+        self.siteId = getattr(obj, "siteId", None)
         # FIXME: rename filter to hhc_fname
         self.hhc_fname = hhc_fname
         # FIXME: rename filter_name to hhc_type
@@ -110,12 +115,28 @@ class Site:
             self.re_HeroCards2 = obj.re_HeroCards2 
 
 class IdentifySite:
-    def __init__(self, config, hhcs = None):
+    def __init__(self, config, hhcs = None, cache = None):
+        """cache: file to keep the sites of the files identified in between runs"""
         self.config = config
         self.codepage = ("utf8", "utf-16", "cp1252")
         self.sitelist = {}
         self.filelist = {}
         self.generateSiteList(hhcs)
+        # a file not identified is tried again once the sites configured change
+        self.sites_key = tuple(sorted((id, site.filter_name) for id, site in self.sitelist.iteritems()))
+        self.cache_path = cache
+        self.cache = {}  # path -> ((size, mtime, sites_key), None or the FPDBFile attributes), see processFile
+        self.cache_changed = False
+        if cache and os.path.exists(cache):
+            try:
+                f = open(cache, 'rb')
+                try:
+                    self.cache = cPickle.load(f)
+                finally:
+                    f.close()
+            except Exception, e:
+                log.warning(_("Could not read the file identification cache %s: %s") % (cache, e))
+                self.cache = {}
 
     def scan(self, path):
         if os.path.isdir(path):
@@ -200,13 +221,94 @@ class IdentifySite:
 
     def processFile(self, path):
         if path not in self.filelist:
-            whole_file, kodec = self.read_file(path)
-            if whole_file:
-                fobj = self.idSite(path, whole_file[:5000], kodec)
-                if fobj == False: # Site id failed
-                    log.debug(_("DEBUG:") + " " + _("siteId Failed for: %s") % path)
-                else:
-                    self.filelist[path] = fobj
+            try:
+                st = os.stat(path)
+                key = (st.st_size, st.st_mtime, self.sites_key)
+            except OSError:
+                key = None
+            fobj = self.getCached(path, key)
+            if fobj is None:
+                fobj = False
+                whole_file, kodec = self.read_head(path)
+                if whole_file:
+                    fobj = self.idSite(path, whole_file, kodec)
+                    if fobj == False: # Site id failed
+                        log.debug(_("DEBUG:") + " " + _("siteId Failed for: %s") % path)
+                self.setCached(path, key, fobj)
+            if fobj:
+                self.filelist[path] = fobj
+
+    def getCached(self, path, key):
+        """The FPDBFile of path from the cache, False if it was not identified,
+           None if it is not cached for this size, modification time and site list"""
+        cached = self.cache.get(path)
+        if cached is None or key is None or cached[0] != key:
+            return None
+        if cached[1] is None:
+            return False
+        siteId, ftype, kodec, archive, archiveSplit, hero = cached[1]
+        if siteId not in self.sitelist:
+            del self.cache[path]
+            self.cache_changed = True
+            return None
+        f = FPDBFile(path)
+        f.site = self.sitelist[siteId]
+        f.ftype, f.kodec, f.hero = ftype, kodec, hero
+        f.archive, f.archiveSplit = archive, archiveSplit
+        return f
+
+    def setCached(self, path, key, fobj):
+        if key is None:
+            return
+        if fobj == False:
+            self.cache[path] = (key, None)
+        elif self.sitelist.get(fobj.site.siteId) is fobj.site:
+            # PokerTracker files get a Site of their own, identify them again
+            self.cache[path] = (key, (fobj.site.siteId, fobj.ftype, fobj.kodec,
+                                      fobj.archive, fobj.archiveSplit, fobj.hero))
+        else:
+            return
+        self.cache_changed = True
+
+    def save_cache(self):
+        """Write the cache to the file given, if anything was identified since"""
+        if not self.cache_path or not self.cache_changed:
+            return
+        try:
+            tmp = self.cache_path + '.tmp'
+            f = open(tmp, 'wb')
+            try:
+                cPickle.dump(self.cache, f, cPickle.HIGHEST_PROTOCOL)
+            finally:
+                f.close()
+            if os.path.exists(self.cache_path):
+                os.remove(self.cache_path)
+            os.rename(tmp, self.cache_path)
+            self.cache_changed = False
+        except (IOError, OSError), e:
+            log.warning(_("Could not write the file identification cache %s: %s") % (self.cache_path, e))
+
+    def read_head(self, in_path):
+        """The first HEAD_CHARS characters of in_path and its codec, like read_file
+           but reading only the start of the file"""
+        if in_path.endswith('.xls') or in_path.endswith('.xlsx') and xlrd:
+            return self.read_file(in_path)
+        try:
+            infile = open(in_path, 'rb')
+            try:
+                data = infile.read(HEAD_BYTES)
+            finally:
+                infile.close()
+        except IOError:
+            return None, None
+        for kodec in self.codepage:
+            try:
+                # not final: a character cut by HEAD_BYTES is not an error
+                head = codecs.getincrementaldecoder(kodec)().decode(data)
+                return head[:HEAD_CHARS], kodec
+            except UnicodeError:
+                continue
+        return None, None
 
     def read_file(self, in_path):
         if in_path.endswith('.xls') or in_path.endswith('.xlsx') and xlrd:
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""Where the time of an import goes.
+
+An ImportProfile adds up the calls to and the time spent in each stage of an
+import: reading and splitting the files, parsing the hands and each converter
+method within that, assembleHand, each Database store method (flushing the
+bulk caches included) and commit. Importer keeps one for the run, logs the part
+of each file in logImport and the whole run at the end, and can write it out
+as JSON.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+import json
+from time import time
+
+# HandHistoryConverter methods the hands are parsed with, timed as 'parse.<method>'
+PARSE_METHODS = ('determineGameType', 'readHandInfo', 'readPlayerStacks', 'compilePlayerRegexs',
+                 'markStreets', 'readBlinds', 'readAntes', 'readBringIn', 'readButton',
+                 'readHeroCards', 'readCommunityCards', 'readAction', 'readShowdownActions',
+                 'readCollectPot', 'readShownCards', 'readTourneyResults', 'readOther', 'getRake')
+# Database methods the hands are stored with, timed as 'db.<method>'
+DATABASE_METHODS = ('storeHand', 'storeBoards', 'storeHandsPlayers', 'storeHandsPots',
+                    'storeHandsActions', 'storeHandsStove', 'storeHudCache', 'storeSessionsCache',
+                    'storeCashCache', 'storeTourCache', 'storeCardsCache', 'storePositionsCache',
+                    'storeTourResults', 'commit')
+
+
+class ImportProfile:
+
+    def __init__(self):
+        self.stages = {}    # stage -> [calls, seconds]
+
+    def add(self, stage, seconds, calls=1):
+        counts = self.stages.get(stage)
+        if counts is None:
+            self.stages[stage] = [calls, seconds]
+        else:
+            counts[0] += calls
+            counts[1] += seconds
+
+    def timed(self, stage, func):
+        """func, with its calls and time added to stage"""
+        def timed(*args, **kwargs):
+            start = time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time() - start)
+        return timed
+
+    def instrument(self, obj, methods, prefix):
+        """Time the calls to those of methods obj has, each as its own stage prefix + name"""
+        for name in methods:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self.timed(prefix + name, method))
+
+    def merge(self, other):
+        """Add the stages of other, e.g. from a parse process"""
+        for stage, (calls, seconds) in other.stages.iteritems():
+            self.add(stage, seconds, calls)
+
+    def copy(self):
+        profile = ImportProfile()
+        profile.merge(self)
+        return profile
+
+    def since(self, earlier):
+        """The profile of what was added after earlier, a copy of this profile"""
+        profile = ImportProfile()
+        for stage, (calls, seconds) in self.stages.iteritems():
+            before = earlier.stages.get(stage, [0, 0.0])
+            if calls > before[0]:
+                profile.add(stage, seconds - before[1], calls - before[0])
+        return profile
+
+    def report(self):
+        """One line per stage, the longest first"""
+        lines = []
+        for stage, (calls, seconds) in sorted(self.stages.iteritems(), key=lambda s: -s[1][1]):
+            lines.append(_("%s: %d calls, %.3f s, %.3f ms per call")
+                         % (stage, calls, seconds, 1000 * seconds / max(calls, 1)))
+        return "\n".join(lines)
+
+    def toJSON(self):
+        return json.dumps(dict([(stage, {'calls': calls, 'seconds': seconds})
+                                for stage, (calls, seconds) in self.stages.iteritems()]),
+                          sort_keys=True, indent=1)
+
+    def writeJSON(self, path):
+        f = open(path, 'w')
+        try:
+            f.write(self.toJSON())
+        finally:
+            f.close()
@@ -26,6 +26,7 @@ import datetime
 import Queue
 import shutil
 import re
+import multiprocessing
 
 import logging, traceback
 
@@ -35,7 +36,13 @@ import gtk
 import Database
 import Configuration
 import IdentifySite
-from Exceptions import FpdbParseError, FpdbHandDuplicate
+import FileWatcher
+import Archive
+import RawText
+import RegexCache
+import ReportCache
+import ImportProfile
+from Exceptions import FpdbParseError, FpdbHandDuplicate, FpdbHandPartial
 
 try:
     import xlrd
@@ -56,7 +63,10 @@ class Importer:
         self.sql        = sql
         self.parent     = parent
 
-        self.idsite = IdentifySite.IdentifySite(config)
+        cache = None # remembers the site of unchanged files, so directories are scanned again quickly
+        if config.config_path and os.path.isdir(config.config_path):
+            cache = os.path.join(config.config_path, u'IdentifySite.cache')
+        self.idsite = IdentifySite.IdentifySite(config, cache = cache)
 
         self.filelist   = {}
         self.dirlist    = {}
@@ -69,6 +79,8 @@ class Importer:
         self.faobs      = None       # File as one big string
         self.mode       = None
         self.pos_in_file = {}        # dict to remember how far we have read in the file
+        self.tail_offsets = {}       # path -> (byte offset, codec) to carry on reading from in auto mode
+        self.watcher    = FileWatcher.FileWatcher()
         #Set defaults
         self.callHud    = self.config.get_import_parameters().get("callFpdbHud")
 
@@ -87,10 +99,16 @@ class Importer:
 
         self.writeq = None
         self.database = Database.Database(self.config, sql = self.sql)
-        self.writerdbs = []
-        self.settings.setdefault("threads", 1) # value set by GuiBulkImport
-        for i in xrange(self.settings['threads']):
-            self.writerdbs.append( Database.Database(self.config, sql = self.sql) )
+        # where the time of the run goes, see ImportProfile; the store methods and commit are timed on the database
+        self.profile = ImportProfile.ImportProfile()
+        self.profile.instrument(self.database, ImportProfile.DATABASE_METHODS, 'db.')
+        self.archive = None
+        if self.config.get_import_parameters()['archivePath']:
+            self.archive = Archive.Archive(self.config)
+        # the text of the hands and summaries, as the raw_hands and raw_tourneys config sections say
+        self.rawHands = RawText.RawStore(self.database, 'RawHands', self.config.raw_hands)
+        self.rawTourneys = RawText.RawStore(self.database, 'RawTourneys', self.config.raw_tourneys)
+        self.settings.setdefault("threads", 1) # number of parse processes, value set by GuiBulkImport
 
         clock() # init clock in windows
 
@@ -115,9 +133,6 @@ class Importer:
 
     def setThreads(self, value):
         self.settings['threads'] = value
-        if self.settings["threads"] > len(self.writerdbs):
-            for i in xrange(self.settings['threads'] - len(self.writerdbs)):
-                self.writerdbs.append( Database.Database(self.config, sql = self.sql) )
 
     def setDropIndexes(self, value):
         self.settings['dropIndexes'] = value
@@ -147,10 +162,14 @@ class Importer:
         self.updatedsize = {}
         self.updatetime = {}
         self.pos_in_file = {}
+        self.tail_offsets = {}
         self.filelist = {}
 
-    def logImport(self, type, file, stored, dups, partial, errs, ttime, id):
+    def logImport(self, type, file, stored, dups, partial, errs, ttime, id, profile = None):
+        """profile: the ImportProfile of the file, logged stage by stage"""
         hands = stored + dups + partial + errs
+        if profile is not None and profile.stages:
+            log.info(_("Import profile of %s (%d hands in %.3f seconds):\n%s") % (file, hands, ttime, profile.report()))
         now = datetime.datetime.utcnow()
         ttime100 = ttime * 100
         self.database.updateFile([type, now, now, hands, stored, dups, partial, errs, ttime100, True, id])
@@ -212,6 +231,7 @@ class Importer:
             for subdir in os.walk(inputPath):
                 for file in subdir[2]:
                     self.addImportFile(os.path.join(subdir[0], file), site=site)
+            self.idsite.save_cache()
             return True
         else:
             return self.addImportFile(inputPath, site=site)
@@ -228,6 +248,7 @@ class Importer:
             if monitor == True:
                 self.monitor = True
                 self.dirlist[site] = [dir] + [filter]
+                self.watcher.watch(dir)
 
             #print "addImportDirectory: checking files in", dir
             for subdir in os.walk(dir):
@@ -237,6 +258,7 @@ class Importer:
                                                                     # need long time because FTP in Win does not
                                                                     # update the timestamp on the HH during session
                         self.addImportFile(filename, "auto")
+            self.idsite.save_cache()
         else:
             log.warning(_("Attempted to add non-directory '%s' as an import directory") % str(dir))
 
@@ -247,12 +269,15 @@ class Importer:
         start = datetime.datetime.now()
         starttime = time()
         log.info(_("Started at %s -- %d files to import. indexes: %s") % (start, len(self.filelist), self.settings['dropIndexes']))
+        self.profile.stages.clear()
         if self.settings['dropIndexes'] == 'auto':
             self.settings['dropIndexes'] = self.calculate_auto2(self.database, 12.0, 500.0)
         if 'dropHudCache' in self.settings and self.settings['dropHudCache'] == 'auto':
             self.settings['dropHudCache'] = self.calculate_auto2(self.database, 25.0, 500.0)    # returns "drop"/"don't drop"
 
         (totstored, totdups, totpartial, toterrors) = self.importFiles(None)
+        log.info(RegexCache.report())
+        log.info(_("Import profile of the run:\n%s") % self.profile.report())
 
         # Tidying up after import
         #if 'dropHudCache' in self.settings and self.settings['dropHudCache'] == 'drop':
@@ -269,10 +294,90 @@ class Importer:
     # end def runImport
     
     def runPostImport(self):
+        if self.archive is not None:
+            self.archive.writeHands()
         self.database.cleanUpTourneyTypes()
         self.database.cleanUpWeeksMonths()
         self.database.resetClean()
 
+    def runArchiveImport(self, hands = None, startTimes = None):
+        """Stores HandsPlayers, HandsActions and HandsStove again from the archive instead of
+           parsing the hand histories, for the hands in the hand id and start time ranges given,
+           then rebuilds the caches from them. Returns the number of hands"""
+        if self.archive is None:
+            return 0
+        self.archive.writeHands()
+        count = self.archive.quickImport(self.database, hands = hands, startTimes = startTimes)
+        if count:
+            self.database.rebuild_caches()
+            ReportCache.invalidate(self.config)
+        return count
+
+    def runRawImport(self, hands = None):
+        """Parses the hands kept in RawHands again, for the hand ids in the range hands
+           ((min, max) or None for all), stores their HandsPlayers, HandsPots, HandsActions
+           and HandsStove again, then rebuilds the caches from them, e.g. once the stats
+           derived have been fixed. The Hands rows are left as they are. The hands of sites
+           whose converters copy the game header of the file to each hand (copyGameHeader:
+           Merge, iPoker, Everest) are not supported, as the header is not kept, they are
+           skipped and counted in the log. Returns the number of hands"""
+        self.rawHands.flush()
+        converters = {}     # filter name -> converter, the hands of a site are parsed by the same one
+        unsupported = {}    # site name -> hands skipped
+        (count, batch) = (0, [])
+        for (hid, text) in self.rawHands.texts(hands):
+            fobj = self.idsite.idSite(u'RawHands', text, 'utf8')
+            if not fobj or fobj.site is None or fobj.ftype != "hh":
+                log.warning(_("Could not identify the site of hand %s") % hid)
+                continue
+            if fobj.site.copyGameHeader:
+                unsupported[fobj.site.name] = unsupported.get(fobj.site.name, 0) + 1
+                continue
+            hhc = converters.get(fobj.site.filter_name)
+            if hhc is None:
+                obj = getattr(__import__(fobj.site.hhc_fname), fobj.site.filter_name)
+                hhc = converters[fobj.site.filter_name] = obj(self.config, in_path = u'RawHands', autostart = False,
+                                                               sitename = fobj.site.name)
+                hhc.setProfile(self.profile)
+            try:
+                hhc.whole_file = text
+                hand = hhc.processHand(text)
+                if hand is None:
+                    raise FpdbParseError(_("Unsupported game"))
+                hand.prepInsert(self.database)
+                hand.dbid_hands = hid
+                hand.assembleHand()
+            except (FpdbParseError, FpdbHandPartial), e:
+                log.warning(_("Hand %s no longer parses: %s") % (hid, e))
+                continue
+            batch.append(hand)
+            if len(batch) >= RawText.FETCH_SIZE:
+                count += self.storeReparsed(batch)
+                batch = []
+        if batch:
+            count += self.storeReparsed(batch)
+        for site, skipped in sorted(unsupported.iteritems()):
+            log.warning(_("%d %s hands not parsed again: their file header is not kept in RawHands") % (skipped, site))
+        if count:
+            self.database.rebuild_caches()
+            ReportCache.invalidate(self.config)
+        return count
+
+    def storeReparsed(self, hands):
+        """Replaces the rows of hands, parsed again by runRawImport, that are derived from them"""
+        c = self.database.get_cursor()
+        ids = [hand.dbid_hands for hand in hands]
+        for table in ('HandsPlayers', 'HandsPots', 'HandsActions', 'HandsStove'):
+            c.execute(self.database.sql.compiled['delete_archived_rows'].replace('<table>', table), (ids,))
+        self.database.resetBulkCache()
+        for i, hand in enumerate(hands):
+            doinsert = len(hands)==i+1
+            hand.insertHandsPlayers(self.database, doinsert)
+            hand.insertHandsActions(self.database, doinsert)
+            hand.insertHandsStove(self.database, doinsert)
+        self.database.commit()
+        return len(hands)
+
     def importFiles(self, q):
         """"Read filenames in self.filelist and pass to despatcher."""
 
@@ -289,11 +394,22 @@ class Importer:
         #prepare progress popup window
         ProgressDialog = ProgressBar(len(self.filelist), self.parent)
         
+        # With more than one thread the hh files are parsed (and their stats
+        # derived) in a pool of worker processes, this process stays the only
+        # writer to the database and stores the files in filelist order
+        pool, parsed = None, None
+        if self.settings['threads'] > 1:
+            (pool, parsed) = self._parse_files_parallel()
+        
         for f in self.filelist:
             filecount = filecount + 1
             ProgressDialog.progress_update(f, str(self.database.getHandCount()))
+            before = self.profile.copy()
 
-            (stored, duplicates, partial, errors, ttime) = self._import_despatch(self.filelist[f])
+            if parsed is not None and self.filelist[f].ftype in ("hh", "both"):
+                (stored, duplicates, partial, errors, ttime) = self._import_despatch(self.filelist[f], parsed.next())
+            else:
+                (stored, duplicates, partial, errors, ttime) = self._import_despatch(self.filelist[f])
             totstored += stored
             totdups += duplicates
             totpartial += partial
@@ -308,24 +424,43 @@ class Importer:
                     if movefailedfiles:
                         shutil.move(file, "c:\\fpdbfailed\\%d-%s" % (fileerrorcount, os.path.basename(file[3:]) ) )
             
-            self.logImport('bulk', f, stored, duplicates, partial, errors, ttime, self.filelist[f].fileId)
+            self.logImport('bulk', f, stored, duplicates, partial, errors, ttime, self.filelist[f].fileId,
+                           self.profile.since(before))
             
+        if pool is not None:
+            pool.close()
+            pool.join()
         del ProgressDialog
         
         return (totstored, totdups, totpartial, toterrors)
     # end def importFiles
 
-    def _import_despatch(self, fpdbfile):
+    def _parse_files_parallel(self):
+        """Start parsing every hh file in self.filelist in a pool of worker processes.
+           Returns the pool and an iterator yielding one ParsedFile per hh file,
+           in the same order importFiles walks self.filelist"""
+        jobs = []
+        for f in self.filelist:
+            fpdbfile = self.filelist[f]
+            if fpdbfile.ftype in ("hh", "both"):
+                jobs.append((fpdbfile.path, fpdbfile.site.hhc_fname, fpdbfile.site.filter_name,
+                             fpdbfile.site.name, fpdbfile.archive, self.pos_in_file.get(fpdbfile.path, 0)))
+        processes = min(self.settings['threads'], max(len(jobs), 1))
+        log.info(_("Parsing %d files with %d processes") % (len(jobs), processes))
+        pool = multiprocessing.Pool(processes, _parse_worker_init, (self.config,))
+        return (pool, pool.imap(_parse_hh_worker, jobs))
+
+    def _import_despatch(self, fpdbfile, parsed = None):
         stored, duplicates, partial, errors, ttime = 0,0,0,0,0
         ftype = fpdbfile.ftype
         if ftype in ("hh", "both"):
-            (stored, duplicates, partial, errors, ttime) = self._import_hh_file(fpdbfile)
+            (stored, duplicates, partial, errors, ttime) = self._import_hh_file(fpdbfile, parsed)
         if ftype == "summary":
             (stored, duplicates, partial, errors, ttime) = self._import_summary_file(fpdbfile)
         if ftype == "both" and fpdbfile.path not in self.updatedsize:
             self._import_summary_file(fpdbfile)
         #    pass
-        print "DEBUG: _import_summary_file.ttime: %.3f %s" % (ttime, ftype)
+        log.debug("_import_despatch: %s %s took %.3f seconds" % (ftype, fpdbfile.path, ttime))
         return (stored, duplicates, partial, errors, ttime)
 
 
@@ -367,12 +502,26 @@ class Importer:
     #Run import on updated files, then store latest update time. Called from GuiAutoImport.py
     def runUpdated(self):
         """Check for new files in monitored directories"""
-        for (site,type) in self.dirlist:
-            self.addImportDirectory(self.dirlist[(site,type)][0], False, (site,type), self.dirlist[(site,type)][1])
+        changed = self.watcher.changes()
+        if changed is None:
+            # not watching, look for new files and check them all
+            for (site,type) in self.dirlist:
+                self.addImportDirectory(self.dirlist[(site,type)][0], False, (site,type), self.dirlist[(site,type)][1])
+            files = self.filelist.keys()
+        else:
+            # only the files written to since the last check
+            for f in changed:
+                if f not in self.filelist and os.path.isfile(f):
+                    self.addImportFile(f, "auto")
+            files = [f for f in changed if f in self.filelist]
 
-        for f in self.filelist:
+        for f in files:
             if os.path.exists(f):
                 stat_info = os.stat(f)
+                if changed is not None and f not in self.updatedsize:
+                    # just written to, import it now rather than on its next change
+                    self.updatedsize[f] = 0
+                    self.updatedtime[f] = 0
                 if f in self.updatedsize: # we should be able to assume that if we're in size, we're in time as well
                     if stat_info.st_size > self.updatedsize[f] or stat_info.st_mtime > self.updatedtime[f]:
                         try:
@@ -380,9 +529,19 @@ class Importer:
                                 self.caller.addText("\n"+os.path.basename(f))
                         except KeyError:
                             log.error("File '%s' seems to have disappeared" % f)
-                        (stored, duplicates, partial, errors, ttime) = self._import_despatch(self.filelist[f])
-                        self.logImport('auto', f, stored, duplicates, partial, errors, ttime, self.filelist[f].fileId)
-                        self.database.commit()
+                        before = self.profile.copy()
+                        try:
+                            (stored, duplicates, partial, errors, ttime) = self._import_despatch(self.filelist[f])
+                            self.logImport('auto', f, stored, duplicates, partial, errors, ttime, self.filelist[f].fileId,
+                                           self.profile.since(before))
+                            self.database.commit()
+                        except:
+                            # skipped until it is written to again, the other files are still imported
+                            log.error(_("Importer.runUpdated: '%r' Fatal error: '%r'") % (f, traceback.format_exc()))
+                            self.database.rollback()
+                            self.updatedsize[f] = stat_info.st_size
+                            self.updatedtime[f] = time()
+                            continue
                         try:
                             if not os.path.isdir(f): # Note: This assumes that whatever calls us has an "addText" func
                                 self.caller.addText(" %d stored, %d duplicates, %d partial, %d errors (time = %f)" % (stored, duplicates, partial, errors, ttime))
@@ -408,9 +567,10 @@ class Importer:
         self.database.rollback()
         self.runPostImport()
 
-    def _import_hh_file(self, fpdbfile):
+    def _import_hh_file(self, fpdbfile, parsed = None):
         """Function for actual import of a hh file
-            This is now an internal function that should not be called directly."""
+            This is now an internal function that should not be called directly.
+            parsed: a ParsedFile from _parse_hh_worker, the file is then only stored"""
 
         (stored, duplicates, partial, errors, ttime) = (0, 0, 0, 0, time())
 
@@ -420,17 +580,34 @@ class Importer:
         filter_name = fpdbfile.site.filter_name
         mod = __import__(fpdbfile.site.hhc_fname)
         obj = getattr(mod, filter_name, None)
+        if parsed is not None and parsed.failed:
+            log.warning(_("Parse process failed on %s, importing it again in this process") % fpdbfile.path)
+            parsed = None
         if callable(obj):
             
             if fpdbfile.path in self.pos_in_file:  idx = self.pos_in_file[fpdbfile.path]
             else: self.pos_in_file[fpdbfile.path], idx = 0, 0
-                
-            hhc = obj( self.config, in_path = fpdbfile.path, index = idx, autostart=False
-                      ,starsArchive = fpdbfile.archive
-                      ,ftpArchive   = fpdbfile.archive
-                      ,sitename     = fpdbfile.site.name)
-            hhc.setAutoPop(self.mode=='auto')
-            hhc.start()
+            
+            if parsed is not None:
+                hhc = parsed
+                if parsed.profile is not None:
+                    self.profile.merge(parsed.profile)
+            else:
+                hhc = obj( self.config, in_path = fpdbfile.path, index = idx, autostart=False
+                          ,starsArchive = fpdbfile.archive
+                          ,ftpArchive   = fpdbfile.archive
+                          ,sitename     = fpdbfile.site.name)
+                hhc.setAutoPop(self.mode=='auto')
+                hhc.setProfile(self.profile)
+                if self.mode == 'auto':
+                    offset, kodec = self.tail_offsets.get(fpdbfile.path, (0, None))
+                    if os.path.getsize(fpdbfile.path) < offset:
+                        # truncated or replaced, start again
+                        offset, kodec = 0, None
+                    hhc.setTailOffset(offset, kodec)
+                hhc.start()
+                if hhc.getLastByteRead() is not None:
+                    self.tail_offsets[fpdbfile.path] = (hhc.getLastByteRead(), hhc.kodec)
             
             self.pos_in_file[file] = hhc.getLastCharacterRead()
             #Tally the results
@@ -449,40 +626,38 @@ class Importer:
                 self.database.resetBulkCache()
                 
                 ####Lock Placeholder####
+                stime = time()
                 for hand in handlist:
+                    if parsed is not None:
+                        hand.config = self.config
                     hand.prepInsert(self.database, printtest = self.settings['testData'])
                     ahands.append(hand)
+                self.profile.add('prepInsert', time() - stime, len(handlist))
                 self.database.commit()
                 ####Lock Placeholder####
                 
+                stime = time()
                 for hand in ahands:
-                    hand.assembleHand()
+                    if parsed is not None:
+                        hand.remapIds() # already assembled by the parse process
+                    else:
+                        hand.assembleHand()
                     phands.append(hand)
+                self.profile.add('remapIds' if parsed is not None else 'assembleHand', time() - stime, len(ahands))
                 
                 ####Lock Placeholder####
                 backtrack = False
                 id = self.database.nextHandId()
-                sctimer, ihtimer, cctimer, pctimer, hctimer = 0,0,0,0,0
                 for i in range(len(phands)):
                     doinsert = len(phands)==i+1
                     hand = phands[i]
                     try:
                         id = hand.getHandId(self.database, id)
-                        stime = time()
                         hand.updateSessionsCache(self.database, None, doinsert)
-                        sctimer += time() - stime
-                        stime = time()
                         hand.insertHands(self.database, fpdbfile.fileId, doinsert, self.settings['testData'])
-                        ihtimer = time() - stime
-                        stime = time()
                         hand.updateCardsCache(self.database, None, doinsert)
-                        cctimer = time() - stime
-                        stime = time()
                         hand.updatePositionsCache(self.database, None, doinsert) 
-                        pctimer = time() - stime
-                        stime = time()
                         hand.updateHudCache(self.database, doinsert)
-                        hctimer = time() - stime
                         ihands.append(hand)
                         to_hud.append(hand.dbid_hands)
                     except FpdbHandDuplicate:
@@ -510,9 +685,6 @@ class Importer:
                         hand.updatePositionsCache(self.database, None, doinsert)
                         hand.updateHudCache(self.database, doinsert)
                         hand.handsplayers, hand.hero = hp, hero
-                #log.debug("DEBUG: hand.updateSessionsCache: %s" % (t5tot))
-                #log.debug("DEBUG: hand.insertHands: %s" % (t6tot))
-                #log.debug("DEBUG: hand.updateHudCache: %s" % (t7tot))
                 self.database.commit()
                 ####Lock Placeholder####
                 
@@ -522,7 +694,15 @@ class Importer:
                     hand.insertHandsPlayers(self.database, doinsert, self.settings['testData'])
                     hand.insertHandsActions(self.database, doinsert, self.settings['testData'])
                     hand.insertHandsStove(self.database, doinsert)
+                    self.rawHands.add(hand.dbid_hands, hand.handText, hand.siteId)
+                self.rawHands.flush()
                 self.database.commit()
+                ReportCache.invalidate(self.config)
+                if self.archive is not None:
+                    stime = time()
+                    for hand in ihands:
+                        self.archive.addHand(self.database, hand)
+                    self.profile.add('archive', time() - stime, len(ihands))
 
                 #pipe the Hands.id out to the HUD
                 if self.callHud:
@@ -536,6 +716,10 @@ class Importer:
                 # with only an Importer objec
                 if self.settings['cacheHHC']:
                     self.handhistoryconverter = hhc
+            for handText in hhc.failedHands:
+                self.rawHands.add(0, handText, fpdbfile.site.siteId, complain=True)
+            if self.rawHands.flush():
+                self.database.commit()
         elif (self.mode=='auto'):
             return (0, 0, partial, errors, time() - ttime)
         
@@ -572,20 +756,29 @@ class Importer:
                     conv = obj(db=self.database, config=self.config, siteName=fpdbfile.site.name, summaryText=summaryText, in_path = fpdbfile.path, header=summaryTexts[0])
                     self.database.resetBulkCache(False)
                     conv.insertOrUpdate(printtest = self.settings['testData'])
-                except Exceptions.FpdbHandPartial, e:
+                    self.rawTourneys.add(conv.tourneyId, summaryText, fpdbfile.site.siteId)
+                except FpdbHandPartial, e:
                     partial += 1
                 except FpdbParseError, e:
                     log.error(_("Summary import parse error in file: %s") % fpdbfile.path)
+                    self.rawTourneys.add(0, summaryText, fpdbfile.site.siteId, complain=True)
                     errors += 1
                 if j != 1:
                     print _("Finished importing %s/%s tournament summaries") %(j, len(summaryTexts))
                 imported = j
+            if self.rawTourneys.flush():
+                self.database.commit()
+            if imported:
+                ReportCache.invalidate(self.config)
             ####Lock Placeholder####
         ttime = time() - ttime
         return (imported - errors - partial, duplicates, partial, errors, ttime)
 
     def progressNotify(self):
         "A callback to the interface while events are pending"
+        if hasattr(self.caller, 'progressNotify'):
+            # e.g. the auto import worker, which must not run the gtk main loop
+            return self.caller.progressNotify()
         while gtk.events_pending():
             gtk.main_iteration(False)
             
@@ -619,6 +812,72 @@ class Importer:
                     log.warn(_("TourneyImport: Removing text < 100 characters from start of file"))
         return summaryTexts 
         
+class ParsedFile:
+    """The outcome of parsing one hh file in a parse process. Carries the parts
+       of the HandHistoryConverter that Importer._import_hh_file reads, the
+       hands are already assembled but still keyed by player name"""
+    def __init__(self, path):
+        self.path = path
+        self.failed = False
+        self.numHands = 0
+        self.numPartial = 0
+        self.numErrors = 0
+        self.index = 0
+        self.summaryInFile = False
+        self.processedHands = []
+        self.failedHands = []   # texts of the hands that failed to parse
+        self.profile = None     # the ImportProfile of reading, parsing and assembling the file
+
+    def getLastCharacterRead(self):
+        return self.index
+
+    def getProcessedHands(self):
+        return self.processedHands
+
+# Each parse process keeps its own copy of the Config, handed over once by the pool
+_worker_config = None
+
+def _parse_worker_init(config):
+    global _worker_config
+    _worker_config = config
+
+def _parse_hh_worker(job):
+    """Parse a hh file and derive the stats of its hands. Runs in a parse process
+       so it must not touch the database: player names stand in for the db ids
+       and are replaced by Hand.remapIds once the writer has run prepInsert"""
+    (path, hhc_fname, filter_name, sitename, archive, idx) = job
+    parsed = ParsedFile(path)
+    try:
+        mod = __import__(hhc_fname)
+        obj = getattr(mod, filter_name, None)
+        if callable(obj):
+            hhc = obj( _worker_config, in_path = path, index = idx, autostart=False
+                      ,starsArchive = archive
+                      ,ftpArchive   = archive
+                      ,sitename     = sitename)
+            hhc.setAutoPop(False)
+            profile = ImportProfile.ImportProfile()
+            hhc.setProfile(profile)
+            hhc.start()
+            parsed.numHands = hhc.numHands
+            parsed.numPartial = hhc.numPartial
+            parsed.numErrors = hhc.numErrors
+            parsed.index = hhc.getLastCharacterRead()
+            parsed.summaryInFile = hhc.summaryInFile
+            parsed.failedHands = hhc.failedHands
+            stime = time()
+            for hand in hhc.getProcessedHands():
+                hand.assembleDetached()
+                hand.config = None # the writer has its own, no need to pickle it back
+                parsed.processedHands.append(hand)
+            profile.add('assembleHand', time() - stime, len(parsed.processedHands))
+            parsed.profile = profile
+    except:
+        log.error(_("Importer._parse_hh_worker: '%r' Fatal error: '%r'") % (path, traceback.format_exc()))
+        parsed = ParsedFile(path)
+        parsed.failed = True
+    return parsed
+
 class ProgressBar:
 
     """
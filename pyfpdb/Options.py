@@ -78,6 +78,14 @@ def fpdb_options():
                       help=_("Start Minimized"))
     parser.add_option("--hidden", action="store_true", dest="hidden",
                       help=_("Start Hidden"))
+    parser.add_option("--profile", dest="profile", metavar="FILE", default=None,
+                      help=_("Write where the time of the import went to FILE, as JSON"))
+    parser.add_option("--fromArchive", action="store_true", dest="fromArchive", default=False,
+                      help=_("Store the hands of the archive again instead of importing a file"))
+    parser.add_option("--fromRawHands", action="store_true", dest="fromRawHands", default=False,
+                      help=_("Parse the hands kept in RawHands again instead of importing a file"))
+    parser.add_option("--handIds", dest="handIds", metavar="MIN:MAX", default=None,
+                      help=_("Range of the hand ids stored or parsed again, all the hands by default"))
 
 
     (options, argv) = parser.parse_args()
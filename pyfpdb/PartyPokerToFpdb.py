@@ -159,6 +159,10 @@ class PartyPoker(HandHistoryConverter):
     re_GameStartLine = re.compile('Game\s\#\d+\sstarts', re.MULTILINE)
     re_PreliminaryHand = re.compile(r"Buy-in  - ")
     re_emailedHand = re.compile(r'\*\*\sSummary\s\*\*')
+    re_SplitTest = re.compile(r"(joined the table|left the table|is sitting out)")
+    re_JoiningPlayers = re.compile(r"(?P<PLAYERNAME>.+?) has joined the table")
+    re_BBPostingPlayers = re.compile(r"(?P<PLAYERNAME>.+?) posts big blind", re.MULTILINE)
+    re_LeavingPlayers = re.compile(r"(?P<PLAYERNAME>.+?) has left the table")
 
     def allHandsAsList(self):
         list = HandHistoryConverter.allHandsAsList(self)
@@ -175,44 +179,44 @@ class PartyPoker(HandHistoryConverter):
                 'CUR': hand.gametype['currency'] if hand.gametype['currency']!='T$' else '(chips|)',
                 'BRAX' : u"\[\(\)\]"
                     }
-            self.re_PostSB = re.compile(
+            self.re_PostSB = self.compileRegex(
                 r"%(PLYR)s posts small blind [%(BRAX)s]?%(CUR_SYM)s?(?P<SB>[.,0-9]+)\s*(%(CUR)s)?[%(BRAX)s]?\.?\s*$"
                 %  subst, re.MULTILINE)
-            self.re_PostBB = re.compile(
+            self.re_PostBB = self.compileRegex(
                 r"%(PLYR)s posts big blind [%(BRAX)s]?%(CUR_SYM)s?(?P<BB>[.,0-9]+)\s*(%(CUR)s)?[%(BRAX)s]?\.?\s*$"
                 %  subst, re.MULTILINE)
-            self.re_PostDead = re.compile(
+            self.re_PostDead = self.compileRegex(
                 r"%(PLYR)s posts big blind \+ dead [%(BRAX)s]?%(CUR_SYM)s?(?P<BBNDEAD>[.,0-9]+)\s*%(CUR_SYM)s?[%(BRAX)s]?\.?\s*$" %  subst,
                 re.MULTILINE)
-            self.re_Antes = re.compile(
+            self.re_Antes = self.compileRegex(
                 r"%(PLYR)s posts ante [%(BRAX)s]?%(CUR_SYM)s(?P<ANTE>[.,0-9]+)\s*%(CUR)s[%(BRAX)s]?\.?\s*$" %  subst,
                 re.MULTILINE)
-            self.re_HeroCards = re.compile(
+            self.re_HeroCards = self.compileRegex(
                 r"Dealt to %(PLYR)s \[\s*(?P<NEWCARDS>.+)\s*\]" % subst,
                 re.MULTILINE)
-            self.re_Action = re.compile(u"""
+            self.re_Action = self.compileRegex(u"""
                 (?P<PNAME>.+?)\s(?P<ATYPE>bets|checks|raises|completes|bring-ins|calls|folds|is\sall-In|double\sbets)
                 (?:\s*[%(BRAX)s]?\s?%(CUR_SYM)s?(?P<BET>[.,\d]+)\s*(%(CUR)s)?\s?[%(BRAX)s]?)?
                 (\sto\s[.,\d]+)?
                 \.?\s*$""" %  subst, re.MULTILINE|re.VERBOSE)
             if not hand.emailedHand:
-                self.re_ShownCards = re.compile(
+                self.re_ShownCards = self.compileRegex(
                     r"%s (?P<SHOWED>(?:doesn\'t )?shows?) "  %  player_re +
                     r"\[ *(?P<CARDS>.+) *\](?P<COMBINATION>.+)\.",
                     re.MULTILINE)
             else:
                 #Michow111 balance $113, bet $50, collected $110.25, net +$60.25 [ 8h 9h ] [ a straight, seven to jack -- Jc,Td,9h,8h,7c ]
                 #babunchik balance $0, lost $50 [ Kd Js ] [ a pair of jacks -- Kd,Js,Jc,Td,7c ]
-                self.re_ShownCards = re.compile(
+                self.re_ShownCards = self.compileRegex(
                     r"%(PLYR)s balance.*"  %  subst +
                     r"\[ (?P<CARDS>.+) \] *\[ *(?P<COMBINATION>.+) \-\-",
                     re.MULTILINE)
             if not hand.emailedHand:
-                self.re_CollectPot = re.compile(
+                self.re_CollectPot = self.compileRegex(
                     r"""%(PLYR)s\s+wins\s+(Lo\s\()?%(CUR_SYM)s?(?P<POT>[.,\d]+)\s*(%(CUR)s)?\)?""" %  subst,
                     re.MULTILINE|re.VERBOSE)
             else:
-                self.re_CollectPot = re.compile(
+                self.re_CollectPot = self.compileRegex(
                     r"""%(PLYR)s(\sbalance\s%(CUR_SYM)s?[.,\d]+,)(\sbet\s%(CUR_SYM)s?[.,\d]+,)(\scollected\s%(CUR_SYM)s?(?P<POT>[.,\d]+),)""" %  subst,
                     re.MULTILINE|re.VERBOSE)
 
@@ -456,7 +460,7 @@ class PartyPoker(HandHistoryConverter):
             if hand.emailedHand:
                 
                 subst = {'PLYR': re.escape(a.group('PNAME')), 'SPACENAME': "\s(.+)? "}
-                re_PlayerName = re.compile(
+                re_PlayerName = self.compileRegex(
                         r"""^%(PLYR)s(?P<PNAMEEXTRA>%(SPACENAME)s)balance\s""" %  subst,
                         re.MULTILINE|re.VERBOSE)
                 m1 = re_PlayerName.search(hand.handText)
@@ -483,15 +487,10 @@ class PartyPoker(HandHistoryConverter):
                     if i>10: break
                 return startSeat
             
-            re_SplitTest = re.compile(r"(joined the table|left the table|is sitting out)")
-            re_JoiningPlayers = re.compile(r"(?P<PLAYERNAME>.+?) has joined the table")
-            re_BBPostingPlayers = re.compile(r"(?P<PLAYERNAME>.+?) posts big blind", re.MULTILINE)
-            re_LeavingPlayers = re.compile(r"(?P<PLAYERNAME>.+?) has left the table")
-
-            match_JoiningPlayers = re_JoiningPlayers.findall(hand.handText)
-            match_LeavingPlayers = re_LeavingPlayers.findall(hand.handText)
+            match_JoiningPlayers = self.re_JoiningPlayers.findall(hand.handText)
+            match_LeavingPlayers = self.re_LeavingPlayers.findall(hand.handText)
             match_BBPostingPlayers = []
-            m = re_BBPostingPlayers.finditer(re_SplitTest.split(hand.handText)[-1])
+            m = self.re_BBPostingPlayers.finditer(self.re_SplitTest.split(hand.handText)[-1])
             for player in m:
                 match_BBPostingPlayers.append(player.group('PLAYERNAME'))
 
@@ -102,22 +102,22 @@ class Pkr(HandHistoryConverter):
             self.compiledPlayers = players
             player_re = "(?P<PNAME>" + "|".join(map(re.escape, players)) + ")"
             subst = {'PLYR': player_re, 'CUR': self.sym[hand.gametype['currency']], 'NUM' : u".,\d",}
-            self.re_PostSB    = re.compile(r"^%(PLYR)s posts small blind \(%(CUR)s(?P<SB>[%(NUM)s]+)\)" %  subst, re.MULTILINE)
+            self.re_PostSB    = self.compileRegex(r"^%(PLYR)s posts small blind \(%(CUR)s(?P<SB>[%(NUM)s]+)\)" %  subst, re.MULTILINE)
             # FIXME: Sionel posts $0.04 is a second big blind in a different format.
-            self.re_PostBB    = re.compile(r"^%(PLYR)s posts (big blind \()?%(CUR)s(?P<BB>[%(NUM)s]+)\)?" %  subst, re.MULTILINE)
-            self.re_Antes     = re.compile(r"^%(PLYR)s posts ante of %(CUR)s(?P<ANTE>[%(NUM)s]+)" % subst, re.MULTILINE)
-            self.re_BringIn   = re.compile(r"^%(PLYR)s brings[- ]in( low|) for %(CUR)s(?P<BRINGIN>[%(NUM)s]+)" % subst, re.MULTILINE)
-            self.re_PostBoth  = re.compile(r"^%(PLYR)s posts small \& big blinds %(CUR)s(?P<SBBB>[%(NUM)s]+)" %  subst, re.MULTILINE)
-            self.re_PostDead  = re.compile(r"^%(PLYR)s posts %(CUR)s(?P<SB>[%(NUM)s]+) dead" %  subst, re.MULTILINE)
-            self.re_HeroCards = re.compile(r"^Dealing( (?P<OLDCARDS>\[.+\]))?( (?P<NEWCARDS>\[.+\])) to %(PLYR)s" % subst, re.MULTILINE)
-            self.re_Action    = re.compile(r"""
+            self.re_PostBB    = self.compileRegex(r"^%(PLYR)s posts (big blind \()?%(CUR)s(?P<BB>[%(NUM)s]+)\)?" %  subst, re.MULTILINE)
+            self.re_Antes     = self.compileRegex(r"^%(PLYR)s posts ante of %(CUR)s(?P<ANTE>[%(NUM)s]+)" % subst, re.MULTILINE)
+            self.re_BringIn   = self.compileRegex(r"^%(PLYR)s brings[- ]in( low|) for %(CUR)s(?P<BRINGIN>[%(NUM)s]+)" % subst, re.MULTILINE)
+            self.re_PostBoth  = self.compileRegex(r"^%(PLYR)s posts small \& big blinds %(CUR)s(?P<SBBB>[%(NUM)s]+)" %  subst, re.MULTILINE)
+            self.re_PostDead  = self.compileRegex(r"^%(PLYR)s posts %(CUR)s(?P<SB>[%(NUM)s]+) dead" %  subst, re.MULTILINE)
+            self.re_HeroCards = self.compileRegex(r"^Dealing( (?P<OLDCARDS>\[.+\]))?( (?P<NEWCARDS>\[.+\])) to %(PLYR)s" % subst, re.MULTILINE)
+            self.re_Action    = self.compileRegex(r"""
                         ^%(PLYR)s(?P<ATYPE>\sbets|\schecks|\sraises|\scalls|\sfolds)(\sto)?
                         (\s(%(CUR)s)?(?P<BET>[%(NUM)s]+))?(\s\(all\-in\))?\s*$
                         """ %  subst, re.MULTILINE|re.VERBOSE)
-            self.re_ShowdownAction   = re.compile(r"^%(PLYR)s shows (?P<CARDS>\[.+\])" % subst, re.MULTILINE)
-            self.re_CollectPot       = re.compile(r"^%(PLYR)s (ties( side pot \#\d)?, and )?wins %(CUR)s(?P<POT>[%(NUM)s]+)" %  subst, re.MULTILINE)
-            self.re_sitsOut          = re.compile("^%s sits out" %  player_re, re.MULTILINE)
-            self.re_ShownCards       = re.compile("^Seat (?P<SEAT>[0-9]+): %s (\(.*\) )?(?P<SHOWED>showed|mucked) (?P<CARDS>\[.+\])" %  player_re, re.MULTILINE)
+            self.re_ShowdownAction   = self.compileRegex(r"^%(PLYR)s shows (?P<CARDS>\[.+\])" % subst, re.MULTILINE)
+            self.re_CollectPot       = self.compileRegex(r"^%(PLYR)s (ties( side pot \#\d)?, and )?wins %(CUR)s(?P<POT>[%(NUM)s]+)" %  subst, re.MULTILINE)
+            self.re_sitsOut          = self.compileRegex("^%s sits out" %  player_re, re.MULTILINE)
+            self.re_ShownCards       = self.compileRegex("^Seat (?P<SEAT>[0-9]+): %s (\(.*\) )?(?P<SHOWED>showed|mucked) (?P<CARDS>\[.+\])" %  player_re, re.MULTILINE)
 
     def readSupportedGames(self):
         return [["ring", "hold", "nl"],
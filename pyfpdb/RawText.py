@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""The text of the hands and tournament summaries imported, kept in RawHands and RawTourneys.
+
+What is kept follows the raw_hands and raw_tourneys sections of the config:
+save="all" keeps every hand (summary) stored, save="error" only those that
+failed to parse, with complain set. Each text is its own row, so a hand can be
+read back by its id, and is compressed on its own as compression says: "bzip2"
+with bz2, "gzip" with zlib. A hand compresses about 2x on its own, but the hands
+of a site share most of their lines, so once enough of them have been seen
+(DICTIONARY_SIZE characters) the recent ones are kept in the table as the
+site's dictionary, a row of its own with the site id negated as hand id, and
+zlib is primed with it: that is more like 4.5x. The compressed bytes are
+base64 encoded behind a marker, the columns being TEXT, and rows written before
+compression was turned on stay plain text.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+import base64
+import bz2
+import zlib
+
+import logging
+# logging has been set up in fpdb.py or HUD_main.py, use their settings:
+log = logging.getLogger("importer")
+
+DICTIONARY_SIZE = 16384     # characters of recent texts a site's dictionary is made of
+FETCH_SIZE = 1000           # rows read at a time by RawStore.texts
+MARKER = u'\x02'            # starts a compressed text, then the codec: ZLIB, DICTIONARY or BZIP2
+ZLIB, DICTIONARY, BZIP2 = u'z', u'd', u'b'
+
+# the columns of the id and text in each table
+COLUMNS = {
+    'RawHands'    : ('handId', 'rawHand'),
+    'RawTourneys' : ('tourneyId', 'rawTourney'),
+}
+
+
+class Dictionary:
+    """zlib primed with text, as a preset dictionary would (zdict is python 3 only):
+       the compressor and decompressor have been through text before each hand, so
+       the hand's lines are found in it. Copies of them are used for each text"""
+
+    def __init__(self, text):
+        self.text = text
+        self.compressor = zlib.compressobj(9)
+        prefix = self.compressor.compress(text.encode('utf-8'))
+        prefix += self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.decompressor = zlib.decompressobj()
+        self.decompressor.decompress(prefix)
+
+    def compress(self, data):
+        c = self.compressor.copy()
+        return c.compress(data) + c.flush()
+
+    def decompress(self, data):
+        d = self.decompressor.copy()
+        return d.decompress(data) + d.flush()
+
+def train(texts, size=DICTIONARY_SIZE):
+    """The dictionary text of texts: the most recent size characters of them"""
+    parts, length = [], 0
+    for text in reversed(texts):
+        if length >= size:
+            break
+        parts.append(text)
+        length += len(text)
+    return u''.join(reversed(parts))[-size:]
+
+def encode(text, compression, dictionary=None):
+    """text as stored with compression, a Config value. dictionary is a
+       (row id, Dictionary) pair, used by "gzip" when given"""
+    data = text.encode('utf-8')
+    if compression == "bzip2":
+        codec, data = BZIP2, bz2.compress(data)
+    elif compression == "gzip" and dictionary is not None:
+        codec, data = u'%s%d:' % (DICTIONARY, dictionary[0]), dictionary[1].compress(data)
+    elif compression == "gzip":
+        codec, data = ZLIB, zlib.compress(data, 9)
+    else:
+        return text
+    return MARKER + codec + base64.b64encode(data).decode('ascii')
+
+def decode(stored, dictionary=None):
+    """The text of stored, as encode made it. dictionary is a function of the row id
+       of a dictionary returning its Dictionary"""
+    if not stored.startswith(MARKER):
+        return stored
+    codec, data = stored[1], stored[2:]
+    if codec == DICTIONARY:
+        rowid, data = data.split(u':', 1)
+        data = dictionary(int(rowid)).decompress(base64.b64decode(data))
+    elif codec == ZLIB:
+        data = zlib.decompress(base64.b64decode(data))
+    elif codec == BZIP2:
+        data = bz2.decompress(base64.b64decode(data))
+    else:
+        raise ValueError(_("Unknown raw text codec %r") % codec)
+    return data.decode('utf-8')
+
+
+class RawStore:
+    """The texts of table (RawHands or RawTourneys) as the config's settings for it
+       say: add them while importing, flush them with the rest of the file"""
+
+    def __init__(self, db, table, settings):
+        self.db = db
+        self.table = table
+        self.save = settings.save
+        self.compression = settings.compression
+        self.idColumn, self.textColumn = COLUMNS[table]
+        self.rows = []          # (id, text, siteId, complain) waiting for flush
+        self.samples = {}       # siteId -> recent texts, until the site has a dictionary
+        self.dictionaries = {}  # siteId -> (row id, Dictionary) texts are compressed with, None if none yet
+        self.loaded = {}        # row id -> Dictionary, of the texts read
+
+    def query(self, name):
+        return (self.db.sql.compiled[name].replace('<table>', self.table)
+                .replace('<id>', self.idColumn).replace('<text>', self.textColumn))
+
+    def wanted(self, complain):
+        return self.save == "all" or (self.save == "error" and complain)
+
+    def add(self, id, text, siteId, complain=False):
+        """Keep text, of hand (tourney) id or 0 if it failed to parse, at the next flush"""
+        if text and self.wanted(complain):
+            self.rows.append((id, text, siteId, complain))
+
+    def flush(self):
+        """Store the texts added, in the transaction of the caller. Returns how many"""
+        if not self.rows:
+            return 0
+        c = self.db.get_cursor()
+        values = []
+        for (id, text, siteId, complain) in self.rows:
+            values.append((id, encode(text, self.compression, self.dictionary(c, siteId, text)), complain))
+        self.db.executemany(c, self.query('store_raw_text'), values)
+        self.rows = []
+        return len(values)
+
+    def dictionary(self, c, siteId, text):
+        """The (row id, Dictionary) of the site, stored in the table once text and
+           the texts before it are enough to make one, None until then"""
+        if self.compression != "gzip":
+            return None
+        if siteId not in self.dictionaries:
+            c.execute(self.query('get_raw_dictionary'), (-siteId,))
+            row = c.fetchone()
+            self.dictionaries[siteId] = row and (row[0], Dictionary(row[1]))
+        if self.dictionaries[siteId] is None:
+            samples = self.samples.setdefault(siteId, [])
+            samples.append(text)
+            if sum([len(t) for t in samples]) < DICTIONARY_SIZE:
+                return None
+            dictionary = train(samples)
+            c.execute(self.query('store_raw_text'), (-siteId, dictionary, False))
+            self.dictionaries[siteId] = (self.db.get_last_insert_id(c), Dictionary(dictionary))
+            del self.samples[siteId]
+            log.info(_("Stored the %s dictionary of site %d") % (self.table, siteId))
+        return self.dictionaries[siteId]
+
+    def loadDictionary(self, rowid):
+        dictionary = self.loaded.get(rowid)
+        if dictionary is None:
+            c = self.db.get_cursor()
+            c.execute(self.query('get_raw_text'), (rowid,))
+            dictionary = self.loaded[rowid] = Dictionary(c.fetchone()[0])
+        return dictionary
+
+    def texts(self, ids=None):
+        """(id, text) of the texts stored that parsed, for the ids in the range ids,
+           a (min, max) pair or None for all, in the order stored. Read FETCH_SIZE
+           rows at a time, so the table is never all in memory"""
+        (low, high) = ids or (1, 2**63 - 1)
+        c = self.db.get_cursor()
+        q = self.query('get_raw_texts')
+        last = 0
+        while True:
+            c.execute(q, (last, low, high, FETCH_SIZE))
+            rows = c.fetchall()
+            for (rowid, id, stored) in rows:
+                yield (id, decode(stored, self.loadDictionary))
+            if len(rows) < FETCH_SIZE:
+                break
+            last = rows[-1][0]
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""Compiled regular expressions shared by all the hand history converters.
+
+The converters build the regexes that match player names (compilePlayerRegexs)
+each time the players at the table change, and a converter is created for each
+file, so the same patterns were compiled over and over: the re module only keeps
+100 patterns and throws them all away when it is full. Here the compiled
+patterns are kept for the life of the process, the least recently used dropped
+past MAX_PATTERNS. The pattern text holds the player names, so it is the key.
+The hits, misses and time spent compiling are counted for each converter.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+import re
+import threading
+from time import time
+from collections import OrderedDict
+
+MAX_PATTERNS = 5000     # compiled patterns kept at most
+
+
+class RegexCache:
+
+    def __init__(self, size=MAX_PATTERNS):
+        self.size = size
+        self.patterns = OrderedDict()   # (pattern, flags) -> compiled regex, least recently used first
+        self.stats = {}                 # owner -> [hits, misses, seconds spent compiling]
+        self.lock = threading.Lock()
+
+    def compile(self, pattern, flags=0, owner=None):
+        """The compiled regex of pattern, compiled only if not already in the cache.
+           owner is the name the lookup is counted under"""
+        key = (pattern, flags)
+        with self.lock:
+            stats = self.stats.get(owner)
+            if stats is None:
+                stats = self.stats[owner] = [0, 0, 0.0]
+            regex = self.patterns.pop(key, None)
+            if regex is None:
+                start = time()
+                regex = re.compile(pattern, flags)
+                stats[1] += 1
+                stats[2] += time() - start
+                if len(self.patterns) >= self.size:
+                    self.patterns.popitem(last=False)
+            else:
+                stats[0] += 1
+            self.patterns[key] = regex
+        return regex
+
+    def hitRate(self, owner=None):
+        """Fraction of the lookups of owner (of all if None) found in the cache"""
+        if owner is None:
+            counts = self.stats.values()
+        else:
+            counts = [self.stats.get(owner, [0, 0, 0.0])]
+        hits = sum([c[0] for c in counts])
+        lookups = hits + sum([c[1] for c in counts])
+        if lookups == 0:
+            return 0.0
+        return float(hits) / lookups
+
+    def report(self):
+        """One line per owner: lookups, hit rate and time spent compiling"""
+        lines = []
+        for owner in sorted(self.stats):
+            hits, misses, seconds = self.stats[owner]
+            lines.append(_("%s regexes: %d lookups, %.1f%% hits, %.3f s compiling")
+                         % (owner, hits + misses, 100 * self.hitRate(owner), seconds))
+        return "\n".join(lines)
+
+    def clear(self):
+        with self.lock:
+            self.patterns.clear()
+            self.stats.clear()
+
+
+_cache = RegexCache()
+
+def compile(pattern, flags=0, owner=None):
+    """The compiled regex of pattern from the process wide cache"""
+    return _cache.compile(pattern, flags, owner)
+
+def hitRate(owner=None):
+    return _cache.hitRate(owner)
+
+def report():
+    return _cache.report()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""Results of the report queries of the GUI tabs, kept until hands are imported.
+
+The stats, positional stats, tourney stats and graph tabs run their aggregate
+queries again on each Refresh. A query is built from the Filters selection, so
+its text (and parameters) stands for the selection: the result is kept under it
+and the database's generation, the highest Hands, Tourneys and TourneysPlayers
+ids, which a new import changes whichever process made it. The Importer clears
+the cache too once it has stored hands or summaries, as updates to existing
+rows leave the generation as it is, and so does the Database once it has
+rebuilt the caches of the hands, recreated the tables or restored a dump. Results are kept in memory up to MAX_BYTES
+and on disk, in a directory next to the config file, up to MAX_DISK_BYTES, the
+least recently used dropped first.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+import os
+import threading
+import hashlib
+import cPickle
+from collections import OrderedDict
+
+import logging
+# logging has been set up in fpdb.py or HUD_main.py, use their settings:
+log = logging.getLogger("db")
+
+MAX_BYTES = 64 * 1024 * 1024         # pickled size of the results kept in memory at most
+MAX_DISK_BYTES = 256 * 1024 * 1024   # size of the result files kept on disk at most
+SUFFIX = '.rc'
+
+
+class ReportCache:
+
+    def __init__(self, path=None, size=MAX_BYTES, diskSize=MAX_DISK_BYTES):
+        self.path = path            # directory of the result files, None to keep them in memory only
+        self.size = size
+        self.diskSize = diskSize
+        self.results = OrderedDict()    # key -> (result, pickled size), least recently used first
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def generation(self, db):
+        c = db.get_cursor()
+        c.execute(db.sql.query['get_report_generation'])
+        return tuple(c.fetchone())
+
+    def key(self, db, name, query, params):
+        return hashlib.sha1(cPickle.dumps((db.host, db.database, self.generation(db), name, query, params),
+                                          cPickle.HIGHEST_PROTOCOL)).hexdigest()
+
+    def cached(self, db, name, query, compute, params=None):
+        """The result of compute(), which runs query (with params), from the cache if the
+           database has not changed since it was last computed. name tells apart
+           results computed differently from the same query"""
+        key = self.key(db, name, query, params)
+        with self.lock:
+            entry = self.results.pop(key, None)
+            if entry is not None:
+                self.results[key] = entry
+                self.hits += 1
+                return entry[0]
+        data = self.readFile(key)
+        found = data is not None
+        if found:
+            result = cPickle.loads(data)
+        else:
+            result = compute()
+            data = cPickle.dumps(result, cPickle.HIGHEST_PROTOCOL)
+            self.writeFile(key, data)
+        with self.lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.add(key, result, len(data))
+        return result
+
+    def query(self, db, cursor, query, params=None):
+        """(column names, rows) of query, run on cursor unless cached"""
+        def compute():
+            if params is None:
+                cursor.execute(query)
+            else:
+                cursor.execute(query, params)
+            rows = cursor.fetchall()
+            return ([desc[0] for desc in cursor.description], list(rows))
+        return self.cached(db, 'rows', query, compute, params)
+
+    def add(self, key, result, size):
+        if key in self.results:
+            self.used -= self.results.pop(key)[1]
+        if size > self.size:
+            return
+        while self.used + size > self.size:
+            self.used -= self.results.popitem(last=False)[1][1]
+        self.results[key] = (result, size)
+        self.used += size
+
+    def fileName(self, key):
+        return os.path.join(self.path, key + SUFFIX)
+
+    def readFile(self, key):
+        """The pickled result of key on disk, None if there is none. Reading it
+           counts as its last use"""
+        if self.path is None:
+            return None
+        try:
+            f = open(self.fileName(key), 'rb')
+            try:
+                data = f.read()
+            finally:
+                f.close()
+            os.utime(self.fileName(key), None)
+            return data
+        except (IOError, OSError):
+            return None
+
+    def writeFile(self, key, data):
+        """Keep data on disk, removing the least recently used files past diskSize"""
+        if self.path is None or len(data) > self.diskSize:
+            return
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            f = open(self.fileName(key), 'wb')
+            try:
+                f.write(data)
+            finally:
+                f.close()
+            files = []
+            for name in os.listdir(self.path):
+                if name.endswith(SUFFIX):
+                    st = os.stat(os.path.join(self.path, name))
+                    files.append((st.st_mtime, st.st_size, name))
+            used = sum([f[1] for f in files])
+            for (mtime, size, name) in sorted(files):
+                if used <= self.diskSize:
+                    break
+                os.remove(os.path.join(self.path, name))
+                used -= size
+        except (IOError, OSError), e:
+            log.warning(_("Could not write to the report cache %s: %s") % (self.path, e))
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+            self.used = 0
+            if self.path is not None and os.path.isdir(self.path):
+                for name in os.listdir(self.path):
+                    if name.endswith(SUFFIX):
+                        try:
+                            os.remove(os.path.join(self.path, name))
+                        except OSError:
+                            pass
+
+
+_caches = {}    # directory (None for memory only) -> its ReportCache
+_lock = threading.Lock()
+
+def forConfig(config):
+    """The ReportCache of the process for config, its files kept next to the config file"""
+    path = None
+    if config.config_path and os.path.isdir(config.config_path):
+        path = os.path.join(config.config_path, u'ReportCache')
+    with _lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ReportCache(path)
+    return cache
+
+def invalidate(config):
+    """Forget all the results, those on disk for config too, called once hands have been
+       stored or the tables read by the reports rebuilt"""
+    forConfig(config)
+    with _lock:
+        caches = _caches.values()
+    for cache in caches:
+        cache.clear()
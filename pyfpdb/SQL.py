@@ -1269,6 +1269,18 @@ class Sql:
                         street3Raises INT,
                         street4Raises INT)
                         """
+                        
+        ################################
+        # Create CacheRebuilds
+        ################################
+        # checkpoints of the cache rebuilds in progress, see Database.rebuild_in_chunks
+
+        self.query['createCacheRebuildsTable'] = """CREATE TABLE IF NOT EXISTS CacheRebuilds (
+                        tableName VARCHAR(32) NOT NULL, PRIMARY KEY (tableName),
+                        params TEXT NOT NULL,
+                        lastHandId BIGINT NOT NULL,
+                        maxHandId BIGINT NOT NULL)
+                        """
             
         self.query['addTourneyIndex'] = """CREATE UNIQUE INDEX siteTourneyNo ON Tourneys (siteTourneyNo, tourneyTypeId)"""
         self.query['addHandsIndex'] = """CREATE UNIQUE INDEX siteHandNo ON Hands (siteHandNo, gametypeId<heroseat>)"""
@@ -1354,6 +1366,31 @@ class Sql:
                     limit 1
             """
 
+        self.query['get_gameinfo_from_hids'] = """
+                SELECT
+                        h.id,
+                        s.name,
+                        g.category,
+                        g.base,
+                        g.type,
+                        g.limitType,
+                        g.hilo,
+                        round(g.smallBlind / 100.0,2),
+                        round(g.bigBlind / 100.0,2),
+                        round(g.smallBet / 100.0,2),
+                        round(g.bigBet / 100.0,2),
+                        g.currency,
+                        h.gametypeId
+                    FROM
+                        Hands as h,
+                        Sites as s,
+                        Gametypes as g
+                    WHERE
+                        h.id = ANY(%s)
+                    and g.id = h.gametypeId
+                    and s.id = g.siteId
+            """
+
         self.query['get_stats_from_hand'] = """
                 SELECT hc.playerId                      AS player_id,
                     hp.seatNo                           AS seat,
@@ -1778,6 +1815,250 @@ class Sql:
                        the session */
                 """
         
+#    HudCache totals of some players, for the HUD's in memory stat cache (HudStatCache)
+        self.query['get_hudcache_for_players'] = """
+                SELECT hc.playerId                         AS player_id,
+                       hc.gametypeId                       AS gametype_id,
+                       hc.activeSeats                      AS active_seats,
+                       hc.styleKey                         AS style_key,
+                       p.name                              AS screen_name,
+                       (SELECT max(id) FROM Hands)         AS max_hand_id,
+                       sum(hc.hands)                         AS n,
+                       sum(hc.street0VPIChance)            AS vpip_opp,
+                       sum(hc.street0VPI)                  AS vpip,
+                       sum(hc.street0AggrChance)           AS pfr_opp,
+                       sum(hc.street0Aggr)                 AS pfr,
+                       sum(hc.street0CalledRaiseChance)    AS CAR_opp_0,
+                       sum(hc.street0CalledRaiseDone)      AS CAR_0,
+                       sum(hc.street0_3BChance)            AS TB_opp_0,
+                       sum(hc.street0_3BDone)              AS TB_0,
+                       sum(hc.street0_4BChance)            AS FB_opp_0,
+                       sum(hc.street0_4BDone)              AS FB_0,
+                       sum(hc.street0_C4BChance)           AS CFB_opp_0,
+                       sum(hc.street0_C4BDone)             AS CFB_0,
+                       sum(hc.street0_FoldTo3BChance)      AS F3B_opp_0,
+                       sum(hc.street0_FoldTo3BDone)        AS F3B_0,
+                       sum(hc.street0_FoldTo4BChance)      AS F4B_opp_0,
+                       sum(hc.street0_FoldTo4BDone)        AS F4B_0,
+                       sum(hc.street0_SqueezeChance)       AS SQZ_opp_0,
+                       sum(hc.street0_SqueezeDone)         AS SQZ_0,
+                       sum(hc.raiseToStealChance)          AS RTS_opp,
+                       sum(hc.raiseToStealDone)            AS RTS,
+                       sum(hc.success_Steal)               AS SUC_ST,
+                       sum(hc.street1Seen)                 AS saw_f,
+                       sum(hc.street1Seen)                 AS saw_1,
+                       sum(hc.street2Seen)                 AS saw_2,
+                       sum(hc.street3Seen)                 AS saw_3,
+                       sum(hc.street4Seen)                 AS saw_4,
+                       sum(hc.sawShowdown)                 AS sd,
+                       sum(hc.street1Aggr)                 AS aggr_1,
+                       sum(hc.street2Aggr)                 AS aggr_2,
+                       sum(hc.street3Aggr)                 AS aggr_3,
+                       sum(hc.street4Aggr)                 AS aggr_4,
+                       sum(hc.otherRaisedStreet1)          AS was_raised_1,
+                       sum(hc.otherRaisedStreet2)          AS was_raised_2,
+                       sum(hc.otherRaisedStreet3)          AS was_raised_3,
+                       sum(hc.otherRaisedStreet4)          AS was_raised_4,
+                       sum(hc.foldToOtherRaisedStreet1)    AS f_freq_1,
+                       sum(hc.foldToOtherRaisedStreet2)    AS f_freq_2,
+                       sum(hc.foldToOtherRaisedStreet3)    AS f_freq_3,
+                       sum(hc.foldToOtherRaisedStreet4)    AS f_freq_4,
+                       sum(hc.wonWhenSeenStreet1)          AS w_w_s_1,
+                       sum(hc.wonAtSD)                     AS wmsd,
+                       sum(case
+                        when hc.position = 'S' then hc.raiseFirstInChance
+                        when hc.position = 'D' then hc.raiseFirstInChance
+                        when hc.position = 'C' then hc.raiseFirstInChance
+                        else 0
+                        end)                               AS steal_opp,
+                       sum(case
+                        when hc.position = 'S' then hc.raisedFirstIn
+                        when hc.position = 'D' then hc.raisedFirstIn
+                        when hc.position = 'C' then hc.raisedFirstIn
+                        else 0
+                        end)                               AS steal,
+                       sum(hc.foldSbToStealChance)         AS SBstolen,
+                       sum(hc.foldedSbToSteal)             AS SBnotDef,
+                       sum(hc.foldBbToStealChance)         AS BBstolen,
+                       sum(hc.foldedBbToSteal)             AS BBnotDef,
+                       sum(hc.street1CBChance)             AS CB_opp_1,
+                       sum(hc.street1CBDone)               AS CB_1,
+                       sum(hc.street2CBChance)             AS CB_opp_2,
+                       sum(hc.street2CBDone)               AS CB_2,
+                       sum(hc.street3CBChance)             AS CB_opp_3,
+                       sum(hc.street3CBDone)               AS CB_3,
+                       sum(hc.street4CBChance)             AS CB_opp_4,
+                       sum(hc.street4CBDone)               AS CB_4,
+                       sum(hc.foldToStreet1CBChance)       AS f_cb_opp_1,
+                       sum(hc.foldToStreet1CBDone)         AS f_cb_1,
+                       sum(hc.foldToStreet2CBChance)       AS f_cb_opp_2,
+                       sum(hc.foldToStreet2CBDone)         AS f_cb_2,
+                       sum(hc.foldToStreet3CBChance)       AS f_cb_opp_3,
+                       sum(hc.foldToStreet3CBDone)         AS f_cb_3,
+                       sum(hc.foldToStreet4CBChance)       AS f_cb_opp_4,
+                       sum(hc.foldToStreet4CBDone)         AS f_cb_4,
+                       sum(hc.totalProfit)                 AS net,
+                       sum(gt.bigblind * hc.hands)         AS bigblind,
+                       sum(hc.street1CheckCallRaiseChance) AS ccr_opp_1,
+                       sum(hc.street1CheckCallDone)        AS cc_1,
+                       sum(hc.street1CheckRaiseDone)       AS cr_1,
+                       sum(hc.street2CheckCallRaiseChance) AS ccr_opp_2,
+                       sum(hc.street2CheckCallDone)        AS cc_2,
+                       sum(hc.street2CheckRaiseDone)       AS cr_2,
+                       sum(hc.street3CheckCallRaiseChance) AS ccr_opp_3,
+                       sum(hc.street3CheckCallDone)        AS cc_3,
+                       sum(hc.street3CheckRaiseDone)       AS cr_3,
+                       sum(hc.street4CheckCallRaiseChance) AS ccr_opp_4,
+                       sum(hc.street4CheckCallDone)        AS cc_4,
+                       sum(hc.street4CheckRaiseDone)       AS cr_4,
+                       sum(hc.street0Calls)                AS call_0,
+                       sum(hc.street1Calls)                AS call_1,
+                       sum(hc.street2Calls)                AS call_2,
+                       sum(hc.street3Calls)                AS call_3,
+                       sum(hc.street4Calls)                AS call_4,
+                       sum(hc.street0Bets)                 AS bet_0,
+                       sum(hc.street1Bets)                 AS bet_1,
+                       sum(hc.street2Bets)                 AS bet_2,
+                       sum(hc.street3Bets)                 AS bet_3,
+                       sum(hc.street4Bets)                 AS bet_4,
+                       sum(hc.street0Raises)               AS raise_0,
+                       sum(hc.street1Raises)               AS raise_1,
+                       sum(hc.street2Raises)               AS raise_2,
+                       sum(hc.street3Raises)               AS raise_3,
+                       sum(hc.street4Raises)               AS raise_4
+                FROM HudCache hc
+                     INNER JOIN Players p       ON (p.id = hc.playerId)
+                     INNER JOIN Gametypes gt    ON (gt.id = hc.gametypeId)
+                WHERE hc.playerId = ANY(%s)
+                GROUP BY hc.playerId, hc.gametypeId, hc.activeSeats, hc.styleKey, p.name
+            """
+
+#    HandsPlayers rows of some players imported after a given hand, in the same
+#    shape as get_hudcache_for_players so they can be added to its totals
+        self.query['get_handsplayers_for_hudcache'] = """
+                    SELECT hp.playerId                                              AS player_id,
+                           hp.handId                                                AS hand_id,
+                           h.gametypeId                                             AS gametype_id,
+                           h.seats                                                  AS active_seats,
+                           h.startTime                                              AS start_time,
+                           p.name                                                   AS screen_name,
+                           1                                                        AS n,
+                           cast(hp.street0VPIChance as integer)            AS vpip_opp,
+                           cast(hp.street0VPI as integer)                  AS vpip,
+                           cast(hp.street0AggrChance as integer)           AS pfr_opp,
+                           cast(hp.street0Aggr as integer)                 AS pfr,
+                           cast(hp.street0CalledRaiseChance as integer)    AS CAR_opp_0,
+                           cast(hp.street0CalledRaiseDone as integer)      AS CAR_0,
+                           cast(hp.street0_3BChance as integer)            AS TB_opp_0,
+                           cast(hp.street0_3BDone as integer)              AS TB_0,
+                           cast(hp.street0_4BChance as integer)            AS FB_opp_0,
+                           cast(hp.street0_4BDone as integer)              AS FB_0,
+                           cast(hp.street0_C4BChance as integer)           AS CFB_opp_0,
+                           cast(hp.street0_C4BDone as integer)             AS CFB_0,
+                           cast(hp.street0_FoldTo3BChance as integer)      AS F3B_opp_0,
+                           cast(hp.street0_FoldTo3BDone as integer)        AS F3B_0,
+                           cast(hp.street0_FoldTo4BChance as integer)      AS F4B_opp_0,
+                           cast(hp.street0_FoldTo4BDone as integer)        AS F4B_0,
+                           cast(hp.street0_SqueezeChance as integer)       AS SQZ_opp_0,
+                           cast(hp.street0_SqueezeDone as integer)         AS SQZ_0,
+                           cast(hp.raiseToStealChance as integer)          AS RTS_opp,
+                           cast(hp.raiseToStealDone as integer)            AS RTS,
+                           cast(hp.success_Steal as integer)               AS SUC_ST,
+                           cast(hp.street1Seen as integer)                 AS saw_f,
+                           cast(hp.street1Seen as integer)                 AS saw_1,
+                           cast(hp.street2Seen as integer)                 AS saw_2,
+                           cast(hp.street3Seen as integer)                 AS saw_3,
+                           cast(hp.street4Seen as integer)                 AS saw_4,
+                           cast(hp.sawShowdown as integer)                 AS sd,
+                           cast(hp.street1Aggr as integer)                 AS aggr_1,
+                           cast(hp.street2Aggr as integer)                 AS aggr_2,
+                           cast(hp.street3Aggr as integer)                 AS aggr_3,
+                           cast(hp.street4Aggr as integer)                 AS aggr_4,
+                           cast(hp.otherRaisedStreet1 as integer)          AS was_raised_1,
+                           cast(hp.otherRaisedStreet2 as integer)          AS was_raised_2,
+                           cast(hp.otherRaisedStreet3 as integer)          AS was_raised_3,
+                           cast(hp.otherRaisedStreet4 as integer)          AS was_raised_4,
+                           cast(hp.foldToOtherRaisedStreet1 as integer)    AS f_freq_1,
+                           cast(hp.foldToOtherRaisedStreet2 as integer)    AS f_freq_2,
+                           cast(hp.foldToOtherRaisedStreet3 as integer)    AS f_freq_3,
+                           cast(hp.foldToOtherRaisedStreet4 as integer)    AS f_freq_4,
+                           cast(hp.wonWhenSeenStreet1 as integer)          AS w_w_s_1,
+                           cast(hp.wonAtSD as integer)                     AS wmsd,
+                           case
+                                when hp.position = 'S' then cast(hp.raiseFirstInChance as integer)
+                                when hp.position = '0' then cast(hp.raiseFirstInChance as integer)
+                                when hp.position = '1' then cast(hp.raiseFirstInChance as integer)
+                                else 0
+                           end                                                      AS steal_opp,
+                          case
+                                when hp.position = 'S' then cast(hp.raisedFirstIn as integer)
+                                when hp.position = '0' then cast(hp.raisedFirstIn as integer)
+                                when hp.position = '1' then cast(hp.raisedFirstIn as integer)
+                                else 0
+                           end                                                      AS steal,
+                           cast(hp.foldSbToStealChance as integer)         AS SBstolen,
+                           cast(hp.foldedSbToSteal as integer)             AS SBnotDef,
+                           cast(hp.foldBbToStealChance as integer)         AS BBstolen,
+                           cast(hp.foldedBbToSteal as integer)             AS BBnotDef,
+                           cast(hp.street1CBChance as integer)             AS CB_opp_1,
+                           cast(hp.street1CBDone as integer)               AS CB_1,
+                           cast(hp.street2CBChance as integer)             AS CB_opp_2,
+                           cast(hp.street2CBDone as integer)               AS CB_2,
+                           cast(hp.street3CBChance as integer)             AS CB_opp_3,
+                           cast(hp.street3CBDone as integer)               AS CB_3,
+                           cast(hp.street4CBChance as integer)             AS CB_opp_4,
+                           cast(hp.street4CBDone as integer)               AS CB_4,
+                           cast(hp.foldToStreet1CBChance as integer)       AS f_cb_opp_1,
+                           cast(hp.foldToStreet1CBDone as integer)         AS f_cb_1,
+                           cast(hp.foldToStreet2CBChance as integer)       AS f_cb_opp_2,
+                           cast(hp.foldToStreet2CBDone as integer)         AS f_cb_2,
+                           cast(hp.foldToStreet3CBChance as integer)       AS f_cb_opp_3,
+                           cast(hp.foldToStreet3CBDone as integer)         AS f_cb_3,
+                           cast(hp.foldToStreet4CBChance as integer)       AS f_cb_opp_4,
+                           cast(hp.foldToStreet4CBDone as integer)         AS f_cb_4,
+                           cast(hp.totalProfit as bigint)                  AS net,
+                           cast(gt.bigblind as bigint)                      AS bigblind,
+                           cast(hp.street1CheckCallRaiseChance as integer) AS ccr_opp_1,
+                           cast(hp.street1CheckCallDone as integer)        AS cc_1,
+                           cast(hp.street1CheckRaiseDone as integer)       AS cr_1,
+                           cast(hp.street2CheckCallRaiseChance as integer) AS ccr_opp_2,
+                           cast(hp.street2CheckCallDone as integer)        AS cc_2,
+                           cast(hp.street2CheckRaiseDone as integer)       AS cr_2,
+                           cast(hp.street3CheckCallRaiseChance as integer) AS ccr_opp_3,
+                           cast(hp.street3CheckCallDone as integer)        AS cc_3,
+                           cast(hp.street3CheckRaiseDone as integer)       AS cr_3,
+                           cast(hp.street4CheckCallRaiseChance as integer) AS ccr_opp_4,
+                           cast(hp.street4CheckCallDone as integer)        AS cc_4,
+                           cast(hp.street4CheckRaiseDone as integer)       AS cr_4,
+                           cast(hp.street0Calls as integer)                AS call_0,
+                           cast(hp.street1Calls as integer)                AS call_1,
+                           cast(hp.street2Calls as integer)                AS call_2,
+                           cast(hp.street3Calls as integer)                AS call_3,
+                           cast(hp.street4Calls as integer)                AS call_4,
+                           cast(hp.street0Bets as integer)                 AS bet_0,
+                           cast(hp.street1Bets as integer)                 AS bet_1,
+                           cast(hp.street2Bets as integer)                 AS bet_2,
+                           cast(hp.street3Bets as integer)                 AS bet_3,
+                           cast(hp.street4Bets as integer)                 AS bet_4,
+                           cast(hp.street0Raises as integer)               AS raise_0,
+                           cast(hp.street1Raises as integer)               AS raise_1,
+                           cast(hp.street2Raises as integer)               AS raise_2,
+                           cast(hp.street3Raises as integer)               AS raise_3,
+                           cast(hp.street4Raises as integer)               AS raise_4
+                    FROM HandsPlayers hp
+                         INNER JOIN Hands h          ON (h.id = hp.handId)
+                         INNER JOIN Players p        ON (p.id = hp.playerId)
+                         INNER JOIN Gametypes gt     ON (gt.id = h.gametypeId)
+                    WHERE hp.playerId = ANY(%s)
+                    AND   hp.handId > %s
+                    ORDER BY hp.handId
+                """
+
+        self.query['get_gametypes_for_hudcache'] = """
+                SELECT id, siteId, type, category, limitType, bigBlind
+                FROM Gametypes
+            """
+
         self.query['get_players_from_hand'] = """
                 SELECT HandsPlayers.playerId, seatNo, name
                 FROM  HandsPlayers INNER JOIN Players ON (HandsPlayers.playerId = Players.id)
@@ -2589,6 +2870,39 @@ class Sql:
                  <seats_test>
                  <currency_test>
                 ORDER by time"""
+
+        # the sessions of SessionsCache from CashCache: start, end, hands and profit, and the
+        # highest and lowest the running profit of its hands went from the start of each
+        self.query['sessionStatsCached'] = """
+                WITH cached AS (
+                    SELECT cc.sessionId, MIN(cc.startTime) as startTime, MAX(cc.endTime) as endTime,
+                           SUM(cc.hands) as hands, SUM(cc.totalProfit) as profit
+                    FROM CashCache cc
+                     INNER JOIN Gametypes gt  on  (gt.Id = cc.gametypeId)
+                    WHERE cc.playerId in <player_test>
+                     AND  cc.startTime <datestest>
+                     <limit_test>
+                     <game_test>
+                     <currency_test>
+                    GROUP BY cc.sessionId),
+                running AS (
+                    SELECT h.sessionId, SUM(hp.totalProfit) OVER
+                               (PARTITION BY h.sessionId ORDER BY h.startTime, h.id) as balance
+                    FROM HandsPlayers hp
+                     INNER JOIN Hands h       on  (h.id = hp.handId)
+                     INNER JOIN Gametypes gt  on  (gt.Id = h.gametypeId)
+                    WHERE hp.playerId in <player_test>
+                     AND  h.sessionId IN (SELECT sessionId FROM cached)
+                     AND  gt.type LIKE 'ring'
+                     <limit_test>
+                     <game_test>
+                     <currency_test>)
+                SELECT EXTRACT(epoch from c.startTime), EXTRACT(epoch from c.endTime), c.hands, c.profit,
+                       GREATEST(MAX(r.balance), 0), LEAST(MIN(r.balance), 0)
+                FROM cached c
+                 LEFT JOIN running r      on  (r.sessionId = c.sessionId)
+                GROUP BY c.sessionId, c.startTime, c.endTime, c.hands, c.profit
+                ORDER BY c.startTime"""
         
         ####################################
         # Querry to get all hands in a date range
@@ -2661,6 +2975,57 @@ class Sql:
                       ha.id ASC
                 """
 
+        ####################################
+        # Set based versions of the three replayer queries above, for Hand.hand_factory_many
+        ####################################
+        self.query['multiHands'] = """
+                 SELECT h.*
+                    FROM Hands h
+                    WHERE id = ANY(%s)"""
+
+        self.query['playerHands'] = """
+            SELECT
+                        hp.handId,
+                        hp.seatno,
+                        round(hp.winnings / 100.0,2) as winnings,
+                        p.name,
+                        round(hp.startCash / 100.0,2) as chips,
+                        hp.card1,hp.card2,hp.card3,hp.card4,hp.card5,
+                        hp.card6,hp.card7,hp.card8,hp.card9,hp.card10,
+                        hp.card11,hp.card12,hp.card13,hp.card14,hp.card15,
+                        hp.card16,hp.card17,hp.card18,hp.card19,hp.card20,
+                        hp.position
+                    FROM
+                        HandsPlayers as hp,
+                        Players as p
+                    WHERE
+                        hp.handId = ANY(%s)
+                        and p.id = hp.playerId
+                    ORDER BY
+                        hp.handId, hp.seatno
+                """
+
+        self.query['handsActions'] = """
+            SELECT
+                      ha.handId,
+                      ha.actionNo,
+                      p.name,
+                      ha.street,
+                      ha.actionId,
+                      ha.allIn,
+                      round(ha.amount / 100.0,2) as bet,
+                      ha.numDiscarded,
+                      ha.cardsDiscarded
+                FROM
+                      HandsActions as ha,
+                      Players as p
+                WHERE
+                          ha.handId = ANY(%s)
+                      AND ha.playerId = p.id
+                ORDER BY
+                      ha.handId, ha.id ASC
+                """
+
         ####################################
         # Queries to rebuild/modify hudcache
         ####################################
@@ -2669,6 +3034,24 @@ class Sql:
         self.query['clearCardsCache'] = """DELETE FROM CardsCache"""
         self.query['clearPositionsCache'] = """DELETE FROM PositionsCache"""
         
+        self.query['clearCachePlayers'] = """DELETE FROM <table> WHERE playerId = ANY(%s)"""
+
+        self.query['delete_archived_rows'] = """DELETE FROM <table> WHERE handId = ANY(%s)"""
+
+        ################################
+        # RawHands and RawTourneys, see RawText
+        ################################
+        self.query['store_raw_text'] = """INSERT INTO <table> (<id>, <text>, complain) VALUES (%s, %s, %s)"""
+
+        self.query['get_raw_text'] = """SELECT <text> FROM <table> WHERE id = %s"""
+
+        self.query['get_raw_dictionary'] = """SELECT id, <text> FROM <table> WHERE <id> = %s
+                                              ORDER BY id DESC LIMIT 1"""
+
+        self.query['get_raw_texts'] = """SELECT id, <id>, <text> FROM <table>
+                                         WHERE id > %s AND <id> BETWEEN %s AND %s AND NOT complain
+                                         ORDER BY id LIMIT %s"""
+        
         self.query['clearHudCacheTourneyType'] = """DELETE FROM HudCache WHERE tourneyTypeId = %s"""
         self.query['clearCardsCacheTourneyType'] = """DELETE FROM CardsCache WHERE tourneyTypeId = %s"""
         self.query['clearPositionsCacheTourneyType'] = """DELETE FROM PositionsCache WHERE tourneyTypeId = %s"""  
@@ -2714,6 +3097,11 @@ class Sql:
         
             
 
+        self.query['select_cache_rebuild'] = """SELECT params, lastHandId, maxHandId FROM CacheRebuilds WHERE tableName = %s"""
+        self.query['insert_cache_rebuild'] = """INSERT INTO CacheRebuilds (tableName, params, lastHandId, maxHandId) VALUES (%s, %s, %s, %s)"""
+        self.query['update_cache_rebuild'] = """UPDATE CacheRebuilds SET lastHandId = %s WHERE tableName = %s"""
+        self.query['delete_cache_rebuild'] = """DELETE FROM CacheRebuilds WHERE tableName = %s"""
+
         self.query['rebuildCache'] = """
                 INSERT INTO <insert>
                 ,hands
@@ -3784,35 +4172,46 @@ class Sql:
         self.query['clear_SC_TC'] = "UPDATE TourCache SET sessionId = NULL"
         self.query['clear_WC_SC'] = "UPDATE SessionsCache SET weekId = NULL"
         self.query['clear_MC_SC'] = "UPDATE SessionsCache SET monthId = NULL"
-        self.query['clearCashCache']    = "DELETE FROM CashCache WHERE 1"
-        self.query['clearTourCache']    = "DELETE FROM TourCache WHERE 1"
-        self.query['clearSessionsCache'] = "DELETE FROM SessionsCache WHERE 1"
-        self.query['clearWeeksCache']    = "DELETE FROM WeeksCache WHERE 1"
-        self.query['clearMonthsCache']   = "DELETE FROM MonthsCache WHERE 1"
+        self.query['clearCashCache']    = "DELETE FROM CashCache"
+        self.query['clearTourCache']    = "DELETE FROM TourCache"
+        self.query['clearSessionsCache'] = "DELETE FROM SessionsCache"
+        self.query['clearWeeksCache']    = "DELETE FROM WeeksCache"
+        self.query['clearMonthsCache']   = "DELETE FROM MonthsCache"
         self.query['update_RSC_H']       = "UPDATE Hands SET sessionId = %s WHERE id = %s"
         
         self.query['rebuildSessionsCache'] = """
                     SELECT Hands.id as id,
                     Hands.startTime as startTime,
-                    HandsPlayers.playerId as playerId,
                     Hands.tourneyId as tourneyId,
                     Hands.gametypeId as gametypeId,
                     Gametypes.type as game,
-                    <tourney_type_clause>
-                    HandsPlayers.totalProfit as totalProfit,
-                    HandsPlayers.rake as rake,
-                    HandsPlayers.allInEV as allInEV,
-                    HandsPlayers.street0VPI as street0VPI,
-                    HandsPlayers.street1Seen as street1Seen,
-                    HandsPlayers.sawShowdown as sawShowdown
+                    HandsPlayers.playerId as playerId,
+                    <cache_columns>
                     FROM  HandsPlayers HandsPlayers
                     INNER JOIN Hands ON (HandsPlayers.handId = Hands.id)
                     INNER JOIN Gametypes ON (Gametypes.id = Hands.gametypeId)
-                    <tourney_join_clause>
-                    WHERE  (HandsPlayers.playerId = <where_clause>)
-                    AND Gametypes.type = %s
-                    AND Hands.id > %s
-                    AND Hands.id <= %s"""
+                    WHERE Hands.id > %s
+                    AND Hands.id <= %s
+                    AND EXISTS (SELECT 1 FROM HandsPlayers hh
+                                WHERE hh.handId = Hands.id AND hh.playerId = ANY(%s))
+                    <exclude_clause>
+                    ORDER BY Hands.id"""
+                    
+        self.query['rebuildSessionsCacheExclude'] = """
+                    AND NOT EXISTS (SELECT 1 FROM HandsPlayers hx
+                                    WHERE hx.handId = Hands.id AND hx.playerId = ANY(%s))"""
+                    
+        self.query['get_hero_ids'] = """SELECT id FROM Players WHERE hero = %s"""
+        
+        self.query['set_heroes'] = """UPDATE Players SET hero = TRUE WHERE id = ANY(%s)"""
+        
+        # the hands imported with no hero at the table
+        self.query['set_hero_seats'] = """
+                    UPDATE Hands SET heroSeat = hp.seatNo
+                    FROM HandsPlayers hp
+                    WHERE hp.handId = Hands.id
+                    AND hp.playerId = ANY(%s)
+                    AND Hands.heroSeat = 0"""
                     
         ####################################
         # select
@@ -4530,6 +4929,43 @@ class Sql:
                     DELETE FROM CashCache
                     WHERE id=%s"""
                     
+        self.query['delete_CC_many'] = """
+                    DELETE FROM CashCache
+                    WHERE id = ANY(%s)"""
+                    
+        ####################################
+        # set based merge of cache lines: the lines are copied into
+        # cache_stage, added to the rows they match and the others inserted
+        ####################################
+        
+        self.query['create_cache_stage'] = """
+                    CREATE TEMPORARY TABLE cache_stage AS
+                    SELECT <columns> FROM <table> WITH NO DATA"""
+                    
+        self.query['copy_cache_lines'] = """COPY <table> (<columns>) FROM STDIN"""
+        
+        self.query['update_cache_from_stage'] = """
+                    UPDATE <table> t SET
+                    <update>
+                    FROM cache_stage s
+                    WHERE <match>"""
+                    
+        self.query['insert_cache_from_stage'] = """
+                    INSERT INTO <table> (<columns>)
+                    SELECT <columns> FROM cache_stage s
+                    WHERE NOT EXISTS (SELECT 1 FROM <table> t WHERE <match>)"""
+                    
+        self.query['drop_cache_stage'] = """DROP TABLE cache_stage"""
+        
+        self.query['select_CC_from_stage'] = """
+                    SELECT DISTINCT cc.*
+                    FROM CashCache cc
+                    INNER JOIN cache_stage s ON (    cc.gametypeId = s.gametypeId
+                                                 AND cc.playerId = s.playerId
+                                                 AND cc.endTime >= s.startTime
+                                                 AND cc.startTime <= s.endTime)
+                    ORDER BY cc.id"""
+                    
         ####################################
         # update CashCache, Hands, Tourneys
         ####################################
@@ -5185,20 +5621,71 @@ class Sql:
         # Counts for DB stats window
         ################################
         self.query['getHandCount'] = "SELECT COUNT(*) FROM Hands"
+        # changes whenever hands or tournaments are imported, see ReportCache
+        self.query['get_report_generation'] = """SELECT (SELECT MAX(id) FROM Hands), (SELECT MAX(id) FROM Tourneys),
+                                                        (SELECT MAX(id) FROM TourneysPlayers)"""
         self.query['getTourneyCount'] = "SELECT COUNT(*) FROM Tourneys"
         self.query['getTourneyTypeCount'] = "SELECT COUNT(*) FROM TourneyTypes"
         
         ################################
         # queries for dumpDatabase
         ################################
-        for table in (u'Autorates', u'Backings', u'Gametypes', u'Hands', u'HandsActions', u'HandsPlayers', u'HudCache', u'Players', u'RawHands', u'RawTourneys', u'Settings', u'Sites', u'TourneyTypes', u'Tourneys', u'TourneysPlayers'):
+        # all the tables, in the order they are created in, so a table comes after those it refers to
+        self.dump_tables = (u'Settings', u'Actions', u'Rank', u'StartCards', u'Sites', u'Gametypes', u'Files',
+                            u'Players', u'Autorates', u'WeeksCache', u'MonthsCache', u'SessionsCache',
+                            u'TourneyTypes', u'Tourneys', u'TourneysPlayers', u'CashCache', u'TourCache',
+                            u'CacheRebuilds', u'Hands', u'HandsPlayers', u'HandsActions', u'HandsStove',
+                            u'HandsPots', u'HudCache', u'CardsCache', u'PositionsCache', u'Boards', u'Backings',
+                            u'RawHands', u'RawTourneys')
+        for table in self.dump_tables:
             self.query['get'+table] = u"SELECT * FROM "+table
+
+        self.query['copy_csv_lines'] = """COPY <table> (<columns>) FROM STDIN WITH CSV"""
+
+        self.query['clear_table'] = """DELETE FROM <table>"""
+
+        self.query['reset_serial'] = """SELECT setval(pg_get_serial_sequence('<table>', 'id'), MAX(id)) FROM <table>"""
         
         ################################
         # placeholders and substitution stuff
         ################################
         self.query['placeholder'] = u'%s'
         
+        self.query['get_prepared_statements'] = """
+                    SELECT name, array_length(parameter_types, 1)
+                    FROM pg_prepared_statements"""
+        
+        ################################
+        # compiled statements
+        ################################
+        # statements run for every hand or batch of hands: on PostgreSQL they are
+        # prepared on the server once per connection, see Database.prepare
+        self.prepared = set(['store_hand', 'store_boards', 'store_hands_players', 'store_hands_actions',
+                             'store_hands_pots', 'store_hands_stove', 'getGametypeNL', 'insertGameTypes',
+                             'isAlreadyInDB', 'isAlreadyInDBHeroSeat'])
+        self.compile()
+        
+    def compile(self):
+        """Substitute the placeholder in all the queries, once: the results are in self.compiled"""
+        placeholder = self.query['placeholder']
+        self.compiled = {}
+        for name, q in self.query.iteritems():
+            self.compiled[name] = q.replace('%s', placeholder)
+        
+    def prepare_statement(self, name, q):
+        """Returns the PREPARE statement for PostgreSQL query q as name, and the
+           EXECUTE statement taking the same parameters as q to run it with"""
+        params = q.count('%s')
+        numbers = iter(xrange(1, params + 1))
+        prepare = "PREPARE %s AS %s" % (name, re.sub('%s', lambda m: '$%d' % numbers.next(), q))
+        return prepare, self.execute_statement(name, params)
+        
+    def execute_statement(self, name, params):
+        """Returns the EXECUTE statement for prepared statement name, taking params parameters"""
+        if not params:
+            return "EXECUTE %s" % name
+        return "EXECUTE %s (%s)" % (name, ', '.join(['%s'] * params))
+        
 if __name__== "__main__":
 #    just print the default queries and exit
     s = Sql()
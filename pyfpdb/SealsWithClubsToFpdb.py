@@ -196,7 +196,7 @@ class SealsWithClubs(HandHistoryConverter):
         m = self.re_ButtonName.search(hand.handText)
         if m:
             dealer = m.group('BUTTONNAME')
-            re_Button = re.compile(ur"""Seat\s+(?P<BUTTON>\d+):\s+%s""" % dealer)
+            re_Button = self.compileRegex(ur"""Seat\s+(?P<BUTTON>\d+):\s+%s""" % dealer)
             m = re_Button.search(hand.handText)
             hand.buttonpos = int(m.group('BUTTON'));
         else:
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""Session data for GuiSessionViewer.
+
+A session is described by its start and end time, hands, profit, and the
+highest and lowest its balance went from the start of it (0 included, the
+balance it opened with). When the sessions asked for are those of the
+SessionsCache the import keeps, they are read a row each (sessionStatsCached);
+otherwise the hands are split into sessions where more than the threshold
+passes between two of them, each session reduced on whole arrays with reduceat.
+sessionTable turns either into the rows of the viewer's table and candlesticks.
+"""
+
+import L10n
+_ = L10n.get_translation()
+
+from time import strftime, localtime
+
+import numpy
+
+PADDING = 5     # minutes added to a session, for getting started and leaving
+
+
+def handSessions(times, profits, threshold):
+    """(start, end, hands, profit, high, low) arrays of the sessions of the hands
+       at times (seconds, sorted) with profits, a new session starting where the
+       time between two hands is more than threshold seconds"""
+    times = numpy.asarray(times, dtype=float)
+    profits = numpy.asarray(profits, dtype=float)
+    if not len(times):
+        empty = numpy.zeros(0)
+        return (empty,) * 6
+    firsts = numpy.concatenate(([0], numpy.nonzero(numpy.diff(times) > threshold)[0] + 1))
+    lasts = numpy.concatenate((firsts[1:], [len(times)])) - 1
+    balance = numpy.cumsum(profits)
+    opening = balance[firsts] - profits[firsts]
+    return (times[firsts], times[lasts], lasts - firsts + 1,
+            numpy.add.reduceat(profits, firsts),
+            numpy.maximum(numpy.maximum.reduceat(balance, firsts) - opening, 0),
+            numpy.minimum(numpy.minimum.reduceat(balance, firsts) - opening, 0))
+
+def sessionTable(start, end, hands, profit, high, low):
+    """(results, quotes, times) of the sessions, profits in cents: a row of the
+       viewer's table for each session and one for all of them, a candlestick
+       (sid, open, close, high, low) in dollars for each session, and the
+       (start, end) time of each"""
+    if not len(start):
+        return ([], [], [])
+    profit = numpy.asarray(profit, dtype=float) / 100
+    close = numpy.cumsum(profit)
+    open = close - profit
+    hwm = open + numpy.asarray(high, dtype=float) / 100
+    lwm = open + numpy.asarray(low, dtype=float) / 100
+    minutes = (numpy.asarray(end, dtype=long) - numpy.asarray(start, dtype=long)) / 60 + PADDING
+
+    fmt = lambda t: strftime("%d/%m/%Y %H:%M", localtime(t))
+    results, quotes, times = [], [], []
+    for i in range(len(start)):
+        sid = i + 1
+        results.append([sid, int(hands[i]), fmt(start[i]), fmt(end[i]), int(hands[i]) * 60 / max(int(minutes[i]), 1),
+                        "%.2f" % open[i],
+                        "%.2f" % close[i],
+                        "%.2f" % lwm[i],
+                        "%.2f" % hwm[i],
+                        "%.2f" % (hwm[i] - lwm[i]),
+                        "%.2f" % profit[i]])
+        quotes.append((sid, open[i], close[i], hwm[i], lwm[i]))
+        times.append((long(start[i]), long(end[i])))
+    total = int(numpy.sum(hands))
+    results.append([''] * 11)
+    results.append([_("all"), total, fmt(start[0]), fmt(end[-1]),
+                    total * 60 / max(int(numpy.sum(minutes)), 1),
+                    "%.2f" % open[0],
+                    "%.2f" % close[-1],
+                    "%.2f" % lwm.min(),
+                    "%.2f" % hwm.max(),
+                    "%.2f" % (hwm.max() - lwm.min()),
+                    "%.2f" % (close[-1] - open[0])])
+    return (results, quotes, times)
+
+def fetchSessions(cursor):
+    """The (start, end, hands, profit, high, low) arrays of the rows of a
+       sessionStatsCached query executed on cursor"""
+    rows = cursor.fetchall()
+    if not rows:
+        return (numpy.zeros(0),) * 6
+    data = numpy.array(rows, dtype=float)
+    data[numpy.isnan(data)] = 0
+    return tuple(data.T)
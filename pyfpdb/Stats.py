@@ -106,28 +106,77 @@ def do_stat(stat_dict, player = 24, stat = 'vpip', hand_instance = None):
     #to avoid having to conditionally pass the extra value
     global _global_hand_instance
     _global_hand_instance = hand_instance
-    
-    statname = stat
-    match = re_Places.search(stat)
-    if match:   # override if necessary
-        statname = stat[0:-2]
 
-    if statname not in STATLIST:
+    if stat not in _compiled_stats:
+        _compiled_stats[stat] = compile_stat(stat)
+    function = _compiled_stats[stat]
+    if function is None:
         return None
+    return function(stat_dict, player)
 
-    result = eval("%(stat)s(stat_dict, %(player)d)" %
-        {'stat': statname, 'player': player})
+_compiled_stats = {}  # stat name as configured -> compile_stat(name)
 
+def _stat_function(stat):
+    """The stat function and decimal places override of a configured stat name,
+       (None, None) if there is no such stat"""
+    statname, places = stat, None
+    if stat and re_Places.search(stat):   # override if necessary
+        statname, places = stat[0:-2], int(stat[-1:])
+    if statname not in STATLIST:
+        return None, None
+    return globals()[statname], places
+
+def compile_stat(stat):
+    """Resolve a configured stat name, with its optional _N decimal places, to a
+       function of (stat_dict, player) returning what do_stat returns.
+       None if there is no such stat."""
+    function, places = _stat_function(stat)
+    if function is None or places is None:
+        return function
     # If decimal places have been defined, override result[1]
     # NOTE: decimal place override ALWAYS assumes the raw result is a
     # fraction (x/100); manual decimal places really only make sense for
     # percentage values. Also, profit/100 hands (bb/BB) already default
     # to three decimal places anyhow, so they are unlikely override
     # candidates.
-    if match:
-        places = int(stat[-1:])
-        result = __stat_override(places, result)
-    return result
+    return lambda stat_dict, player: __stat_override(places, function(stat_dict, player))
+
+class StatPlan:
+    """The stats of a HUD layout, resolved to their functions once and
+       evaluated for a player in one pass."""
+
+    def __init__(self, stats):
+        self.stats = list(stats)
+        self.functions = [compile_stat(stat) for stat in self.stats]
+        # stats reading the hand instance can change while the player's counters don't
+        self.hand_stats = []
+        for i, stat in enumerate(self.stats):
+            function = _stat_function(stat)[0]
+            if function is not None and '_global_hand_instance' in function.func_code.co_names:
+                self.hand_stats.append(i)
+
+    def evaluate(self, stat_dict, player, hand_instance = None, last = None):
+        """Returns (state, results), results being the stats of player as do_stat
+           returns them, None for unknown stats.
+           Pass state back as last on the next call for the same player: when the
+           player's counters have not changed, only the stats using the hand instance
+           are computed again, and results is None if they did not change either."""
+        global _global_hand_instance
+        _global_hand_instance = hand_instance
+
+        counters = stat_dict.get(player)
+        if last is not None and last[0] == counters:
+            results = list(last[1])
+            for i in self.hand_stats:
+                results[i] = self.functions[i](stat_dict, player)
+            if results == last[1]:
+                return last, None
+        else:
+            results = [function(stat_dict, player) if function is not None else None
+                       for function in self.functions]
+        if counters is not None:
+            counters = dict(counters)
+        return (counters, results), results
 
 #    OK, for reference the tuple returned by the stat is:
 #    0 - The stat, raw, no formating, eg 0.33333333
@@ -1417,68 +1466,68 @@ def starthands(stat_dict, player):
     PFdefendBB="Defend BB:"
     count_pfl = count_pfa = count_pfc = count_pfd = 5
     
-    c = Configuration.Config()
-    db_connection = Database.Database(c)
-    sc = db_connection.get_cursor()
-
-    query = ("SELECT distinct startCards, street0Aggr, street0CalledRaiseDone, " +
-    			"case when HandsPlayers.position = 'B' then 'b' " +
-                            "when HandsPlayers.position = 'S' then 'b' " +
-                            "when HandsPlayers.position = '0' then 'l' " +
-                            "when HandsPlayers.position = '1' then 'l' " +
-                            "when HandsPlayers.position = '2' then 'm' " +
-                            "when HandsPlayers.position = '3' then 'm' " +
-                            "when HandsPlayers.position = '4' then 'm' " +
-                            "when HandsPlayers.position = '5' then 'e' " +
-                            "when HandsPlayers.position = '6' then 'e' " +
-                            "when HandsPlayers.position = '7' then 'e' " +
-                            "when HandsPlayers.position = '8' then 'e' " +
-                            "when HandsPlayers.position = '9' then 'e' " +
-                            "else 'X' end " +
-                        "FROM Hands, HandsPlayers, Gametypes " +
-                        "WHERE HandsPlayers.handId = Hands.id " +
-                        " AND Gametypes.id = Hands.gametypeid "+
-                        " AND Gametypes.type = " +
-                        "   (SELECT Gametypes.type FROM Gametypes, Hands   " +
-                        "  WHERE Hands.gametypeid = Gametypes.id and Hands.id = %d) " +
-                        " AND Gametypes.Limittype =  " +
-                        "   (SELECT Gametypes.limitType FROM Gametypes, Hands  " +
-                        " WHERE Hands.gametypeid = Gametypes.id and Hands.id = %d) " +
-                        "AND Gametypes.category = 'holdem' " +
-                        "AND fileId = (SELECT fileId FROM Hands " +
-                        " WHERE Hands.id = %d) " +
-                        "AND HandsPlayers.playerId = %d " +
-                        "AND street0VPI " +
-                        "AND startCards > 0 AND startCards <> 170 " +
-                        "ORDER BY startCards DESC " +
-                        ";")   % (int(handid), int(handid), int(handid), int(player))
-
-    #print query
-    sc.execute(query)
-    for (qstartcards, qstreet0Aggr, qstreet0CalledRaiseDone, qposition) in sc.fetchall():
-        humancards = Card.decodeStartHandValue("holdem", qstartcards)
-        #print humancards, qstreet0Aggr, qstreet0CalledRaiseDone, qposition
-        if qposition == "b" and qstreet0CalledRaiseDone:
-            PFdefendBB=PFdefendBB+"/"+humancards
-            count_pfd += 1
-            if (count_pfd / 8.0 == int(count_pfd / 8.0)):
-                PFdefendBB=PFdefendBB+"\n"
-        elif qstreet0Aggr == True:
-            PFaggr=PFaggr+"/"+humancards+"."+qposition
-            count_pfa += 1
-            if (count_pfa / 8.0 == int(count_pfa / 8.0)):
-                PFaggr=PFaggr+"\n"
-        elif qstreet0CalledRaiseDone:
-            PFcar=PFcar+"/"+humancards+"."+qposition
-            count_pfc += 1
-            if (count_pfc / 8.0 == int(count_pfc / 8.0)):
-                PFcar=PFcar+"\n"
-        else:
-            PFlimp=PFlimp+"/"+humancards+"."+qposition
-            count_pfl += 1
-            if (count_pfl / 8.0 == int(count_pfl / 8.0)):
-                PFlimp=PFlimp+"\n"
-    sc.close()
+    # a warm connection of the pool instead of a new Config and Database for each popup
+    with Database.pooled(hand_instance.config) as db_connection:
+        sc = db_connection.get_cursor()
+
+        query = ("SELECT distinct startCards, street0Aggr, street0CalledRaiseDone, " +
+        			"case when HandsPlayers.position = 'B' then 'b' " +
+                                "when HandsPlayers.position = 'S' then 'b' " +
+                                "when HandsPlayers.position = '0' then 'l' " +
+                                "when HandsPlayers.position = '1' then 'l' " +
+                                "when HandsPlayers.position = '2' then 'm' " +
+                                "when HandsPlayers.position = '3' then 'm' " +
+                                "when HandsPlayers.position = '4' then 'm' " +
+                                "when HandsPlayers.position = '5' then 'e' " +
+                                "when HandsPlayers.position = '6' then 'e' " +
+                                "when HandsPlayers.position = '7' then 'e' " +
+                                "when HandsPlayers.position = '8' then 'e' " +
+                                "when HandsPlayers.position = '9' then 'e' " +
+                                "else 'X' end " +
+                            "FROM Hands, HandsPlayers, Gametypes " +
+                            "WHERE HandsPlayers.handId = Hands.id " +
+                            " AND Gametypes.id = Hands.gametypeid "+
+                            " AND Gametypes.type = " +
+                            "   (SELECT Gametypes.type FROM Gametypes, Hands   " +
+                            "  WHERE Hands.gametypeid = Gametypes.id and Hands.id = %d) " +
+                            " AND Gametypes.Limittype =  " +
+                            "   (SELECT Gametypes.limitType FROM Gametypes, Hands  " +
+                            " WHERE Hands.gametypeid = Gametypes.id and Hands.id = %d) " +
+                            "AND Gametypes.category = 'holdem' " +
+                            "AND fileId = (SELECT fileId FROM Hands " +
+                            " WHERE Hands.id = %d) " +
+                            "AND HandsPlayers.playerId = %d " +
+                            "AND street0VPI " +
+                            "AND startCards > 0 AND startCards <> 170 " +
+                            "ORDER BY startCards DESC " +
+                            ";")   % (int(handid), int(handid), int(handid), int(player))
+
+        #print query
+        sc.execute(query)
+        for (qstartcards, qstreet0Aggr, qstreet0CalledRaiseDone, qposition) in sc.fetchall():
+            humancards = Card.decodeStartHandValue("holdem", qstartcards)
+            #print humancards, qstreet0Aggr, qstreet0CalledRaiseDone, qposition
+            if qposition == "b" and qstreet0CalledRaiseDone:
+                PFdefendBB=PFdefendBB+"/"+humancards
+                count_pfd += 1
+                if (count_pfd / 8.0 == int(count_pfd / 8.0)):
+                    PFdefendBB=PFdefendBB+"\n"
+            elif qstreet0Aggr == True:
+                PFaggr=PFaggr+"/"+humancards+"."+qposition
+                count_pfa += 1
+                if (count_pfa / 8.0 == int(count_pfa / 8.0)):
+                    PFaggr=PFaggr+"\n"
+            elif qstreet0CalledRaiseDone:
+                PFcar=PFcar+"/"+humancards+"."+qposition
+                count_pfc += 1
+                if (count_pfc / 8.0 == int(count_pfc / 8.0)):
+                    PFcar=PFcar+"\n"
+            else:
+                PFlimp=PFlimp+"/"+humancards+"."+qposition
+                count_pfl += 1
+                if (count_pfl / 8.0 == int(count_pfl / 8.0)):
+                    PFlimp=PFlimp+"\n"
+        sc.close()
     
     returnstring = PFlimp + "\n" + PFaggr + "\n" + PFcar + "\n" + PFdefendBB  #+ "\n" + str(handid)
 
@@ -1510,7 +1559,7 @@ misslist = [ "Configuration", "Database", "Charset", "codecs", "encoder"
                  , 'GPollableInputStream', 'GPollableOutputStream'
                  , "re", "re_Places", 'Hand'
                ]
-STATLIST = [ x for x in STATLIST if x not in ("do_stat", "do_tip","get_valid_stats")]
+STATLIST = [ x for x in STATLIST if x not in ("do_stat", "do_tip","get_valid_stats", "compile_stat", "StatPlan")]
 STATLIST = [ x for x in STATLIST if not x.startswith('_')]
 STATLIST = [ x for x in STATLIST if x not in dir(sys) ]
 STATLIST = [ x for x in STATLIST if x not in dir(codecs) ]
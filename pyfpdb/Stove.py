@@ -16,7 +16,10 @@ _ = L10n.get_translation()
 
 import sys, random
 import re
-import pokereval
+try:
+    from pokereval import PokerEval
+except ImportError:
+    from HandEval import HandEval as PokerEval
 
 SUITS = ['h', 'd', 's', 'c']
 
@@ -27,7 +30,7 @@ ANY = 0
 SUITED = 1
 OFFSUIT = 2
 
-ev = pokereval.PokerEval()
+ev = PokerEval()
 
 
 class Stove:
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+"""Stand-ins for the Config, a Database and its cursors, for the test_*.py
+modules that run without a database server.
+
+A FakeDatabase records the statements executed on its cursors and answers them
+with result(), which a test subclasses to make up the rows of its tables.
+"""
+
+import SQL
+
+
+class FakeConfig:
+    def __init__(self, name='fpdb', path=None):
+        self.name = name
+        self.config_path = path
+
+    def get_db_parameters(self):
+        return {'db-backend': 3, 'db-host': 'localhost', 'db-port': None, 'db-databaseName': self.name,
+                'db-user': 'fpdb', 'db-server': 'postgresql'}
+
+
+class FakeCursor:
+    """A DB-API cursor over rows, those given or the result of the last statement"""
+    def __init__(self, db=None, rows=()):
+        self.db = db
+        self.rows = list(rows)
+        self.description = None
+
+    def execute(self, q, args=None):
+        self.db.statements.append(q)
+        result = self.db.result(q, args)
+        if result is None:
+            self.rows, self.description = [], None
+        else:
+            columns, rows = result
+            self.rows = list(rows)
+            self.description = [(c,) for c in columns]
+
+    def executemany(self, q, rows):
+        for row in rows:
+            self.execute(q, row)
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def copy_expert(self, q, data):
+        self.db.copy(q, data)
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    PGSQL = 3
+    backend = 4     # not PGSQL, no named cursors
+    host, database = 'localhost', 'fpdb'
+
+    def __init__(self):
+        self.config = FakeConfig()
+        self.sql = SQL.Sql()
+        self.statements = []
+        self.alive, self.connects, self.closed = True, 0, False
+
+    def result(self, q, args):
+        """(column names, rows) of the statement q, None when it returns none"""
+        return None
+
+    def copy(self, q, data):
+        pass
+
+    def get_cursor(self):
+        return FakeCursor(self)
+
+    def executemany(self, c, q, rows):
+        c.executemany(q, rows)
+
+    def get_last_insert_id(self, c):
+        return None
+
+    def is_alive(self):
+        return self.alive
+
+    def do_connect(self, config):
+        self.alive = True
+        self.connects += 1
+
+    def close_connection(self):
+        self.closed = True
+
+    def rollback(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def resetCache(self):
+        pass
+
+    def get_sites(self):
+        pass
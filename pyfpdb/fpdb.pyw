@@ -39,6 +39,7 @@ import logging
 import pygtk
 pygtk.require('2.0')
 import gtk
+import gobject
 ## Horrible hack to Get Icons shown on the windows theme buttons
 gtk.Settings.set_long_property(gtk.settings_get_default(), "gtk-button-images", gtk.TRUE, "main")
 import pango
@@ -494,11 +495,12 @@ class fpdb:
 
     def dia_dump_db(self, widget, data=None):
         filename = "database-dump.sql"
-        result = self.db.dumpDatabase()
-
         dumpFile = open(filename, 'w')
-        dumpFile.write(result)
-        dumpFile.close()
+        try:
+            counts = self.db.dumpDatabase(dumpFile)
+        finally:
+            dumpFile.close()
+        log.info(_("Dumped %d rows to %s") % (sum(counts.values()), filename))
     #end def dia_database_stats
 
     def dia_recreate_tables(self, widget, data=None):
@@ -571,10 +573,19 @@ class fpdb:
                 lbl = gtk.Label(_(" Rebuilding HUD Cache ... "))
                 self.dia_confirm.vbox.add(lbl)
                 lbl.show()
+                pbar = gtk.ProgressBar()
+                self.dia_confirm.vbox.add(pbar)
+                pbar.show()
                 while gtk.events_pending():
                     gtk.main_iteration_do(False)
 
-                self.db.rebuild_cache(self.h_start_date.get_text(), self.start_date.get_text())
+                def progress(fraction):
+                    pbar.set_fraction(fraction)
+                    pbar.set_text("%d%%" % (fraction * 100))
+                    while gtk.events_pending():
+                        gtk.main_iteration_do(False)
+
+                self.db.rebuild_cache(self.h_start_date.get_text(), self.start_date.get_text(), callback=progress)
             elif response == gtk.RESPONSE_NO:
                 print _('User cancelled rebuilding hud cache')
 
@@ -737,15 +748,49 @@ class fpdb:
         dia.show_all()
         response = dia.run()
         if (response == gtk.RESPONSE_ACCEPT):
+            heroes = []
             for site_number in range(0, len(available_site_names)):
                 #print "site %s enabled=%s name=%s" % (available_site_names[site_number], check_buttons[site_number].get_active(), screen_names[site_number].get_text(), history_paths[site_number].get_text())
-                self.config.edit_site(available_site_names[site_number], str(check_buttons[site_number].get_active()), screen_names[site_number].get_text(), history_paths[site_number].get_text(), summary_paths[site_number].get_text())
+                screen_name = screen_names[site_number].get_text()
+                if screen_name and check_buttons[site_number].get_active():
+                    heroes.append((available_site_names[site_number], screen_name))
+                self.config.edit_site(available_site_names[site_number], str(check_buttons[site_number].get_active()), screen_name, history_paths[site_number].get_text(), summary_paths[site_number].get_text())
             
             self.config.save()
+            self.add_heroes(dia, heroes)
             self.reload_config(dia)
             
         dia.destroy()
         
+    def add_heroes(self, dia, heroes):
+        """Add the hands already imported of the heroes of the site preferences that
+           are new to the database to the caches kept of the heroes' hands"""
+        pids = self.db.new_heroes(heroes)
+        if not pids:
+            return
+        if not self.obtain_global_lock("add_heroes"):
+            self.warning_box(_("The hands of the new heroes have not been added to the caches because other windows have been opened.")+" "+_("Re-start fpdb and save the site preferences again to add them."))
+            return
+        lbl = gtk.Label(_(" Adding the hands of the new heroes to the caches ... "))
+        dia.vbox.add(lbl)
+        lbl.show()
+        pbar = gtk.ProgressBar()
+        dia.vbox.add(pbar)
+        pbar.show()
+        while gtk.events_pending():
+            gtk.main_iteration_do(False)
+
+        def progress(fraction):
+            pbar.set_fraction(fraction)
+            pbar.set_text("%d%%" % (fraction * 100))
+            while gtk.events_pending():
+                gtk.main_iteration_do(False)
+
+        try:
+            self.db.add_heroes(pids, callback=progress)
+        finally:
+            self.release_global_lock()
+
     def autoenableSite(self, widget, data):
         #autoactivate site if something gets typed in the screename field
         checkbox=data[0]
@@ -1458,5 +1503,6 @@ You can find the full license texts in agpl-3.0.txt, gpl-2.0.txt, gpl-3.0.txt an
 
 
 if __name__ == "__main__":
+    gobject.threads_init()  # auto import runs in a thread of its own, see GuiAutoImport.ImportWorker
     me = fpdb()
     me.main()
@@ -335,7 +335,7 @@ class iPoker(HandHistoryConverter):
         for a in m:
             ag = a.groupdict()
             plist[a.group('PNAME')] = [int(a.group('SEAT')), self.clearMoneyString(a.group('CASH')), self.clearMoneyString(a.group('WIN')), False]
-            re_sitout = re.compile(r'<action no="[0-9]+" player="' + re.escape(a.group('PNAME')) + '" type="9"')
+            re_sitout = self.compileRegex(r'<action no="[0-9]+" player="' + re.escape(a.group('PNAME')) + '" type="9"')
             if re_sitout.search(hand.handText):
                 if hand.gametype['type'] == "ring" :
                     # Remove any listed as sitting out in the summary as start of hand info unreliable
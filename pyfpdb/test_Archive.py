@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+import shutil
+import tempfile
+from datetime import datetime
+
+import Archive
+
+def writeChunk(archive, first, last):
+    for hid in range(first, last + 1):
+        archive.rows['Hands'].append([hid, datetime(2012, 1, 1, 0, hid % 60)])
+        archive.rows['HandsActions'].append([hid, 7, 1, 1, 1, 2, 50, 0, 0, 0, None, False])
+        archive.rows['HandsStove'].append([hid, 7, 1, 1, 'n', 1, 0, None, 0])
+    archive.writeHands()
+
+def testChunks():
+    path = tempfile.mkdtemp()
+    try:
+        archive = Archive.Archive(path = path)
+        writeChunk(archive, 1, 10)
+        writeChunk(archive, 11, 20)
+        chunks = archive.chunks()
+        assert [c.hands for c in chunks] == [(1, 10), (11, 20)]
+        assert chunks[1].readTable('HandsStove')[0] == [11, 7, 1, 1, 'n', 1, 0, None, 0]
+        assert len(chunks[0].readTable('HandsActions')) == 10
+        assert chunks[0].readTable('HandsPlayers') == []
+        assert [c.hands for c in archive.chunks(hands = (15, 30))] == [(11, 20)]
+        assert archive.chunks(startTimes = (datetime(2012, 1, 2), datetime(2012, 1, 3))) == []
+    finally:
+        shutil.rmtree(path)
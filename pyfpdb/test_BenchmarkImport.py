@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+import BenchmarkImport
+import ImportProfile
+
+def testCompareResults():
+    profile = ImportProfile.ImportProfile()
+    profile.add('parse', 1.0, 100)
+    profile.add('read', 1.0, 3)
+    profile.add('derive', 2.0, 100)
+    results = {'PokerStars': BenchmarkImport.rates(profile)}
+    assert results['PokerStars'] == {'parse': [100, 50.0], 'derive': [100, 50.0]}
+    baseline = {'PokerStars': {'parse': [100, 60.0], 'derive': [100, 100.0], 'store': [100, 10.0]},
+                'all': {'parse': [1, 1000.0]}}
+    regressions = BenchmarkImport.compareResults(results, baseline, 0.2)
+    assert len(regressions) == 1 and regressions[0].startswith('PokerStars derive: 50 hands/s')
+    assert BenchmarkImport.compareResults(results, baseline, 0.6) == []
+
+def testComparePeakMemory():
+    results = {'PokerStars': {'parse': [100, 50.0], 'peakKB': 130000}, 'all': {'peakKB': None}}
+    baseline = {'PokerStars': {'parse': [100, 50.0], 'peakKB': 100000}, 'all': {'peakKB': 90000}}
+    regressions = BenchmarkImport.compareResults(results, baseline, 0.2)
+    assert len(regressions) == 1 and regressions[0].startswith('PokerStars peak memory: 130000 KB')
+    assert BenchmarkImport.compareResults(results, baseline, 0.5) == []
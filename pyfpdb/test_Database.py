@@ -19,6 +19,8 @@ import sqlite3
 import Database
 import math
 
+from TestFakes import FakeConfig, FakeDatabase
+
 # Should probably use our wrapper classes - creating sqlite db in memory
 sqlite3.register_converter("bool", lambda x: bool(int(x)))
 sqlite3.register_adapter(bool, lambda x: "1" if x else "0")
@@ -81,3 +83,36 @@ def testSQLiteModFunction():
         idx = idx+1
 
     cur.execute("DROP TABLE test")
+
+class FakePool(Database.ConnectionPool):
+    def open(self, config, sql=None):
+        return FakeDatabase()
+
+def testConnectionPool():
+    import threading
+    pool = FakePool(size = 2, timeout = 0.1)
+    fpdb, other = FakeConfig('fpdb'), FakeConfig('other')
+    db = pool.checkout(fpdb)
+    assert pool.checkout(fpdb) is db        # the thread's own handle, checked out twice
+    pool.checkin(db)
+    assert pool.idle == []
+    pool.checkin(db)
+    assert [d for k, d in pool.idle] == [db]
+
+    # another thread gets the idle handle, reconnected if its connection died
+    db.alive = False
+    got = []
+    t = threading.Thread(target = lambda: got.append(pool.checkout(fpdb)))
+    t.start(); t.join()
+    assert got == [db] and db.connects == 1
+
+    # the pool is full while that thread holds db and this one a handle to other
+    db2 = pool.checkout(other)
+    try:
+        pool.checkout(fpdb)
+        assert False
+    except Database.FpdbError:
+        pass
+    pool.checkin(db2)
+    db3 = pool.checkout(fpdb)               # closes the idle handle of other to make room
+    assert db2.closed and db3 is not db and pool.count == 2
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+import csv
+from datetime import datetime
+from decimal import Decimal
+from cStringIO import StringIO
+
+import DatabaseDump
+import ReportCache
+from TestFakes import FakeDatabase
+
+TABLES = {
+    'Sites'    : (['id', 'name', 'code'], [(1, u'Full Tilt Poker', u'FT'), (2, u'PokerStars', u'PS')]),
+    'RawHands' : (['id', 'handId', 'rawHand', 'complain'],
+                  [(n, n * 10, u'Seat 1: "Plàyer", 5\nTotal pot %d' % n, n % 2 == 0) for n in range(1, 8)]),
+    'Hands'    : (['id', 'startTime', 'rake', 'comment'],
+                  [(1, datetime(2012, 1, 2, 3, 4, 5), Decimal('0.25'), None), (2, datetime(2012, 1, 3), 0, u'')]),
+}
+
+class FakeDumpDatabase(FakeDatabase):
+    def __init__(self):
+        FakeDatabase.__init__(self)
+        self.copied = {}
+
+    def result(self, q, args):
+        if q.startswith('SELECT *'):
+            return TABLES.get(q.split()[-1], (['id'], []))
+
+    def copy(self, q, data):
+        self.copied.setdefault(q.split()[1], []).extend(csv.reader(data))
+
+def testDumpRestore():
+    size, DatabaseDump.FETCH_SIZE = DatabaseDump.FETCH_SIZE, 3
+    try:
+        for format in ('csv', 'binary'):
+            f, progress = StringIO(), []
+            counts = DatabaseDump.dump(FakeDumpDatabase(), f, format, lambda table, rows: progress.append((table, rows)))
+            assert counts['RawHands'] == 7 and counts['Hands'] == 2 and counts['Players'] == 0
+            assert [p for p in progress if p[0] == 'RawHands'] == [('RawHands', 3), ('RawHands', 6), ('RawHands', 7)]
+
+            db = FakeDumpDatabase()
+            ReportCache.forConfig(db.config).add('key', [], 1)
+            f.seek(0)
+            assert DatabaseDump.restore(db, f) == dict([(t, len(TABLES.get(t, ([], []))[1])) for t in db.sql.dump_tables])
+            assert db.statements[0] == 'DELETE FROM RawTourneys'
+            assert sorted(db.copied) == sorted(TABLES)
+            assert not ReportCache.forConfig(db.config).results
+            for table, (columns, rows) in TABLES.items():
+                assert db.copied[table] == [[DatabaseDump.csvLine([v]).strip().strip('"').replace('""', '"') for v in row]
+                                            for row in rows]
+    finally:
+        DatabaseDump.FETCH_SIZE = size
+
+def testTextDump():
+    f = StringIO()
+    DatabaseDump.dump(FakeDumpDatabase(), f)
+    text = f.getvalue()
+    assert text.startswith("fpdb database dump\n")
+    assert "Table Players\n###################\nempty table\n" in text
+    assert "  name=PokerStars\n" in text and "  rawHand=Seat 1: \"Plàyer\"" in text
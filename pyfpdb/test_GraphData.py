@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+from decimal import Decimal
+
+import numpy
+
+import GraphData
+from TestFakes import FakeCursor
+
+def testRingProfitLines():
+    rows = [(1, 100, True, Decimal('50')), (2, -30, False, None), (3, 20, True, 20)]
+    data = GraphData.fetchArray(FakeCursor(rows=rows), [1, 2, 3], size=2)
+    green, blue, red, orange = GraphData.ringProfitLines(data[:, 0], data[:, 1], data[:, 2])
+    assert list(green) == [100, 70, 90]
+    assert list(blue) == [100, 100, 120]
+    assert list(red) == [0, -30, -30]
+    assert list(orange) == [50, 50, 70]
+
+def testDownsample():
+    line = numpy.cumsum(numpy.random.RandomState(1).randn(100000))
+    x, y = GraphData.downsample(line, 800)
+    assert len(x) <= 2 * 800 + 2
+    assert x[0] == 0 and x[-1] == len(line) - 1
+    assert all(numpy.diff(x) > 0)
+    assert y.min() == line.min() and y.max() == line.max()
+    x, y = GraphData.downsample(line[:100], 800)
+    assert list(y) == list(line[:100])
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+import Configuration
+import PokerStarsToFpdb
+from TestFakes import FakeDatabase
+
+config = Configuration.Config(file = "HUD_config.test.xml")
+config.set_site_ids([('PokerStars', 32)])
+
+class FakeIdDatabase(FakeDatabase):
+    """Hands out the ids prepInsert asks for"""
+    def getSqlPlayerIDs(self, pnames, siteId, hero):
+        return dict([(p, 100 + i) for i, p in enumerate(pnames)])
+
+    def getSqlGameTypeId(self, siteId, gametype, printdata = False):
+        return 3
+
+    def getSqlTourneyTypeIDs(self, hand):
+        return 5
+
+    def getSqlTourneyIDs(self, hand):
+        return 7
+
+    def getSqlTourneysPlayersIDs(self, hand):
+        return dict([(p[1], 200 + i) for i, p in enumerate(hand.players)])
+
+def testDetachedTourneyIds():
+    """A tourney hand assembled in a parse process of a parallel import gets the
+       db ids of the writer"""
+    hhc = PokerStarsToFpdb.PokerStars(config, in_path = "regression-test-files/tour/Stars/Flop/NLHE-2max-USD-STT-20-201209.txt",
+                                      autostart = False, sitename = "PokerStars")
+    hhc.setAutoPop(False)
+    hhc.start()
+    hands = hhc.getProcessedHands()
+    assert hands
+    db = FakeIdDatabase()
+    for hand in hands:
+        hand.assembleDetached()
+        assert hand.hands['tourneyId'] is None
+        hand.prepInsert(db)
+        hand.remapIds()
+        assert hand.hands['tourneyId'] == 7
+        for pname, hp in hand.handsplayers.iteritems():
+            assert hp['tourneyTypeId'] == 5 and hp['tourneysPlayersIds'] == hand.tourneysPlayersIds[pname]
+        assert set([hs[1] for hs in hand.handsstove]) <= set(hand.dbid_pids.values())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+import HandEval
+
+ev = HandEval.HandEval()
+
+def testBestHi():
+    value, rank = ev.best('hi', ['As','Ad','Kh','Kc','2s','3d','Ks'])
+    assert rank[0] == 'FlHouse'
+    assert ''.join([ev.card2string(c)[0] for c in rank[1:]]) == 'KKKAA'
+    value, rank = ev.best('hi', ['Ah','2d','3c','4s','5h','Kd','Qd'])
+    assert rank[0] == 'Straight'
+    assert ''.join([ev.card2string(c)[0] for c in rank[1:]]) == '5432A'
+
+def testBestOmaha():
+    # only two cards from the hand play: no flush with a single heart
+    value, rank = ev.best('hi', ['Ah','Kd','2d','2c'], ['Qh','Jh','Th','9h','3s'])
+    assert rank[0] == 'Straight'
+    value, rank = ev.best('low', ['Ah','2d','Kc','Kd'], ['3c','4s','8h','Kh','7d'])
+    assert ''.join([ev.card2string(c)[0] for c in rank[1:]]) == '7432A'
+
+def testWinners():
+    board = ['2c','7d','9h','Tc','Jd']
+    assert ev.winners('holdem', [['As','Ah'] + board, ['Kd','Kc'] + board]) == {'hi': [0]}
+    assert ev.winners('holdem', [['As','Kh'] + board, ['Ad','Kc'] + board]) == {'hi': [0, 1]}
+    win = ev.winners('omaha8', [['As','2h','3d','Kc'],['Ad','Kd','Qc','Jc']], ['4c','7d','8h','Ts','Js'])
+    assert win == {'hi': [1], 'low': [0]}
+
+def testPokerEval():
+    res = ev.poker_eval('holdem', [['As','Ah'],['Kd','Kc']], ['2c','7d','9h','__','__'], [], 0)
+    assert res['info'] == (990, 0, 1)
+    assert res['eval'][0]['winhi'] + res['eval'][1]['winhi'] == 990
+    assert res['eval'][0]['ev'] == 916
+    res = ev.poker_eval('holdem', [['As','Ah'],['Kd','Kc']], ['__']*5, [], 20000)
+    assert 790 < res['eval'][0]['ev'] < 840
+
+def testSamples():
+    # as few deals as samples asked for: enumerated
+    res = ev.poker_eval('holdem', [['As','Ah'],['Kd','Kc']], ['2c','7d','9h','__','__'], [], 50000)
+    assert res['info'] == (990, 0, 1) and res['eval'][0]['ev'] == 916
+    res = HandEval.HandEval(1000).poker_eval('holdem', [['As','Ah'],['Kd','Kc']], ['__']*5, [], 50000)
+    assert res['info'][0] == 1000
+    res = HandEval.HandEval(1000).poker_eval('omaha', [['As','Ah','2c','3d'],['Kd','Kc','Qs','Js']], ['__']*5, [], 50000)
+    assert res['info'][0] == 1000 / HandEval.OMAHA_COST
+    res = HandEval.HandEval(1000).poker_eval('holdem', [['As','Ah'],['Kd','Kc']], ['2c','7d','9h','__','__'], [], 0)
+    assert res['info'][0] == 990
+    res = HandEval.HandEval(500).poker_eval('holdem', [['As','Ah'],['Kd','Kc']], ['2c','7d','9h','__','__'], [], 0)
+    assert res['info'][0] == 500
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+import os
+import shutil
+import tempfile
+
+import Configuration
+import PokerStarsToFpdb
+
+config = Configuration.Config(file = "HUD_config.test.xml")
+config.set_site_ids([('PokerStars', 32)])
+
+def tail(path, offset, kodec):
+    hhc = PokerStarsToFpdb.PokerStars(config, in_path = path, autostart = False, sitename = "PokerStars")
+    hhc.setAutoPop(False)
+    hhc.setTailOffset(offset, kodec)
+    hhc.start()
+    return hhc
+
+def testTailCodecChange():
+    """A cp1252 file taken for utf8 while it was plain ASCII"""
+    ascii = open("regression-test-files/cash/Stars/Flop/NLHE-6max-USD-0.05-0.10-200911.txt", 'rb').read()
+    euro = open("regression-test-files/cash/Stars/Flop/NLHE-6max-EUR-1.00-2.00-201212.RunItTwice.txt", 'rb').read()
+    dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(dir, "hh.txt")
+        f = open(path, 'wb')
+        f.write(ascii.rstrip() + "\r\n\r\n\r\n")
+        f.close()
+        hhc = tail(path, 0, None)
+        offset, kodec = hhc.getLastByteRead(), hhc.kodec
+        assert kodec == "utf8" and len(hhc.getProcessedHands()) == ascii.count("PokerStars Game #")
+
+        f = open(path, 'ab')
+        f.write(euro)
+        f.close()
+        hhc = tail(path, offset, kodec)
+        assert hhc.kodec == "cp1252"
+        assert [h.handid for h in hhc.getProcessedHands()] == [euro.split('#')[1].split(':')[0]]
+        assert hhc.getProcessedHands()[0].gametype['currency'] == 'EUR'
+    finally:
+        shutil.rmtree(dir)
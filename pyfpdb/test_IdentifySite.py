@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+import os
+import shutil
+import tempfile
+
+import Configuration
+import IdentifySite
+
+config = Configuration.Config(file = "HUD_config.test.xml")
+
+def testCacheSites():
+    """The cache of a file identified, or not, follows the sites configured"""
+    stars = "regression-test-files/cash/Stars/Flop/NLHE-6max-USD-0.05-0.10-200911.txt"
+    others = dict([(s, h) for s, h in config.hhcs.iteritems() if s != 'PokerStars'])
+    dir = tempfile.mkdtemp()
+    try:
+        cache = os.path.join(dir, "cache")
+        ids = IdentifySite.IdentifySite(config, cache = cache)
+        ids.scan(stars)
+        assert ids.get_fobj(stars).site.name == 'PokerStars'
+        ids.save_cache()
+
+        ids = IdentifySite.IdentifySite(config, hhcs = others, cache = cache)
+        ids.scan(stars)
+        assert not ids.get_fobj(stars)
+        ids.save_cache()
+
+        ids = IdentifySite.IdentifySite(config, cache = cache)
+        ids.scan(stars)
+        assert ids.get_fobj(stars).site.name == 'PokerStars'
+    finally:
+        shutil.rmtree(dir)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+import json
+
+import ImportProfile
+
+class Converter:
+    def readBlinds(self, hand):
+        return hand
+
+def testStages():
+    profile = ImportProfile.ImportProfile()
+    profile.add('read', 0.5)
+    before = profile.copy()
+    profile.add('read', 0.25)
+    profile.add('parse', 1.0, calls = 4)
+    hhc = Converter()
+    profile.instrument(hhc, ImportProfile.PARSE_METHODS, 'parse.')
+    assert hhc.readBlinds('hand') == 'hand'
+    assert profile.stages['parse.readBlinds'][0] == 1
+    assert 'parse.readAction' not in profile.stages
+    since = profile.since(before)
+    assert since.stages['read'] == [1, 0.25]
+    assert since.stages['parse'] == [4, 1.0]
+    assert before.stages == {'read': [1, 0.5]}
+    assert json.loads(since.toJSON())['parse'] == {'calls': 4, 'seconds': 1.0}
+    assert profile.report().splitlines()[0].startswith('parse: 4 calls')
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+import RawText
+from TestFakes import FakeDatabase
+
+def hand(n):
+    return (u"PokerStars Hand #%d: Hold'em No Limit ($0.01/$0.02 USD) - 2012/01/0%d\n"
+            u"Table 'Aase III' 6-max Seat #%d is the button\n" % (n, n % 9, n % 6)
+            + u"".join([u"Seat %d: Plàyer%d ($%d.00 in chips)\n" % (s, s * n % 7, s + n % 3) for s in range(1, 7)])
+            + u"Player%d: folds\n*** SUMMARY ***\nTotal pot $0.%02d | Rake $0\n" % (n % 5, n % 100))
+
+class FakeRawDatabase(FakeDatabase):
+    def __init__(self):
+        FakeDatabase.__init__(self)
+        self.rows = []      # (id, handId, rawHand, complain)
+
+    def result(self, q, args):
+        if q.startswith('INSERT'):
+            self.rows.append((len(self.rows) + 1,) + tuple(args))
+        elif 'LIMIT 1' in q:
+            return (['id', 'rawHand'], [(r[0], r[2]) for r in self.rows if r[1] == args[0]][-1:])
+        elif 'LIMIT' in q:
+            return (['id', 'handId', 'rawHand'], [r[:3] for r in self.rows
+                                                  if r[0] > args[0] and args[1] <= r[1] <= args[2] and not r[3]][:args[3]])
+        else:
+            return (['rawHand'], [(r[2],) for r in self.rows if r[0] == args[0]])
+
+    def get_last_insert_id(self, c):
+        return len(self.rows)
+
+class Settings:
+    def __init__(self, save, compression):
+        self.save, self.compression = save, compression
+
+def testEncodeDecode():
+    text = hand(1)
+    for compression in ("none", "gzip", "bzip2"):
+        stored = RawText.encode(text, compression)
+        assert (stored == text) == (compression == "none")
+        assert RawText.decode(stored) == text
+    dictionary = RawText.Dictionary(RawText.train([hand(n) for n in range(2, 100)]))
+    stored = RawText.encode(text, "gzip", (7, dictionary))
+    assert len(stored) < len(RawText.encode(text, "gzip"))
+    assert RawText.decode(stored, {7: dictionary}.get) == text
+
+def testRawStore():
+    db = FakeRawDatabase()
+    store = RawText.RawStore(db, 'RawHands', Settings("error", "gzip"))
+    store.add(1, hand(1), 2)
+    store.add(0, hand(2), 2, complain=True)
+    assert store.flush() == 1
+    assert [r[1:] for r in db.rows] == [(0, RawText.encode(hand(2), "gzip"), True)]
+
+    db = FakeRawDatabase()
+    store = RawText.RawStore(db, 'RawHands', Settings("all", "gzip"))
+    texts = [hand(n) for n in range(1, 200)]
+    for n, text in enumerate(texts, start=1):
+        store.add(n, text, 2)
+    assert store.flush() == len(texts)
+    dictionaries = [r for r in db.rows if r[1] == -2]
+    assert len(dictionaries) == 1
+    assert db.rows[-1][2].startswith(u'\x02d%d:' % dictionaries[0][0])
+    size, RawText.FETCH_SIZE = RawText.FETCH_SIZE, 50
+    try:
+        store = RawText.RawStore(db, 'RawHands', Settings("all", "gzip"))
+        assert list(store.texts()) == list(enumerate(texts, start=1))
+        assert list(store.texts((10, 12))) == [(n, texts[n - 1]) for n in (10, 11, 12)]
+    finally:
+        RawText.FETCH_SIZE = size
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+import re
+
+import RegexCache
+
+def testLeastRecentlyUsed():
+    cache = RegexCache.RegexCache(size = 2)
+    a = cache.compile(r'^a', re.MULTILINE, 'Site')
+    cache.compile(r'^b', owner = 'Site')
+    assert cache.compile(r'^a', re.MULTILINE, 'Site') is a
+    cache.compile(r'^c', owner = 'Other')   # drops ^b, the least recently used
+    assert cache.patterns.keys() == [(r'^a', re.MULTILINE), (r'^c', 0)]
+    assert cache.compile(r'^a', re.MULTILINE, 'Site') is a
+    cache.compile(r'^b', owner = 'Site')
+    assert cache.stats['Site'][:2] == [2, 3]
+    assert cache.hitRate('Site') == 0.4
+    assert cache.hitRate() == 2.0 / 6
+    assert 'Other regexes: 1 lookups' in cache.report()
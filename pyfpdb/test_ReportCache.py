@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+import os
+import shutil
+import tempfile
+
+import ReportCache
+from TestFakes import FakeConfig, FakeDatabase
+
+class FakeReportDatabase(FakeDatabase):
+    def __init__(self):
+        FakeDatabase.__init__(self)
+        self.maxHandId = 10
+        self.rows = 3
+        self.queries = []
+
+    def result(self, q, args):
+        if q == self.sql.query['get_report_generation']:
+            return (['hands', 'tourneys', 'players'], [(self.maxHandId, 1, 1)])
+        self.queries.append(q)
+        return (['Query', 'Row'], [(q, i) for i in range(self.rows)])
+
+def testMemory():
+    db = FakeReportDatabase()
+    cache = ReportCache.ReportCache(size=200)
+    c = db.get_cursor()
+    assert cache.query(db, c, 'a') == (['Query', 'Row'], [('a', 0), ('a', 1), ('a', 2)])
+    assert cache.query(db, c, 'a')[1][2] == ('a', 2)
+    assert db.queries == ['a'] and (cache.hits, cache.misses) == (1, 1)
+    db.maxHandId += 1                   # hands imported
+    cache.query(db, c, 'a')
+    assert db.queries == ['a', 'a']
+    for q in 'bcdefgh':                 # least recently used dropped past size
+        cache.query(db, c, q)
+    assert cache.used <= 200 and len(cache.results) < 8
+    cache.query(db, c, 'h')
+    cache.query(db, c, 'b')
+    assert db.queries[-2:] == ['h', 'b']
+
+def testDisk():
+    path = tempfile.mkdtemp()
+    try:
+        config = FakeConfig(path=path)
+        db = FakeReportDatabase()
+        ReportCache.forConfig(config).query(db, db.get_cursor(), 'a')
+        files = os.listdir(os.path.join(path, 'ReportCache'))
+        assert len(files) == 1
+        # another process, or the next run
+        cache = ReportCache.ReportCache(os.path.join(path, 'ReportCache'), diskSize=1000)
+        assert cache.query(db, db.get_cursor(), 'a')[1][0] == ('a', 0)
+        assert db.queries == ['a'] and cache.hits == 1
+        db.rows = 30
+        for q in 'bcdefgh':
+            cache.query(db, db.get_cursor(), q)
+        sizes = [os.path.getsize(os.path.join(path, 'ReportCache', f)) for f in os.listdir(os.path.join(path, 'ReportCache'))]
+        assert sum(sizes) <= 1000 and len(sizes) < 8
+        ReportCache.invalidate(config)
+        assert os.listdir(os.path.join(path, 'ReportCache')) == []
+        assert not ReportCache.forConfig(config).results
+    finally:
+        shutil.rmtree(path)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#This program is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Affero General Public License as published by
+#the Free Software Foundation, version 3 of the License.
+#
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU Affero General Public License
+#along with this program. If not, see <http://www.gnu.org/licenses/>.
+#In the "official" distribution you can find the license in agpl-3.0.txt.
+
+from decimal import Decimal
+
+import numpy
+
+import SessionData
+from TestFakes import FakeCursor
+
+def testHandSessions():
+    rng = numpy.random.RandomState(3)
+    times = numpy.cumsum(rng.randint(1, 3000, 500))
+    profits = rng.randint(-500, 500, 500)
+    start, end, hands, profit, high, low = SessionData.handSessions(times, profits, 1800)
+    assert hands.sum() == 500 and len(start) == (numpy.diff(times) > 1800).sum() + 1
+    first = 0
+    for i in range(len(start)):
+        last = first + hands[i]
+        running = numpy.concatenate(([0], numpy.cumsum(profits[first:last])))
+        assert (start[i], end[i]) == (times[first], times[last - 1])
+        assert (profit[i], high[i], low[i]) == (profits[first:last].sum(), running.max(), running.min())
+        first = last
+
+def testSessionTable():
+    assert SessionData.sessionTable(*SessionData.handSessions([], [], 1800)) == ([], [], [])
+    times = [10000, 10600, 20000, 20000, 20300]
+    results, quotes, times = SessionData.sessionTable(*SessionData.handSessions(times, [100, -300, 50, 400, -100], 1800))
+    assert times == [(10000, 10600), (20000, 20300)]
+    assert quotes == [(1, 0, -2, 1, -2), (2, -2, 1.5, 2.5, -2)]
+    assert [r[1] for r in results] == [2, 3, '', 3 + 2]
+    assert results[0][4] == 2 * 60 / 15 and results[-1][4] == 5 * 60 / 25
+    assert results[-1][5:] == ['0.00', '1.50', '-2.00', '2.50', '4.50', '1.50']
+
+def testFetchSessions():
+    rows = [(10000.0, 10600.0, 2, Decimal(-200), Decimal(100), 0), (20000.0, 20300.0, 3, 350, None, None)]
+    start, end, hands, profit, high, low = SessionData.fetchSessions(FakeCursor(rows=rows))
+    assert list(hands) == [2, 3] and list(profit) == [-200, 350]
+    assert list(high) == [100, 0] and list(low) == [0, 0]